@@ -0,0 +1,107 @@
+"""add_corpus_generations
+
+Revision ID: a3c9e1f4b7d2
+Revises: e58b0c4f9a13
+Create Date: 2025-11-14 10:12:37.408211
+
+Счётчик версий корпуса пользователя для кэша результатов поиска.
+Триггеры увеличивают generation при любом изменении видимого пользователю
+корпуса: индексация (search_index), связь с документом, мягкое удаление и
+восстановление (user_documents), удаление документа (каскадом). Триггеры, а не
+вызовы из Python, — чтобы версию меняли все пути записи: psycopg2 (db_indexing),
+ORM (routes/files.py, BlobStorageService) и GC.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e1f4b7d2'
+down_revision: Union[str, None] = 'e58b0c4f9a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Таблицы, изменения которых меняют видимый пользователю корпус
+_TRIGGER_TABLES = ('user_documents', 'search_index')
+
+
+def upgrade() -> None:
+    """Создать corpus_generations и триггеры инкремента."""
+    op.create_table(
+        'corpus_generations',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('generation', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+    # Триггеры уровня оператора: пакетная индексация или каскадное удаление
+    # N документов увеличивают generation каждого затронутого пользователя
+    # один раз, а не N раз, и не держат блокировку строки corpus_generations
+    # на каждой вставке. Таблицы переходов доступны только триггерам
+    # с одним событием и без списка столбцов UPDATE — поэтому по три триггера
+    # на таблицу, а отслеживаемые столбцы сравниваются в функции.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_corpus_generation() RETURNS trigger AS $$
+        DECLARE
+            uids integer[];
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(DISTINCT user_id) INTO uids FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(DISTINCT user_id) INTO uids FROM old_rows;
+            ELSIF TG_TABLE_NAME = 'user_documents' THEN
+                SELECT array_agg(DISTINCT n.user_id) INTO uids
+                FROM new_rows n JOIN old_rows o ON o.id = n.id
+                WHERE (o.is_soft_deleted, o.user_path, o.original_filename)
+                      IS DISTINCT FROM (n.is_soft_deleted, n.user_path, n.original_filename);
+            ELSE
+                SELECT array_agg(DISTINCT n.user_id) INTO uids
+                FROM new_rows n JOIN old_rows o ON o.id = n.id
+                WHERE o.content IS DISTINCT FROM n.content
+                   OR o.metadata::text IS DISTINCT FROM n.metadata::text;
+            END IF;
+            IF uids IS NULL THEN
+                RETURN NULL;
+            END IF;
+            -- Пользователь, удаляемый каскадом вместе со своими строками, уже отсутствует
+            -- в users; строки блокируются в порядке user_id (без взаимоблокировок)
+            INSERT INTO corpus_generations (user_id, generation, updated_at)
+            SELECT u.id, 1, NOW() FROM users u WHERE u.id = ANY(uids) ORDER BY u.id
+            ON CONFLICT (user_id) DO UPDATE
+            SET generation = corpus_generations.generation + 1, updated_at = NOW();
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    for table in _TRIGGER_TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_corpus_generation_insert
+            AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_corpus_generation();
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_corpus_generation_delete
+            AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_corpus_generation();
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_corpus_generation_update
+            AFTER UPDATE ON {table}
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_corpus_generation();
+        """)
+
+
+def downgrade() -> None:
+    """Удалить триггеры и corpus_generations."""
+    for table in _TRIGGER_TABLES:
+        for event in ('insert', 'delete', 'update'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_corpus_generation_{event} ON {table};")
+    op.execute("DROP FUNCTION IF EXISTS bump_corpus_generation();")
+    op.drop_table('corpus_generations')
@@ -0,0 +1,72 @@
+"""search_index_content_squashed
+
+Revision ID: b7e2d94c1f38
+Revises: a3c9e1f4b7d2
+Create Date: 2025-11-15 11:26:04.118530
+
+Толерантный поиск терминов, разорванных OCR или переносом строки
+(«по-ставка», «пос тавка», мягкий перенос). Раньше это умел только legacy
+Searcher — регулярным выражением с разрывом между каждой парой букв по всему
+тексту. Добавляем столбец content_squashed (content без пробелов, дефисов и
+мягких переносов), который заполняет существующий триггер search_index при
+индексации, и trigram GIN индекс по нему: поиск «поставка» становится
+content_squashed ILIKE '%поставка%' по индексу.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d94c1f38'
+down_revision: Union[str, None] = 'a3c9e1f4b7d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Функция squash_search_text, столбец content_squashed, его заполнение и trigram индекс."""
+    # Набор символов совпадает с TOLERANT_GAP_CHARS в search_index_repository
+    op.execute(r"""
+        CREATE OR REPLACE FUNCTION squash_search_text(t text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT regexp_replace(t, '[ \t\n\r\f\v\u00A0\u00AD\u200B\uFEFF-]+', '', 'g');
+        $$;
+    """)
+    op.execute("ALTER TABLE search_index ADD COLUMN IF NOT EXISTS content_squashed TEXT;")
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION search_index_tsvector_trigger()
+        RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := to_tsvector('russian', COALESCE(NEW.content, ''));
+            NEW.content_squashed := squash_search_text(COALESCE(NEW.content, ''));
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # Заполнение существующих строк (триггер при этом пересчитает и search_vector)
+    op.execute("UPDATE search_index SET content_squashed = squash_search_text(COALESCE(content, ''));")
+
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_search_index_content_squashed_trgm
+        ON search_index
+        USING GIN (content_squashed gin_trgm_ops);
+    """)
+
+
+def downgrade() -> None:
+    """Вернуть прежний триггер и удалить content_squashed с индексом и функцией."""
+    op.execute("DROP INDEX IF EXISTS idx_search_index_content_squashed_trgm;")
+    op.execute("""
+        CREATE OR REPLACE FUNCTION search_index_tsvector_trigger()
+        RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := to_tsvector('russian', COALESCE(NEW.content, ''));
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("ALTER TABLE search_index DROP COLUMN IF EXISTS content_squashed;")
+    op.execute("DROP FUNCTION IF EXISTS squash_search_text(text);")
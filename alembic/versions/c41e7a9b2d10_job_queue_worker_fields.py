@@ -0,0 +1,44 @@
+"""job_queue_worker_fields
+
+Revision ID: c41e7a9b2d10
+Revises: 209c1dea59f0
+Create Date: 2025-11-12 10:15:42.318904
+
+Фоновые воркеры индексации.
+Добавляем в job_queue поля для протокола захвата задач (SKIP LOCKED),
+повторов с backoff и хранения результата/ошибки.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e7a9b2d10'
+down_revision: Union[str, None] = '209c1dea59f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Добавить поля повторов, backoff и результата в job_queue."""
+    op.add_column('job_queue', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('job_queue', sa.Column('max_attempts', sa.Integer(), server_default='3', nullable=False))
+    op.add_column('job_queue', sa.Column('run_after', sa.DateTime(), nullable=True))
+    op.add_column('job_queue', sa.Column('last_error', sa.Text(), nullable=True))
+    op.add_column('job_queue', sa.Column('result_json', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+    # Индекс для выборки готовых к запуску задач (status='queued' AND run_after <= NOW())
+    op.create_index('idx_job_queue_status_run_after', 'job_queue', ['status', 'run_after'], unique=False)
+
+
+def downgrade() -> None:
+    """Удалить поля воркеров из job_queue."""
+    op.drop_index('idx_job_queue_status_run_after', table_name='job_queue')
+    op.drop_column('job_queue', 'result_json')
+    op.drop_column('job_queue', 'last_error')
+    op.drop_column('job_queue', 'run_after')
+    op.drop_column('job_queue', 'max_attempts')
+    op.drop_column('job_queue', 'attempts')
@@ -0,0 +1,36 @@
+"""search_index_content_trgm
+
+Revision ID: d7f3a1c8e502
+Revises: c41e7a9b2d10
+Create Date: 2025-11-12 14:02:27.540113
+
+Поиск подстрок по search_index.
+Фильтр content ILIKE '%kw%' не мог использовать GIN индекс по search_vector,
+поэтому каждый поиск читал (и детостил) полный текст всех документов.
+Добавляем расширение pg_trgm и GIN индекс gin_trgm_ops по content.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f3a1c8e502'
+down_revision: Union[str, None] = 'c41e7a9b2d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Создать расширение pg_trgm и trigram GIN индекс по search_index.content."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_search_index_content_trgm
+        ON search_index
+        USING GIN (content gin_trgm_ops);
+    """)
+
+
+def downgrade() -> None:
+    """Удалить trigram индекс (расширение pg_trgm оставляем — его могут использовать другие объекты)."""
+    op.execute("DROP INDEX IF EXISTS idx_search_index_content_trgm;")
@@ -0,0 +1,40 @@
+"""add_embedding_cache
+
+Revision ID: e58b0c4f9a13
+Revises: d7f3a1c8e502
+Create Date: 2025-11-12 17:41:09.662135
+
+Кэш эмбеддингов в PostgreSQL.
+Ключ (model, dimension, text_sha256) — sha256 нормализованного текста чанка;
+EmbeddingsService обращается к кэшу до вызова API провайдера.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e58b0c4f9a13'
+down_revision: Union[str, None] = 'd7f3a1c8e502'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Создать таблицу embedding_cache."""
+    op.create_table(
+        'embedding_cache',
+        sa.Column('model', sa.String(length=100), nullable=False),
+        sa.Column('dimension', sa.Integer(), nullable=False),
+        sa.Column('text_sha256', sa.String(length=64), nullable=False),
+        sa.Column('embedding', Vector(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('model', 'dimension', 'text_sha256'),
+    )
+
+
+def downgrade() -> None:
+    """Удалить таблицу embedding_cache."""
+    op.drop_table('embedding_cache')
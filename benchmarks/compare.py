@@ -0,0 +1,81 @@
+"""
+Сравнение двух прогонов бенчмарков (JSON из benchmarks/harness.py).
+
+Использование:
+    python -m benchmarks.compare benchmarks/results/baseline.json benchmarks/results/latest.json
+    python -m benchmarks.compare base.json new.json --max-regression 20
+
+Сравниваются медианы; код возврата 1, если хотя бы один бенчмарк замедлился
+больше чем на --max-regression процентов.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], stat: str = 'median') -> List[Dict[str, Any]]:
+    """
+    Сопоставить бенчмарки по (group, name).
+
+    Returns:
+        Список {group, name, baseline, current, change_pct}; для бенчмарков,
+        которых нет в одном из прогонов, соответствующее значение None.
+    """
+    def _index(data):
+        return {(b['group'], b['name']): b['stats'][stat] for b in data.get('benchmarks', [])}
+
+    base, cur = _index(baseline), _index(current)
+    rows = []
+    for key in sorted(set(base) | set(cur)):
+        b, c = base.get(key), cur.get(key)
+        change = (c - b) / b * 100 if b and c is not None else None
+        rows.append({'group': key[0], 'name': key[1], 'baseline': b, 'current': c, 'change_pct': change})
+    return rows
+
+
+def regressions(rows: List[Dict[str, Any]], max_regression_pct: float) -> List[Dict[str, Any]]:
+    """Бенчмарки, замедлившиеся больше порога."""
+    return [r for r in rows if r['change_pct'] is not None and r['change_pct'] > max_regression_pct]
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    def _ms(value: Optional[float]) -> str:
+        return '—' if value is None else f'{value * 1000:.2f}'
+
+    lines = [f"{'группа':<14} {'бенчмарк':<44} {'было, мс':>10} {'стало, мс':>10} {'изм., %':>9}"]
+    for r in rows:
+        change = '—' if r['change_pct'] is None else f"{r['change_pct']:+.1f}"
+        lines.append(f"{r['group']:<14} {r['name']:<44} {_ms(r['baseline']):>10} {_ms(r['current']):>10} {change:>9}")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Сравнение результатов бенчмарков')
+    parser.add_argument('baseline', help='JSON базового прогона')
+    parser.add_argument('current', help='JSON нового прогона')
+    parser.add_argument('--stat', default='median', choices=['min', 'median', 'mean', 'max'])
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help='Порог замедления в процентах (код возврата 1 при превышении)')
+    args = parser.parse_args(argv)
+
+    baseline, current = load(args.baseline), load(args.current)
+    rows = compare(baseline, current, args.stat)
+    print(f"base: {baseline.get('commit')} ({baseline.get('datetime')}) → new: {current.get('commit')} ({current.get('datetime')})")
+    print(format_table(rows))
+
+    if args.max_regression is not None:
+        slow = regressions(rows, args.max_regression)
+        if slow:
+            print(f"\nЗамедление больше {args.max_regression}%: " + ', '.join(f"{r['group']}/{r['name']}" for r in slow))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
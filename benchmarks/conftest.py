@@ -0,0 +1,189 @@
+"""
+Фикстуры и опции бенчмарков.
+
+Запуск (отдельно от tests/, по умолчанию pytest их не собирает):
+    pytest benchmarks                                   # все замеры, результаты в benchmarks/results/latest.json
+    pytest benchmarks --bench-save=baseline             # сохранить как benchmarks/results/baseline.json
+    pytest benchmarks --bench-compare=benchmarks/results/baseline.json --bench-max-regression=20
+
+Замеры с БД (index_document_to_db, _search_in_db, SearchIndexRepository.search)
+требуют локальный PostgreSQL из DATABASE_URL с применёнными миграциями и
+пропускаются без него. Используйте отдельную БД: бенчмарк создаёт своего
+пользователя и документы корпуса и удаляет их по завершении.
+"""
+import os
+import uuid
+
+import pytest
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.harness import Bench, BenchmarkSession
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+_session = BenchmarkSession()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('bench', 'бенчмарки ZAKUPKI_WEB')
+    group.addoption('--bench-rounds', type=int, default=5, help='Замеряемых раундов на бенчмарк')
+    group.addoption('--bench-warmup', type=int, default=1, help='Прогревочных раундов')
+    group.addoption('--bench-docs', type=int, default=40, help='Размер синтетического корпуса')
+    group.addoption('--bench-seed', type=int, default=2024, help='Seed генератора корпуса')
+    group.addoption('--bench-save', default='latest', help='Имя файла результатов в benchmarks/results/')
+    group.addoption('--bench-compare', default=None, help='JSON прогона для сравнения')
+    group.addoption('--bench-max-regression', type=float, default=None,
+                    help='Падать, если медиана выросла больше чем на N%% относительно --bench-compare')
+
+
+def pytest_collection_modifyitems(config, items):
+    # Глобальный timeout=30 из pytest.ini рассчитан на юнит-тесты
+    for item in items:
+        item.add_marker(pytest.mark.timeout(0))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not _session.results:
+        return
+    config = session.config
+    path = _session.save(os.path.join(RESULTS_DIR, f"{config.getoption('--bench-save')}.json"))
+    reporter = config.pluginmanager.get_plugin('terminalreporter')
+
+    def _write(line):
+        if reporter is not None:
+            reporter.write_line(line)
+
+    _write(f'\nРезультаты бенчмарков: {path}')
+    baseline_path = config.getoption('--bench-compare')
+    if baseline_path:
+        from benchmarks import compare
+        rows = compare.compare(compare.load(baseline_path), _session.to_dict())
+        _write(compare.format_table(rows))
+        threshold = config.getoption('--bench-max-regression')
+        if threshold is not None and compare.regressions(rows, threshold):
+            _write(f'Замедление больше {threshold}% относительно {baseline_path}')
+            session.exitstatus = 1
+
+
+@pytest.fixture(scope='session')
+def corpus(request):
+    """Синтетический корпус закупочных документов (одинаковый для одинакового seed)."""
+    return generate_corpus(
+        n_docs=request.config.getoption('--bench-docs'),
+        seed=request.config.getoption('--bench-seed')
+    )
+
+
+@pytest.fixture()
+def bench(request):
+    """Измеритель: ``bench(fn, *args)``; группа — имя модуля без префикса test_bench_."""
+    module = request.node.module.__name__.rsplit('.', 1)[-1]
+    return Bench(
+        _session,
+        name=request.node.name,
+        group=module.replace('test_bench_', ''),
+        rounds=request.config.getoption('--bench-rounds'),
+        warmup=request.config.getoption('--bench-warmup'),
+    )
+
+
+@pytest.fixture(scope='session')
+def bench_app():
+    """Flask-приложение в тестовом режиме с активным app context."""
+    from webapp import create_app
+
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture(scope='session')
+def rag_db(bench_app):
+    """RAGDatabase на локальном PostgreSQL (замеры пропускаются без БД)."""
+    from webapp.models.rag_models import RAGDatabase
+
+    try:
+        db = RAGDatabase()
+        with db.db.connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT to_regclass('public.search_index');")
+                if cur.fetchone()[0] is None:
+                    pytest.skip('Нет таблицы search_index (alembic upgrade head)')
+    except Exception as e:
+        pytest.skip(f'PostgreSQL недоступен: {e}')
+    return db
+
+
+@pytest.fixture(scope='session')
+def bench_user(rag_db):
+    """Отдельный пользователь бенчмарка; его данные удаляются по завершении."""
+    with rag_db.db.connect() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO users (email, password_hash, role, created_at)
+                VALUES (%s, 'benchmark', 'user', NOW())
+                RETURNING id;
+                """,
+                (f'bench_{uuid.uuid4().hex[:8]}@benchmark.local',)
+            )
+            user_id = cur.fetchone()[0]
+    try:
+        yield user_id
+    finally:
+        with rag_db.db.connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT document_id FROM user_documents ud
+                    WHERE ud.user_id = %s
+                      AND NOT EXISTS (
+                          SELECT 1 FROM user_documents o
+                          WHERE o.document_id = ud.document_id AND o.user_id <> %s
+                      );
+                """, (user_id, user_id))
+                own_docs = [row[0] for row in cur.fetchall()]
+                cur.execute("DELETE FROM search_index WHERE user_id = %s;", (user_id,))
+                cur.execute("DELETE FROM user_documents WHERE user_id = %s;", (user_id,))
+                if own_docs:
+                    cur.execute("DELETE FROM chunks WHERE document_id = ANY(%s);", (own_docs,))
+                    cur.execute("DELETE FROM documents WHERE id = ANY(%s);", (own_docs,))
+                cur.execute("DELETE FROM users WHERE id = %s;", (user_id,))
+
+
+@pytest.fixture(scope='session')
+def stored_corpus(rag_db, corpus, bench_user):
+    """Документы корпуса в documents.blob (как после загрузки), без индексации."""
+    stored = []
+    with rag_db.db.connect() as conn:
+        with conn.cursor() as cur:
+            for doc in corpus:
+                cur.execute(
+                    """
+                    INSERT INTO documents (sha256, size_bytes, mime, blob, parse_status, indexing_cost_seconds)
+                    VALUES (%s, %s, %s, %s, 'pending', 0)
+                    ON CONFLICT (sha256) DO UPDATE SET blob = EXCLUDED.blob
+                    RETURNING id;
+                    """,
+                    (doc.sha256, len(doc.data), 'application/octet-stream', doc.data)
+                )
+                stored.append((cur.fetchone()[0], doc))
+    return stored
+
+
+@pytest.fixture(scope='session')
+def indexed_corpus(bench_app, rag_db, stored_corpus, bench_user):
+    """Весь корпус проиндексирован для пользователя бенчмарка (chunks + search_index)."""
+    from webapp.services.db_indexing import index_document_to_db
+
+    with bench_app.test_request_context():
+        for _, doc in stored_corpus:
+            index_document_to_db(
+                db=rag_db,
+                file_path='',
+                file_info={'sha256': doc.sha256, 'size': len(doc.data)},
+                user_id=bench_user,
+                original_filename=doc.filename,
+                user_path=f'bench/{doc.filename}',
+            )
+    return stored_corpus
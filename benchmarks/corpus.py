@@ -0,0 +1,270 @@
+"""
+Детерминированный генератор корпуса документов, похожих на закупочную документацию.
+
+Один и тот же seed даёт один и тот же текст документов (байты DOCX/XLSX могут
+отличаться метками времени внутри zip): извещения (PDF), проекты
+контрактов (DOCX), спецификации (XLSX) и выгрузки реестра (TXT, UTF-8 и cp1251).
+В текстах есть ИКЗ, ИНН/КПП заказчиков, ОКПД2, цены и даты — то, что реально
+ищут пользователи, — и «редкие» термины с известной частотой для замеров поиска.
+
+Использование:
+    from benchmarks.corpus import generate_corpus
+    for doc in generate_corpus(n_docs=40, seed=2024):
+        doc.filename, doc.extension, doc.data
+"""
+import hashlib
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from io import BytesIO
+from typing import Dict, List
+
+
+FORMATS = ('pdf', 'docx', 'xlsx', 'txt')
+
+# Термины для поисковых замеров: частый (во всех документах), средний и редкий
+COMMON_TERM = 'заказчик'
+MEDIUM_TERM = 'картридж'
+RARE_TERM = 'аэростат'
+
+CUSTOMERS = [
+    'ГБУЗ «Городская клиническая больница № 7»',
+    'МБОУ «Средняя общеобразовательная школа № 12»',
+    'ФГБУ «Национальный медицинский исследовательский центр»',
+    'Администрация муниципального образования «Город Энск»',
+    'ГКУ «Дирекция по обеспечению деятельности государственных учреждений»',
+    'АО «Региональная энергетическая компания»',
+    'ФКУ «Управление материально-технического обеспечения»',
+]
+
+ITEMS = [
+    ('Бумага для офисной техники А4', 'пачка', '17.12.14.129', 290, 420),
+    ('Картридж лазерный для принтера', 'шт', '20.59.12.120', 2400, 7800),
+    ('Перчатки медицинские нитриловые', 'пара', '22.19.60.119', 9, 25),
+    ('Шприц инъекционный однократного применения 5 мл', 'шт', '32.50.13.110', 4, 12),
+    ('Системный блок', 'шт', '26.20.15.000', 45000, 98000),
+    ('Монитор 24 дюйма', 'шт', '26.20.17.110', 11000, 23000),
+    ('Услуги по техническому обслуживанию лифтов', 'усл. ед', '33.12.19.000', 18000, 65000),
+    ('Дизельное топливо', 'л', '19.20.21.300', 52, 68),
+    ('Стол письменный', 'шт', '31.01.12.160', 6500, 17000),
+    ('Мыло жидкое', 'л', '20.41.31.130', 110, 260),
+]
+
+SECTIONS = [
+    'Предмет контракта',
+    'Цена контракта и порядок расчётов',
+    'Сроки и условия поставки товара',
+    'Порядок приёмки товара',
+    'Ответственность сторон',
+    'Обеспечение исполнения контракта',
+]
+
+FILLER = [
+    'Поставщик обязуется осуществить поставку товара в соответствии со спецификацией.',
+    'Заказчик обязуется принять и оплатить поставленный товар в порядке и сроки, установленные контрактом.',
+    'Оплата осуществляется в безналичной форме в течение семи рабочих дней с даты подписания документа о приёмке.',
+    'Приёмка товара осуществляется в соответствии с требованиями Федерального закона от 05.04.2013 № 44-ФЗ.',
+    'Гарантийный срок на товар составляет не менее двенадцати месяцев с даты подписания акта приёмки.',
+    'В случае просрочки исполнения обязательств начисляется пеня в размере одной трёхсотой ключевой ставки.',
+    'Товар должен быть новым, не бывшим в употреблении, не восстановленным.',
+    'Размер обеспечения исполнения контракта составляет пять процентов от начальной (максимальной) цены.',
+]
+
+
+@dataclass
+class CorpusDocument:
+    """Сгенерированный документ корпуса."""
+
+    filename: str
+    extension: str
+    data: bytes
+    text: str
+    terms: Dict[str, bool] = field(default_factory=dict)
+
+    @property
+    def sha256(self) -> str:
+        return hashlib.sha256(self.data).hexdigest()
+
+
+def _inn(rnd: random.Random) -> str:
+    """ИНН юридического лица (10 цифр) с корректной контрольной цифрой."""
+    digits = [rnd.randint(0, 9) for _ in range(9)]
+    weights = [2, 4, 10, 3, 5, 9, 4, 6, 8]
+    control = sum(d * w for d, w in zip(digits, weights)) % 11 % 10
+    return ''.join(map(str, digits + [control]))
+
+
+def _ikz(rnd: random.Random, inn: str, year: int) -> str:
+    """Идентификационный код закупки (36 цифр)."""
+    return (f'{year % 100:02d}1{inn}{rnd.randint(0, 99999999):08d}'
+            f'{rnd.randint(1, 9999):04d}{rnd.randint(0, 999):03d}{rnd.randint(100, 999):03d}'
+            f'{rnd.randint(200, 299)}')[:36]
+
+
+def _money(value: float) -> str:
+    """Сумма в формате закупочных документов: 1 234 567,89."""
+    whole, frac = f'{value:.2f}'.split('.')
+    groups = []
+    while whole:
+        groups.insert(0, whole[-3:])
+        whole = whole[:-3]
+    return f"{' '.join(groups)},{frac}"
+
+
+def _build_content(rnd: random.Random, index: int, paragraphs: int) -> Dict:
+    """Содержимое документа: реквизиты, позиции спецификации и текст разделов."""
+    year = 2022 + index % 3
+    published = date(year, 1, 10) + timedelta(days=rnd.randint(0, 340))
+    inn = _inn(rnd)
+    positions = []
+    for item in rnd.sample(ITEMS, k=rnd.randint(2, 5)):
+        name, unit, okpd2, low, high = item
+        qty = rnd.randint(1, 500)
+        price = round(rnd.uniform(low, high), 2)
+        positions.append({
+            'name': name, 'unit': unit, 'okpd2': okpd2,
+            'qty': qty, 'price': price, 'total': round(qty * price, 2),
+        })
+    body = []
+    for n in range(paragraphs):
+        section = SECTIONS[n % len(SECTIONS)]
+        sentences = ' '.join(rnd.choice(FILLER) for _ in range(rnd.randint(3, 6)))
+        body.append((f'{n % len(SECTIONS) + 1}. {section}', sentences))
+    return {
+        'number': f'0{rnd.randint(100000000, 999999999)}{year}{index:06d}',
+        'ikz': _ikz(rnd, inn, year),
+        'customer': rnd.choice(CUSTOMERS),
+        'inn': inn,
+        'kpp': f'{inn[:4]}01001',
+        'published': published,
+        'deadline': published + timedelta(days=rnd.randint(7, 20)),
+        'positions': positions,
+        'nmck': round(sum(p['total'] for p in positions), 2),
+        'body': body,
+        # Редкий термин — примерно в каждом десятом документе, детерминированно
+        'rare': index % 10 == 3,
+    }
+
+
+def _plain_text(c: Dict) -> str:
+    lines = [
+        f"Извещение о проведении электронного аукциона № {c['number']}",
+        f"Идентификационный код закупки (ИКЗ): {c['ikz']}",
+        f"Заказчик: {c['customer']}, ИНН {c['inn']}, КПП {c['kpp']}",
+        f"Дата размещения: {c['published']:%d.%m.%Y}. Окончание подачи заявок: {c['deadline']:%d.%m.%Y}",
+        f"Начальная (максимальная) цена контракта: {_money(c['nmck'])} руб.",
+        '',
+        'Спецификация:',
+    ]
+    for i, p in enumerate(c['positions'], 1):
+        lines.append(f"{i}. {p['name']} (ОКПД2 {p['okpd2']}) — {p['qty']} {p['unit']} по "
+                     f"{_money(p['price'])} руб. = {_money(p['total'])} руб.")
+    lines.append('')
+    for title, text in c['body']:
+        lines.append(title)
+        lines.append(text)
+    if c['rare']:
+        lines.append(f'Доставка осуществляется с использованием транспорта заказчика, включая {RARE_TERM}.')
+    return '\n'.join(lines)
+
+
+def _to_pdf(text: str) -> bytes:
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    lines = text.split('\n')
+    # ~15 абзацев на страницу; insert_htmlbox встраивает шрифт с кириллицей
+    for start in range(0, len(lines), 15):
+        page = doc.new_page()
+        html = ''.join(f'<p>{line or "&nbsp;"}</p>' for line in lines[start:start + 15])
+        page.insert_htmlbox(fitz.Rect(40, 40, 555, 800), html, css='p { font-size: 9px; margin: 0; }')
+    doc.set_metadata({})
+    data = doc.tobytes(garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+    return data
+
+
+def _to_docx(c: Dict, text: str) -> bytes:
+    from docx import Document
+
+    document = Document()
+    for paragraph in text.split('\n'):
+        if paragraph:
+            document.add_paragraph(paragraph)
+    table = document.add_table(rows=1, cols=4)
+    for cell, title in zip(table.rows[0].cells, ('Наименование', 'ОКПД2', 'Количество', 'Цена, руб.')):
+        cell.text = title
+    for p in c['positions']:
+        cells = table.add_row().cells
+        cells[0].text, cells[1].text = p['name'], p['okpd2']
+        cells[2].text, cells[3].text = f"{p['qty']} {p['unit']}", _money(p['price'])
+    buf = BytesIO()
+    document.save(buf)
+    return buf.getvalue()
+
+
+def _to_xlsx(c: Dict) -> bytes:
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Спецификация'
+    ws.append(['ИКЗ', c['ikz']])
+    ws.append(['Заказчик', c['customer']])
+    ws.append(['ИНН', c['inn']])
+    ws.append(['Дата размещения', c['published'].strftime('%d.%m.%Y')])
+    ws.append([])
+    ws.append(['№', 'Наименование', 'ОКПД2', 'Ед. изм.', 'Количество', 'Цена, руб.', 'Сумма, руб.'])
+    for i, p in enumerate(c['positions'], 1):
+        ws.append([i, p['name'], p['okpd2'], p['unit'], p['qty'], p['price'], p['total']])
+    ws.append(['', 'Итого НМЦК', '', '', '', '', c['nmck']])
+    if c['rare']:
+        ws.append(['', f'Примечание: {RARE_TERM}'])
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def generate_corpus(n_docs: int = 40, seed: int = 2024, paragraphs: int = 12) -> List[CorpusDocument]:
+    """
+    Сгенерировать корпус документов.
+
+    Args:
+        n_docs: Количество документов (форматы чередуются: pdf, docx, xlsx, txt)
+        seed: Seed генератора (одинаковый seed — одинаковый текст)
+        paragraphs: Число разделов текста в PDF/DOCX/TXT (размер документа)
+
+    Returns:
+        Список CorpusDocument
+    """
+    rnd = random.Random(seed)
+    docs = []
+    for index in range(n_docs):
+        content = _build_content(rnd, index, paragraphs)
+        text = _plain_text(content)
+        ext = FORMATS[index % len(FORMATS)]
+        if ext == 'pdf':
+            data = _to_pdf(text)
+        elif ext == 'docx':
+            data = _to_docx(content, text)
+        elif ext == 'xlsx':
+            data = _to_xlsx(content)
+            text = _plain_text({**content, 'body': []})
+        else:
+            # Часть выгрузок — в cp1251, как у старых систем документооборота
+            data = text.encode('cp1251' if index % 8 == 3 else 'utf-8')
+        docs.append(CorpusDocument(
+            filename=f'zakupka_{index:04d}.{ext}',
+            extension=ext,
+            data=data,
+            text=text,
+            terms={
+                COMMON_TERM: True,
+                MEDIUM_TERM: any('Картридж' in p['name'] for p in content['positions']),
+                RARE_TERM: content['rare'],
+            },
+        ))
+    return docs
+
+
+__all__ = ['CorpusDocument', 'generate_corpus', 'FORMATS', 'COMMON_TERM', 'MEDIUM_TERM', 'RARE_TERM']
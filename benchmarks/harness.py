@@ -0,0 +1,143 @@
+"""
+Минимальный измеритель времени в стиле pytest-benchmark и формат результатов.
+
+Фикстура ``bench`` (см. benchmarks/conftest.py) вызывается как ``bench(fn, *args)``:
+функция прогоняется warmup раз без замера и rounds раз с замером, результат
+последнего вызова возвращается тесту. Итоги сессии сохраняются в JSON,
+который можно сравнить с другим прогоном (benchmarks/compare.py).
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+
+SCHEMA_VERSION = 1
+
+
+class BenchmarkSession:
+    """Накопитель результатов замеров за прогон."""
+
+    def __init__(self):
+        self.results: List[Dict[str, Any]] = []
+
+    def record(self, name: str, group: str, timings: List[float], extra_info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Сохранить замеры одного бенчмарка (timings — секунды на раунд)."""
+        result = {
+            'name': name,
+            'group': group,
+            'stats': summarize(timings),
+            'extra_info': extra_info or {},
+        }
+        self.results.append(result)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'schema': SCHEMA_VERSION,
+            'datetime': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'machine': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+            },
+            'benchmarks': sorted(self.results, key=lambda r: (r['group'], r['name'])),
+        }
+
+    def save(self, path: str) -> str:
+        """Записать результаты в JSON (каталог создаётся при необходимости)."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+class Bench:
+    """Callable-измеритель одного теста: ``bench(fn, *args, **kwargs)``."""
+
+    def __init__(self, session: BenchmarkSession, name: str, group: str, rounds: int = 5, warmup: int = 1):
+        self.session = session
+        self.name = name
+        self.group = group
+        self.rounds = rounds
+        self.warmup = warmup
+        self.extra_info: Dict[str, Any] = {}
+        self.result: Optional[Dict[str, Any]] = None
+
+    def __call__(self, fn: Callable, *args, **kwargs):
+        return self.pedantic(fn, args=args, kwargs=kwargs)
+
+    def pedantic(
+        self,
+        fn: Callable,
+        args: tuple = (),
+        kwargs: Optional[Dict[str, Any]] = None,
+        setup: Optional[Callable[[], Any]] = None,
+        rounds: Optional[int] = None,
+        warmup: Optional[int] = None
+    ):
+        """
+        Замер с явными параметрами.
+
+        Args:
+            fn: Измеряемая функция
+            args, kwargs: Аргументы fn
+            setup: Вызывается перед каждым раундом вне замера
+            rounds: Число замеряемых раундов (по умолчанию — из опций запуска)
+            warmup: Число прогревочных раундов
+
+        Returns:
+            Результат последнего вызова fn
+        """
+        kwargs = kwargs or {}
+        rounds = max(1, rounds if rounds is not None else self.rounds)
+        warmup = max(0, warmup if warmup is not None else self.warmup)
+
+        value = None
+        for _ in range(warmup):
+            if setup is not None:
+                setup()
+            value = fn(*args, **kwargs)
+
+        timings = []
+        for _ in range(rounds):
+            if setup is not None:
+                setup()
+            started = time.perf_counter()
+            value = fn(*args, **kwargs)
+            timings.append(time.perf_counter() - started)
+
+        self.result = self.session.record(self.name, self.group, timings, self.extra_info)
+        return value
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    """Статистика по раундам (секунды)."""
+    return {
+        'rounds': len(timings),
+        'min': min(timings),
+        'max': max(timings),
+        'mean': statistics.fmean(timings),
+        'median': statistics.median(timings),
+        'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+__all__ = ['Bench', 'BenchmarkSession', 'summarize', 'SCHEMA_VERSION']
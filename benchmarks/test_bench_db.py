@@ -0,0 +1,79 @@
+"""
+Замеры индексации и поиска на локальном PostgreSQL.
+
+Без БД тесты пропускаются (см. фикстуру rag_db в conftest.py).
+"""
+import pytest
+
+from benchmarks.corpus import COMMON_TERM, MEDIUM_TERM, RARE_TERM
+
+
+def test_index_document_to_db(bench, bench_app, rag_db, stored_corpus, bench_user):
+    """Полная индексация корпуса из blob: извлечение, чанки, search_index."""
+    from webapp.services.db_indexing import index_document_to_db
+
+    bench.extra_info['docs'] = len(stored_corpus)
+
+    def _index_all():
+        ids = []
+        for _, doc in stored_corpus:
+            doc_id, _ = index_document_to_db(
+                db=rag_db,
+                file_path='',
+                file_info={'sha256': doc.sha256, 'size': len(doc.data)},
+                user_id=bench_user,
+                original_filename=doc.filename,
+                user_path=f'bench/{doc.filename}',
+            )
+            ids.append(doc_id)
+        return ids
+
+    with bench_app.test_request_context():
+        # Повторная индексация идемпотентна: старые чанки удаляются, search_index обновляется
+        ids = bench.pedantic(_index_all, rounds=min(bench.rounds, 3))
+    assert all(ids)
+
+
+@pytest.mark.parametrize('terms', [
+    [RARE_TERM],
+    [MEDIUM_TERM],
+    [COMMON_TERM],
+    [RARE_TERM, MEDIUM_TERM, 'ИНН'],
+], ids=['rare', 'medium', 'common', 'three_terms'])
+def test_search_index_repository_search(bench, rag_db, indexed_corpus, bench_user, terms):
+    """SearchIndexRepository.search — запрос к search_index без постобработки."""
+    from webapp.db.repositories.search_index_repository import SearchIndexRepository
+
+    def _search():
+        with rag_db.db.connect() as conn:
+            return SearchIndexRepository(conn).search(bench_user, terms, limit=100)
+
+    results = bench(_search)
+    bench.extra_info['hits'] = len(results)
+    if terms == [RARE_TERM]:
+        assert len(results) == sum(1 for _, d in indexed_corpus if d.terms[RARE_TERM])
+
+
+@pytest.mark.parametrize('terms,exclude_mode', [
+    ([RARE_TERM], False),
+    ([COMMON_TERM], False),
+    ([RARE_TERM, MEDIUM_TERM], False),
+    ([RARE_TERM], True),
+], ids=['rare', 'common', 'two_terms', 'exclude_rare'])
+def test_search_in_db(bench, bench_app, rag_db, indexed_corpus, bench_user, terms, exclude_mode):
+    """_search_in_db — поиск вместе с подсчётом вхождений и сниппетами (как /search)."""
+    from webapp.routes.search import _search_in_db
+
+    with bench_app.test_request_context():
+        results = bench(_search_in_db, rag_db, bench_user, terms, exclude_mode)
+    bench.extra_info['hits'] = len(results)
+
+
+@pytest.mark.parametrize('terms', [[RARE_TERM], [COMMON_TERM]], ids=['rare', 'common'])
+def test_search_first_page(bench, bench_app, rag_db, indexed_corpus, bench_user, terms):
+    """_search_page — первая страница (50) keyset-поиска: время до первого результата."""
+    from webapp.routes.search import _search_page
+
+    with bench_app.test_request_context():
+        results, _, _ = bench(_search_page, rag_db, bench_user, terms, page_size=50)
+    bench.extra_info['hits'] = len(results)
@@ -0,0 +1,36 @@
+"""
+Замеры извлечения текста и чанкования (без БД).
+"""
+import pytest
+
+from benchmarks.corpus import FORMATS
+from document_processor.extractors.text_extractor import extract_text_from_bytes
+from webapp.services.chunking import chunk_document
+
+
+@pytest.mark.parametrize('extension', FORMATS)
+def test_extract_text_from_bytes(bench, corpus, extension):
+    """extract_text_from_bytes на всех документах корпуса одного формата."""
+    docs = [d for d in corpus if d.extension == extension]
+    bench.extra_info.update(docs=len(docs), bytes=sum(len(d.data) for d in docs))
+
+    def _extract_all():
+        return [extract_text_from_bytes(d.data, d.extension) for d in docs]
+
+    texts = bench(_extract_all)
+    assert all(texts), 'Из каждого документа должен извлекаться текст'
+    bench.extra_info['chars'] = sum(len(t) for t in texts)
+
+
+@pytest.mark.parametrize('chunk_size_tokens', [200, 800])
+def test_chunk_document(bench, corpus, chunk_size_tokens):
+    """chunk_document на эталонных текстах корпуса."""
+    texts = [(d.filename, d.text) for d in corpus]
+    bench.extra_info.update(docs=len(texts), chars=sum(len(t) for _, t in texts))
+
+    def _chunk_all():
+        return [chunk_document(text, name, chunk_size_tokens=chunk_size_tokens) for name, text in texts]
+
+    chunks = bench(_chunk_all)
+    assert all(chunks)
+    bench.extra_info['chunks'] = sum(len(c) for c in chunks)
@@ -1,11 +1,12 @@
 """Модуль извлечения структурированных данных из сводного индекса."""
 import re
-import os
 import logging
 from typing import List, Dict, Any, Optional
 from document_processor.analysis.schemas import (
     Procurement, Item, Party, Address, Terms, AnalysisResult
 )
+from document_processor.search.offset_index import OffsetIndexReader
+from document_processor.search.segments import index_exists, index_files
 
 
 class Extractor:
@@ -43,15 +44,23 @@ class Extractor:
         Returns:
             AnalysisResult с извлечёнными данными
         """
-        if not os.path.exists(index_path):
+        if not index_exists(index_path):
             raise FileNotFoundError(f'Индекс не найден: {index_path}')
         
-        # Читаем весь индекс
-        with open(index_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-        
-        # Парсим документы из индекса
-        documents = self._parse_documents(content)
+        # Документы — по сегментам групповой индексации или из самого файла индекса;
+        # каждый файл читается по таблице смещений (mmap, без чтения и разбора всего файла),
+        # если она есть и актуальна, иначе читаем и парсим его целиком
+        documents: List[Dict[str, Any]] = []
+        for path in index_files(index_path):
+            reader = OffsetIndexReader.open(path)
+            if reader is not None:
+                with reader:
+                    documents.extend(doc for doc in reader.iter_documents() if doc['title'] and doc['body'])
+            else:
+                with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                    content = f.read()
+                documents.extend(self._parse_documents(content))
+        self.logger.info(f'Распознано документов: {len(documents)}')
         
         # Объединяем весь текст документов для анализа
         full_text = '\n\n'.join(doc['body'] for doc in documents)
@@ -8,7 +8,8 @@ class DocumentProcessor:
     """High-level orchestration for indexing and searching documents.
 
     API:
-      - create_search_index(root_folder) -> path to _search_index.txt
+      - create_search_index(root_folder) -> index path (_search_index.txt; for grouped
+        indexing the file itself is absent, segments are listed in the manifest)
       - search_keywords(index_path, keywords, context=80) -> list of matches
       - get_file_stats(source) -> dict (stub for now)
     """
@@ -27,7 +28,8 @@ class DocumentProcessor:
             use_groups: если True, использует групповую индексацию (increment-014)
         
         Returns:
-            путь к созданному индексу
+            путь индекса _search_index.txt; при use_groups=True самого файла нет —
+            индекс состоит из сегментов по манифесту (проверка — segments.index_exists)
         """
         if not os.path.isdir(root_folder):
             raise ValueError(f"Folder not found: {root_folder}")
@@ -0,0 +1,330 @@
+"""
+Песочница извлечения текста: каждый документ обрабатывается в отдельном процессе.
+
+Лимиты PdfReader проверяются только между страницами, поэтому одна патологическая
+страница PDF или огромный XLSX могли надолго занять pdfplumber/openpyxl прямо
+в веб-процессе и раздуть его память. ExtractionSandbox держит заранее запущенные
+процессы-воркеры и передаёт им документы по одному:
+
+- на документ отводится timeout секунд, после чего воркер снимается вместе
+  со своей группой процессов (tesseract, antiword и т.п.) и заменяется новым;
+- адресное пространство воркера ограничено RLIMIT_AS (memory_mb); OCR сканов
+  выполняется в самом воркере (OCR_MAX_WORKERS=1), поэтому лимит — на документ;
+- после max_docs_per_worker документов воркер перезапускается, чтобы
+  фрагментация памяти и утечки библиотек не накапливались.
+
+Результат — словарь {'text', 'status', 'error', 'elapsed_ms'}; status —
+ok, timeout, oom, error или crashed. Процессы создаются через spawn: веб-процесс
+многопоточный, fork из него небезопасен.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set
+
+try:
+    import resource  # type: ignore
+except ImportError:  # pragma: no cover - Windows
+    resource = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = 'ok'
+STATUS_TIMEOUT = 'timeout'
+STATUS_OOM = 'oom'
+STATUS_ERROR = 'error'
+STATUS_CRASHED = 'crashed'
+
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT_SECONDS = 120.0
+DEFAULT_MEMORY_MB = 2048
+DEFAULT_MAX_DOCS_PER_WORKER = 50
+
+ExtractFunc = Callable[[bytes, str], str]
+
+
+def _env_number(name: str, default, cast):
+    try:
+        value = cast(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+def sandbox_enabled() -> bool:
+    """Включена ли песочница: EXTRACTION_SANDBOX (по умолчанию включена)."""
+    return (os.environ.get('EXTRACTION_SANDBOX') or '1').strip().lower() not in {'0', 'false', 'no', 'off'}
+
+
+def sandbox_settings() -> Dict[str, Any]:
+    """Параметры песочницы из окружения.
+
+    EXTRACTION_WORKERS — число воркеров, EXTRACTION_TIMEOUT_SECONDS — лимит
+    времени на документ, EXTRACTION_MEMORY_MB — RLIMIT_AS воркера,
+    EXTRACTION_MAX_DOCS_PER_WORKER — документов до перезапуска воркера.
+    """
+    return {
+        'workers': _env_number('EXTRACTION_WORKERS', DEFAULT_WORKERS, int),
+        'timeout': _env_number('EXTRACTION_TIMEOUT_SECONDS', DEFAULT_TIMEOUT_SECONDS, float),
+        'memory_mb': _env_number('EXTRACTION_MEMORY_MB', DEFAULT_MEMORY_MB, int),
+        'max_docs_per_worker': _env_number('EXTRACTION_MAX_DOCS_PER_WORKER', DEFAULT_MAX_DOCS_PER_WORKER, int),
+    }
+
+
+def _result(status: str, text: str = '', error: Optional[str] = None, started: float = 0.0) -> Dict[str, Any]:
+    return {
+        'text': text,
+        'status': status,
+        'error': error,
+        'elapsed_ms': int((time.monotonic() - started) * 1000) if started else 0,
+    }
+
+
+def _limit_memory(memory_mb: int) -> None:
+    """Ограничить адресное пространство текущего процесса (наследуется дочерними)."""
+    if resource is None or not memory_mb:
+        return
+    limit = memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _worker_main(conn, memory_mb: int, func: Optional[ExtractFunc]) -> None:
+    """Цикл воркера: (file_bytes, extension) -> (status, text, error); None — завершение."""
+    # RLIMIT_AS действует на каждый процесс отдельно: OCR — в самом воркере,
+    # без пула процессов, иначе документ мог бы занять до 9 лимитов памяти
+    os.environ['OCR_MAX_WORKERS'] = '1'
+    # Своя группа процессов: при тайм-ауте снимаются и внешние утилиты воркера
+    if hasattr(os, 'setsid'):
+        try:
+            os.setsid()
+        except OSError:
+            pass
+    if func is None:
+        from document_processor.extractors.text_extractor import extract_text_from_bytes
+        func = extract_text_from_bytes
+    # Лимит — после импортов, чтобы он приходился на сами документы
+    _limit_memory(memory_mb)
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        file_bytes, extension = task
+        try:
+            reply = (STATUS_OK, func(file_bytes, extension) or '', None)
+        except MemoryError:
+            reply = (STATUS_OOM, '', f'превышен лимит памяти {memory_mb} МБ')
+        except Exception as e:
+            reply = (STATUS_ERROR, '', f'{type(e).__name__}: {e}')
+        del task, file_bytes
+        conn.send(reply)
+    conn.close()
+
+
+class _Worker:
+    """Процесс-воркер и его конец канала."""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.docs = 0
+
+
+class ExtractionSandbox:
+    """Пул заранее запущенных процессов извлечения с лимитами времени и памяти."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        memory_mb: Optional[int] = None,
+        max_docs_per_worker: Optional[int] = None,
+        func: Optional[ExtractFunc] = None
+    ):
+        """
+        Args:
+            workers: Число воркеров (столько документов обрабатывается одновременно)
+            timeout: Лимит времени на документ, сек
+            memory_mb: RLIMIT_AS воркера, МБ (0 — без ограничения)
+            max_docs_per_worker: Документов до перезапуска воркера
+            func: Функция извлечения (file_bytes, extension) -> text; должна
+                импортироваться по имени (spawn). По умолчанию extract_text_from_bytes
+        """
+        settings = sandbox_settings()
+        self.workers = max(1, workers or settings['workers'])
+        self.timeout = timeout or settings['timeout']
+        self.memory_mb = settings['memory_mb'] if memory_mb is None else memory_mb
+        self.max_docs_per_worker = max(1, max_docs_per_worker or settings['max_docs_per_worker'])
+        self.func = func
+        self._context = multiprocessing.get_context('spawn')
+        self._idle: 'queue.Queue[_Worker]' = queue.Queue()
+        self._all: Set[_Worker] = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(self.workers):
+            self._idle.put(self._start_worker())
+
+    def extract(self, file_bytes: bytes, extension: str) -> Dict[str, Any]:
+        """Извлечь текст документа в воркере.
+
+        Returns:
+            {'text', 'status', 'error', 'elapsed_ms'}; при любом статусе,
+            кроме ok, text — пустая строка
+        """
+        started = time.monotonic()
+        worker = self._acquire()
+        replace = False
+        try:
+            try:
+                worker.conn.send((file_bytes, extension))
+                if not worker.conn.poll(self.timeout):
+                    replace = True
+                    logger.warning("Тайм-аут извлечения (%.0f с), воркер %s снят", self.timeout, worker.process.pid)
+                    return _result(STATUS_TIMEOUT, error=f'превышен лимит времени {self.timeout:g} с', started=started)
+                status, text, error = worker.conn.recv()
+            except (EOFError, OSError):
+                replace = True
+                worker.process.join(1)
+                exitcode = worker.process.exitcode
+                logger.warning("Воркер извлечения %s аварийно завершился (код %s)", worker.process.pid, exitcode)
+                return _result(STATUS_CRASHED, error=f'воркер завершился с кодом {exitcode}', started=started)
+            worker.docs += 1
+            # После MemoryError куча воркера не в лучшем состоянии — перезапускаем
+            replace = status == STATUS_OOM
+            if status != STATUS_OK:
+                logger.warning("Извлечение в песочнице: %s (%s)", status, error)
+            return _result(status, text, error, started)
+        finally:
+            self._release(worker, replace)
+
+    def shutdown(self) -> None:
+        """Остановить воркеры (занятые снимаются принудительно)."""
+        with self._lock:
+            self._closed = True
+            workers = list(self._all)
+            self._all.clear()
+        for worker in workers:
+            self._stop(worker)
+        for worker in workers:
+            worker.process.join(2)
+            if worker.process.is_alive():
+                self._kill(worker)
+
+    def _start_worker(self) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        # Не daemon: воркеру может понадобиться собственный пул (OCR)
+        process = self._context.Process(
+            target=_worker_main, args=(child_conn, self.memory_mb, self.func), name='extraction-sandbox'
+        )
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, parent_conn)
+        with self._lock:
+            self._all.add(worker)
+        return worker
+
+    def _acquire(self) -> _Worker:
+        if self._closed:
+            raise RuntimeError('ExtractionSandbox остановлена')
+        return self._idle.get()
+
+    def _release(self, worker: _Worker, replace: bool) -> None:
+        if replace:
+            self._kill(worker)
+        elif worker.docs >= self.max_docs_per_worker:
+            self._stop(worker)
+            replace = True
+        if self._closed:
+            return
+        if replace:
+            with self._lock:
+                self._all.discard(worker)
+            worker = self._start_worker()
+        self._idle.put(worker)
+
+    @staticmethod
+    def _stop(worker: _Worker) -> None:
+        """Штатно завершить воркер (не дожидаясь выхода)."""
+        try:
+            worker.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        worker.conn.close()
+
+    @staticmethod
+    def _kill(worker: _Worker) -> None:
+        """Снять воркер вместе с его группой процессов."""
+        process = worker.process
+        if process.is_alive():
+            try:
+                if hasattr(os, 'killpg'):
+                    os.killpg(process.pid, signal.SIGKILL)
+                else:  # pragma: no cover
+                    process.kill()
+            except OSError:
+                process.kill()
+        process.join(1)
+        worker.conn.close()
+
+
+# Общая песочница процесса (создаётся при первом обращении)
+_sandbox_lock = threading.Lock()
+_sandbox: Optional[ExtractionSandbox] = None
+
+
+def get_sandbox() -> ExtractionSandbox:
+    """Общая песочница с параметрами из окружения."""
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is None:
+            _sandbox = ExtractionSandbox()
+        return _sandbox
+
+
+def shutdown_sandbox() -> None:
+    """Остановить общую песочницу (вызывается при выходе)."""
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is not None:
+            _sandbox.shutdown()
+            _sandbox = None
+
+
+atexit.register(shutdown_sandbox)
+
+
+def extract_text_sandboxed(file_bytes: bytes, extension: str) -> Dict[str, Any]:
+    """Извлечь текст в общей песочнице (при EXTRACTION_SANDBOX=0 — в текущем процессе).
+
+    Returns:
+        {'text', 'status', 'error', 'elapsed_ms'}
+    """
+    if sandbox_enabled():
+        return get_sandbox().extract(file_bytes, extension)
+
+    from document_processor.extractors.text_extractor import extract_text_from_bytes
+
+    started = time.monotonic()
+    try:
+        return _result(STATUS_OK, extract_text_from_bytes(file_bytes, extension) or '', started=started)
+    except MemoryError:
+        return _result(STATUS_OOM, error='MemoryError', started=started)
+
+
+__all__ = [
+    'ExtractionSandbox', 'extract_text_sandboxed', 'get_sandbox', 'shutdown_sandbox',
+    'sandbox_enabled', 'sandbox_settings',
+    'STATUS_OK', 'STATUS_TIMEOUT', 'STATUS_OOM', 'STATUS_ERROR', 'STATUS_CRASHED',
+]
@@ -3,7 +3,7 @@
 Поддержка:
 - TXT (автодетект кодировки)
 - JSON, CSV/TSV, XML/HTML (как текст)
-- PDF (pdfplumber → pypdf, иначе пустая строка)
+- PDF (PdfReader: PyMuPDF/pdfplumber/pypdf/pdfminer, OCR сканов; с тайм-бюджетом и лимитом страниц)
 - DOCX (python-docx)
 - XLSX (openpyxl)
 - XLS (xlrd — опционально)
@@ -16,11 +16,17 @@
 """
 from __future__ import annotations
 
+import os
 from pathlib import Path
-from typing import Optional, Union
+from typing import Any, Dict, Optional, Union
 from io import BytesIO
 import chardet  # type: ignore
 
+# Лимиты извлечения PDF по умолчанию (переопределяются переменными окружения, см. pdf_limits)
+DEFAULT_PDF_BUDGET_SECONDS = 60.0
+DEFAULT_PDF_MAX_PAGES_TEXT = 500
+DEFAULT_PDF_MAX_PAGES_OCR = 5
+
 
 def _read_text_with_encoding(data: bytes) -> str:
     """Чтение текста с автодетектом кодировки."""
@@ -60,6 +66,42 @@ def _clean_html_xml(raw: str) -> str:
     return raw.strip()
 
 
+def pdf_limits() -> Dict[str, Any]:
+    """Лимиты извлечения PDF из байтов.
+
+    PDF_EXTRACT_BUDGET_SECONDS — тайм-бюджет на документ (текст и OCR),
+    PDF_MAX_PAGES_TEXT / PDF_MAX_PAGES_OCR — максимум страниц для текстового
+    слоя и для OCR, PDF_OCR_MODE — auto (OCR сканов), off, force.
+    """
+    def _number(name: str, default, cast):
+        try:
+            value = cast(os.environ.get(name, default))
+        except (TypeError, ValueError):
+            return default
+        return value if value > 0 else default
+
+    mode = (os.environ.get('PDF_OCR_MODE') or 'auto').strip().lower()
+    return {
+        'budget_seconds': _number('PDF_EXTRACT_BUDGET_SECONDS', DEFAULT_PDF_BUDGET_SECONDS, float),
+        'max_pages_text': _number('PDF_MAX_PAGES_TEXT', DEFAULT_PDF_MAX_PAGES_TEXT, int),
+        'max_pages_ocr': _number('PDF_MAX_PAGES_OCR', DEFAULT_PDF_MAX_PAGES_OCR, int),
+        'ocr': mode if mode in {'auto', 'off', 'force'} else 'auto',
+    }
+
+
+def _extract_pdf(file_bytes: bytes) -> str:
+    """Текст PDF из байтов через PdfReader (без временных файлов).
+
+    Тот же конвейер, что у файловой индексации: один дескриптор PyMuPDF,
+    запасные парсеры для пустых страниц, OCR сканов — с лимитами pdf_limits().
+    Переводы строк сохраняются (на них опирается чанкование).
+    """
+    from document_processor.pdf_reader import PdfReader
+
+    result = PdfReader().read_pdf(file_bytes, lang='rus+eng', normalize=False, **pdf_limits())
+    return result['text']
+
+
 def extract_text_from_bytes(file_bytes: bytes, extension: str) -> str:
     """Извлечь текст из бинарных данных файла.
 
@@ -69,6 +111,10 @@ def extract_text_from_bytes(file_bytes: bytes, extension: str) -> str:
 
     Returns:
         str: Извлечённый текст или пустая строка
+
+    Raises:
+        MemoryError: не глушится — по ней песочница (sandbox.py) определяет
+            превышение лимита памяти
     """
     try:
         ext = extension.lower().lstrip('.')
@@ -83,27 +129,11 @@ def extract_text_from_bytes(file_bytes: bytes, extension: str) -> str:
         # PDF
         if ext == 'pdf':
             try:
-                import pdfplumber  # type: ignore
-                text_parts = []
-                with pdfplumber.open(BytesIO(file_bytes)) as pdf:
-                    for page in pdf.pages:
-                        t = page.extract_text() or ''
-                        if t:
-                            text_parts.append(t)
-                return '\n'.join(text_parts)
+                return _extract_pdf(file_bytes)
+            except MemoryError:
+                raise
             except Exception:
-                # Fallback на pypdf
-                try:
-                    from pypdf import PdfReader  # type: ignore
-                    reader = PdfReader(BytesIO(file_bytes))
-                    parts = []
-                    for page in reader.pages:
-                        t = page.extract_text() or ''
-                        if t:
-                            parts.append(t)
-                    return '\n'.join(parts)
-                except Exception:
-                    return ''
+                return ''
         
         # DOCX
         if ext == 'docx':
@@ -112,6 +142,8 @@ def extract_text_from_bytes(file_bytes: bytes, extension: str) -> str:
                 doc = Document(BytesIO(file_bytes))
                 paras = [para.text for para in doc.paragraphs if para.text]
                 return '\n'.join(paras)
+            except MemoryError:
+                raise
             except Exception:
                 return ''
         
@@ -127,6 +159,8 @@ def extract_text_from_bytes(file_bytes: bytes, extension: str) -> str:
                         if vals:
                             parts.append('\t'.join(vals))
                 return '\n'.join(parts)
+            except MemoryError:
+                raise
             except Exception:
                 return ''
         
@@ -144,10 +178,14 @@ def extract_text_from_bytes(file_bytes: bytes, extension: str) -> str:
                         if vals:
                             parts.append('\t'.join(vals))
                 return '\n'.join(parts)
+            except MemoryError:
+                raise
             except Exception:
                 return ''
         
         return ''
+    except MemoryError:
+        raise
     except Exception:
         return ''
 
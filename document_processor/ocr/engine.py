@@ -0,0 +1,322 @@
+"""OCR-движок для PDF: растеризация только нужных страниц и параллельный tesseract.
+
+Раньше OCR растеризовал весь документ (convert_from_path(path)) и только потом
+брал первые max_pages страниц, а tesseract запускался последовательно на одном ядре.
+Здесь каждая страница рендерится отдельно (PyMuPDF, иначе pdf2image с first_page/last_page)
+прямо в процессе-воркере, а страницы распределяются по ограниченному пулу процессов.
+
+Общий тайм-бюджет задаётся абсолютным дедлайном: воркер не начинает страницу после
+дедлайна и ограничивает тайм-аут tesseract оставшимся временем.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+# Опциональные зависимости
+try:
+    import pytesseract  # type: ignore
+    from PIL import Image  # type: ignore
+    TESSERACT_AVAILABLE = True
+except Exception:  # pragma: no cover
+    pytesseract = None  # type: ignore
+    Image = None  # type: ignore
+    TESSERACT_AVAILABLE = False
+
+try:
+    import fitz  # PyMuPDF  # type: ignore
+except Exception:  # pragma: no cover
+    fitz = None  # type: ignore
+
+try:
+    from pdf2image import convert_from_bytes, convert_from_path, pdfinfo_from_bytes, pdfinfo_from_path  # type: ignore
+except Exception:  # pragma: no cover
+    convert_from_bytes = convert_from_path = pdfinfo_from_bytes = pdfinfo_from_path = None  # type: ignore
+
+OCR_AVAILABLE = TESSERACT_AVAILABLE and (fitz is not None or convert_from_path is not None)
+
+PdfSource = Union[str, bytes]
+
+DEFAULT_DPI = 300
+# Меньше секунды на страницу tesseract не запускаем (timeout=0 у pytesseract означает «без ограничения»)
+MIN_PAGE_SECONDS = 1.0
+
+
+def default_workers() -> int:
+    """Размер пула по умолчанию: OCR_MAX_WORKERS или число ядер (не больше 8)."""
+    try:
+        configured = int(os.environ.get('OCR_MAX_WORKERS', '0'))
+    except ValueError:
+        configured = 0
+    if configured > 0:
+        return configured
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+def count_pages(source: PdfSource) -> Optional[int]:
+    """Количество страниц PDF без растеризации (None, если определить не удалось)."""
+    try:
+        if fitz is not None:
+            doc = fitz.open(stream=source, filetype='pdf') if isinstance(source, bytes) else fitz.open(source)
+            try:
+                return doc.page_count
+            finally:
+                doc.close()
+        if pdfinfo_from_path is not None:
+            info = pdfinfo_from_bytes(source) if isinstance(source, bytes) else pdfinfo_from_path(source)
+            return int(info.get('Pages', 0)) or None
+    except Exception as e:
+        logger.debug("Не удалось определить число страниц PDF: %s", e)
+    return None
+
+
+def render_page(source: PdfSource, page_number: int, dpi: int = DEFAULT_DPI) -> 'Image.Image':
+    """Растеризовать одну страницу PDF (нумерация с 1).
+
+    Args:
+        source: Путь к PDF или его байты
+        page_number: Номер страницы (с 1)
+        dpi: Разрешение растеризации
+
+    Returns:
+        PIL Image страницы
+    """
+    if fitz is not None:
+        doc = fitz.open(stream=source, filetype='pdf') if isinstance(source, bytes) else fitz.open(source)
+        try:
+            pix = doc.load_page(page_number - 1).get_pixmap(dpi=dpi, alpha=False)
+            return Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+        finally:
+            doc.close()
+
+    if convert_from_path is None:
+        raise RuntimeError('Нет бэкенда растеризации PDF (PyMuPDF или pdf2image)')
+    kwargs = {'dpi': dpi, 'first_page': page_number, 'last_page': page_number}
+    images = convert_from_bytes(source, **kwargs) if isinstance(source, bytes) else convert_from_path(source, **kwargs)
+    if not images:
+        raise RuntimeError(f'Страница {page_number} не растеризована')
+    return images[0]
+
+
+def ocr_page(
+    source: PdfSource,
+    page_number: int,
+    lang: str,
+    deadline: float,
+    timeout_per_page: float,
+    dpi: int = DEFAULT_DPI,
+    preprocess: bool = False
+) -> Dict[str, Any]:
+    """Растеризовать и распознать одну страницу (выполняется в процессе пула).
+
+    Args:
+        source: Путь к PDF или его байты
+        page_number: Номер страницы (с 1)
+        lang: Языки tesseract
+        deadline: Абсолютный дедлайн общего бюджета (time.time())
+        timeout_per_page: Тайм-аут tesseract на страницу
+        dpi: Разрешение растеризации
+        preprocess: Предобработка изображения (image_utils.preprocess_image_for_ocr)
+
+    Returns:
+        {'page', 'text', 'ok', 'elapsed_ms', 'error'}
+    """
+    t0 = time.time()
+    result: Dict[str, Any] = {'page': page_number, 'text': '', 'ok': False, 'elapsed_ms': 0, 'error': None}
+
+    remaining = deadline - t0
+    if remaining < MIN_PAGE_SECONDS:
+        result['error'] = 'budget exceeded'
+        return result
+
+    try:
+        img = render_page(source, page_number, dpi=dpi)
+        if preprocess:
+            try:
+                from document_processor.pdf_reader.image_utils import preprocess_image_for_ocr
+                img = preprocess_image_for_ocr(img)
+            except Exception as e:
+                logger.debug("Предобработка страницы %d не удалась: %s, используем исходное", page_number, e)
+
+        timeout = min(float(timeout_per_page), deadline - time.time())
+        if timeout < MIN_PAGE_SECONDS:
+            result['error'] = 'budget exceeded'
+        else:
+            text = pytesseract.image_to_string(img, lang=lang, timeout=timeout) or ''
+            result['text'] = text
+            result['ok'] = bool(text.strip())
+    except RuntimeError as e:
+        # Тайм-аут pytesseract или ошибка растеризации
+        result['error'] = f'{type(e).__name__}: {e}'
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+
+    result['elapsed_ms'] = int((time.time() - t0) * 1000)
+    return result
+
+
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Общий пул процессов OCR (создаётся лениво, пересоздаётся при смене размера или поломке)."""
+    global _pool, _pool_size
+    with _pool_lock:
+        broken = _pool is not None and getattr(_pool, '_broken', False)
+        if _pool is None or broken or _pool_size != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            import multiprocessing
+            # spawn: веб-процесс многопоточный, fork из него небезопасен
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_size = workers
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Остановить общий пул процессов OCR."""
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+            _pool_size = 0
+
+
+atexit.register(shutdown_pool)
+
+
+class OcrEngine:
+    """Постраничный OCR PDF с ограниченным пулом процессов и общим тайм-бюджетом."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        dpi: int = DEFAULT_DPI,
+        preprocess: bool = False
+    ):
+        """
+        Args:
+            workers: Размер пула процессов (None — default_workers(); 1 — без пула)
+            dpi: Разрешение растеризации
+            preprocess: Предобработка изображений перед OCR
+        """
+        self.workers = workers if workers is not None else default_workers()
+        self.dpi = dpi
+        self.preprocess = preprocess
+
+    def ocr_pdf(
+        self,
+        source: PdfSource,
+        max_pages: int,
+        lang: str = 'rus+eng',
+        budget_seconds: float = 60.0,
+        timeout_per_page: float = 30.0,
+        pages: Optional[Sequence[int]] = None
+    ) -> Dict[str, Any]:
+        """Распознать страницы PDF.
+
+        Растеризуются только распознаваемые страницы: первые max_pages
+        (или явно переданные pages, нумерация с 1).
+
+        Args:
+            source: Путь к PDF или его байты
+            max_pages: Максимум страниц для OCR
+            lang: Языки tesseract
+            budget_seconds: Общий тайм-бюджет на документ (для всех воркеров)
+            timeout_per_page: Тайм-аут tesseract на страницу
+            pages: Явный список номеров страниц (по умолчанию 1..max_pages)
+
+        Returns:
+            dict с полями:
+                - text: текст распознанных страниц по порядку
+                - pages: список результатов по страницам (в порядке номеров)
+                - pages_total: число страниц в документе (если известно)
+                - timed_out: бюджет исчерпан до распознавания всех страниц
+                - elapsed_ms: общее время
+        """
+        t0 = time.time()
+        deadline = t0 + max(0.0, float(budget_seconds))
+
+        pages_total = count_pages(source)
+        if pages is None:
+            limit = max_pages if pages_total is None else min(max_pages, pages_total)
+            page_numbers = list(range(1, max(0, limit) + 1))
+        else:
+            page_numbers = [p for p in pages if pages_total is None or 1 <= p <= pages_total][:max_pages]
+
+        results: Dict[int, Dict[str, Any]] = {}
+        if page_numbers:
+            args = (lang, deadline, timeout_per_page, self.dpi, self.preprocess)
+            workers = min(self.workers, len(page_numbers))
+            if workers <= 1:
+                for n in page_numbers:
+                    results[n] = ocr_page(source, n, *args)
+            else:
+                results = self._run_parallel(source, page_numbers, deadline, args)
+
+        ordered = []
+        for n in page_numbers:
+            ordered.append(results.get(n) or {
+                'page': n, 'text': '', 'ok': False, 'elapsed_ms': 0, 'error': 'budget exceeded'
+            })
+
+        text = '\n'.join(r['text'] for r in ordered if r.get('ok'))
+        timed_out = any(r.get('error') == 'budget exceeded' for r in ordered)
+        elapsed_ms = int((time.time() - t0) * 1000)
+
+        logger.info(
+            "OCR: %d/%d страниц распознано, %d символов, %d мс (воркеров: %d%s)",
+            sum(1 for r in ordered if r.get('ok')), len(ordered), len(text), elapsed_ms,
+            min(self.workers, max(1, len(page_numbers))), ', бюджет исчерпан' if timed_out else ''
+        )
+
+        return {
+            'text': text,
+            'pages': ordered,
+            'pages_total': pages_total,
+            'timed_out': timed_out,
+            'elapsed_ms': elapsed_ms,
+        }
+
+    def _run_parallel(
+        self,
+        source: PdfSource,
+        page_numbers: List[int],
+        deadline: float,
+        args: tuple
+    ) -> Dict[int, Dict[str, Any]]:
+        """Распределить страницы по пулу процессов и собрать результаты до дедлайна."""
+        pool = _get_pool(self.workers)
+        futures = {pool.submit(ocr_page, source, n, *args): n for n in page_numbers}
+        results: Dict[int, Dict[str, Any]] = {}
+        pending = set(futures)
+
+        # Небольшой запас сверх дедлайна: воркер сам ограничивает tesseract оставшимся временем
+        while pending:
+            timeout = deadline - time.time() + MIN_PAGE_SECONDS
+            if timeout <= 0:
+                break
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in done:
+                n = futures[fut]
+                try:
+                    results[n] = fut.result()
+                except Exception as e:
+                    results[n] = {'page': n, 'text': '', 'ok': False, 'elapsed_ms': 0,
+                                  'error': f'{type(e).__name__}: {e}'}
+
+        for fut in pending:
+            # Не начатые страницы снимаем; начатые завершатся сами по тайм-ауту tesseract
+            fut.cancel()
+        return results
+
+
+__all__ = ['OcrEngine', 'OCR_AVAILABLE', 'count_pages', 'render_page', 'ocr_page', 'default_workers', 'shutdown_pool']
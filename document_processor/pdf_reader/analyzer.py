@@ -1,6 +1,7 @@
 """Анализатор PDF-документов (перенесено из pdf_utils.py)."""
 import os
-from typing import Any, Dict
+from io import BytesIO
+from typing import Any, Dict, Union
 
 try:
     import pypdf  # type: ignore
@@ -11,19 +12,20 @@ except Exception:  # pragma: no cover
 class PdfAnalyzer:
     """Быстрый анализ PDF-документов без извлечения текста."""
     
-    def analyze_pdf(self, path: str) -> Dict[str, Any]:
+    def analyze_pdf(self, path: Union[str, bytes]) -> Dict[str, Any]:
         """Быстрый анализ PDF: признаки линейности, шифрования, кол-во страниц.
         Все ошибки глотаются, возвращается best-effort словарь.
         
         Args:
-            path: Путь к PDF-файлу
+            path: Путь к PDF-файлу или его байты
             
         Returns:
             Dict с полями: is_pdf, linearized, is_encrypted, pages, producer, size, mtime
         """
+        in_memory = isinstance(path, bytes)
         info: Dict[str, Any] = {
-            'path': path,
-            **self._file_stats(path),
+            'path': None if in_memory else path,
+            **({'size': len(path), 'mtime': None} if in_memory else self._file_stats(path)),
             'is_pdf': False,
             'linearized': None,
             'is_encrypted': None,
@@ -32,7 +34,7 @@ class PdfAnalyzer:
         }
         
         try:
-            with open(path, 'rb') as f:
+            with self._open(path) as f:
                 head = f.read(2048)
                 info['is_pdf'] = head.startswith(b'%PDF-')
                 # эвристика линейности
@@ -43,7 +45,7 @@ class PdfAnalyzer:
         # pypdf: шифрование, страницы, метаданные
         try:
             if pypdf is not None:
-                with open(path, 'rb') as f:
+                with self._open(path) as f:
                     reader = pypdf.PdfReader(f)
                     enc = getattr(reader, 'is_encrypted', False)
                     info['is_encrypted'] = bool(enc)
@@ -73,6 +75,10 @@ class PdfAnalyzer:
 
         return info
     
+    def _open(self, path: Union[str, bytes]):
+        """Бинарный поток файла или байтов."""
+        return BytesIO(path) if isinstance(path, bytes) else open(path, 'rb')
+    
     def _file_stats(self, path: str) -> Dict[str, Any]:
         """Получить размер и время модификации файла."""
         try:
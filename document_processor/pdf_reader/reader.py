@@ -1,9 +1,21 @@
-"""Модуль чтения PDF-документов (векторные и сканы)."""
+"""Модуль чтения PDF-документов (векторные и сканы).
+
+Если установлен PyMuPDF, документ открывается один раз: число страниц,
+проверка текстового слоя и текст страниц берутся из одного дескриптора.
+Более тяжёлые парсеры (pdfplumber, pypdf, pdfminer) запускаются только для
+страниц, на которых PyMuPDF не нашёл текста. Без PyMuPDF работает прежний
+каскад: анализ pypdf, проверка слоя pdfplumber и каскад экстракторов.
+
+Источник — путь к файлу или его байты (индексация из БД читает blob без
+временных файлов).
+"""
 import time
 import logging
 import unicodedata
 import re
-from typing import Any, Dict, List
+from contextlib import closing
+from io import BytesIO
+from typing import IO, Any, Callable, Dict, List, Optional, Union
 
 from .analyzer import PdfAnalyzer
 
@@ -19,25 +31,34 @@ except Exception:  # pragma: no cover
     pypdf = None  # type: ignore
 
 try:
+    from pdfminer.high_level import extract_pages as pdfminer_extract_pages  # type: ignore
     from pdfminer.high_level import extract_text as pdfminer_extract_text  # type: ignore
+    from pdfminer.layout import LTTextContainer  # type: ignore
 except Exception:  # pragma: no cover
-    pdfminer_extract_text = None  # type: ignore
+    pdfminer_extract_text = pdfminer_extract_pages = LTTextContainer = None  # type: ignore
 
 try:
     import fitz  # PyMuPDF  # type: ignore
 except Exception:  # pragma: no cover
     fitz = None  # type: ignore
 
-# OCR-зависимости (опциональные)
-try:
-    import pytesseract  # type: ignore
-    from pdf2image import convert_from_path  # type: ignore
-    from PIL import Image  # type: ignore  # noqa: F401
-    OCR_AVAILABLE = True
-except Exception:  # pragma: no cover
-    pytesseract = None  # type: ignore
-    convert_from_path = None  # type: ignore
-    OCR_AVAILABLE = False
+# OCR-движок (зависимости pytesseract/PyMuPDF/pdf2image опциональные)
+from document_processor.ocr.engine import OcrEngine, OCR_AVAILABLE, PdfSource
+
+
+def _source_file(source: PdfSource) -> Union[str, IO[bytes]]:
+    """Путь или файловый объект для библиотек, принимающих и то и другое."""
+    return BytesIO(source) if isinstance(source, bytes) else source
+
+
+def _open_binary(source: PdfSource) -> IO[bytes]:
+    """Бинарный поток источника (контекстный менеджер)."""
+    return BytesIO(source) if isinstance(source, bytes) else open(source, 'rb')
+
+
+def _describe(source: PdfSource) -> str:
+    """Источник для логов: путь или размер байтов."""
+    return f'<{len(source)} байт>' if isinstance(source, bytes) else source
 
 
 class PdfReader:
@@ -65,22 +86,25 @@ class PdfReader:
     
     def read_pdf(
         self,
-        path: str,
+        path: PdfSource,
         ocr: str = 'auto',
         lang: str = 'rus+eng',
         budget_seconds: float = 10.0,
         max_pages_text: int = 100,
-        max_pages_ocr: int = 2
+        max_pages_ocr: int = 2,
+        normalize: bool = True
     ) -> Dict[str, Any]:
         """Извлечь текст из PDF (векторный или скан).
         
         Args:
-            path: Путь к PDF-файлу
+            path: Путь к PDF-файлу или его байты
             ocr: Режим OCR: 'auto' (авто), 'force' (принудительно), 'off' (выключен)
             lang: Языки для OCR (например, 'rus+eng')
-            budget_seconds: Тайм-бюджет для извлечения текста
+            budget_seconds: Общий тайм-бюджет на документ (OCR и текстовый слой делят его)
             max_pages_text: Максимум страниц для векторного извлечения
             max_pages_ocr: Максимум страниц для OCR
+            normalize: Нормализовать текст (NFKC, пробелы схлопываются в один,
+                в том числе переводы строк); False — текст страниц как есть
             
         Returns:
             PdfReadResult (dict) с полями:
@@ -93,42 +117,69 @@ class PdfReader:
                 - attempts: список попыток извлечения
         """
         start = time.time()
-        self._log.info("Начало чтения PDF: %s (ocr=%s, budget=%.1fs)", path, ocr, budget_seconds)
+        self._log.info("Начало чтения PDF: %s (ocr=%s, budget=%.1fs)", _describe(path), ocr, budget_seconds)
         
-        # Анализ PDF
-        analysis = self._analyzer.analyze_pdf(path)
-        pages = analysis.get('pages')
-        
-        # Определение типа PDF
-        has_text = False
-        if ocr != 'force':
-            has_text = self.has_text_layer(path, sample_pages=2, min_text_len=50)
-        
-        # Извлечение текста
-        text = ''
-        ocr_used = False
-        used_extractor = 'none'
-        attempts: List[Dict[str, Any]] = []
+        def left_time() -> float:
+            # Бюджет общий на документ: каждый этап получает остаток
+            return max(0.0, budget_seconds - (time.time() - start))
         
-        if ocr == 'force' or (ocr == 'auto' and not has_text):
-            # OCR для сканов или принудительный OCR
-            timeout = self._get_config_value('OCR_TIMEOUT_PER_PAGE', 30)
-            text, ocr_attempts = self._extract_text_ocr(
-                path, max_pages=max_pages_ocr, lang=lang, timeout_per_page=timeout
-            )
-            if text:
-                ocr_used = True
-                used_extractor = 'ocr'
-            attempts.extend(ocr_attempts)
-        
-        if not text and ocr != 'force':
-            # Векторное извлечение (каскад экстракторов)
-            text, used_extractor, attempts = self._extract_text_vector(
-                path, budget_seconds=budget_seconds, max_pages=max_pages_text
-            )
+        # Один дескриптор PyMuPDF на весь файл (None — прежний каскад библиотек)
+        document = self._open_document(path)
+        # Текст страниц, уже извлечённый из document: номер страницы (с 0) -> текст
+        page_texts: Dict[int, str] = {}
+        try:
+            # Анализ PDF
+            if document is not None:
+                pages = document.page_count
+            else:
+                analysis = self._analyzer.analyze_pdf(path)
+                pages = analysis.get('pages')
+            
+            # Определение типа PDF
+            has_text = False
+            if ocr != 'force':
+                if document is not None:
+                    has_text = self._document_has_text(document, page_texts, sample_pages=2, min_text_len=50)
+                else:
+                    has_text = self.has_text_layer(path, sample_pages=2, min_text_len=50)
+            
+            # Извлечение текста
+            text = ''
+            ocr_used = False
+            used_extractor = 'none'
+            attempts: List[Dict[str, Any]] = []
+            
+            if ocr == 'force' or (ocr == 'auto' and not has_text):
+                # OCR для сканов или принудительный OCR
+                timeout = self._get_config_value('OCR_TIMEOUT_PER_PAGE', 30)
+                text, ocr_attempts = self._extract_text_ocr(
+                    path, max_pages=max_pages_ocr, lang=lang, timeout_per_page=timeout,
+                    budget_seconds=left_time()
+                )
+                if text:
+                    ocr_used = True
+                    used_extractor = 'ocr'
+                attempts.extend(ocr_attempts)
+            
+            if not text and ocr != 'force':
+                if document is not None:
+                    # Постранично из открытого документа, пустые страницы — тяжёлыми парсерами
+                    text, used_extractor, vector_attempts = self._extract_text_document(
+                        document, path, page_texts, budget_seconds=left_time(), max_pages=max_pages_text
+                    )
+                else:
+                    # Векторное извлечение (каскад экстракторов)
+                    text, used_extractor, vector_attempts = self._extract_text_vector(
+                        path, budget_seconds=left_time(), max_pages=max_pages_text
+                    )
+                attempts.extend(vector_attempts)
+        finally:
+            if document is not None:
+                document.close()
         
         # Нормализация текста
-        text = self._normalize_text(text)
+        if normalize:
+            text = self._normalize_text(text)
         
         elapsed_ms = int((time.time() - start) * 1000)
         
@@ -144,18 +195,18 @@ class PdfReader:
         
         self._log.info(
             "Чтение PDF завершено: %s | extractor=%s | ocr=%s | elapsed=%dms | pages=%s",
-            path, used_extractor, ocr_used, elapsed_ms, pages
+            _describe(path), used_extractor, ocr_used, elapsed_ms, pages
         )
         
         return result
     
     def has_text_layer(
-        self, path: str, sample_pages: int = 2, min_text_len: int = 50
+        self, path: PdfSource, sample_pages: int = 2, min_text_len: int = 50
     ) -> bool:
         """Определить наличие текстового слоя в PDF.
         
         Args:
-            path: Путь к PDF-файлу
+            path: Путь к PDF-файлу или его байты
             sample_pages: Количество страниц для проверки
             min_text_len: Минимальная длина текста для определения как "векторный"
             
@@ -163,8 +214,14 @@ class PdfReader:
             True если PDF векторный (есть текстовый слой), False если скан
         """
         try:
+            document = self._open_document(path)
+            if document is not None:
+                try:
+                    return self._document_has_text(document, {}, sample_pages, min_text_len)
+                finally:
+                    document.close()
             if pdfplumber is not None:
-                with pdfplumber.open(path) as pdf:
+                with pdfplumber.open(_source_file(path)) as pdf:
                     text_len = 0
                     for i, page in enumerate(pdf.pages[:sample_pages]):
                         t = page.extract_text() or ''
@@ -173,7 +230,7 @@ class PdfReader:
                             return True
                     return False
             elif pypdf is not None:
-                with open(path, 'rb') as f:
+                with _open_binary(path) as f:
                     reader = pypdf.PdfReader(f)
                     text_len = 0
                     pages_to_check = reader.pages[:sample_pages]
@@ -190,13 +247,168 @@ class PdfReader:
             self._log.debug("Ошибка при определении типа PDF: %s", e)
             return False
     
+    def _open_document(self, path: PdfSource):
+        """Открыть PDF через PyMuPDF (None — PyMuPDF нет или файл не открылся)."""
+        if fitz is None:
+            return None
+        try:
+            if isinstance(path, bytes):
+                document = fitz.open(stream=path, filetype='pdf')
+            else:
+                document = fitz.open(path)
+        except Exception as e:
+            self._log.debug("PyMuPDF не открыл PDF: %s", e)
+            return None
+        try:
+            if not document.is_pdf or (document.needs_pass and not document.authenticate('')):
+                document.close()
+                return None
+        except Exception:
+            document.close()
+            return None
+        return document
+    
+    def _page_text(self, document, index: int, page_texts: Dict[int, str]) -> str:
+        """Текст страницы index (с 0) из открытого документа, с запоминанием."""
+        if index not in page_texts:
+            try:
+                page_texts[index] = document[index].get_text("text") or ''
+            except Exception as e:
+                self._log.debug("PyMuPDF: ошибка страницы %d: %s", index + 1, e)
+                page_texts[index] = ''
+        return page_texts[index]
+    
+    def _document_has_text(
+        self, document, page_texts: Dict[int, str], sample_pages: int = 2, min_text_len: int = 50
+    ) -> bool:
+        """has_text_layer по открытому документу (текст проверенных страниц запоминается)."""
+        text_len = 0
+        for i in range(min(sample_pages, document.page_count)):
+            text_len += len(self._page_text(document, i, page_texts).strip())
+            if text_len >= min_text_len:
+                return True
+        return False
+    
+    def _extract_text_document(
+        self, document, path: PdfSource, page_texts: Dict[int, str], budget_seconds: float, max_pages: int
+    ) -> tuple[str, str, List[Dict[str, Any]]]:
+        """Постраничное извлечение из открытого документа PyMuPDF.
+        
+        Страницы без текста по очереди передаются pdfplumber, pypdf и pdfminer —
+        только они, а не весь документ.
+        
+        Args:
+            document: Документ PyMuPDF
+            path: Путь к PDF-файлу или его байты (для запасных парсеров)
+            page_texts: Уже извлечённый текст страниц
+            budget_seconds: Тайм-бюджет
+            max_pages: Максимум страниц
+            
+        Returns:
+            Кортеж: (text, used_extractor, attempts), used_extractor — например 'pymupdf+pdfplumber'
+        """
+        start = time.time()
+        attempts: List[Dict[str, Any]] = []
+        used: List[str] = []
+        
+        def left_time() -> float:
+            return budget_seconds - (time.time() - start)
+        
+        t0 = time.time()
+        texts: List[str] = []
+        for i in range(min(max_pages, document.page_count)):
+            if left_time() <= 0:
+                break
+            texts.append(self._page_text(document, i, page_texts))
+        ok = any(t.strip() for t in texts)
+        if ok:
+            used.append('pymupdf')
+        attempts.append({
+            'name': 'pymupdf',
+            'ok': ok,
+            'elapsed_ms': int((time.time() - t0) * 1000),
+            'error': None
+        })
+        
+        fallbacks = (
+            ('pdfplumber', pdfplumber, self._pages_pdfplumber),
+            ('pypdf', pypdf, self._pages_pypdf),
+            ('pdfminer', pdfminer_extract_text, self._pages_pdfminer),
+        )
+        for name, backend, extract in fallbacks:
+            empty = [i for i, t in enumerate(texts) if not t.strip()]
+            if not empty or left_time() <= 0:
+                break
+            if backend is None:
+                continue
+            t0 = time.time()
+            ok, err = False, None
+            try:
+                for i, t in extract(path, empty, left_time).items():
+                    if t.strip():
+                        texts[i] = t
+                        ok = True
+            except Exception as e:  # pragma: no cover
+                err = f'{type(e).__name__}: {e}'
+                self._log.debug("%s не удалось: %s", name, err)
+            if ok:
+                used.append(name)
+            attempts.append({
+                'name': name,
+                'ok': ok,
+                'elapsed_ms': int((time.time() - t0) * 1000),
+                'error': err,
+                'pages': len(empty)
+            })
+        
+        text = '\n'.join(t for t in texts if t)
+        return text, '+'.join(used) or 'none', attempts
+    
+    def _pages_pdfplumber(self, path: PdfSource, indexes: List[int], left_time: Callable[[], float]) -> Dict[int, str]:
+        """Текст страниц indexes (с 0) через pdfplumber."""
+        found: Dict[int, str] = {}
+        with pdfplumber.open(_source_file(path)) as pdf:
+            for i in indexes:
+                if left_time() <= 0 or i >= len(pdf.pages):
+                    break
+                found[i] = pdf.pages[i].extract_text() or ''
+        return found
+    
+    def _pages_pypdf(self, path: PdfSource, indexes: List[int], left_time: Callable[[], float]) -> Dict[int, str]:
+        """Текст страниц indexes (с 0) через pypdf."""
+        found: Dict[int, str] = {}
+        with _open_binary(path) as f:
+            r = pypdf.PdfReader(f)
+            if getattr(r, 'is_encrypted', False):
+                try:
+                    r.decrypt("")
+                except Exception:
+                    pass
+            for i in indexes:
+                if left_time() <= 0 or i >= len(r.pages):
+                    break
+                found[i] = r.pages[i].extract_text() or ''
+        return found
+    
+    def _pages_pdfminer(self, path: PdfSource, indexes: List[int], left_time: Callable[[], float]) -> Dict[int, str]:
+        """Текст страниц indexes (с 0) через pdfminer.six (документ разбирается один раз)."""
+        found: Dict[int, str] = {}
+        wanted = sorted(indexes)
+        # Страницы выдаются лениво и по порядку документа: выход из цикла прекращает разбор
+        with closing(pdfminer_extract_pages(_source_file(path), page_numbers=set(wanted))) as pages:
+            for i, page in zip(wanted, pages):
+                found[i] = ''.join(el.get_text() for el in page if isinstance(el, LTTextContainer))
+                if left_time() <= 0:
+                    break
+        return found
+    
     def _extract_text_vector(
-        self, path: str, budget_seconds: float, max_pages: int
+        self, path: PdfSource, budget_seconds: float, max_pages: int
     ) -> tuple[str, str, List[Dict[str, Any]]]:
         """Извлечение текста из векторного PDF через каскад экстракторов.
         
         Args:
-            path: Путь к PDF-файлу
+            path: Путь к PDF-файлу или его байты
             budget_seconds: Тайм-бюджет
             max_pages: Максимум страниц
             
@@ -216,7 +428,7 @@ class PdfReader:
             t0 = time.time()
             ok, err = False, None
             try:
-                with pdfplumber.open(path) as pdf:
+                with pdfplumber.open(_source_file(path)) as pdf:
                     parts = []
                     for i, page in enumerate(pdf.pages):
                         if i >= max_pages or left_time() <= 0:
@@ -243,7 +455,7 @@ class PdfReader:
             t0 = time.time()
             ok, err = False, None
             try:
-                with open(path, 'rb') as f:
+                with _open_binary(path) as f:
                     r = pypdf.PdfReader(f)
                     try:
                         if getattr(r, 'is_encrypted', False):
@@ -282,7 +494,7 @@ class PdfReader:
             t0 = time.time()
             ok, err = False, None
             try:
-                t = pdfminer_extract_text(path) or ''
+                t = pdfminer_extract_text(_source_file(path)) or ''
                 if t.strip():
                     text = t
                     used = 'pdfminer'
@@ -302,7 +514,7 @@ class PdfReader:
             t0 = time.time()
             ok, err = False, None
             try:
-                doc = fitz.open(path)
+                doc = fitz.open(stream=path, filetype='pdf') if isinstance(path, bytes) else fitz.open(path)
                 parts = []
                 for i, page in enumerate(doc):
                     if i >= max_pages or left_time() <= 0:
@@ -327,15 +539,20 @@ class PdfReader:
         return text, used, attempts
     
     def _extract_text_ocr(
-        self, path: str, max_pages: int, lang: str, timeout_per_page: int = 30
+        self, path: PdfSource, max_pages: int, lang: str, timeout_per_page: int = 30,
+        budget_seconds: Optional[float] = None
     ) -> tuple[str, List[Dict[str, Any]]]:
         """Извлечение текста через OCR.
         
+        Растеризуются только первые max_pages страниц, страницы распознаются
+        параллельно в пуле процессов (см. document_processor.ocr.engine).
+        
         Args:
-            path: Путь к PDF-файлу
+            path: Путь к PDF-файлу или его байты
             max_pages: Максимум страниц для OCR
             lang: Языки для распознавания
             timeout_per_page: Тайм-аут на страницу в секундах (по умолчанию 30)
+            budget_seconds: Общий тайм-бюджет OCR (по умолчанию timeout_per_page * max_pages)
             
         Returns:
             Кортеж: (text, attempts)
@@ -344,7 +561,7 @@ class PdfReader:
         
         if not OCR_AVAILABLE:
             self._log.warning(
-                "OCR пропущен: отсутствуют зависимости (pytesseract/pdf2image/Pillow)"
+                "OCR пропущен: отсутствуют зависимости (pytesseract + PyMuPDF/pdf2image)"
             )
             attempts.append({
                 'name': 'ocr',
@@ -356,82 +573,38 @@ class PdfReader:
         
         # Получение конфигурации из webapp/config.py (если доступна)
         preprocess_enabled = self._get_config_value('OCR_PREPROCESS_ENABLED', False)
+        if budget_seconds is None:
+            budget_seconds = float(timeout_per_page) * max(1, max_pages)
         
         t0 = time.time()
         ok, err = False, None
         text = ''
         
         try:
-            images = convert_from_path(path)
-            if images:
-                texts: List[str] = []
-                for i, img in enumerate(images[:max_pages]):
-                    page_start = time.time()
-                    try:
-                        # Опциональная предобработка изображения
-                        processed_img = img
-                        if preprocess_enabled:
-                            try:
-                                from .image_utils import preprocess_image_for_ocr
-                                processed_img = preprocess_image_for_ocr(img)
-                                self._log.debug("Предобработка страницы %d выполнена", i + 1)
-                            except Exception as e:
-                                self._log.debug("Предобработка страницы %d не удалась: %s, используем исходное", i + 1, e)
-                                processed_img = img
-                        
-                        # OCR с тайм-аутом
-                        t = pytesseract.image_to_string(
-                            processed_img, 
-                            lang=lang,
-                            timeout=timeout_per_page
-                        )
-                        
-                        page_elapsed = time.time() - page_start
-                        if t and t.strip():
-                            texts.append(t)
-                            self._log.debug(
-                                "OCR страницы %d/%d завершён: %.1f сек, %d символов",
-                                i + 1, len(images[:max_pages]), page_elapsed, len(t)
-                            )
-                        else:
-                            self._log.debug("OCR страницы %d: пустой результат", i + 1)
-                            
-                    except RuntimeError as e:
-                        # Тайм-аут или другая ошибка pytesseract
-                        page_elapsed = time.time() - page_start
-                        self._log.warning(
-                            "OCR страницы %d не удалось (%.1f сек): %s",
-                            i + 1, page_elapsed, e
-                        )
-                        continue
-                    except Exception as e:
-                        page_elapsed = time.time() - page_start
-                        self._log.debug(
-                            "OCR страницы %d не удалось (%.1f сек): %s",
-                            i + 1, page_elapsed, e
-                        )
-                        continue
-                        
-                if texts:
-                    text = '\n'.join(texts)
-                    ok = True
+            engine = OcrEngine(preprocess=bool(preprocess_enabled))
+            result = engine.ocr_pdf(
+                path,
+                max_pages=max_pages,
+                lang=lang,
+                budget_seconds=budget_seconds,
+                timeout_per_page=timeout_per_page
+            )
+            text = result['text']
+            ok = bool(text)
+            page_errors = [f"p{r['page']}: {r['error']}" for r in result['pages'] if r.get('error')]
+            if page_errors and not ok:
+                err = '; '.join(page_errors)[:500]
         except Exception as e:  # pragma: no cover
             err = f'{type(e).__name__}: {e}'
             self._log.warning("OCR не удалось: %s", err)
         
-        elapsed_ms = int((time.time() - t0) * 1000)
         attempts.append({
             'name': 'ocr',
             'ok': ok,
-            'elapsed_ms': elapsed_ms,
+            'elapsed_ms': int((time.time() - t0) * 1000),
             'error': err
         })
         
-        self._log.info(
-            "OCR завершён: %d/%d страниц распознано, %d символов, %d мс",
-            len(text.split('\n')) if text else 0, max_pages, len(text), elapsed_ms
-        )
-        
         return text, attempts
     
     def _normalize_text(self, text: str) -> str:
@@ -0,0 +1,147 @@
+"""
+Обнаружение файлов для Indexer одним проходом по дереву.
+
+Раньше дерево обходилось os.walk дважды (подсчёт файлов и выдача источников),
+размер каждого файла запрашивался ещё раз при сортировке, а каждый PDF
+открывался pdfplumber при классификации. На сетевых архивах закупок одни
+метаданные занимали заметную долю времени индексации. Теперь scan_files один
+раз обходит дерево через os.scandir и возвращает неизменяемый список FileInfo
+(путь, размер, mtime, расширение), который используют все следующие этапы.
+
+FileCache хранит результаты прошлого запуска рядом с индексом
+(_search_index.files.json): для файлов с прежними размером и mtime
+классификация (fast/medium/slow) берётся из него, PDF повторно не открываются.
+"""
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Collection, Dict, Iterable, List, NamedTuple, Optional
+
+CACHE_VERSION = 1
+
+
+class FileInfo(NamedTuple):
+    """Файл для индексации."""
+    ext: str
+    name: str
+    abs_path: str
+    rel_path: str
+    size: int
+    mtime_ns: int
+    # Группа скорости обработки (fast/medium/slow); None — ещё не определена
+    kind: Optional[str] = None
+
+
+def scan_files(
+    root_folder: str,
+    max_depth: int,
+    extensions: Collection[str],
+    skip_names: Collection[str] = (),
+    skip_dirs: Collection[str] = ()
+) -> List[FileInfo]:
+    """Файлы дерева с поддерживаемыми расширениями в порядке os.walk.
+
+    Каталоги глубже max_depth не обходятся, символические ссылки на каталоги
+    не раскрываются, нечитаемые каталоги пропускаются (как у os.walk).
+
+    Args:
+        root_folder: Корень обхода
+        max_depth: Максимальная глубина каталога с файлами (корень — 0)
+        extensions: Поддерживаемые расширения (без точки, в нижнем регистре)
+        skip_names: Имена файлов, которые не индексируются
+        skip_dirs: Имена каталогов, которые не обходятся
+    """
+    files: List[FileInfo] = []
+
+    def walk(dir_path: str, rel_dir: str, depth: int) -> None:
+        subdirs = []
+        try:
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if entry.name not in skip_dirs and not entry.is_symlink():
+                    subdirs.append(entry)
+                continue
+            name = entry.name
+            # Временные файлы Office (обычно начинаются с ~$ или $)
+            if name.startswith("~$") or name.startswith("$") or name in skip_names:
+                continue
+            ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+            if ext not in extensions:
+                continue
+            try:
+                st = entry.stat()
+                size, mtime_ns = st.st_size, st.st_mtime_ns
+            except OSError:
+                size, mtime_ns = 0, 0
+            rel_path = os.path.normpath(os.path.join(rel_dir, name)) if rel_dir else name
+            files.append(FileInfo(ext, name, entry.path, rel_path, size, mtime_ns))
+        if depth < max_depth:
+            for entry in subdirs:
+                walk(entry.path, os.path.join(rel_dir, entry.name) if rel_dir else entry.name, depth + 1)
+
+    walk(root_folder, "", 0)
+    return files
+
+
+def cache_path(index_path: str) -> str:
+    """Путь кэша обнаружения (_search_index.txt -> _search_index.files.json)."""
+    return os.path.splitext(index_path)[0] + '.files.json'
+
+
+class FileCache:
+    """Сохранённые между запусками размеры, mtime и классификация файлов."""
+
+    def __init__(self, path: str, entries: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = entries or {}
+
+    @classmethod
+    def load(cls, index_path: str) -> 'FileCache':
+        """Кэш индекса (пустой, если его нет или он повреждён)."""
+        path = cache_path(index_path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get('version') != CACHE_VERSION:
+            return cls(path)
+        return cls(path, data.get('files') or {})
+
+    def kind(self, info: FileInfo) -> Optional[str]:
+        """Сохранённая классификация файла, если он не менялся."""
+        entry = self.entries.get(info.rel_path)
+        if entry and entry.get('size') == info.size and entry.get('mtime_ns') == info.mtime_ns:
+            return entry.get('kind')
+        return None
+
+    def update(self, files: Iterable[FileInfo]) -> None:
+        """Заменить содержимое текущим списком файлов (удалённые файлы выпадают)."""
+        self.entries = {
+            info.rel_path: {'size': info.size, 'mtime_ns': info.mtime_ns, 'ext': info.ext, 'kind': info.kind}
+            for info in files
+        }
+
+    def save(self) -> None:
+        """Атомарно записать кэш."""
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': CACHE_VERSION,
+                'updated_at': datetime.now().isoformat(),
+                'files': self.entries,
+            }, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+
+__all__ = ['FileInfo', 'FileCache', 'scan_files', 'cache_path']
@@ -5,10 +5,18 @@ import re
 import zipfile
 import tempfile
 import json
+import time
+import itertools
+from contextlib import closing
 from datetime import datetime
-from typing import Iterable, Tuple, List
+from typing import Iterable, Iterator, Optional, Tuple, List
 import logging
 
+from .offset_index import OffsetIndexReader, OffsetTableWriter, build_offset_table, offsets_path
+from .segments import SegmentManifest, index_files, segments_dir
+from .parallel import ParallelExtractor, default_file_timeout, default_workers
+from .discovery import FileCache, FileInfo, scan_files
+
 # Разделитель заголовков в индексе
 HEADER_BAR = "===============================" 
 # Маркеры начала и конца документа
@@ -16,19 +24,48 @@ DOC_START_MARKER = "<<< НАЧАЛО ДОКУМЕНТА >>>"
 DOC_END_MARKER = "<<< КОНЕЦ ДОКУМЕНТА >>>"
 SUPPORTED_EXT = {"pdf", "doc", "docx", "xls", "xlsx", "txt", "html", "htm", "csv", "tsv", "xml", "json"}
 DOC_EXTS = {"doc", "docx"}
+# Файлы и каталог самого индекса, которые не индексируются
+INDEX_FILE_NAMES = {"_search_index.txt", "_search_index.manifest.json", "_search_index.files.json"}
+SEGMENTS_DIR_NAME = "_search_index.segments"
+# Подписи групп в служебных заголовках групповой индексации
+GROUP_LABELS = {
+    'fast': 'TXT, CSV, HTML',
+    'medium': 'DOCX, XLSX, векторные PDF',
+    'slow': 'PDF-сканы с OCR'
+}
 
 class Indexer:
-    def __init__(self, *, max_depth: int = 10, archive_depth: int = 0):
+    def __init__(self, *, max_depth: int = 10, archive_depth: int = 0, status_interval: float = 1.0,
+                 workers: Optional[int] = None, file_timeout: Optional[float] = None):
+        """
+        Args:
+            status_interval: не чаще чем раз в столько секунд статус прогресса
+                пишется в status.json (смена статуса и границы групп — сразу)
+            workers: размер пула процессов извлечения текста
+                (None — INDEX_MAX_WORKERS, по умолчанию 1 — без пула)
+            file_timeout: тайм-аут извлечения одного файла в пуле, сек
+                (None — INDEX_FILE_TIMEOUT_SECONDS)
+        """
         self.max_depth = max_depth
         self.archive_depth = archive_depth
+        self.status_interval = status_interval
+        self.workers = workers if workers is not None else default_workers()
+        self.file_timeout = file_timeout if file_timeout is not None else default_file_timeout()
         self._temp_paths: List[str] = []
         self._log = logging.getLogger(__name__)
+        # Статус индексации в памяти: путь status.json -> (данные, время последней записи)
+        self._status: dict = {}
+        # Кэш обнаружения последнего _collect_all_files (классификация файлов между запусками)
+        self._file_cache: Optional[FileCache] = None
 
-    def _classify_files(self, files: List[Tuple[str, str, str, str]]) -> dict:
+    def _classify_files(self, files: Iterable[FileInfo]) -> dict:
         """Группирует файлы по скорости обработки.
         
+        Классификация берётся из FileInfo.kind (кэш прошлого запуска), для
+        остальных файлов вычисляется и сохраняется в кэш обнаружения.
+        
         Args:
-            files: список кортежей (ext, name, abs_path, rel_path)
+            files: результат _collect_all_files
         
         Returns:
             {
@@ -37,29 +74,37 @@ class Indexer:
                 'slow': [...]                            # PDF с OCR, архивы
             }
         """
-        fast_exts = {'.txt', '.csv', '.html', '.htm', '.md', '.json', '.xml', '.tsv'}
-        medium_exts = {'.docx', '.xlsx', '.xls', '.doc'}
-        
         groups = {'fast': [], 'medium': [], 'slow': []}
+        classified = []
+        computed = False
         
-        for ext, name, abs_path, rel_path in files:
-            ext_lower = f'.{ext}'
-            
-            if ext_lower in fast_exts:
-                groups['fast'].append((rel_path, abs_path))
-            elif ext_lower in medium_exts:
-                groups['medium'].append((rel_path, abs_path))
-            elif ext == 'pdf':
-                # Эвристика: пробуем определить, текстовый ли PDF
-                if self._is_text_pdf(abs_path):
-                    groups['medium'].append((rel_path, abs_path))
-                else:
-                    groups['slow'].append((rel_path, abs_path))
-            else:  # ZIP, RAR и прочие
-                groups['slow'].append((rel_path, abs_path))
+        for info in files:
+            if info.kind is None:
+                info = info._replace(kind=self._file_kind(info))
+                computed = True
+            groups[info.kind].append((info.rel_path, info.abs_path))
+            classified.append(info)
+        
+        if computed and self._file_cache is not None:
+            self._save_file_cache(classified)
         
         return groups
     
+    def _file_kind(self, info: FileInfo) -> str:
+        """Группа скорости обработки файла: fast/medium/slow."""
+        fast_exts = {'.txt', '.csv', '.html', '.htm', '.md', '.json', '.xml', '.tsv'}
+        medium_exts = {'.docx', '.xlsx', '.xls', '.doc'}
+        ext_lower = f'.{info.ext}'
+        
+        if ext_lower in fast_exts:
+            return 'fast'
+        if ext_lower in medium_exts:
+            return 'medium'
+        if info.ext == 'pdf':
+            # Эвристика: пробуем определить, текстовый ли PDF
+            return 'medium' if self._is_text_pdf(info.abs_path) else 'slow'
+        return 'slow'  # ZIP, RAR и прочие
+    
     def _is_text_pdf(self, path: str, threshold: int = 100) -> bool:
         """Быстрая проверка: содержит ли PDF извлекаемый текст.
         
@@ -90,7 +135,8 @@ class Indexer:
             use_groups: если True, использует групповую индексацию (increment-014)
         
         Returns:
-            путь к созданному индексу
+            путь индекса _search_index.txt; при use_groups=True самого файла нет —
+            индекс состоит из сегментов по манифесту (проверка — segments.index_exists)
         """
         if use_groups:
             return self._create_index_grouped(root_folder)
@@ -98,7 +144,11 @@ class Indexer:
             return self._create_index_classic(root_folder)
     
     def _create_index_grouped(self, root_folder: str) -> str:
-        """Создаёт индекс в 3 этапа с промежуточной доступностью (increment-014)."""
+        """Создаёт индекс в 3 этапа с промежуточной доступностью (increment-014).
+
+        Каждая группа пишется отдельным сегментом (см. segments.py) и публикуется
+        в манифесте сразу после записи: уже записанные данные не переписываются.
+        """
         index_path = os.path.join(root_folder, "_search_index.txt")
         status_path = os.path.join(os.path.dirname(root_folder), "index", "status.json")
         
@@ -131,70 +181,69 @@ class Indexer:
                 'group_times': group_times,
                 'started_at': datetime.now().isoformat(),
                 'updated_at': datetime.now().isoformat()
-            })
+            }, force=True)
             
-            # 2. Создаём индекс с заголовками
-            self._create_index_skeleton(index_path, groups)
+            # 2. Пустой манифест с группами вместо прежнего индекса
+            manifest = self._create_manifest(index_path, groups)
             
-            # 3. Обрабатываем группы последовательно
+            # 3. Обрабатываем группы по порядку. Извлечение идёт одним потоком
+            # результатов по всем группам: в пуле процессов медленные файлы
+            # обрабатываются, пока пишутся сегменты быстрых групп
             processed_files = 0
-            for group_name in ['fast', 'medium', 'slow']:
-                group_files = groups[group_name]
-                if not group_files:
-                    continue
+            with closing(self._extract_many(
+                (rel_path, abs_path, rel_path)
+                for group_name in ['fast', 'medium', 'slow']
+                for rel_path, abs_path in groups[group_name]
+            )) as extracted:
+                for group_name in ['fast', 'medium', 'slow']:
+                    group_files = groups[group_name]
+                    if not group_files:
+                        continue
                 
-                self._log.info(f"Обработка группы {group_name}: {len(group_files)} файлов")
+                    self._log.info(f"Обработка группы {group_name}: {len(group_files)} файлов")
                 
-                # Отметим старт времени группы
-                start_dt = datetime.now()
-                group_times[group_name]['started_at'] = start_dt.isoformat()
-                # Обновляем статус группы
-                self._update_status(status_path, {
-                    'status': 'running',
-                    'total': total_files,
-                    'processed': processed_files,
-                    'current_group': group_name,
-                    'group_status': {
-                        'fast': 'completed' if group_name != 'fast' else 'running',
-                        'medium': 'completed' if group_name == 'slow' else ('running' if group_name == 'medium' else 'pending'),
-                        'slow': 'running' if group_name == 'slow' else 'pending'
-                    },
-                    'group_times': group_times,
-                    'updated_at': datetime.now().isoformat()
-                })
-                
-                # Обрабатываем группу во временный файл
-                temp_file = os.path.join(os.path.dirname(status_path), f'_search_index_{group_name}.tmp')
-                self._process_group(group_files, temp_file, group_name)
-                
-                # Вставляем в главный индекс атомарно
-                self._insert_group_into_index(index_path, group_name, temp_file)
+                    # Отметим старт времени группы
+                    start_dt = datetime.now()
+                    group_times[group_name]['started_at'] = start_dt.isoformat()
+                    # Обновляем статус группы
+                    self._update_status(status_path, {
+                        'status': 'running',
+                        'total': total_files,
+                        'processed': processed_files,
+                        'current_group': group_name,
+                        'group_status': {
+                            'fast': 'completed' if group_name != 'fast' else 'running',
+                            'medium': 'completed' if group_name == 'slow' else ('running' if group_name == 'medium' else 'pending'),
+                            'slow': 'running' if group_name == 'slow' else 'pending'
+                        },
+                        'group_times': group_times,
+                        'updated_at': datetime.now().isoformat()
+                    }, force=True)
                 
-                # Удаляем временный файл
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
+                    # Пишем сегмент группы и публикуем его в манифесте
+                    self._write_group_segment(manifest, group_name, group_files, extracted)
                 
-                processed_files += len(group_files)
+                    processed_files += len(group_files)
                 
-                # Обновляем статус после завершения группы
-                end_dt = datetime.now()
-                try:
-                    duration_sec = int((end_dt - start_dt).total_seconds())
-                except Exception:
-                    duration_sec = None
-                group_times[group_name]['completed_at'] = end_dt.isoformat()
-                if duration_sec is not None:
-                    group_times[group_name]['duration_sec'] = duration_sec
-                self._update_status(status_path, {
-                    'processed': processed_files,
-                    'group_status': {
-                        'fast': 'completed',
-                        'medium': 'completed' if group_name != 'fast' else 'pending',
-                        'slow': 'completed' if group_name == 'slow' else 'pending'
-                    },
-                    'group_times': group_times,
-                    'updated_at': datetime.now().isoformat()
-                })
+                    # Обновляем статус после завершения группы
+                    end_dt = datetime.now()
+                    try:
+                        duration_sec = int((end_dt - start_dt).total_seconds())
+                    except Exception:
+                        duration_sec = None
+                    group_times[group_name]['completed_at'] = end_dt.isoformat()
+                    if duration_sec is not None:
+                        group_times[group_name]['duration_sec'] = duration_sec
+                    self._update_status(status_path, {
+                        'processed': processed_files,
+                        'group_status': {
+                            'fast': 'completed',
+                            'medium': 'completed' if group_name != 'fast' else 'pending',
+                            'slow': 'completed' if group_name == 'slow' else 'pending'
+                        },
+                        'group_times': group_times,
+                        'updated_at': datetime.now().isoformat()
+                    }, force=True)
             
             # 4. Финализация
             self._update_status(status_path, {
@@ -204,10 +253,10 @@ class Indexer:
                 'current_group': None,
                 'completed_at': datetime.now().isoformat(),
                 'updated_at': datetime.now().isoformat()
-            })
+            }, force=True)
             
             # Финальный добор недостающих файлов (best-effort): если какой-то файл
-            # по граничной причине не попал в секцию — дозапишем его постфактум.
+            # по граничной причине не попал в сегмент группы — допишем его отдельным сегментом.
             try:
                 self._final_sweep_for_missing(index_path, root_folder)
             except Exception:
@@ -223,7 +272,7 @@ class Indexer:
                 'status': 'error',
                 'error': str(e),
                 'updated_at': datetime.now().isoformat()
-            })
+            }, force=True)
             
             self._log.exception("Ошибка при групповой индексации: %s", e)
             raise
@@ -231,22 +280,14 @@ class Indexer:
             self._cleanup_temp_paths()
 
     def _final_sweep_for_missing(self, index_path: str, root_folder: str) -> None:
-        """Дозапись недостающих файлов в соответствующие секции групп.
+        """Дозапись недостающих файлов отдельными сегментами групп.
 
         Алгоритм:
-        - Читаем текущий индекс и собираем множество уже присутствующих rel_path по строкам 'ЗАГОЛОВОК: ...'.
+        - Собираем множество уже присутствующих rel_path по заголовкам записей сегментов.
         - Повторно собираем список файлов и группируем их стандартной логикой.
-        - Для каждой группы вычисляем недостающие rel_path и дозаписываем их в секцию.
+        - Для каждой группы вычисляем недостающие rel_path и дописываем их новым сегментом.
         """
-        try:
-            with io.open(index_path, 'r', encoding='utf-8') as f:
-                index_content = f.read()
-        except Exception:
-            return
-
-        present: set = set()
-        for m in re.finditer(r"^ЗАГОЛОВОК:\s+(.+)$", index_content, flags=re.MULTILINE):
-            present.add(m.group(1).strip())
+        present = self._indexed_titles(index_path)
 
         all_files = self._collect_all_files(root_folder)
         groups = self._classify_files(all_files)
@@ -259,49 +300,37 @@ class Indexer:
             if missing:
                 self._append_files_to_group(index_path, group_name, missing)
 
+    def _indexed_titles(self, index_path: str) -> set:
+        """Заголовки (rel_path) записей индекса: по таблицам смещений, иначе по тексту."""
+        present: set = set()
+        for path in index_files(index_path):
+            reader = OffsetIndexReader.open(path)
+            if reader is not None:
+                with reader:
+                    present.update(title.strip() for title in reader.titles())
+                continue
+            try:
+                with io.open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.startswith('ЗАГОЛОВОК:'):
+                            present.add(line.split(':', 1)[1].strip())
+            except OSError:
+                continue
+        return present
+
     def _append_files_to_group(self, index_path: str, group_name: str, files: 'List[Tuple[str, str]]') -> None:
-        """Дозаписывает записи файлов в секцию группы, не удаляя существующее содержимое.
+        """Дописывает записи файлов группы новым сегментом, не трогая существующие.
 
         Args:
             index_path: путь к индексу
             group_name: fast/medium/slow
             files: список (rel_path, abs_path)
         """
-        begin_marker = f'<!-- BEGIN_{group_name.upper()} -->'
-        end_marker = f'<!-- END_{group_name.upper()} -->'
-
-        with io.open(index_path, 'r', encoding='utf-8') as f:
-            index_content = f.read()
-
-        start = index_content.find(begin_marker)
-        end = index_content.find(end_marker)
-        if start == -1 or end == -1 or end < start:
+        manifest = SegmentManifest.load(index_path)
+        if manifest is None:
             return
+        self._write_group_segment(manifest, group_name, files)
 
-        section_start = start + len(begin_marker)
-        current_section = index_content[section_start:end]
-
-        buf = io.StringIO()
-        for rel_path, abs_path in files:
-            text, meta = self._extract_text(abs_path, rel_path, rel_path)
-            self._write_entry(buf, rel_path=rel_path, text=text, meta=meta)
-        appendix = buf.getvalue()
-
-        new_section = f"\n{current_section.rstrip()}\n{appendix.rstrip()}\n"
-        new_content = index_content[:start] + begin_marker + new_section + index_content[end:]
-
-        # Обновим статус группы в заголовке (на случай, если ещё 'ожидание')
-        status_pattern = re.compile(
-            rf'(\[ГРУППА: {re.escape(group_name.upper())}\].*?Статус: )ожидание',
-            re.DOTALL
-        )
-        new_content = status_pattern.sub(lambda m: m.group(1) + '✅ завершено', new_content)
-
-        temp_index = index_path + '.tmp'
-        with io.open(temp_index, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        os.replace(temp_index, index_path)
-    
     def _create_index_classic(self, root_folder: str) -> str:
         """Классическая индексация (одним проходом) — для обратной совместимости."""
         index_path = os.path.join(root_folder, "_search_index.txt")
@@ -311,7 +340,7 @@ class Indexer:
         self._log.info("Индексация начата: root=%s -> %s", root_folder, index_path)
         
         # Подсчитываем общее количество файлов для прогресса
-        all_files = list(self._collect_all_files(root_folder))
+        all_files = self._collect_all_files(root_folder)
         total_files = len(all_files)
         processed_files = 0
         
@@ -332,8 +361,9 @@ class Indexer:
             })
             
             # Write to temporary file first for atomic replacement
-            with io.open(temp_path, "w", encoding="utf-8") as out:
-                for rel_path, abs_path, source in self._iter_sources(root_folder):
+            offsets = OffsetTableWriter()
+            with io.open(temp_path, "w", encoding="utf-8", newline="\n") as out:
+                for rel_path, abs_path, source, text, meta in self._extract_many(self._iter_sources(root_folder, all_files)):
                     # Обновляем статус для текущего файла
                     ext = rel_path.rsplit(".", 1)[-1].upper() if "." in rel_path else "UNKNOWN"
                     is_pdf = ext == "PDF"
@@ -348,13 +378,15 @@ class Indexer:
                         'updated_at': datetime.now().isoformat()
                     })
                     
-                    text, meta = self._extract_text(abs_path, rel_path, source)
-                    self._write_entry(out, rel_path=source, text=text, meta=meta)
+                    self._write_entry(out, rel_path=source, text=text, meta=meta, offsets=offsets)
                     processed_files += 1
             
             # Atomically replace old index with new one
             if os.path.exists(temp_path):
                 os.replace(temp_path, index_path)
+                self._write_offset_table(index_path, offsets)
+                # Сегменты прежней групповой индексации больше не актуальны
+                SegmentManifest.remove(index_path)
                 self._log.info("Индексация завершена: %s", index_path)
             else:
                 self._log.error("Временный файл индекса не создан: %s", temp_path)
@@ -393,49 +425,32 @@ class Indexer:
         finally:
             self._cleanup_temp_paths()
 
-    def _iter_sources(self, root_folder: str) -> Iterable[Tuple[str, str, str]]:
+    def _iter_sources(self, root_folder: str, files: Optional[Iterable[FileInfo]] = None) -> Iterable[Tuple[str, str, str]]:
         """Iterate over sources, sorted by processing complexity (fast → slow).
         
         Processing order:
         1. TXT, CSV, HTML (instant)
         2. DOCX, XLSX, vector PDFs (fast)
         3. PDF scans with OCR, ZIP, RAR (slow)
-        """
-        # Collect all files first for sorting
-        all_files = []
         
-        # Walk directories recursively
-        for dirpath, dirnames, filenames in os.walk(root_folder):
-            # Optionally limit depth
-            rel_dir = os.path.relpath(dirpath, root_folder)
-            depth = 0 if rel_dir == "." else rel_dir.count(os.sep) + 1
-            if depth > self.max_depth:
-                continue
-            for name in filenames:
-                # Пропускаем временные файлы Office (обычно начинаются с ~$ или $)
-                if name.startswith("~$") or name.startswith("$"):
-                    continue
-                # Пропускаем сам сводный индекс
-                if name == "_search_index.txt":
-                    continue
-                ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
-                if ext in SUPPORTED_EXT:
-                    abs_path = os.path.join(dirpath, name)
-                    rel_path = os.path.normpath(os.path.join(rel_dir, name)) if rel_dir != "." else name
-                    all_files.append((ext, name, abs_path, rel_path))
+        Args:
+            files: результат _collect_all_files (по умолчанию обнаруживаются здесь же)
+        """
+        if files is None:
+            files = self._collect_all_files(root_folder)
         
         # Sort files by processing priority
-        all_files.sort(key=self._file_sort_key)
+        all_files = sorted(files, key=self._file_sort_key)
         
         # Yield files in sorted order
-        for ext, name, abs_path, rel_path in all_files:
-            if ext in {"zip", "rar"}:
-                for v_rel, v_abs, v_source in self._iter_archive(abs_path, rel_path, ext, current_depth=0):
+        for info in all_files:
+            if info.ext in {"zip", "rar"}:
+                for v_rel, v_abs, v_source in self._iter_archive(info.abs_path, info.rel_path, info.ext, current_depth=0):
                     yield v_rel, v_abs, v_source
             else:
-                yield rel_path, abs_path, rel_path
+                yield info.rel_path, info.abs_path, info.rel_path
     
-    def _file_sort_key(self, file_info: Tuple[str, str, str, str]) -> Tuple[int, int, str]:
+    def _file_sort_key(self, info: FileInfo) -> Tuple[int, int, str]:
         """Compute sort key for file: (priority, size_category, name).
         
         Priority groups:
@@ -446,7 +461,7 @@ class Indexer:
         
         Size categories: 0=small (<1MB), 1=medium (1-10MB), 2=large (>10MB)
         """
-        ext, name, abs_path, rel_path = file_info
+        ext = info.ext
         
         # Priority by extension
         if ext in {"txt", "csv", "tsv", "html", "htm", "xml", "json"}:
@@ -458,160 +473,157 @@ class Indexer:
         else:  # zip, rar
             priority = 3  # slow
         
-        # Size category (to process small files first within same priority)
-        try:
-            size = os.path.getsize(abs_path)
-            if size < 1_000_000:  # <1MB
-                size_cat = 0
-            elif size < 10_000_000:  # 1-10MB
-                size_cat = 1
-            else:  # >10MB
-                size_cat = 2
-        except Exception:
-            size_cat = 0  # default to small if can't get size
+        # Size category (to process small files first within same priority);
+        # размер получен при обнаружении, файл повторно не запрашивается
+        size = info.size
+        if size < 1_000_000:  # <1MB
+            size_cat = 0
+        elif size < 10_000_000:  # 1-10MB
+            size_cat = 1
+        else:  # >10MB
+            size_cat = 2
         
-        return (priority, size_cat, name.lower())
+        return (priority, size_cat, info.name.lower())
     
-    def _collect_all_files(self, root_folder: str) -> List[Tuple[str, str, str, str]]:
-        """Collect all files for counting (for progress tracking).
+    def _collect_all_files(self, root_folder: str) -> Tuple[FileInfo, ...]:
+        """Обнаруживает файлы для индексации одним проходом os.scandir.
         
-        Returns list of (ext, name, abs_path, rel_path) tuples.
+        Возвращает неизменяемый список FileInfo (путь, размер, mtime, расширение);
+        для файлов, не изменившихся с прошлого запуска, kind берётся из кэша
+        обнаружения рядом с индексом.
         """
-        all_files = []
-        
-        for dirpath, dirnames, filenames in os.walk(root_folder):
-            rel_dir = os.path.relpath(dirpath, root_folder)
-            depth = 0 if rel_dir == "." else rel_dir.count(os.sep) + 1
-            if depth > self.max_depth:
-                continue
-            
-            for name in filenames:
-                if name.startswith("~$") or name.startswith("$"):
-                    continue
-                if name == "_search_index.txt":
-                    continue
-                    
-                ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
-                if ext in SUPPORTED_EXT:
-                    abs_path = os.path.join(dirpath, name)
-                    rel_path = os.path.normpath(os.path.join(rel_dir, name)) if rel_dir != "." else name
-                    all_files.append((ext, name, abs_path, rel_path))
+        index_path = os.path.join(root_folder, "_search_index.txt")
+        cache = FileCache.load(index_path)
+        self._file_cache = cache
         
-        return all_files
+        files = tuple(
+            info._replace(kind=cache.kind(info))
+            for info in scan_files(root_folder, self.max_depth, SUPPORTED_EXT,
+                                   skip_names=INDEX_FILE_NAMES, skip_dirs={SEGMENTS_DIR_NAME})
+        )
+        self._save_file_cache(files)
+        return files
+    
+    def _save_file_cache(self, files: Iterable[FileInfo]) -> None:
+        """Сохраняет кэш обнаружения (best-effort)."""
+        try:
+            self._file_cache.update(files)
+            self._file_cache.save()
+        except Exception as e:
+            self._log.debug("Не удалось сохранить кэш обнаружения файлов: %s", e)
     
-    def _create_index_skeleton(self, index_path: str, groups: dict) -> None:
-        """Создаёт индекс с заголовками групп (резервация мест).
+    def _create_manifest(self, index_path: str, groups: dict) -> SegmentManifest:
+        """Начинает сегментный индекс: пустой манифест с группами (резервация мест).
+
+        Прежний индекс (одним файлом или сегментами) удаляется.
         
         Args:
             index_path: Путь к индексному файлу
             groups: Словарь групп {'fast': [...], 'medium': [...], 'slow': [...]}
         """
-        group_labels = {
-            'fast': 'TXT, CSV, HTML',
-            'medium': 'DOCX, XLSX, векторные PDF',
-            'slow': 'PDF-сканы с OCR'
-        }
-        
-        temp_path = index_path + '.tmp'
+        SegmentManifest.remove(index_path)
+        for path in (index_path, offsets_path(index_path)):
+            if os.path.exists(path):
+                os.remove(path)
+        os.makedirs(segments_dir(index_path), exist_ok=True)
         
-        with io.open(temp_path, 'w', encoding='utf-8') as f:
-            for group_name in ['fast', 'medium', 'slow']:
-                f.write('\n')
-                f.write('═' * 80 + '\n')
-                f.write(f'[ГРУППА: {group_name.upper()}] {group_labels[group_name]}\n')
-                f.write(f'Файлов: {len(groups[group_name])} | Статус: ожидание\n')
-                f.write('═' * 80 + '\n')
-                f.write(f'<!-- BEGIN_{group_name.upper()} -->\n')
-                f.write(f'<!-- END_{group_name.upper()} -->\n')
-                f.write('\n')
-        
-        os.replace(temp_path, index_path)
+        manifest = SegmentManifest(index_path, groups={
+            group_name: {'label': GROUP_LABELS[group_name], 'files': len(groups[group_name]), 'status': 'pending'}
+            for group_name in ['fast', 'medium', 'slow']
+        })
+        manifest.save()
+        return manifest
     
-    def _process_group(self, files: List[Tuple[str, str]], temp_file: str, group_name: str) -> None:
-        """Обрабатывает группу файлов и записывает во временный файл.
-        
-        Args:
-            files: список кортежей (rel_path, abs_path)
-            temp_file: путь к временному файлу для записи
-            group_name: имя группы (fast/medium/slow)
-        """
-        os.makedirs(os.path.dirname(temp_file), exist_ok=True)
+    def _write_group_segment(self, manifest: SegmentManifest, group_name: str,
+                             files: List[Tuple[str, str]],
+                             extracted: Optional[Iterator[tuple]] = None) -> str:
+        """Обрабатывает файлы группы в новый сегмент и публикует его в манифесте.
         
-        with io.open(temp_file, 'w', encoding='utf-8') as out:
-            for rel_path, abs_path in files:
-                text, meta = self._extract_text(abs_path, rel_path, rel_path)
-                self._write_entry(out, rel_path=rel_path, text=text, meta=meta)
-    
-    def _insert_group_into_index(self, index_path: str, group_name: str, temp_file: str) -> None:
-        """Атомарно вставляет содержимое группы в главный индекс.
+        Сегмент начинается служебным заголовком группы (как секция прежнего
+        индекса) и пишется вместе с таблицей смещений; в манифест он попадает
+        только после записи, поэтому читатели не видят его недописанным.
         
         Args:
-            index_path: путь к главному индексу
+            manifest: манифест индекса
             group_name: имя группы (fast/medium/slow)
-            temp_file: путь к временному файлу с содержимым группы
-        """
-        # Читаем обработанные записи группы
-        with io.open(temp_file, 'r', encoding='utf-8') as f:
-            group_content = f.read()
-        
-        # Читаем главный индекс
-        with io.open(index_path, 'r', encoding='utf-8') as f:
-            index_content = f.read()
-        
-        # Заменяем секцию группы
-        begin_marker = f'<!-- BEGIN_{group_name.upper()} -->'
-        end_marker = f'<!-- END_{group_name.upper()} -->'
-        
-        pattern = re.compile(
-            re.escape(begin_marker) + r'.*?' + re.escape(end_marker),
-            re.DOTALL
-        )
+            files: список кортежей (rel_path, abs_path)
+            extracted: результаты _extract_many, первые len(files) из которых
+                относятся к files (по умолчанию файлы извлекаются здесь же)
         
-        # Используем lambda для избежания интерпретации обратных ссылок в содержимом
-        replacement_text = f'{begin_marker}\n{group_content}\n{end_marker}'
-        new_content = pattern.sub(lambda m: replacement_text, index_content)
+        Returns:
+            путь к сегменту
+        """
+        name = manifest.next_segment_name(group_name)
+        path = manifest.segment_path(name)
+        temp_path = path + '.tmp'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
         
-        # Обновляем статус группы в заголовке
-        # Используем функцию для безопасной замены
-        status_pattern = re.compile(
-            rf'(\[ГРУППА: {re.escape(group_name.upper())}\].*?Статус: )ожидание',
-            re.DOTALL
+        header = (
+            '\n'
+            + '═' * 80 + '\n'
+            + f'[ГРУППА: {group_name.upper()}] {GROUP_LABELS[group_name]}\n'
+            + f'Файлов: {len(files)} | Статус: ✅ завершено\n'
+            + '═' * 80 + '\n'
+            + f'<!-- BEGIN_{group_name.upper()} -->\n'
         )
-        new_content = status_pattern.sub(lambda m: m.group(1) + '✅ завершено', new_content)
+        offsets = OffsetTableWriter(len(header.encode('utf-8')))
+        with io.open(temp_path, 'w', encoding='utf-8', newline='\n') as out:
+            out.write(header)
+            if extracted is None:
+                extracted = self._extract_many((rel_path, abs_path, rel_path) for rel_path, abs_path in files)
+            for rel_path, _, _, text, meta in itertools.islice(extracted, len(files)):
+                self._write_entry(out, rel_path=rel_path, text=text, meta=meta, offsets=offsets)
+            out.write(f'<!-- END_{group_name.upper()} -->\n\n')
+        os.replace(temp_path, path)
+        self._write_offset_table(path, offsets)
         
-        # Атомарная запись
-        temp_index = index_path + '.tmp'
-        with io.open(temp_index, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        
-        os.replace(temp_index, index_path)
+        manifest.add_segment(name, group_name, len(files))
+        manifest.groups.setdefault(group_name, {})['status'] = 'completed'
+        manifest.save()
+        return path
 
-    def _update_status(self, status_path: str, status_data: dict) -> None:
+    def _update_status(self, status_path: str, status_data: dict, force: bool = False) -> None:
         """Update indexing status JSON file.
         
+        Статус накапливается в памяти, а файл переписывается не чаще раза в
+        status_interval секунд: прогресс по каждому файлу не превращается в
+        запись status.json на каждый файл. Смена поля 'status' и вызовы
+        с force=True пишутся сразу.
+        
         Args:
             status_path: Path to status.json
             status_data: Status data to merge with existing status
+            force: записать файл независимо от интервала
         """
         try:
-            # Read existing status if present
-            existing = {}
-            if os.path.exists(status_path):
-                try:
-                    with open(status_path, 'r', encoding='utf-8') as f:
-                        existing = json.load(f)
-                except Exception:
-                    pass  # ignore errors reading old status
+            cached = self._status.get(status_path)
+            if cached is None:
+                # Read existing status once per indexing run
+                existing = {}
+                if os.path.exists(status_path):
+                    try:
+                        with open(status_path, 'r', encoding='utf-8') as f:
+                            existing = json.load(f)
+                    except Exception:
+                        pass  # ignore errors reading old status
+                cached = self._status[status_path] = [existing, None]
             
+            existing, written_at = cached
+            status_changed = 'status' in status_data and status_data['status'] != existing.get('status')
             # Merge with new data
             existing.update(status_data)
             
+            now = time.monotonic()
+            if not (force or status_changed or written_at is None or now - written_at >= self.status_interval):
+                return
+            
             # Write atomically
             temp_status = status_path + '.tmp'
             with open(temp_status, 'w', encoding='utf-8') as f:
                 json.dump(existing, f, ensure_ascii=False, indent=2)
             
             os.replace(temp_status, status_path)
+            cached[1] = now
         except Exception as e:
             self._log.debug("Не удалось обновить статус индексации: %s", e)
 
@@ -714,6 +726,23 @@ class Indexer:
                 pass
         self._temp_paths.clear()
 
+    def _extract_many(self, items: Iterable[Tuple[str, str, str]]) -> Iterator[tuple]:
+        """Извлекает текст файлов (rel_path, abs_path, source) в порядке подачи.
+
+        При workers > 1 — пулом процессов с тайм-аутом на файл (см. parallel.py),
+        иначе последовательно в текущем процессе.
+
+        Yields:
+            (rel_path, abs_path, source, text, meta)
+        """
+        if self.workers <= 1:
+            for rel_path, abs_path, source in items:
+                text, meta = self._extract_text(abs_path, rel_path, source)
+                yield rel_path, abs_path, source, text, meta
+            return
+        options = {'max_depth': self.max_depth, 'archive_depth': self.archive_depth}
+        yield from ParallelExtractor(self.workers, self.file_timeout, options).map(items)
+
     def _extract_text(self, abs_path: str, rel_path: str, source: str):
         ext = rel_path.rsplit(".", 1)[-1].lower() if "." in rel_path else ""
         text = ""
@@ -779,26 +808,55 @@ class Indexer:
         }
         return text, meta
 
-    def _write_entry(self, out, rel_path: str, text: str, meta: dict):
+    def _write_entry(self, out, rel_path: str, text: str, meta: dict, offsets: OffsetTableWriter = None):
+        """Пишет запись документа в индекс.
+
+        Args:
+            out: текстовый поток индекса (newline='\\n', чтобы байтовые смещения совпадали)
+            offsets: таблица смещений (_search_index.offsets), в которую добавляется запись
+        """
         # Дополнительная защита: не пишем запись для самого индексного файла
         if os.path.basename(rel_path) == "_search_index.txt":
             return
-        out.write(f"{HEADER_BAR}\n")
-        out.write(f"ЗАГОЛОВОК: {rel_path}\n")
-        out.write(
-            "Формат: {fmt} | Символов: {length} | Дата: {date} | OCR: {ocr} | Качество: {quality}%\n".format(
-                fmt=meta.get("format", ""),
-                length=meta.get("length", 0),
-                date=meta.get("date", ""),
-                ocr="да" if meta.get("ocr") else "нет",
-                quality=meta.get("quality", 0),
-            )
+        meta_line = "Формат: {fmt} | Символов: {length} | Дата: {date} | OCR: {ocr} | Качество: {quality}%\n".format(
+            fmt=meta.get("format", ""),
+            length=meta.get("length", 0),
+            date=meta.get("date", ""),
+            ocr="да" if meta.get("ocr") else "нет",
+            quality=meta.get("quality", 0),
+        )
+        header = (
+            f"{HEADER_BAR}\n"
+            f"ЗАГОЛОВОК: {rel_path}\n"
+            + meta_line
+            + f"Источник: {meta.get('source','filesystem')}\n"
+            + f"{HEADER_BAR}\n"
         )
-        out.write(f"Источник: {meta.get('source','filesystem')}\n")
-        out.write(f"{HEADER_BAR}\n")
-        out.write(f"{DOC_START_MARKER}\n")
-        out.write((text or "").strip() + "\n")
-        out.write(f"{DOC_END_MARKER}\n\n")
+        prefix = f"{DOC_START_MARKER}\n"
+        body = (text or "").strip()
+        suffix = f"\n{DOC_END_MARKER}\n\n"
+        out.write(header + prefix + body + suffix)
+        if offsets is not None:
+            offsets.append_entry(
+                header, prefix, body, suffix,
+                title=rel_path.strip(),
+                fmt=str(meta.get("format", "")).split("|", 1)[0].strip(),
+                source=str(meta.get('source', 'filesystem')).strip(),
+            )
+
+    def _write_offset_table(self, index_path: str, offsets: OffsetTableWriter = None) -> None:
+        """Обновляет _search_index.offsets после замены индекса (best-effort).
+
+        Без накопленной таблицы она строится проходом по готовому индексу.
+        Устаревшая таблица читателями не используется, поэтому ошибка не критична.
+        """
+        try:
+            if offsets is not None:
+                offsets.write(index_path)
+            else:
+                build_offset_table(index_path)
+        except Exception as e:
+            self._log.warning("Не удалось записать таблицу смещений индекса: %s", e)
 
     # ---------- Helpers ----------
     def _read_text_with_encoding(self, path: str) -> str:
@@ -860,35 +918,25 @@ class Indexer:
         return int(min(100, max(0, ratio * 100)))
 
     def _ocr_pdf_pages(self, path: str, max_pages: int = 3) -> str:
-        """Best-effort OCR: конвертирует первые N страниц в изображения и распознаёт текст.
-        Требует системные зависимости (poppler для pdf2image и tesseract для OCR)."""
+        """Best-effort OCR: растеризует и распознаёт только первые N страниц (параллельно).
+        Требует системные зависимости (tesseract и PyMuPDF либо poppler для pdf2image)."""
         if max_pages <= 0:
             return ""
         try:
-            from pdf2image import convert_from_path  # type: ignore
-            import pytesseract  # type: ignore
-            from PIL import Image  # type: ignore  # noqa: F401
+            from ..ocr.engine import OcrEngine, OCR_AVAILABLE
         except Exception:
+            OCR_AVAILABLE = False
+        if not OCR_AVAILABLE:
             # Зависимости не установлены — спокойно пропускаем
-            self._log.debug("OCR пропущен: отсутствуют зависимости pdf2image/pytesseract/Pillow")
+            self._log.debug("OCR пропущен: отсутствуют зависимости pytesseract/PyMuPDF/pdf2image")
             return ""
         try:
-            images = convert_from_path(path)
+            result = OcrEngine().ocr_pdf(path, max_pages=max_pages, lang="rus+eng",
+                                         budget_seconds=30.0 * max_pages)
         except Exception:
-            # Возможно, отсутствует poppler (pdftoppm/pdftocairo)
-            self._log.debug("OCR пропущен: не удалось конвертировать PDF в изображения (вероятно, нет poppler)")
-            return ""
-        if not images:
+            self._log.debug("OCR пропущен: не удалось растеризовать PDF", exc_info=True)
             return ""
-        texts: List[str] = []
-        for img in images[:max_pages]:
-            try:
-                t = pytesseract.image_to_string(img, lang="rus+eng")
-                if t and t.strip():
-                    texts.append(t)
-            except Exception:
-                continue
-        return "\n".join(texts).strip()
+        return result['text'].strip()
 
     def _extract_docx(self, path: str) -> str:
         try:
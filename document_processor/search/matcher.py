@@ -0,0 +1,160 @@
+"""
+Поиск всех терминов запроса по тексту: счётчики, позиции и первое вхождение.
+
+Раньше сниппеты, счётчики и legacy Searcher искали каждый термин отдельным
+str.find / re.finditer с нормализацией текста на каждый термин. TermMatcher
+строится один раз на запрос (см. TermMatcher.for_terms), нормализует текст
+один раз и ищет на уровне C: каждый термин — str.find/str.count (быстрый
+поиск подстроки CPython), а большой набор терминов при установленном
+pyahocorasick — одним проходом его автомата. Альтернатива терминов в re
+оказалась медленнее поиска по каждому термину: re не строит по ней автомат.
+
+Сравнение без учёта регистра (casefold) и без различия ё/е. Нормализация
+посимвольная: позиции совпадений — это позиции в исходном тексте.
+"""
+from __future__ import annotations
+
+import heapq
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import ahocorasick  # type: ignore
+except ImportError:  # pragma: no cover
+    ahocorasick = None  # type: ignore
+
+Match = Tuple[int, int, str]
+
+# До стольких различных терминов каждый ищется отдельно через str.find/str.count
+SMALL_TERM_SET = 16
+
+
+def normalize(text: str) -> str:
+    """casefold + ё→е с сохранением длины (символ, который casefold удлиняет, остаётся как есть)."""
+    folded = text.casefold()
+    if len(folded) != len(text):
+        folded = ''.join(ch if len(ch.casefold()) != 1 else ch.casefold() for ch in text)
+    # casefold уже перевёл Ё в ё; str.replace на порядок быстрее str.translate
+    return folded.replace('ё', 'е')
+
+
+class TermMatcher:
+    """Поиск набора терминов без учёта регистра и ё/е."""
+
+    def __init__(self, terms: Iterable[str]):
+        """
+        Args:
+            terms: Термины запроса; пустые пропускаются, термины с одинаковой
+                нормализованной формой находятся вместе (каждый получает совпадение)
+        """
+        self.terms: List[str] = []
+        patterns: Dict[str, List[str]] = {}
+        for term in terms:
+            if not term or term in self.terms:
+                continue
+            key = normalize(term)
+            if not key:
+                continue
+            self.terms.append(term)
+            patterns.setdefault(key, []).append(term)
+        self._patterns: Dict[str, Tuple[str, ...]] = {p: tuple(o) for p, o in patterns.items()}
+        # Длинные шаблоны первыми: в позиции находится самое длинное совпадение
+        self._by_length = sorted(self._patterns, key=len, reverse=True)
+        self._automaton: Optional[Any] = None
+        if ahocorasick is not None and len(self._patterns) > SMALL_TERM_SET:
+            self._automaton = ahocorasick.Automaton()
+            for pattern in self._patterns:
+                self._automaton.add_word(pattern, pattern)
+            self._automaton.make_automaton()
+
+    @classmethod
+    def for_terms(cls, terms: Iterable[str]) -> 'TermMatcher':
+        """Матчер для набора терминов (кэшируется: сниппеты одного запроса строят его один раз)."""
+        return _cached_matcher(tuple(terms))
+
+    def _scan(self, folded: str) -> Iterator[Tuple[int, str]]:
+        """
+        (start, шаблон) вхождений по возрастанию start.
+
+        Вхождения одного шаблона не перекрываются (как у str.count), разных — могут.
+        """
+        if self._automaton is None:
+            def occurrences(pattern: str) -> Iterator[Tuple[int, str]]:
+                pos = folded.find(pattern)
+                while pos >= 0:
+                    yield pos, pattern
+                    pos = folded.find(pattern, pos + len(pattern))
+            yield from heapq.merge(*(occurrences(p) for p in self._patterns))
+            return
+        # Автомат отдаёт все вхождения (с перекрытиями) по возрастанию конца
+        found = sorted((end - len(pattern) + 1, pattern) for end, pattern in self._automaton.iter(folded))
+        last_end: Dict[str, int] = {}
+        for pos, pattern in found:
+            if pos >= last_end.get(pattern, 0):
+                last_end[pattern] = pos + len(pattern)
+                yield pos, pattern
+
+    def finditer(self, text: str) -> Iterator[Match]:
+        """
+        Вхождения терминов (start, end, термин) по возрастанию start.
+
+        Вхождения одного термина не перекрываются (как str.count), вхождения
+        разных терминов — могут («договор» и «договора»).
+        """
+        if not text or not self.terms:
+            return
+        for start, pattern in self._scan(normalize(text)):
+            for term in self._patterns[pattern]:
+                yield start, start + len(pattern), term
+
+    def first(self, text: str) -> Optional[Match]:
+        """Самое раннее (по началу, при равенстве — самое длинное) вхождение любого термина или None."""
+        if not text or not self.terms:
+            return None
+        folded = normalize(text)
+        best: Optional[Match] = None
+        for pattern in self._by_length:
+            # Вхождение правее уже найденного не интересно: ограничиваем поиск
+            pos = folded.find(pattern, 0, best[0] + len(pattern) - 1 if best else len(folded))
+            if pos >= 0:
+                best = (pos, pos + len(pattern), self._patterns[pattern][0])
+        return best
+
+    def contains(self, text: str) -> bool:
+        """Есть ли в тексте хотя бы один термин."""
+        if not text or not self.terms:
+            return False
+        folded = normalize(text)
+        return any(pattern in folded for pattern in self._patterns)
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """Число вхождений каждого термина (термины без вхождений — 0)."""
+        result = {term: 0 for term in self.terms}
+        if not text or not self.terms:
+            return result
+        folded = normalize(text)
+        if self._automaton is None:
+            for pattern, originals in self._patterns.items():
+                count = folded.count(pattern)
+                for term in originals:
+                    result[term] = count
+            return result
+        for _, pattern in self._scan(folded):
+            for term in self._patterns[pattern]:
+                result[term] += 1
+        return result
+
+    def positions(self, text: str) -> Dict[str, List[int]]:
+        """Позиции начала вхождений каждого термина, по возрастанию."""
+        result: Dict[str, List[int]] = {term: [] for term in self.terms}
+        for start, _, term in self.finditer(text):
+            result[term].append(start)
+        return result
+
+
+@lru_cache(maxsize=128)
+def _cached_matcher(terms: Tuple[str, ...]) -> TermMatcher:
+    return TermMatcher(terms)
+
+
+__all__ = ['TermMatcher', 'normalize']
@@ -0,0 +1,281 @@
+"""
+Таблица смещений для сводного индекса _search_index.txt.
+
+Searcher и Extractor раньше читали весь индекс в одну строку и разбирали его
+целиком при каждом вызове: на индексе в несколько гигабайт это секунды разбора
+и гигабайты памяти на один поиск. Рядом с индексом хранится бинарный файл
+_search_index.offsets: для каждой записи — байтовые диапазоны записи, её тела и
+текста документа (между маркерами) и поля заголовка. Читатель отображает индекс
+в память (mmap) и декодирует записи по одной, не строя список всех записей.
+
+Таблицу пишет Indexer._write_entry по мере записи индекса или сегмента группы
+(см. segments.py); для файла без накопленной таблицы она строится одним
+потоковым проходом по готовому файлу (build_offset_table). Таблица считается
+устаревшей, если размер или время изменения индекса не совпадают с записанными,
+— тогда вызывающий код возвращается к полному разбору.
+
+Формат (little-endian):
+    заголовок  <8sQQI: магия, размер индекса, st_mtime_ns индекса, число записей
+    записи     <QQQQQIIIIII: entry_start, body_start, body_end, text_start, text_end,
+               смещение/длина заголовка, формата и источника в блоке строк
+    блок строк UTF-8
+"""
+from __future__ import annotations
+
+import io
+import mmap
+import os
+import re
+import struct
+from typing import Any, Dict, Iterator, List, Optional
+
+MAGIC = b'ZKOFFS01'
+_HEADER = struct.Struct('<8sQQI')
+_RECORD = struct.Struct('<QQQQQIIIIII')
+
+_BAR_RE = re.compile(rb'^=+\s*$')
+_DOC_START = '<<< НАЧАЛО ДОКУМЕНТА >>>'.encode('utf-8')
+_DOC_END = '<<< КОНЕЦ ДОКУМЕНТА >>>'.encode('utf-8')
+_TITLE = 'ЗАГОЛОВОК:'.encode('utf-8')
+_FORMAT = 'Формат:'.encode('utf-8')
+_SOURCE = 'Источник:'.encode('utf-8')
+_FORMAT_RE = re.compile(r'Формат:\s*([^|]+)')
+# Служебные строки групп в байтах (см. is_service_line)
+_SERVICE_PREFIXES = tuple(p.encode('utf-8') for p in ('═', '[ГРУППА:', '<!--'))
+_FILES = 'Файлов:'.encode('utf-8')
+_STATUS = 'Статус:'.encode('utf-8')
+
+
+def offsets_path(index_path: str) -> str:
+    """Путь таблицы смещений для индекса (_search_index.txt -> _search_index.offsets)."""
+    return os.path.splitext(index_path)[0] + '.offsets'
+
+
+def is_service_line(line: str) -> bool:
+    """Служебные строки групповой индексации (заголовки групп, маркеры секций)."""
+    return (line.startswith('═') or line.startswith('[ГРУППА:') or line.startswith('<!--')
+            or ('Файлов:' in line and 'Статус:' in line))
+
+
+class OffsetTableWriter:
+    """Накопитель записей таблицы; position — текущее смещение в индексе, байт."""
+
+    def __init__(self, position: int = 0):
+        self.position = position
+        self._records: List[tuple] = []
+        self._strings = io.BytesIO()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _string(self, value: str) -> tuple:
+        data = (value or '').encode('utf-8')
+        offset = self._strings.tell()
+        self._strings.write(data)
+        return offset, len(data)
+
+    def add(self, entry_start: int, body_start: int, body_end: int, text_start: int, text_end: int,
+            title: str, fmt: str, source: str) -> None:
+        """Добавить запись с уже известными смещениями."""
+        self._records.append(
+            (entry_start, body_start, body_end, text_start, text_end)
+            + self._string(title) + self._string(fmt) + self._string(source)
+        )
+
+    def append_entry(self, header: str, prefix: str, text: str, suffix: str,
+                     title: str, fmt: str, source: str) -> None:
+        """
+        Учесть запись, записанную в индекс как header + prefix + text + suffix.
+
+        Тело записи — prefix + text + suffix, текст документа — text.
+        """
+        entry_start = self.position
+        body_start = entry_start + len(header.encode('utf-8'))
+        text_start = body_start + len(prefix.encode('utf-8'))
+        text_end = text_start + len(text.encode('utf-8'))
+        body_end = text_end + len(suffix.encode('utf-8'))
+        self.add(entry_start, body_start, body_end, text_start, text_end, title, fmt, source)
+        self.position = body_end
+
+    def write(self, index_path: str, path: Optional[str] = None) -> str:
+        """Атомарно записать таблицу для текущего состояния файла индекса."""
+        path = path or offsets_path(index_path)
+        st = os.stat(index_path)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, st.st_size, st.st_mtime_ns, len(self._records)))
+            for record in self._records:
+                f.write(_RECORD.pack(*record))
+            f.write(self._strings.getvalue())
+        os.replace(temp_path, path)
+        return path
+
+
+def build_offset_table(index_path: str, path: Optional[str] = None) -> str:
+    """
+    Построить таблицу одним потоковым проходом по готовому индексу.
+
+    Границы записей те же, что у Searcher._parse_entries: запись начинается
+    строкой из '=', за ней необязательные ЗАГОЛОВОК/Формат/Источник и
+    закрывающая черта, тело — до следующей черты. Служебные строки групп
+    пропускаются.
+    """
+    writer = OffsetTableWriter()
+    current: Optional[Dict[str, Any]] = None
+
+    def finish(end: int) -> None:
+        if current is None:
+            return
+        body_start = current['body_start'] if current['body_start'] is not None else end
+        text_start = current['text_start'] if current['text_start'] is not None else 0
+        text_end = current['text_end'] if current['text_end'] is not None else text_start
+        writer.add(current['entry_start'], body_start, end, text_start, text_end,
+                   current['title'], current['format'], current['source'])
+
+    position = 0
+    with open(index_path, 'rb') as f:
+        for raw in f:
+            start, position = position, position + len(raw)
+            line = raw.rstrip(b'\r\n')
+            if line.startswith(_SERVICE_PREFIXES) or (_FILES in line and _STATUS in line):
+                continue
+            is_bar = line[:1] == b'=' and _BAR_RE.match(line) is not None
+            if current is not None and current['stage'] < 4:
+                stage = current['stage']
+                if stage <= 0 and line.startswith(_TITLE):
+                    current['title'] = line.decode('utf-8', errors='replace').split(':', 1)[1].strip()
+                    current['stage'] = 1
+                    continue
+                if stage <= 1 and line.startswith(_FORMAT):
+                    m = _FORMAT_RE.match(line.decode('utf-8', errors='replace'))
+                    current['format'] = m.group(1).strip() if m else ''
+                    current['stage'] = 2
+                    continue
+                if stage <= 2 and line.startswith(_SOURCE):
+                    current['source'] = line.decode('utf-8', errors='replace').split(':', 1)[1].strip()
+                    current['stage'] = 3
+                    continue
+                current['stage'] = 4
+                if is_bar:
+                    # Закрывающая черта заголовка
+                    current['body_start'] = position
+                    continue
+                current['body_start'] = start
+            if is_bar:
+                finish(start)
+                current = {'entry_start': start, 'stage': 0, 'title': '', 'format': '', 'source': '',
+                           'body_start': None, 'text_start': None, 'text_end': None}
+                continue
+            if current is None:
+                continue
+            if line == _DOC_START and current['text_start'] is None:
+                current['text_start'] = position
+            elif line == _DOC_END and current['text_start'] is not None and current['text_end'] is None:
+                current['text_end'] = start
+        finish(position)
+    return writer.write(index_path, path)
+
+
+class OffsetIndexReader:
+    """Чтение записей индекса по таблице смещений через mmap."""
+
+    def __init__(self, index_path: str, path: Optional[str] = None):
+        """
+        Raises:
+            ValueError: таблица повреждена или не соответствует индексу
+            OSError: нет файла индекса или таблицы
+        """
+        self.index_path = index_path
+        self._index_file = open(index_path, 'rb')
+        self._table_file = open(path or offsets_path(index_path), 'rb')
+        self._index = self._table = None
+        try:
+            self._table = mmap.mmap(self._table_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, size, mtime_ns, count = _HEADER.unpack_from(self._table, 0)
+            st = os.fstat(self._index_file.fileno())
+            if magic != MAGIC or size != st.st_size or mtime_ns != st.st_mtime_ns:
+                raise ValueError('Таблица смещений устарела')
+            self._count = count
+            self._strings = _HEADER.size + count * _RECORD.size
+            if len(self._table) < self._strings:
+                raise ValueError('Таблица смещений повреждена')
+            if size:
+                self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.close()
+            raise
+
+    @classmethod
+    def open(cls, index_path: str) -> Optional['OffsetIndexReader']:
+        """Читатель или None, если таблицы нет или она не соответствует индексу."""
+        if not os.path.isfile(offsets_path(index_path)):
+            return None
+        try:
+            return cls(index_path)
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def close(self) -> None:
+        for obj in (self._index, self._table, self._index_file, self._table_file):
+            if obj is not None:
+                obj.close()
+        self._index = self._table = None
+
+    def __enter__(self) -> 'OffsetIndexReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record(self, i: int) -> tuple:
+        return _RECORD.unpack_from(self._table, _HEADER.size + i * _RECORD.size)
+
+    def _str(self, offset: int, length: int) -> str:
+        start = self._strings + offset
+        return self._table[start:start + length].decode('utf-8', errors='replace')
+
+    def _slice(self, start: int, end: int) -> str:
+        if self._index is None or end <= start:
+            return ''
+        return self._index[start:end].decode('utf-8', errors='replace')
+
+    def _header(self, record: tuple) -> Dict[str, Any]:
+        title = self._str(record[5], record[6])
+        source = self._str(record[9], record[10])
+        return {'title': title, 'format': self._str(record[7], record[8]), 'source': source or title}
+
+    def entry(self, i: int) -> Dict[str, Any]:
+        """Запись i в формате Searcher._parse_entries: {title, format, source, body}."""
+        record = self._record(i)
+        entry = self._header(record)
+        lines = [ln for ln in self._slice(record[1], record[2]).splitlines() if not is_service_line(ln)]
+        while lines and not lines[-1].strip():
+            lines.pop()
+        entry['body'] = '\n'.join(lines)
+        return entry
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self._count):
+            yield self.entry(i)
+
+    def titles(self) -> Iterator[str]:
+        """Заголовки записей (без чтения тел из индекса)."""
+        for i in range(self._count):
+            record = self._record(i)
+            yield self._str(record[5], record[6])
+
+    def iter_documents(self) -> Iterator[Dict[str, Any]]:
+        """Записи с текстом документа между маркерами: {title, format, source, body}."""
+        for i in range(self._count):
+            record = self._record(i)
+            if record[4] <= record[3]:
+                continue
+            document = self._header(record)
+            document['body'] = self._slice(record[3], record[4]).strip()
+            yield document
+
+
+__all__ = ['OffsetIndexReader', 'OffsetTableWriter', 'build_offset_table', 'offsets_path', 'is_service_line']
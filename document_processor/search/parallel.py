@@ -0,0 +1,193 @@
+"""
+Параллельное извлечение текста файлов для Indexer.
+
+Извлечение (PDF, OCR, DOC через внешние утилиты) нагружает процессор и
+подпроцессы, а индексатор обрабатывал файлы строго по одному. ParallelExtractor
+отдаёт файлы в пул процессов с ограниченным окном опережения и возвращает
+результаты в порядке подачи — индекс получается тем же, что и при
+последовательной обработке. Файл, не обработанный за file_timeout секунд,
+попадает в индекс пустой записью с пометкой ошибки; зависший воркер при этом
+снимается вместе с пулом, остальные файлы из окна отправляются заново.
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (rel_path, abs_path, source)
+Item = Tuple[str, str, str]
+# (rel_path, abs_path, source, text, meta)
+Extracted = Tuple[str, str, str, str, Dict[str, Any]]
+
+DEFAULT_FILE_TIMEOUT = 120.0
+
+
+def default_workers() -> int:
+    """Размер пула индексации: INDEX_MAX_WORKERS (по умолчанию 1 — без пула)."""
+    try:
+        configured = int(os.environ.get('INDEX_MAX_WORKERS', '1'))
+    except ValueError:
+        configured = 1
+    return max(1, configured)
+
+
+def default_file_timeout() -> float:
+    """Тайм-аут извлечения одного файла в пуле: INDEX_FILE_TIMEOUT_SECONDS."""
+    try:
+        configured = float(os.environ.get('INDEX_FILE_TIMEOUT_SECONDS', DEFAULT_FILE_TIMEOUT))
+    except ValueError:
+        configured = DEFAULT_FILE_TIMEOUT
+    return configured if configured > 0 else DEFAULT_FILE_TIMEOUT
+
+
+def init_worker() -> None:
+    """Инициализация процесса пула: OCR страниц без собственного пула процессов.
+
+    Параллельность — только на уровне файлов: иначе каждый из N воркеров
+    поднимал бы свой пул OCR (до 8 процессов) и машина была бы перегружена.
+    """
+    os.environ['OCR_MAX_WORKERS'] = '1'
+
+
+def extract_file(options: Dict[str, Any], rel_path: str, abs_path: str, source: str) -> Tuple[str, Dict[str, Any]]:
+    """Извлечь текст файла в процессе пула (отдельный Indexer без своего пула)."""
+    from .indexer import Indexer
+
+    indexer = Indexer(**options, workers=1)
+    try:
+        return indexer._extract_text(abs_path, rel_path, source)
+    finally:
+        indexer._cleanup_temp_paths()
+
+
+def failed_meta(rel_path: str, abs_path: str, source: str, error: str) -> Dict[str, Any]:
+    """Метаданные пустой записи для файла, который не удалось обработать."""
+    ext = rel_path.rsplit(".", 1)[-1].lower() if "." in rel_path else ""
+    try:
+        date = datetime.fromtimestamp(os.path.getmtime(abs_path)).strftime("%Y-%m-%d %H:%M")
+    except OSError:
+        date = ""
+    return {
+        "format": ext.upper(),
+        "length": 0,
+        "date": date,
+        "ocr": False,
+        "quality": 0,
+        "source": source,
+        "error": error,
+    }
+
+
+class ParallelExtractor:
+    """Извлечение текста файлов пулом процессов с сохранением порядка."""
+
+    def __init__(
+        self,
+        workers: int,
+        file_timeout: float,
+        options: Optional[Dict[str, Any]] = None,
+        func: Callable[..., Tuple[str, Dict[str, Any]]] = extract_file
+    ):
+        """
+        Args:
+            workers: Размер пула процессов
+            file_timeout: Сколько ждать результат файла, когда он первый в очереди, сек
+            options: Параметры Indexer в воркере (max_depth, archive_depth)
+            func: Функция извлечения (options, rel_path, abs_path, source) -> (text, meta)
+        """
+        self.workers = max(1, workers)
+        self.file_timeout = file_timeout
+        self.options = options or {}
+        self.func = func
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def map(self, items: Iterable[Item]) -> Iterator[Extracted]:
+        """Результаты извлечения в порядке items; в обработке не больше 2 × workers файлов."""
+        source_iter = iter(items)
+        window = self.workers * 2
+        # Очередь файлов в обработке: {'item', 'future', 'isolated'}
+        queue: Deque[Dict[str, Any]] = deque()
+        self._pool = self._new_pool()
+        try:
+            self._fill(queue, source_iter, window)
+            while queue:
+                entry = queue[0]
+                rel_path, abs_path, source = entry['item']
+                try:
+                    text, meta = entry['future'].result(timeout=self.file_timeout)
+                except FutureTimeoutError:
+                    logger.warning("Тайм-аут извлечения (%.0f с): %s", self.file_timeout, rel_path)
+                    text, meta = '', failed_meta(rel_path, abs_path, source, 'timeout')
+                    # Зависший воркер отдельно не снять: перезапускаем пул
+                    self._restart(queue)
+                except BrokenProcessPool:
+                    # Воркер упал (память, сбой библиотеки), виновника не видно:
+                    # повторяем первый файл в новом пуле одним, остальные — после него
+                    self._restart(queue)
+                    if not entry['isolated']:
+                        entry['isolated'] = True
+                        entry['future'] = self._submit(entry['item'])
+                        continue
+                    logger.warning("Процесс извлечения аварийно завершился: %s", rel_path)
+                    text, meta = '', failed_meta(rel_path, abs_path, source, 'worker crashed')
+                except Exception as e:
+                    logger.exception("Ошибка извлечения текста: %s", rel_path)
+                    text, meta = '', failed_meta(rel_path, abs_path, source, f'{type(e).__name__}: {e}')
+                queue.popleft()
+                yield rel_path, abs_path, source, text, meta
+                for pending in queue:
+                    if pending['future'] is None:
+                        pending['future'] = self._submit(pending['item'])
+                self._fill(queue, source_iter, window)
+        finally:
+            self._terminate()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # spawn: веб-процесс многопоточный, fork из него небезопасен
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=init_worker
+        )
+
+    def _submit(self, item: Item):
+        rel_path, abs_path, source = item
+        return self._pool.submit(self.func, self.options, rel_path, abs_path, source)
+
+    def _fill(self, queue: Deque[Dict[str, Any]], source_iter: Iterator[Item], window: int) -> None:
+        while len(queue) < window:
+            item = next(source_iter, None)
+            if item is None:
+                return
+            queue.append({'item': item, 'future': self._submit(item), 'isolated': False})
+
+    def _restart(self, queue: Deque[Dict[str, Any]]) -> None:
+        """Пересоздать пул; незавершённые файлы очереди будут отправлены заново."""
+        self._terminate()
+        self._pool = self._new_pool()
+        for entry in queue:
+            future = entry['future']
+            if future is not None and (not future.done() or future.cancelled() or future.exception() is not None):
+                entry['future'] = None
+
+    def _terminate(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        # У ProcessPoolExecutor нет публичного terminate: снимаем процессы сами,
+        # иначе shutdown ждал бы зависшее извлечение
+        for process in list((getattr(pool, '_processes', None) or {}).values()):
+            try:
+                process.terminate()
+            except Exception:
+                pass
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+__all__ = ['ParallelExtractor', 'default_workers', 'default_file_timeout', 'extract_file', 'failed_meta', 'init_worker']
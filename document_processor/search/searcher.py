@@ -1,9 +1,12 @@
 from __future__ import annotations
 import io
-import os
 import re
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
+
+from .matcher import TermMatcher
+from .offset_index import OffsetIndexReader, is_service_line
+from .segments import index_exists, index_files
 
 HEADER_BAR_RE = re.compile(r"^=+\s*$")
 HEADER_PREFIXES = (
@@ -14,13 +17,15 @@ HEADER_PREFIXES = (
 
 class Searcher:
     def search(self, index_path: str, keywords: List[str], *, context: int = 80, exclude_mode: bool = False) -> List[Dict]:
-        if not os.path.isfile(index_path):
+        if not index_exists(index_path):
             raise FileNotFoundError(index_path)
         log = logging.getLogger(__name__)
         log.info("Поиск по индексу: %s, terms=%s, context=%d, exclude_mode=%s", index_path, keywords, context, exclude_mode)
-        text = self._read_index(index_path)
-        entries = self._parse_entries(text)
+        entries = self._iter_entries(index_path)
         results: List[Dict[str, Any]] = []
+        terms = list(dict.fromkeys(k.strip() for k in keywords if k and k.strip()))
+        # Все термины ищутся одним проходом по тексту записи (без учёта регистра и ё/е)
+        matcher = TermMatcher(terms)
         
         # Разделители, которые иногда встречаются внутри слов при извлечении из PDF
         # \u00A0 (NBSP), \u00AD (soft hyphen), \u200B (zero-width space), \uFEFF (BOM/ZWNBSP)
@@ -28,24 +33,19 @@ class Searcher:
         
         if exclude_mode:
             # Режим исключения: возвращаем файлы, которые НЕ содержат ни одного из ключевых слов
+            # Толерантные шаблоны для коротких терминов компилируются один раз на запрос
+            tolerant_patterns = []
+            for kw in terms:
+                if 2 <= len(kw) <= 8:
+                    parts = [re.escape(ch) for ch in kw]
+                    tolerant_patterns.append(
+                        re.compile("".join([parts[0]] + [gap_class + p for p in parts[1:]]), re.IGNORECASE)
+                    )
+            
             for entry in entries:
                 body = entry.get("body", "")
-                contains_keyword = False
-                
-                for kw in [k.strip() for k in keywords if k and k.strip()]:
-                    if not kw:
-                        continue
-                    # Проверяем прямое совпадение
-                    if re.search(re.escape(kw), body, flags=re.IGNORECASE):
-                        contains_keyword = True
-                        break
-                    # Проверяем толерантное совпадение для коротких терминов
-                    if 2 <= len(kw) <= 8:
-                        parts = [re.escape(ch) for ch in kw]
-                        pattern = re.compile("".join([parts[0]] + [gap_class + p for p in parts[1:]]), re.IGNORECASE)
-                        if pattern.search(body):
-                            contains_keyword = True
-                            break
+                # Прямое совпадение любого термина, затем толерантное
+                contains_keyword = matcher.contains(body) or any(p.search(body) for p in tolerant_patterns)
                 
                 # Если файл НЕ содержит ни одного ключевого слова - добавляем его в результаты
                 if not contains_keyword:
@@ -63,42 +63,39 @@ class Searcher:
 
         else:
             # Обычный режим: ищем файлы, которые СОДЕРЖАТ ключевые слова
-            # ИСПРАВЛЕНО: используем дедупликацию позиций для устранения задваивания
+            # Толерантное совпадение: допускаем ТОЛЬКО один пробел или дефис между буквами.
+            # Применяем только для терминов длиной 3-8 символов (не для коротких 2-буквенных!),
+            # шаблоны компилируются один раз на запрос
+            limited_gap = r'[\s\-\u00A0]?'
+            tolerant_patterns = {}
+            for kw in terms:
+                if 3 <= len(kw) <= 8:
+                    parts = [re.escape(ch) for ch in kw]
+                    tolerant_patterns[kw] = re.compile(
+                        "".join([parts[0]] + [limited_gap + p for p in parts[1:]]), re.IGNORECASE
+                    )
+            
             for entry in entries:
                 body = entry.get("body", "")
-                for kw in [k.strip() for k in keywords if k and k.strip()]:
-                    if not kw:
-                        continue
-                    
-                    # Собираем все найденные позиции для дедупликации
-                    found_matches = []  # Список (позиция, matched_text)
-                    
-                    # 1) Прямое подстрочное совпадение (точное)
-                    for m in re.finditer(re.escape(kw), body, flags=re.IGNORECASE):
-                        found_matches.append((m.start(), m.group()))
-                    
-                    # 2) Толерантное совпадение: допускаем ТОЛЬКО один пробел или дефис между буквами
-                    # Применяем только для терминов длиной 3-8 символов (не для коротких 2-буквенных!)
-                    # Ограничиваем максимальную длину совпадения, чтобы не находить слишком далёкие фрагменты
-                    if 3 <= len(kw) <= 8:
-                        # Построим шаблон: каждая буква + максимум 1 пробел/дефис
-                        # Ограничиваем общую длину совпадения: не более len(kw) * 2
-                        parts = [re.escape(ch) for ch in kw]
-                        # gap_class теперь ограничен: максимум 1 символ из пробела, дефиса или NBSP
-                        limited_gap = r'[\s\-\u00A0]?'
-                        pattern_str = "".join([parts[0]] + [limited_gap + p for p in parts[1:]])
-                        pattern = re.compile(pattern_str, re.IGNORECASE)
-                        
-                        for m in pattern.finditer(body):
-                            matched_text = m.group()
-                            # Дополнительная проверка: длина совпадения не должна превышать len(kw) * 2
-                            if len(matched_text) <= len(kw) * 2:
-                                # Проверяем, что это не дубликат уже найденного точного совпадения
-                                if m.start() not in [pos for pos, _ in found_matches]:
-                                    found_matches.append((m.start(), matched_text))
-                    
-                    # Добавляем результаты только для уникальных позиций
-                    for pos, matched_text in found_matches:
+                # Позиции для дедупликации: термин -> {позиция: найденный текст}
+                found_matches: Dict[str, Dict[int, str]] = {kw: {} for kw in terms}
+                
+                # 1) Прямое подстрочное совпадение (точное) — все термины за один проход
+                for start_pos, end_pos, kw in matcher.finditer(body):
+                    found_matches[kw][start_pos] = body[start_pos:end_pos]
+                
+                # 2) Толерантное совпадение
+                for kw, pattern in tolerant_patterns.items():
+                    for m in pattern.finditer(body):
+                        matched_text = m.group()
+                        # Длина совпадения не должна превышать len(kw) * 2,
+                        # позиция не должна дублировать уже найденное точное совпадение
+                        if len(matched_text) <= len(kw) * 2 and m.start() not in found_matches[kw]:
+                            found_matches[kw][m.start()] = matched_text
+                
+                # Добавляем результаты только для уникальных позиций
+                for kw in terms:
+                    for pos, matched_text in found_matches[kw].items():
                         start = max(0, pos - context)
                         end = min(len(body), pos + len(matched_text) + context)
                         snippet = body[start:end]
@@ -116,6 +113,19 @@ class Searcher:
         log.info("Поиск завершён: найдено %d совпадений", len(results))
         return results
 
+    def _iter_entries(self, index_path: str) -> Iterator[Dict[str, Any]]:
+        """Записи индекса по одной: по сегментам из манифеста групповой индексации
+        (или из самого файла индекса), каждый — через таблицу смещений и mmap,
+        если она актуальна, иначе полным разбором файла.
+        """
+        for path in index_files(index_path):
+            reader = OffsetIndexReader.open(path)
+            if reader is None:
+                yield from self._parse_entries(self._read_index(path))
+                continue
+            with reader:
+                yield from reader
+
     def _read_index(self, path: str) -> str:
         """Читает индекс, игнорируя служебные заголовки групп (increment-014).
         
@@ -126,16 +136,8 @@ class Searcher:
         with io.open(path, "r", encoding="utf-8") as f:
             lines = f.readlines()
         
-        # Фильтруем служебные строки
-        filtered_lines = []
-        for line in lines:
-            # Пропускаем заголовки групп
-            if line.startswith('═') or \
-               line.startswith('[ГРУППА:') or \
-               line.startswith('<!--') or \
-               ('Файлов:' in line and 'Статус:' in line):
-                continue
-            filtered_lines.append(line)
+        # Фильтруем служебные строки (заголовки групп)
+        filtered_lines = [line for line in lines if not is_service_line(line)]
         
         return ''.join(filtered_lines)
 
@@ -0,0 +1,119 @@
+"""
+Сегментный сводный индекс групповой индексации.
+
+Раньше Indexer после каждой группы (fast/medium/slow) и при доборе пропущенных
+файлов перечитывал весь _search_index.txt, заменял секцию группы регулярным
+выражением и переписывал файл целиком — время индексации росло квадратично от
+размера корпуса. Теперь каждая группа пишется в отдельный файл-сегмент (только
+дозапись), а манифест _search_index.manifest.json перечисляет готовые сегменты
+в порядке чтения. Сегмент появляется в манифесте только после того, как полностью
+записан, поэтому читатели видят уже обработанные группы во время индексации.
+
+Searcher и Extractor получают путь _search_index.txt как раньше и читают
+сегменты по манифесту (index_files); без манифеста читается сам файл индекса.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path(index_path: str) -> str:
+    """Путь манифеста (_search_index.txt -> _search_index.manifest.json)."""
+    return os.path.splitext(index_path)[0] + '.manifest.json'
+
+
+def segments_dir(index_path: str) -> str:
+    """Каталог сегментов (_search_index.txt -> _search_index.segments)."""
+    return os.path.splitext(index_path)[0] + '.segments'
+
+
+class SegmentManifest:
+    """Манифест сегментов: группы с числом файлов и статусом, сегменты в порядке чтения."""
+
+    def __init__(self, index_path: str, groups: Optional[Dict[str, Dict[str, Any]]] = None,
+                 segments: Optional[List[Dict[str, Any]]] = None):
+        self.index_path = index_path
+        self.groups: Dict[str, Dict[str, Any]] = groups or {}
+        self.segments: List[Dict[str, Any]] = segments or []
+
+    @classmethod
+    def load(cls, index_path: str) -> Optional['SegmentManifest']:
+        """Манифест индекса или None, если его нет или он повреждён."""
+        try:
+            with open(manifest_path(index_path), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get('version') != MANIFEST_VERSION:
+            return None
+        return cls(index_path, groups=data.get('groups') or {}, segments=data.get('segments') or [])
+
+    @staticmethod
+    def remove(index_path: str) -> None:
+        """Удалить манифест и сегменты (индекс снова читается из одного файла)."""
+        try:
+            os.remove(manifest_path(index_path))
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(segments_dir(index_path), ignore_errors=True)
+
+    def next_segment_name(self, group_name: str) -> str:
+        """Имя следующего сегмента группы: 0001_fast.txt, 0002_medium.txt, ..."""
+        return f'{len(self.segments) + 1:04d}_{group_name}.txt'
+
+    def segment_path(self, name: str) -> str:
+        return os.path.join(segments_dir(self.index_path), name)
+
+    def segment_paths(self) -> List[str]:
+        """Пути сегментов в порядке чтения."""
+        return [self.segment_path(seg['name']) for seg in self.segments]
+
+    def add_segment(self, name: str, group_name: str, files: int) -> Dict[str, Any]:
+        """Добавить записанный сегмент (вызывающий код сохраняет манифест)."""
+        path = self.segment_path(name)
+        segment = {
+            'name': name,
+            'group': group_name,
+            'files': files,
+            'size': os.path.getsize(path),
+            'created_at': datetime.now().isoformat(),
+        }
+        self.segments.append(segment)
+        return segment
+
+    def save(self) -> None:
+        """Атомарно записать манифест."""
+        path = manifest_path(self.index_path)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'groups': self.groups,
+                'segments': self.segments,
+                'updated_at': datetime.now().isoformat(),
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+
+
+def index_exists(index_path: str) -> bool:
+    """Есть ли индекс: одним файлом или манифестом сегментов."""
+    return os.path.isfile(index_path) or os.path.isfile(manifest_path(index_path))
+
+
+def index_files(index_path: str) -> List[str]:
+    """Файлы индекса в порядке чтения: сегменты по манифесту, иначе сам файл индекса."""
+    manifest = SegmentManifest.load(index_path)
+    if manifest is None:
+        return [index_path] if os.path.isfile(index_path) else []
+    return [path for path in manifest.segment_paths() if os.path.isfile(path)]
+
+
+__all__ = [
+    'SegmentManifest', 'index_exists', 'index_files', 'manifest_path', 'segments_dir',
+]
@@ -0,0 +1,121 @@
+"""
+Тесты кэша проверенных токенов (webapp/auth/token_cache.py) и auth middleware.
+
+БД не требуется: AuthService и сессии подменяются моками.
+"""
+import time
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from webapp.auth.jwt_manager import generate_token, hash_token
+from webapp.auth.token_cache import CachedUser, TokenCache
+from webapp.services.auth_service import AuthService
+
+
+def _user(user_id=1, role='user'):
+    return CachedUser(id=user_id, email=f'u{user_id}@example.com', role=role,
+                      first_name='Иван', last_name='Петров', created_at=datetime(2025, 1, 1))
+
+
+def test_entries_expire_after_ttl():
+    cache = TokenCache(ttl_seconds=0.05)
+    cache.put('h1', _user(), {'user_id': 1})
+    assert cache.get('h1').user.id == 1
+    time.sleep(0.06)
+    assert cache.get('h1') is None
+
+
+def test_ttl_is_capped_by_token_exp():
+    """Запись не переживает срок действия самого JWT."""
+    cache = TokenCache(ttl_seconds=3600)
+    cache.put('expired', _user(), {'exp': time.time() - 1})
+    cache.put('soon', _user(), {'exp': time.time() + 0.05})
+    assert cache.get('expired') is None
+    time.sleep(0.06)
+    assert cache.get('soon') is None
+
+
+def test_lru_eviction_and_user_invalidation():
+    cache = TokenCache(ttl_seconds=60, max_entries=2)
+    cache.put('a', _user(1), {})
+    cache.put('b', _user(2), {})
+    cache.get('a')
+    cache.put('c', _user(1), {})
+    assert cache.get('b') is None  # вытеснен как самый старый
+
+    cache.invalidate_user(1)
+    assert cache.get('a') is None and cache.get('c') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_apply_notification_payloads():
+    cache = TokenCache(ttl_seconds=60)
+    cache.put('t1', _user(1), {})
+    cache.put('t2', _user(2), {})
+    cache.put('t3', _user(3), {})
+
+    cache.apply_notification('token:t1')
+    cache.apply_notification('user:2')
+    assert cache.get('t1') is None and cache.get('t2') is None
+    assert cache.get('t3') is not None
+
+    cache.apply_notification('all')
+    assert cache.get('t3') is None
+
+
+@pytest.fixture()
+def token_cache():
+    cache = TokenCache(ttl_seconds=60)
+    with patch('webapp.middleware.auth_middleware.get_token_cache', return_value=cache), \
+         patch('webapp.auth.token_cache._cache', cache):
+        yield cache
+
+
+def test_middleware_validates_token_once(app, token_cache):
+    """Повторный запрос с тем же токеном не обращается к AuthService/БД."""
+    token = generate_token(7, 'u7@example.com', 'user', app.config['JWT_SECRET_KEY'])
+    orm_user = MagicMock(id=7, email='u7@example.com', role='user', first_name=None,
+                         last_name=None, created_at=None)
+
+    with patch('webapp.middleware.auth_middleware.SessionLocal'), \
+         patch('webapp.middleware.auth_middleware.AuthService') as service_cls:
+        service_cls.return_value.validate_token.return_value = ({'user_id': 7}, orm_user, None)
+        client = app.test_client()
+        for _ in range(3):
+            response = client.get('/auth/me', headers={'Authorization': f'Bearer {token}'})
+            assert response.status_code == 200
+            assert response.get_json()['user']['email'] == 'u7@example.com'
+
+    assert service_cls.return_value.validate_token.call_count == 1
+    assert token_cache.stats()['hits'] == 2
+
+
+def test_failed_validation_is_not_cached(app, token_cache):
+    with patch('webapp.middleware.auth_middleware.SessionLocal'), \
+         patch('webapp.middleware.auth_middleware.AuthService') as service_cls:
+        service_cls.return_value.validate_token.return_value = (None, None, 'Сессия не найдена или неактивна')
+        client = app.test_client()
+        for _ in range(2):
+            assert client.get('/auth/me', headers={'Authorization': 'Bearer bad'}).status_code == 401
+
+    assert service_cls.return_value.validate_token.call_count == 2
+    assert token_cache.stats()['size'] == 0
+
+
+def test_logout_and_role_change_invalidate_cache(token_cache):
+    token_cache.put(hash_token('tok'), _user(5), {})
+    token_cache.put('other', _user(5), {})
+
+    service = AuthService(db_session=MagicMock(), jwt_secret='s')
+    service.session_repo = MagicMock()
+    service.user_repo = MagicMock()
+
+    service.logout('tok')
+    assert token_cache.get(hash_token('tok')) is None
+    assert token_cache.get('other') is not None
+
+    ok, error = service.change_role(5, 'admin')
+    assert ok and error is None
+    assert token_cache.get('other') is None
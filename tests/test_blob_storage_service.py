@@ -30,6 +30,32 @@ def test_calculate_sha256(blob_service):
     assert file_bytes == content
 
 
+def test_document_query_does_not_load_blob():
+    """Обычный запрос Document не выбирает байты blob (отложенная загрузка)."""
+    from sqlalchemy import select
+    from sqlalchemy.dialects import postgresql
+    
+    sql = str(select(Document).compile(dialect=postgresql.dialect()))
+    
+    # Единственное упоминание blob — выражение has_blob (blob IS NOT NULL), без самих байтов
+    assert sql.count('documents.blob') == 1
+    assert 'documents.blob IS NOT NULL' in sql
+    
+    blob_sql = str(select(Document.blob).compile(dialect=postgresql.dialect()))
+    assert 'documents.blob' in blob_sql
+
+
+def test_get_file_bytes_converts_memoryview(blob_service):
+    """get_file_bytes читает только колонку blob и возвращает bytes."""
+    from unittest.mock import MagicMock
+    
+    db = MagicMock()
+    db.query.return_value.filter.return_value.scalar.return_value = memoryview(b'data')
+    
+    assert blob_service.get_file_bytes(db, 1) == b'data'
+    db.query.assert_called_once_with(Document.blob)
+
+
 def test_save_file_to_db_new_file(db, test_user, blob_service):
     """Тест сохранения нового файла в БД."""
     import uuid
@@ -0,0 +1,172 @@
+"""
+Тесты фоновой пакетной записи логов в БД (LogBatchWriter).
+
+БД не требуется: сессия подменяется моком, который запоминает пакеты INSERT.
+"""
+import logging
+import threading
+from unittest.mock import MagicMock
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from webapp.db.models import AppLog, HTTPRequestLog
+from webapp.utils.db_log_handler import DatabaseLogHandler, HTTPRequestLogHandler, LogBatchWriter
+
+
+class _RecordingSessionFactory:
+    """Фабрика сессий, запоминающая (таблица, строки) каждого execute."""
+
+    def __init__(self, gate: threading.Event = None, error=None):
+        self.batches = []
+        self.commits = 0
+        self.gate = gate
+        self.error = error  # error(rows) -> исключение для отвергнутого INSERT или None
+
+    def __call__(self):
+        session = MagicMock()
+        staged = []
+
+        def _execute(stmt, rows):
+            if self.gate is not None:
+                self.gate.wait(5)
+            error = self.error(rows) if self.error else None
+            if error is not None:
+                raise error
+            staged.append((stmt.table.name, list(rows)))
+
+        def _commit():
+            self.batches.extend(staged)
+            self.commits += 1
+
+        session.execute.side_effect = _execute
+        session.commit.side_effect = _commit
+        return session
+
+
+def _row(message='m'):
+    return {'level': 'INFO', 'user_id': None, 'component': 't', 'message': message,
+            'context_json': None, 'created_at': None}
+
+
+def test_records_are_written_in_batches():
+    """Записи вставляются пакетами по batch_size, остаток — по flush()."""
+    factory = _RecordingSessionFactory()
+    writer = LogBatchWriter(session_factory=factory, batch_size=3, flush_interval=60)
+    for i in range(7):
+        assert writer.submit(AppLog, _row(str(i)))
+    assert writer.flush()
+
+    sizes = [len(rows) for _, rows in factory.batches]
+    assert sizes == [3, 3, 1]
+    assert [r['message'] for _, rows in factory.batches for r in rows] == [str(i) for i in range(7)]
+    assert writer.stats()['written'] == 7
+    writer.shutdown()
+
+
+def test_one_commit_per_batch_across_tables():
+    factory = _RecordingSessionFactory()
+    writer = LogBatchWriter(session_factory=factory, batch_size=100, flush_interval=60)
+    writer.submit(AppLog, _row())
+    writer.submit(HTTPRequestLog, {'method': 'GET', 'path': '/'})
+    writer.flush()
+
+    assert sorted(name for name, _ in factory.batches) == ['app_logs', 'http_request_logs']
+    assert factory.commits == 1
+    writer.shutdown()
+
+
+def test_full_queue_drops_and_reports():
+    """При медленной БД очередь переполняется: записи отбрасываются и учитываются."""
+    gate = threading.Event()
+    factory = _RecordingSessionFactory(gate)
+    writer = LogBatchWriter(session_factory=factory, batch_size=1, flush_interval=60, queue_size=2)
+
+    results = [writer.submit(AppLog, _row(str(i))) for i in range(20)]
+    assert not all(results)
+    dropped = writer.stats()['dropped']
+    assert dropped == results.count(False)
+
+    gate.set()
+    writer.flush()
+    writer.submit(AppLog, _row('after'))
+    writer.flush()
+
+    messages = [r['message'] for _, rows in factory.batches for r in rows]
+    assert any(f'отброшено записей: {dropped}' in m for m in messages)
+    writer.shutdown()
+
+
+def test_shutdown_drains_queue():
+    factory = _RecordingSessionFactory()
+    writer = LogBatchWriter(session_factory=factory, batch_size=100, flush_interval=60)
+    writer.submit(AppLog, _row('last'))
+    writer.shutdown()
+
+    assert factory.batches == [('app_logs', [_row('last')])]
+    assert writer.submit(AppLog, _row('late')) is False
+
+
+def test_database_log_handler_enqueues_record():
+    writer = MagicMock()
+    writer.is_writer_thread.return_value = False
+    handler = DatabaseLogHandler(writer=writer)
+
+    record = logging.LogRecord('webapp.test', logging.WARNING, __file__, 1, 'hello %s', ('world',), None)
+    handler.emit(record)
+
+    model, row = writer.submit.call_args[0]
+    assert model is AppLog
+    assert row['level'] == 'WARNING' and row['message'] == 'hello world' and row['component'] == 'webapp.test'
+
+
+def test_bad_row_is_isolated_from_batch():
+    """Ошибка данных в одной записи не отбрасывает остальной пакет."""
+    def error(rows):
+        if any(r.get('message') == 'bad' for r in rows):
+            return IntegrityError('INSERT', {}, Exception('fk_violation'))
+
+    factory = _RecordingSessionFactory(error=error)
+    writer = LogBatchWriter(session_factory=factory, batch_size=100, flush_interval=60)
+    for message in ['a', 'b', 'bad', 'c', 'd']:
+        writer.submit(AppLog, _row(message))
+    writer.submit(HTTPRequestLog, {'method': 'GET', 'path': '/'})
+    writer.flush()
+
+    written = sorted(r.get('message', r.get('path')) for _, rows in factory.batches for r in rows)
+    assert written == ['/', 'a', 'b', 'c', 'd']
+    stats = writer.stats()
+    assert stats['written'] == 5 and stats['failed'] == 1
+    writer.shutdown()
+
+
+def test_connection_error_fails_batch_without_splitting():
+    factory = _RecordingSessionFactory(error=lambda rows: OperationalError('INSERT', {}, Exception('refused')))
+    writer = LogBatchWriter(session_factory=factory, batch_size=100, flush_interval=60)
+    for i in range(8):
+        writer.submit(AppLog, _row(str(i)))
+    writer.flush()
+
+    assert writer.stats()['failed'] == 8
+    assert factory.commits == 0
+    writer.shutdown()
+
+
+def test_request_log_values_fit_columns(app):
+    writer = MagicMock()
+    response = MagicMock(status_code=200)
+    long_path = '/search/' + 'x' * 1000
+    with app.test_request_context(long_path, headers={'User-Agent': 'bot/' + 'y' * 1000}):
+        from flask import request
+        HTTPRequestLogHandler.log_request(app, request, response, 0.0, writer=writer)
+
+    model, row = writer.submit.call_args[0]
+    assert model is HTTPRequestLog
+    # Обрезка — в LogBatchWriter.submit, проверяем на настоящем writer'е
+    factory = _RecordingSessionFactory()
+    real_writer = LogBatchWriter(session_factory=factory, batch_size=100, flush_interval=60)
+    real_writer.submit(model, row)
+    real_writer.flush()
+    (_, (written,)), = factory.batches
+    assert len(written['path']) == 500 and written['path'].startswith('/search/x')
+    assert len(written['user_agent']) == 500
+    real_writer.shutdown()
@@ -0,0 +1,85 @@
+"""
+Тесты общего пула соединений (webapp/db/pool.py) и аренды соединений RAGDatabase.
+
+PostgreSQL не требуется: пул проверяется на файловой SQLite.
+"""
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.pool import NullPool
+
+from webapp.db import pool as db_pool
+from webapp.models.rag_models import DatabaseConnection
+
+
+def _config(**overrides):
+    values = dict(
+        db_pool_enabled=True,
+        db_pool_size=2,
+        db_max_overflow=1,
+        db_pool_timeout_seconds=1,
+        db_pool_recycle_seconds=-1,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+@pytest.fixture()
+def sqlite_engine(tmp_path):
+    engine = db_pool.build_engine(f"sqlite:///{tmp_path / 'pool.db'}", config=_config())
+    yield engine
+    engine.dispose()
+
+
+def test_pool_reuses_connections_and_counts_checkouts(sqlite_engine):
+    """Повторные выдачи берут соединение из пула, а не подключаются заново."""
+    for _ in range(3):
+        conn = sqlite_engine.raw_connection()
+        conn.close()
+
+    metrics = sqlite_engine.pool.metrics.as_dict()
+    assert metrics['checkouts'] == 3
+    assert metrics['connects'] == 1
+    assert metrics['wait_ms_max'] >= 0
+
+    stats = [p for p in db_pool.pool_stats()['pools'] if p['url'] == str(sqlite_engine.url)]
+    assert stats and stats[0]['checked_out'] == 0 and stats[0]['size'] == 2
+
+
+def test_pool_disabled_uses_null_pool(tmp_path):
+    engine = db_pool.build_engine(f"sqlite:///{tmp_path / 'np.db'}", config=_config(db_pool_enabled=False))
+    assert isinstance(engine.pool, NullPool)
+
+
+def test_dispose_after_fork_drops_inherited_connections(sqlite_engine):
+    """В дочернем процессе пул пересоздаётся без соединений родителя, метрики обнуляются."""
+    sqlite_engine.raw_connection().close()
+    old_pool = sqlite_engine.pool
+
+    db_pool._dispose_after_fork()
+
+    assert sqlite_engine.pool is not old_pool
+    assert sqlite_engine.pool.checkedin() == 0
+    assert sqlite_engine.pool.metrics.as_dict()['checkouts'] == 0
+
+
+def test_database_connection_nested_lease_shares_connection(sqlite_engine):
+    """Вложенные with db.connect() получают одно соединение; внешний выход возвращает его в пул."""
+    db = DatabaseConnection('postgresql://unused')
+    with patch('webapp.db.pool.get_engine_for_dsn', return_value=sqlite_engine):
+        with db.connect() as outer:
+            outer.execute('CREATE TABLE t (x INTEGER)')
+            with db.connect() as inner:
+                assert inner is outer
+            assert sqlite_engine.pool.checkedout() == 1
+        assert sqlite_engine.pool.checkedout() == 0
+
+        with pytest.raises(RuntimeError):
+            with db.connect() as conn:
+                conn.execute('INSERT INTO t VALUES (1)')
+                raise RuntimeError('boom')
+        assert sqlite_engine.pool.checkedout() == 0
+
+        with db.connect() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
@@ -0,0 +1,83 @@
+"""
+Тесты кэша эмбеддингов (EmbeddingsService + EmbeddingCacheService).
+
+Провайдер OpenAI и БД подменяются: проверяем, что к API уходят только промахи
+кэша, одинаковые тексты запрашиваются один раз, а новые векторы пишутся в кэш пакетно.
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from webapp.services.embedding_cache import EmbeddingCacheService, normalize_text, text_hash
+from webapp.services.embeddings import EmbeddingsService
+
+
+class _FakeCache:
+    """Кэш в памяти с интерфейсом EmbeddingCacheService."""
+
+    def __init__(self, data=None):
+        self.data = dict(data or {})
+        self.put_calls = []
+
+    def get_many(self, model, dimension, text_hashes):
+        return {h: self.data[h] for h in text_hashes if h in self.data}
+
+    def put_many(self, model, dimension, embeddings):
+        self.put_calls.append(dict(embeddings))
+        self.data.update(embeddings)
+
+
+def _fake_openai(calls):
+    def create(model, input):
+        calls.append(list(input))
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(t))]) for t in input])
+    client = MagicMock()
+    client.embeddings.create.side_effect = create
+    return client
+
+
+def test_normalized_hash_ignores_whitespace_differences():
+    assert normalize_text('  Поставка\n\tтовара  ') == 'Поставка товара'
+    assert text_hash('Поставка  товара') == text_hash('Поставка\nтовара')
+    assert text_hash('Поставка товара') != text_hash('поставка товара')
+
+
+def test_batch_sends_only_cache_misses_once():
+    """Попадания берутся из кэша, дубликаты промахов отправляются провайдеру один раз."""
+    cache = _FakeCache({text_hash('типовой пункт'): [42.0]})
+    service = EmbeddingsService(api_key='key', cache=cache)
+    calls = []
+
+    with patch('webapp.services.embeddings.openai.OpenAI', return_value=_fake_openai(calls)):
+        result = service.get_embeddings_batch(['типовой  пункт', 'новый', '', 'новый'])
+
+    assert calls == [['новый']]
+    assert result == [[42.0], [5.0], None, [5.0]]
+    assert cache.put_calls == [{text_hash('новый'): [5.0]}]
+
+
+def test_batch_full_hit_skips_api():
+    cache = _FakeCache({text_hash('a'): [1.0], text_hash('b'): [2.0]})
+    service = EmbeddingsService(api_key='key', cache=cache)
+
+    with patch('webapp.services.embeddings.openai.OpenAI') as client_cls:
+        assert service.get_embeddings_batch(['a', 'b']) == [[1.0], [2.0]]
+    client_cls.assert_not_called()
+
+
+def test_cache_service_counts_hits_and_survives_db_errors():
+    """Счётчики hit/miss; ошибка БД не пробрасывается, а считается промахом."""
+    EmbeddingCacheService.reset_stats()
+    service = EmbeddingCacheService(session_factory=MagicMock())
+
+    with patch('webapp.db.repositories.embedding_cache_repository.EmbeddingCacheRepository') as repo_cls:
+        repo_cls.return_value.get_many.return_value = {'h1': [1.0]}
+        assert service.get_many('m', 1, ['h1', 'h2']) == {'h1': [1.0]}
+
+        repo_cls.return_value.get_many.side_effect = RuntimeError('db down')
+        assert service.get_many('m', 1, ['h3']) == {}
+
+    stats = EmbeddingCacheService.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+    assert stats['errors'] == 1
+    assert stats['hit_rate'] == round(1 / 3, 4)
@@ -0,0 +1,100 @@
+"""
+Тесты песочницы извлечения текста (document_processor/extractors/sandbox.py):
+лимиты времени и памяти, аварийное завершение и перезапуск воркеров.
+"""
+import os
+import time
+
+import pytest
+
+from document_processor.extractors import sandbox as sandbox_module
+from document_processor.extractors.sandbox import ExtractionSandbox, extract_text_sandboxed
+
+
+def poisoned_extract(file_bytes, extension):
+    """Извлечение для тестов: hang зависает, oom выделяет 1 ГБ, crash роняет процесс."""
+    if extension == 'hang':
+        time.sleep(60)
+    if extension == 'oom':
+        return str(len(bytearray(1024 ** 3)))
+    if extension == 'crash':
+        os._exit(1)
+    if extension == 'pid':
+        return str(os.getpid())
+    if extension == 'ocr_workers':
+        from document_processor.ocr.engine import default_workers
+        return str(default_workers())
+    return file_bytes.decode('utf-8')
+
+
+@pytest.fixture()
+def make_sandbox():
+    created = []
+
+    def factory(**kwargs):
+        kwargs.setdefault('func', poisoned_extract)
+        sandbox = ExtractionSandbox(**kwargs)
+        created.append(sandbox)
+        return sandbox
+
+    yield factory
+    for sandbox in created:
+        sandbox.shutdown()
+
+
+def test_extracts_text_in_worker(make_sandbox):
+    sandbox = make_sandbox(workers=1, timeout=20)
+    result = sandbox.extract('техническое задание'.encode('utf-8'), 'txt')
+    assert result['status'] == 'ok'
+    assert result['text'] == 'техническое задание'
+    assert result['error'] is None
+
+
+def test_timeout_kills_worker_and_sandbox_recovers(make_sandbox):
+    sandbox = make_sandbox(workers=1, timeout=2)
+    started = time.monotonic()
+    result = sandbox.extract(b'', 'hang')
+    assert result['status'] == 'timeout'
+    assert result['text'] == ''
+    assert time.monotonic() - started < 10
+
+    # Зависший воркер заменён новым
+    sandbox.timeout = 20
+    result = sandbox.extract(b'after', 'txt')
+    assert result['status'] == 'ok' and result['text'] == 'after'
+
+
+@pytest.mark.skipif(sandbox_module.resource is None, reason='нет модуля resource')
+def test_memory_limit_reports_oom(make_sandbox):
+    sandbox = make_sandbox(workers=1, timeout=20, memory_mb=512)
+    result = sandbox.extract(b'', 'oom')
+    assert result['status'] == 'oom'
+    assert '512' in result['error']
+    assert sandbox.extract(b'next', 'txt')['text'] == 'next'
+
+
+def test_crashed_worker_is_replaced(make_sandbox):
+    sandbox = make_sandbox(workers=1, timeout=20)
+    assert sandbox.extract(b'', 'crash')['status'] == 'crashed'
+    assert sandbox.extract(b'next', 'txt')['status'] == 'ok'
+
+
+def test_worker_is_recycled_after_max_docs(make_sandbox):
+    sandbox = make_sandbox(workers=1, timeout=20, max_docs_per_worker=2)
+    pids = [sandbox.extract(b'', 'pid')['text'] for _ in range(3)]
+    assert pids[0] == pids[1] != pids[2]
+    assert str(os.getpid()) not in pids
+
+
+def test_worker_runs_ocr_without_own_pool(make_sandbox):
+    # Иначе пул OCR (до 8 процессов) получил бы каждый свой лимит памяти
+    sandbox = make_sandbox(workers=1, timeout=20)
+    assert sandbox.extract(b'', 'ocr_workers')['text'] == '1'
+
+
+def test_disabled_sandbox_runs_in_process(monkeypatch):
+    monkeypatch.setenv('EXTRACTION_SANDBOX', '0')
+    monkeypatch.setattr(sandbox_module, 'get_sandbox', lambda: pytest.fail('песочница не должна запускаться'))
+    result = extract_text_sandboxed('ИКЗ;123'.encode('utf-8'), 'csv')
+    assert result['status'] == 'ok'
+    assert 'ИКЗ' in result['text']
@@ -177,3 +177,48 @@ def test_extract_empty_bytes():
     result = extract_text_from_bytes(file_bytes, 'txt')
     
     assert result == ''
+
+
+def _pdf_bytes(pages):
+    """PDF из страниц с заданным текстом (None — пустая страница) через PyMuPDF."""
+    fitz = pytest.importorskip('fitz')
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        if text:
+            page.insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_extract_pdf_from_bytes_keeps_page_breaks():
+    """PDF из bytes читается через PdfReader, переводы строк сохраняются для чанкования."""
+    result = extract_text_from_bytes(_pdf_bytes(['First page text', 'Second page text']), 'pdf')
+
+    assert 'First page text' in result and 'Second page text' in result
+    assert '\n' in result.strip()
+
+
+def test_extract_pdf_from_bytes_respects_page_limit(monkeypatch):
+    """PDF_MAX_PAGES_TEXT ограничивает число читаемых страниц."""
+    monkeypatch.setenv('PDF_MAX_PAGES_TEXT', '2')
+    result = extract_text_from_bytes(_pdf_bytes([f'Page number {i}' for i in range(1, 5)]), 'pdf')
+
+    assert 'Page number 2' in result
+    assert 'Page number 3' not in result
+
+
+def test_extract_pdf_from_bytes_uses_ocr_for_scans(monkeypatch):
+    """Скан без текстового слоя распознаётся OCR по байтам, без временных файлов."""
+    from unittest.mock import patch
+    from document_processor.pdf_reader import PdfReader
+
+    monkeypatch.setenv('PDF_MAX_PAGES_OCR', '3')
+    with patch.object(PdfReader, '_extract_text_ocr', return_value=('Распознанный текст', [])) as ocr:
+        result = extract_text_from_bytes(_pdf_bytes([None]), 'pdf')
+
+    assert result == 'Распознанный текст'
+    source = ocr.call_args[0][0]
+    assert isinstance(source, bytes)
+    assert ocr.call_args[1]['max_pages'] == 3
@@ -0,0 +1,89 @@
+"""
+Тесты обнаружения файлов для Indexer (document_processor/search/discovery.py):
+один проход os.scandir и кэш классификации между запусками.
+"""
+import os
+from unittest.mock import patch
+
+import pytest
+
+from document_processor.search.discovery import FileCache, cache_path, scan_files
+from document_processor.search.indexer import Indexer, SUPPORTED_EXT
+
+
+@pytest.fixture()
+def tree(tmp_path):
+    root = tmp_path / 'uploads'
+    (root / 'a' / 'b' / 'c').mkdir(parents=True)
+    (root / '_search_index.segments').mkdir()
+    files = {
+        'top.txt': b'x', 'scan.pdf': b'%PDF-1.4 fake', 'a/doc.docx': b'd', 'a/b/deep.csv': b'c',
+        'a/b/c/deeper.txt': b't', '~$lock.docx': b'', 'skip.exe': b'', '_search_index.txt': b'',
+        '_search_index.segments/0001_fast.txt': b'', '_search_index.files.json': b'{}',
+    }
+    for rel, data in files.items():
+        (root / rel).write_bytes(data)
+    return str(root)
+
+
+def _walk_reference(root_folder, max_depth):
+    """Прежний обход os.walk из Indexer._collect_all_files."""
+    out = []
+    for dirpath, dirnames, filenames in os.walk(root_folder):
+        rel_dir = os.path.relpath(dirpath, root_folder)
+        depth = 0 if rel_dir == "." else rel_dir.count(os.sep) + 1
+        if depth > max_depth:
+            continue
+        dirnames[:] = [d for d in dirnames if d != '_search_index.segments']
+        for name in filenames:
+            if name.startswith("~$") or name.startswith("$") or name.startswith('_search_index.'):
+                continue
+            ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+            if ext in SUPPORTED_EXT:
+                rel_path = os.path.normpath(os.path.join(rel_dir, name)) if rel_dir != "." else name
+                out.append((ext, name, os.path.join(dirpath, name), rel_path))
+    return out
+
+
+@pytest.mark.parametrize('max_depth', [0, 2, 10])
+def test_scan_matches_os_walk(tree, max_depth):
+    files = scan_files(tree, max_depth, SUPPORTED_EXT,
+                       skip_names={'_search_index.txt', '_search_index.files.json'},
+                       skip_dirs={'_search_index.segments'})
+    assert [tuple(f[:4]) for f in files] == _walk_reference(tree, max_depth)
+    assert files[0].size == 1 and files[0].mtime_ns == os.stat(files[0].abs_path).st_mtime_ns
+
+
+def test_unchanged_pdfs_are_not_reclassified(tree):
+    with patch.object(Indexer, '_is_text_pdf', return_value=False) as is_text_pdf:
+        indexer = Indexer()
+        groups = indexer._classify_files(indexer._collect_all_files(tree))
+        assert groups['slow'] == [('scan.pdf', os.path.join(tree, 'scan.pdf'))]
+        assert is_text_pdf.call_count == 1
+
+        indexer = Indexer()
+        files = indexer._collect_all_files(tree)
+        assert {f.rel_path: f.kind for f in files}['scan.pdf'] == 'slow'
+        assert indexer._classify_files(files) == groups
+        assert is_text_pdf.call_count == 1
+
+        # Изменённый файл классифицируется заново
+        with open(os.path.join(tree, 'scan.pdf'), 'ab') as f:
+            f.write(b'more')
+        indexer = Indexer()
+        indexer._classify_files(indexer._collect_all_files(tree))
+        assert is_text_pdf.call_count == 2
+
+    cache = FileCache.load(os.path.join(tree, '_search_index.txt'))
+    assert cache.path == cache_path(os.path.join(tree, '_search_index.txt'))
+    assert sorted(cache.entries) == sorted(f.rel_path for f in files)
+
+
+def test_sources_are_sorted_without_stat_calls(tree):
+    indexer = Indexer()
+    files = indexer._collect_all_files(tree)
+    with patch('os.path.getsize', side_effect=AssertionError('лишний stat')):
+        sources = [rel for rel, _, _ in indexer._iter_sources(tree, files)]
+    # (приоритет формата, размер, имя)
+    assert sources == [os.path.join('a', 'b', 'deep.csv'), os.path.join('a', 'b', 'c', 'deeper.txt'), 'top.txt',
+                       os.path.join('a', 'doc.docx'), 'scan.pdf']
@@ -0,0 +1,115 @@
+"""
+Тесты сегментной групповой индексации (document_processor/search/segments.py):
+группы пишутся отдельными сегментами по манифесту, читатели объединяют их,
+status.json пишется с ограничением частоты.
+"""
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from document_processor.analysis.extractor import Extractor
+from document_processor.search.indexer import Indexer
+from document_processor.search.searcher import Searcher
+from document_processor.search.segments import (
+    SegmentManifest, index_exists, index_files, manifest_path, segments_dir
+)
+
+
+@pytest.fixture()
+def uploads(tmp_path):
+    root = tmp_path / 'uploads'
+    root.mkdir()
+    (root / 'a.txt').write_text('Поставка картриджей', encoding='utf-8')
+    (root / 'b.csv').write_text('ИКЗ;123\nдоговор поставки', encoding='utf-8')
+    (root / 'c.docx').write_bytes(b'not a docx')
+    return str(root)
+
+
+def test_grouped_index_is_written_as_segments(uploads):
+    index_path = Indexer().create_index(uploads, use_groups=True)
+
+    assert not os.path.exists(index_path) and index_exists(index_path)
+    manifest = SegmentManifest.load(index_path)
+    assert [(s['name'], s['group'], s['files']) for s in manifest.segments] == [
+        ('0001_fast.txt', 'fast', 2), ('0002_medium.txt', 'medium', 1)
+    ]
+    assert manifest.groups['fast']['status'] == 'completed'
+    assert manifest.groups['slow'] == {'label': 'PDF-сканы с OCR', 'files': 0, 'status': 'pending'}
+
+    results = Searcher().search(index_path, ['поставк'])
+    assert sorted({r['title'] for r in results}) == ['a.txt', 'b.csv']
+
+    excluded = Searcher().search(index_path, ['поставк'], exclude_mode=True)
+    assert [r['title'] for r in excluded] == ['c.docx']
+
+
+def test_reindex_does_not_pick_up_own_segments(uploads):
+    indexer = Indexer()
+    indexer.create_index(uploads, use_groups=True)
+    index_path = indexer.create_index(uploads, use_groups=True)
+
+    titles = [e['title'] for e in Searcher()._iter_entries(index_path)]
+    assert sorted(titles) == ['a.txt', 'b.csv', 'c.docx']
+
+
+def test_missing_files_are_appended_as_new_segment(uploads):
+    indexer = Indexer()
+    index_path = indexer.create_index(uploads, use_groups=True)
+    first_segment = index_files(index_path)[0]
+    with open(first_segment, 'rb') as f:
+        before = f.read()
+
+    with open(os.path.join(uploads, 'd.txt'), 'w', encoding='utf-8') as f:
+        f.write('дописанный договор')
+    indexer._final_sweep_for_missing(index_path, uploads)
+
+    assert [s['name'] for s in SegmentManifest.load(index_path).segments][-1] == '0003_fast.txt'
+    with open(first_segment, 'rb') as f:
+        assert f.read() == before  # существующие сегменты не переписываются
+    assert [r['title'] for r in Searcher().search(index_path, ['дописанный'])] == ['d.txt']
+
+
+def test_classic_index_replaces_segments(uploads):
+    indexer = Indexer()
+    index_path = indexer.create_index(uploads, use_groups=True)
+    indexer.create_index(uploads, use_groups=False)
+
+    assert not os.path.exists(manifest_path(index_path))
+    assert not os.path.exists(segments_dir(index_path))
+    assert index_files(index_path) == [index_path]
+    result = Extractor(use_spacy=False).analyze_index(index_path)
+    assert sorted(result.sources) == ['a.txt', 'b.csv']
+
+
+def test_analysis_accepts_grouped_index(uploads):
+    from flask import Flask
+    from webapp.services.analysis import run_analysis
+
+    index_path = Indexer().create_index(uploads, use_groups=True)
+    with Flask(__name__).app_context(), patch('webapp.services.analysis.Extractor') as extractor_cls:
+        extractor_cls.return_value.analyze_index.return_value.to_dict.return_value = {'fields': {}}
+        ok, message, result = run_analysis(index_path)
+
+    assert ok, message
+    extractor_cls.return_value.analyze_index.assert_called_once_with(index_path)
+    assert result == {'fields': {}}
+
+
+def test_status_writes_are_throttled(tmp_path):
+    status_path = str(tmp_path / 'status.json')
+    indexer = Indexer(status_interval=60)
+
+    with patch('document_processor.search.indexer.os.replace', wraps=os.replace) as replace:
+        indexer._update_status(status_path, {'status': 'running', 'processed': 0})
+        for i in range(1, 100):
+            indexer._update_status(status_path, {'status': 'running', 'processed': i})
+        assert replace.call_count == 1
+        with open(status_path, encoding='utf-8') as f:
+            assert json.load(f)['processed'] == 0
+
+        indexer._update_status(status_path, {'status': 'completed', 'processed': 100})
+        assert replace.call_count == 2
+    with open(status_path, encoding='utf-8') as f:
+        assert json.load(f) == {'status': 'completed', 'processed': 100}
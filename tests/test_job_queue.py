@@ -0,0 +1,117 @@
+"""
+Тесты фоновых воркеров индексации (job_queue).
+
+БД не требуется: репозиторий и индексация подменяются моками,
+проверяется протокол воркера (complete / fail с повтором / потеря аренды).
+"""
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from webapp.db.repositories.job_queue_repository import JobQueueRepository
+from webapp.services.indexing_worker import IndexingWorker, INDEX_JOB_TYPE, run_index_job
+
+
+def _job(attempts=1, max_attempts=3, job_type=INDEX_JOB_TYPE):
+    return {
+        'id': 42,
+        'type': job_type,
+        'user_id': 7,
+        'payload': {'document_id': 5, 'original_filename': 'a.txt', 'user_path': 'a.txt'},
+        'attempts': attempts,
+        'max_attempts': max_attempts,
+    }
+
+
+def _worker(app, handler):
+    worker = IndexingWorker(app, worker_id='test:1', poll_interval=0, lease_seconds=60,
+                            session_factory=MagicMock())
+    worker.handlers[INDEX_JOB_TYPE] = handler
+    return worker
+
+
+def test_retry_delay_exponential_with_cap():
+    """Backoff удваивается на каждой попытке и ограничен часом."""
+    assert JobQueueRepository.retry_delay(1) == 30
+    assert JobQueueRepository.retry_delay(2) == 60
+    assert JobQueueRepository.retry_delay(3) == 120
+    assert JobQueueRepository.retry_delay(20) == JobQueueRepository.RETRY_MAX_DELAY_SECONDS
+
+
+def test_run_once_empty_queue(app):
+    """Пустая очередь — run_once возвращает False и ничего не выполняет."""
+    handler = MagicMock()
+    with patch('webapp.services.indexing_worker.JobQueueRepository') as repo_cls:
+        repo_cls.return_value.claim_next.return_value = None
+        assert _worker(app, handler).run_once() is False
+    handler.assert_not_called()
+
+
+def test_run_once_success_completes_job(app):
+    """Успешная задача фиксируется через complete() с результатом обработчика."""
+    handler = MagicMock(return_value={'document_id': 5})
+    with patch('webapp.services.indexing_worker.JobQueueRepository') as repo_cls:
+        repo = repo_cls.return_value
+        repo.claim_next.return_value = _job()
+        repo.complete.return_value = True
+
+        assert _worker(app, handler).run_once() is True
+
+        repo.complete.assert_called_once_with(42, 'test:1', {'document_id': 5})
+        repo.fail.assert_not_called()
+
+
+def test_run_once_failure_requeues_with_attempts(app):
+    """Ошибка обработчика передаётся в fail() вместе со счётчиком попыток."""
+    handler = MagicMock(side_effect=RuntimeError('boom'))
+    with patch('webapp.services.indexing_worker.JobQueueRepository') as repo_cls:
+        repo = repo_cls.return_value
+        repo.claim_next.return_value = _job(attempts=2, max_attempts=3)
+        repo.fail.return_value = 'queued'
+
+        assert _worker(app, handler).run_once() is True
+
+        args = repo.fail.call_args[0]
+        assert args[0] == 42 and args[1] == 'test:1'
+        assert 'boom' in args[2]
+        assert args[3:] == (2, 3)
+        repo.complete.assert_not_called()
+
+
+def test_unknown_job_type_fails(app):
+    """Задача неизвестного типа не выполняется, а помечается ошибкой."""
+    with patch('webapp.services.indexing_worker.JobQueueRepository') as repo_cls:
+        repo = repo_cls.return_value
+        repo.claim_next.return_value = _job(job_type='cleanup')
+
+        assert _worker(app, MagicMock()).run_once() is True
+        assert 'cleanup' in repo.fail.call_args[0][2]
+
+
+def test_run_index_job_raises_when_indexing_returns_zero(app):
+    """index_document_to_db сигнализирует ошибку через doc_id=0 — воркер должен получить исключение."""
+    rag_db = MagicMock()
+    cursor = rag_db.db.connect.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value
+    cursor.fetchone.return_value = ('sha', 10, 'text/plain')
+
+    with patch('webapp.services.db_indexing.index_document_to_db', return_value=(0, 0.1)):
+        with pytest.raises(RuntimeError):
+            run_index_job(rag_db, 7, {'document_id': 5, 'original_filename': 'a.txt'})
+
+    with patch('webapp.services.db_indexing.index_document_to_db', return_value=(5, 0.25)) as index_mock:
+        result = run_index_job(rag_db, 7, {'document_id': 5, 'original_filename': 'a.txt'})
+    assert result == {'document_id': 5, 'indexing_cost_seconds': 0.25}
+    assert index_mock.call_args.kwargs['user_id'] == 7
+
+
+def test_claim_does_not_reclaim_exhausted_expired_jobs():
+    """Задача с истёкшей арендой и исчерпанными попытками не захватывается, а получает error."""
+    session = MagicMock()
+    session.execute.return_value.fetchone.return_value = None
+
+    assert JobQueueRepository(session).claim_next('test:1', [INDEX_JOB_TYPE], 60) is None
+
+    expire_sql, claim_sql = (str(call.args[0]) for call in session.execute.call_args_list)
+    assert "SET status = 'error'" in expire_sql and 'attempts >= max_attempts' in expire_sql
+    assert 'attempts < max_attempts' in claim_sql
+    session.commit.assert_called_once()
@@ -0,0 +1,73 @@
+"""
+Тесты OCR-движка (document_processor.ocr.engine).
+
+Tesseract подменяется моком: проверяем, что растеризуются только нужные страницы,
+результаты возвращаются по порядку, а общий тайм-бюджет соблюдается.
+"""
+from unittest.mock import patch
+
+import pytest
+
+fitz = pytest.importorskip('fitz')
+
+from document_processor.ocr import engine as ocr_engine  # noqa: E402
+from document_processor.ocr.engine import OcrEngine  # noqa: E402
+
+
+@pytest.fixture
+def pdf_bytes():
+    """PDF на 6 страниц без текстового слоя."""
+    doc = fitz.open()
+    for _ in range(6):
+        doc.new_page(width=200, height=200)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_count_pages(pdf_bytes):
+    assert ocr_engine.count_pages(pdf_bytes) == 6
+
+
+def test_renders_only_requested_pages_in_order(pdf_bytes):
+    """Растеризуются только первые max_pages страниц, текст собирается по порядку."""
+    rendered = []
+    real_render = ocr_engine.render_page
+
+    def _render(source, page_number, dpi=ocr_engine.DEFAULT_DPI):
+        rendered.append(page_number)
+        return real_render(source, page_number, dpi=72)
+
+    with patch.object(ocr_engine, 'render_page', side_effect=_render), \
+            patch.object(ocr_engine, 'TESSERACT_AVAILABLE', True), \
+            patch.object(ocr_engine, 'pytesseract') as tess:
+        tess.image_to_string.side_effect = ['стр1', '', 'стр3']
+        result = OcrEngine(workers=1).ocr_pdf(pdf_bytes, max_pages=3, budget_seconds=30)
+
+    assert rendered == [1, 2, 3]
+    assert [p['page'] for p in result['pages']] == [1, 2, 3]
+    assert result['text'] == 'стр1\nстр3'
+    assert result['pages_total'] == 6
+    assert result['timed_out'] is False
+    # Тайм-аут tesseract не превышает тайм-аут страницы
+    assert all(call.kwargs['timeout'] <= 30 for call in tess.image_to_string.call_args_list)
+
+
+def test_exhausted_budget_skips_pages(pdf_bytes):
+    """При исчерпанном бюджете страницы не растеризуются и помечаются budget exceeded."""
+    with patch.object(ocr_engine, 'render_page') as render:
+        result = OcrEngine(workers=1).ocr_pdf(pdf_bytes, max_pages=2, budget_seconds=0)
+
+    render.assert_not_called()
+    assert result['timed_out'] is True
+    assert [p['error'] for p in result['pages']] == ['budget exceeded', 'budget exceeded']
+
+
+def test_parallel_pool_returns_pages_in_order(pdf_bytes):
+    """Пул процессов возвращает результаты всех страниц в порядке номеров."""
+    try:
+        result = OcrEngine(workers=2, dpi=72).ocr_pdf(pdf_bytes, max_pages=4, budget_seconds=60)
+    finally:
+        ocr_engine.shutdown_pool()
+
+    assert [p['page'] for p in result['pages']] == [1, 2, 3, 4]
@@ -0,0 +1,73 @@
+"""
+Тесты таблицы смещений сводного индекса (document_processor/search/offset_index.py):
+записи, прочитанные через mmap, совпадают с полным разбором индекса.
+"""
+import os
+
+import pytest
+
+from document_processor.analysis.extractor import Extractor
+from document_processor.search.indexer import Indexer
+from document_processor.search.offset_index import (
+    OffsetIndexReader, build_offset_table, offsets_path
+)
+from document_processor.search.searcher import Searcher
+from document_processor.search.segments import index_files
+
+
+@pytest.fixture()
+def uploads(tmp_path):
+    root = tmp_path / 'uploads'
+    (root / 'sub').mkdir(parents=True)
+    (root / 'a.txt').write_text('Поставка {картриджей}\n=====\nещё строка', encoding='utf-8')
+    (root / 'sub' / 'b{1}.csv').write_text('ИКЗ;123\nдоговор поставки', encoding='utf-8')
+    (root / 'c.html').write_text('<p>Договор</p>', encoding='utf-8')
+    return str(root)
+
+
+def _full_parse(index_path):
+    searcher = Searcher()
+    return searcher._parse_entries(searcher._read_index(index_path))
+
+
+@pytest.mark.parametrize('use_groups', [False, True])
+def test_reader_matches_full_parse(uploads, use_groups):
+    index_path = Indexer().create_index(uploads, use_groups=use_groups)
+    # Групповая индексация пишет сегменты, у каждого своя таблица
+    paths = index_files(index_path)
+    assert paths and all(os.path.isfile(offsets_path(p)) for p in paths)
+
+    entries = []
+    for path in paths:
+        with OffsetIndexReader.open(path) as reader:
+            assert list(reader) == _full_parse(path)
+            entries.extend(reader)
+    assert len(entries) == 3
+
+    # Потоковое построение по готовому файлу даёт ту же таблицу
+    path = paths[0]
+    os.remove(offsets_path(path))
+    assert OffsetIndexReader.open(path) is None
+    build_offset_table(path)
+    with OffsetIndexReader.open(path) as reader:
+        assert list(reader) == _full_parse(path)
+
+
+def test_extractor_documents_match_full_parse(uploads):
+    index_path = Indexer().create_index(uploads, use_groups=False)
+    extractor = Extractor(use_spacy=False)
+    with open(index_path, encoding='utf-8') as f:
+        expected = [(d['title'], d['body']) for d in extractor._parse_documents(f.read())]
+
+    with OffsetIndexReader.open(index_path) as reader:
+        assert [(d['title'], d['body']) for d in reader.iter_documents()] == expected
+
+
+def test_stale_table_falls_back_to_full_parse(uploads):
+    index_path = Indexer().create_index(uploads, use_groups=False)
+    with open(index_path, 'a', encoding='utf-8') as f:
+        f.write('=====\nЗАГОЛОВОК: d.txt\nФормат: TXT\nИсточник: d.txt\n=====\nдописанный договор\n')
+
+    assert OffsetIndexReader.open(index_path) is None
+    sources = {r['source'] for r in Searcher().search(index_path, ['дописанный'])}
+    assert sources == {'d.txt'}
@@ -0,0 +1,75 @@
+"""
+Тесты параллельного извлечения текста в Indexer (document_processor/search/parallel.py):
+порядок записей как при последовательной обработке, тайм-аут и падение воркера.
+"""
+import os
+import time
+
+import pytest
+
+from document_processor.search.indexer import Indexer
+from document_processor.search.parallel import ParallelExtractor, extract_file
+from document_processor.search.segments import index_files
+
+
+def slow_or_crashing_extract(options, rel_path, abs_path, source):
+    """Извлечение для тестов: hang.txt зависает, crash.txt роняет процесс воркера."""
+    if rel_path == 'hang.txt':
+        time.sleep(60)
+    if rel_path == 'crash.txt':
+        os._exit(1)
+    return extract_file(options, rel_path, abs_path, source)
+
+
+@pytest.fixture()
+def uploads(tmp_path):
+    root = tmp_path / 'uploads'
+    root.mkdir()
+    for i in range(6):
+        (root / f'doc{i}.txt').write_text(f'документ {i}', encoding='utf-8')
+    (root / 'table.csv').write_text('ИКЗ;123', encoding='utf-8')
+    (root / 'broken.docx').write_bytes(b'not a docx')
+    return str(root)
+
+
+def _read_all(index_path):
+    chunks = []
+    for path in index_files(index_path):
+        with open(path, encoding='utf-8') as f:
+            chunks.append(f.read())
+    return chunks
+
+
+@pytest.mark.parametrize('use_groups', [False, True])
+def test_pool_output_matches_sequential(uploads, use_groups):
+    index_path = Indexer(workers=1).create_index(uploads, use_groups=use_groups)
+    sequential = _read_all(index_path)
+
+    Indexer(workers=3).create_index(uploads, use_groups=use_groups)
+    assert _read_all(index_path) == sequential
+
+
+def test_timeout_and_crash_produce_empty_entries(uploads):
+    items = [(name, os.path.join(uploads, name), name)
+             for name in ('doc0.txt', 'hang.txt', 'crash.txt', 'doc1.txt')]
+    extractor = ParallelExtractor(2, file_timeout=3, func=slow_or_crashing_extract)
+
+    results = list(extractor.map(items))
+
+    assert [r[0] for r in results] == ['doc0.txt', 'hang.txt', 'crash.txt', 'doc1.txt']
+    assert [r[3] for r in results] == ['документ 0', '', '', 'документ 1']
+    assert results[1][4]['error'] == 'timeout'
+    assert results[2][4]['error'] == 'worker crashed'
+    assert 'error' not in results[3][4]
+
+
+def ocr_workers_in_pool(options, rel_path, abs_path, source):
+    """Извлечение для тестов: размер пула OCR, который увидит воркер."""
+    from document_processor.ocr.engine import default_workers
+    return str(default_workers()), {}
+
+
+def test_pool_workers_run_ocr_without_own_pool(uploads):
+    items = [('doc0.txt', os.path.join(uploads, 'doc0.txt'), 'doc0.txt')]
+    results = list(ParallelExtractor(2, file_timeout=20, func=ocr_workers_in_pool).map(items))
+    assert results[0][3] == '1'
@@ -0,0 +1,116 @@
+"""
+Тесты чтения PDF одним дескриптором PyMuPDF (document_processor/pdf_reader/reader.py):
+число страниц, текстовый слой и текст из одного открытия, запасные парсеры —
+только для пустых страниц.
+"""
+import time
+from unittest.mock import patch
+
+import pytest
+
+fitz = pytest.importorskip('fitz')
+pytest.importorskip('pdfplumber')
+
+from document_processor.pdf_reader import PdfReader  # noqa: E402
+from document_processor.pdf_reader import reader as reader_module  # noqa: E402
+
+
+@pytest.fixture()
+def text_pdf(tmp_path):
+    path = tmp_path / 'doc.pdf'
+    doc = fitz.open()
+    for text in ('Contract for the supply of cartridges, first page text.', None, 'Delivery terms: 30 days.'):
+        page = doc.new_page()
+        if text:
+            page.insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_text_pdf_is_read_with_single_open(text_pdf):
+    with patch.object(reader_module.fitz, 'open', wraps=reader_module.fitz.open) as fitz_open, \
+            patch.object(reader_module.PdfAnalyzer, 'analyze_pdf') as analyze, \
+            patch.object(reader_module.pdfplumber, 'open', wraps=reader_module.pdfplumber.open) as plumber_open:
+        result = PdfReader().read_pdf(text_pdf, ocr='auto')
+
+    assert fitz_open.call_count == 1
+    analyze.assert_not_called()
+    assert result['pages'] == 3
+    assert result['has_text_layer'] is True
+    assert result['ocr_used'] is False
+    assert 'supply of cartridges' in result['text'] and 'Delivery terms' in result['text']
+    # Пустая страница 2 проверена запасными парсерами — каждым одним открытием
+    assert plumber_open.call_count == 1
+    assert result['used_extractor'] == 'pymupdf'
+    assert [a['name'] for a in result['attempts']][:2] == ['pymupdf', 'pdfplumber']
+    assert result['attempts'][1]['pages'] == 1
+
+
+def test_empty_pages_fall_back_to_heavier_parsers(text_pdf):
+    def page_text(self, document, index, page_texts):
+        # PyMuPDF «не видит» текст первой страницы
+        page_texts.setdefault(index, '' if index == 0 else document[index].get_text('text'))
+        return page_texts[index]
+
+    with patch.object(PdfReader, '_page_text', page_text):
+        result = PdfReader().read_pdf(text_pdf, ocr='off')
+
+    assert result['used_extractor'] == 'pymupdf+pdfplumber'
+    assert 'supply of cartridges' in result['text']
+    assert result['text'].index('supply') < result['text'].index('Delivery')
+
+
+def test_without_pymupdf_uses_cascade(text_pdf):
+    with patch.object(reader_module, 'fitz', None):
+        result = PdfReader().read_pdf(text_pdf, ocr='off')
+    assert result['pages'] == 3
+    assert result['used_extractor'] == 'pdfplumber'
+    assert 'Delivery terms' in result['text']
+
+
+def test_has_text_layer_on_blank_pdf(tmp_path):
+    path = tmp_path / 'blank.pdf'
+    doc = fitz.open()
+    doc.new_page()
+    doc.save(str(path))
+    doc.close()
+    assert PdfReader().has_text_layer(str(path)) is False
+
+
+def test_pdfminer_parses_document_once_for_all_empty_pages(text_pdf):
+    def page_text(self, document, index, page_texts):
+        # PyMuPDF не видит текст ни на одной странице
+        page_texts.setdefault(index, '')
+        return ''
+
+    with patch.object(PdfReader, '_page_text', page_text), \
+            patch.object(reader_module, 'pdfplumber', None), \
+            patch.object(reader_module, 'pypdf', None), \
+            patch.object(reader_module, 'pdfminer_extract_pages',
+                         wraps=reader_module.pdfminer_extract_pages) as extract_pages:
+        result = PdfReader().read_pdf(text_pdf, ocr='off')
+
+    assert extract_pages.call_count == 1
+    assert result['used_extractor'] == 'pdfminer'
+    assert result['text'].index('supply of cartridges') < result['text'].index('Delivery terms')
+
+
+def test_second_stage_gets_remaining_budget(text_pdf):
+    def slow_ocr(self, path, max_pages, lang, timeout_per_page=30, budget_seconds=None):
+        time.sleep(0.5)
+        return '', [{'name': 'ocr', 'ok': False, 'elapsed_ms': 500, 'error': None}]
+
+    budgets = []
+
+    def document_stage(self, document, path, page_texts, budget_seconds, max_pages):
+        budgets.append(budget_seconds)
+        return '', 'none', []
+
+    with patch.object(PdfReader, '_document_has_text', return_value=False), \
+            patch.object(PdfReader, '_extract_text_ocr', slow_ocr), \
+            patch.object(PdfReader, '_extract_text_document', document_stage):
+        PdfReader().read_pdf(text_pdf, ocr='auto', budget_seconds=2.0)
+
+    # OCR «съел» полсекунды из общего бюджета документа
+    assert budgets and budgets[0] <= 1.5
@@ -0,0 +1,167 @@
+"""
+Тесты кэша результатов поиска (webapp/services/search_cache.py).
+
+Юнит-тесты не требуют БД. Проверка триггеров corpus_generations требует
+PostgreSQL с применённой миграцией a3c9e1f4b7d2 — иначе пропускается.
+"""
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from webapp.services.search_cache import SearchResultCache, normalize_terms
+
+
+def test_key_normalizes_terms():
+    assert normalize_terms(['  Договор ', 'ПОСТАВКА  товара', '']) == ('договор', 'поставка товара')
+    key = SearchResultCache.make_key(1, ['Договор'], False, 'fts', 3)
+    assert key == SearchResultCache.make_key(1, ['договор '], False, 'fts', 3)
+    assert key != SearchResultCache.make_key(1, ['договор'], False, 'fts', 4)
+    assert key != SearchResultCache.make_key(1, ['договор'], True, 'fts', 3)
+
+
+def test_size_bounds_and_hit_rate():
+    cache = SearchResultCache(max_entries=2, max_results=5)
+    cache.put('a', [1, 2])
+    cache.put('b', [3])
+    assert cache.get('a') == [1, 2]
+    cache.put('c', [4])  # вытесняет 'b' (давно не использовалась)
+    assert cache.get('b') is None
+    cache.put('d', [5, 6, 7, 8])  # суммарно > max_results: вытесняются старые
+    assert cache.stats()['results'] <= 5
+    cache.put('huge', list(range(10)))  # больше всего кэша — не сохраняется
+    assert cache.get('huge') is None
+
+    stats = cache.stats()
+    assert stats['skipped'] == 1
+    assert stats['evictions'] >= 2
+    assert stats['hit_rate'] == round(stats['hits'] / (stats['hits'] + stats['misses']), 4)
+
+
+def test_returned_list_is_a_copy():
+    cache = SearchResultCache()
+    cache.put('k', [{'doc_id': 1}])
+    cache.get('k').append({'doc_id': 2})
+    assert cache.get('k') == [{'doc_id': 1}]
+
+
+def test_cached_search_reuses_results_until_generation_changes(app):
+    from webapp.routes.search import _cached_search_in_db
+
+    cache = SearchResultCache()
+    generation = {'value': 7}
+    with app.test_request_context(), \
+         patch('webapp.routes.search.get_search_cache', return_value=cache), \
+         patch('webapp.routes.search.get_corpus_generation', side_effect=lambda conn, uid: generation['value']), \
+         patch('webapp.routes.search._search_in_db', return_value=[{'doc_id': 1}]) as search_in_db:
+        db = MagicMock()
+        for _ in range(3):
+            assert _cached_search_in_db(db, 1, ['договор'], mode='fts') == [{'doc_id': 1}]
+        assert search_in_db.call_count == 1
+
+        generation['value'] = 8  # проиндексирован/удалён документ
+        _cached_search_in_db(db, 1, ['договор'], mode='fts')
+        assert search_in_db.call_count == 2
+
+        # Без версии корпуса — мимо кэша
+        with patch('webapp.routes.search.get_corpus_generation', side_effect=RuntimeError('нет таблицы')):
+            _cached_search_in_db(db, 1, ['договор'], mode='fts')
+        assert search_in_db.call_count == 3
+
+
+@pytest.fixture()
+def pg_conn():
+    try:
+        from webapp.db import engine
+        conn = engine.raw_connection()
+    except Exception as e:
+        pytest.skip(f'PostgreSQL недоступен: {e}')
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('public.corpus_generations');")
+            if cur.fetchone()[0] is None:
+                pytest.skip('Нет таблицы corpus_generations (alembic upgrade head)')
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def test_triggers_bump_generation_on_soft_delete_and_restore(pg_conn):
+    from webapp.services.search_cache import get_corpus_generation
+
+    with pg_conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO users (email, password_hash, role, created_at)
+            VALUES ('cache_test@example.local', 'x', 'user', NOW()) RETURNING id;
+        """)
+        user_id = cur.fetchone()[0]
+        cur.execute("""
+            INSERT INTO documents (sha256, size_bytes, mime, parse_status, indexing_cost_seconds)
+            VALUES (md5(random()::text) || md5(random()::text), 1, 'text/plain', 'indexed', 0) RETURNING id;
+        """)
+        doc_id = cur.fetchone()[0]
+        cur.execute("""
+            INSERT INTO user_documents (user_id, document_id, original_filename, user_path)
+            VALUES (%s, %s, 'a.txt', 'a.txt');
+        """, (user_id, doc_id))
+    after_insert = get_corpus_generation(pg_conn, user_id)
+    assert after_insert >= 1
+
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE user_documents SET is_soft_deleted = TRUE WHERE user_id = %s;", (user_id,))
+    after_delete = get_corpus_generation(pg_conn, user_id)
+    assert after_delete > after_insert
+
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE user_documents SET is_soft_deleted = FALSE WHERE user_id = %s;", (user_id,))
+    assert get_corpus_generation(pg_conn, user_id) > after_delete
+
+
+def test_bulk_insert_bumps_generation_once(pg_conn):
+    from webapp.services.search_cache import get_corpus_generation
+
+    with pg_conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO users (email, password_hash, role, created_at)
+            VALUES ('cache_bulk_test@example.local', 'x', 'user', NOW()) RETURNING id;
+        """)
+        user_id = cur.fetchone()[0]
+        cur.execute("""
+            INSERT INTO documents (sha256, size_bytes, mime, parse_status, indexing_cost_seconds)
+            SELECT md5(random()::text) || md5(random()::text), 1, 'text/plain', 'indexed', 0
+            FROM generate_series(1, 3) RETURNING id;
+        """)
+        doc_ids = [row[0] for row in cur.fetchall()]
+        # Триггер уровня оператора: три строки — одно увеличение generation
+        cur.execute("""
+            INSERT INTO user_documents (user_id, document_id, original_filename, user_path)
+            SELECT %s, d, 'a.txt', 'a.txt' FROM unnest(%s::int[]) AS d;
+        """, (user_id, doc_ids))
+    assert get_corpus_generation(pg_conn, user_id) == 1
+
+    with pg_conn.cursor() as cur:
+        # Изменение неотслеживаемого столбца корпус не меняет
+        cur.execute("UPDATE user_documents SET access_level = 'read' WHERE user_id = %s;", (user_id,))
+        cur.execute("DELETE FROM user_documents WHERE user_id = %s;", (user_id,))
+    assert get_corpus_generation(pg_conn, user_id) == 2
+
+
+def test_chunks_fallback_after_index_error_is_not_cached(app):
+    from webapp.routes.search import _cached_search_in_db
+
+    cache = SearchResultCache()
+    with app.test_request_context(), \
+         patch('webapp.routes.search.get_search_cache', return_value=cache), \
+         patch('webapp.routes.search.get_corpus_generation', return_value=7), \
+         patch('webapp.routes.search._search_in_db', side_effect=RuntimeError('lock timeout')) as search_in_db, \
+         patch('webapp.routes.search._search_in_chunks', return_value=[{'doc_id': 2}]) as search_in_chunks:
+        db = MagicMock()
+        assert _cached_search_in_db(db, 1, ['договор'], mode='fts') == [{'doc_id': 2}]
+        assert search_in_db.call_args.kwargs['fallback_on_error'] is False
+        assert search_in_chunks.call_count == 1
+
+        # Деградированная выдача не закэширована: следующий запрос снова идёт в search_index
+        search_in_db.side_effect = None
+        search_in_db.return_value = [{'doc_id': 1}]
+        assert _cached_search_in_db(db, 1, ['договор'], mode='fts') == [{'doc_id': 1}]
+        assert cache.stats()['results'] == 1
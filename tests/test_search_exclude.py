@@ -0,0 +1,81 @@
+"""
+Тесты exclude_mode: документы без терминов считаются на уровне документа
+(anti-join к множеству найденных по индексу), а не через NOT ILIKE по чанкам.
+
+БД не требуется: курсор psycopg2 подменяется моком. План запроса с Anti Join
+проверяется в tests/test_search_index_trgm.py (нужен PostgreSQL).
+"""
+from unittest.mock import MagicMock, patch
+
+from webapp.db.repositories.search_index_repository import SearchIndexRepository
+from webapp.routes.search import _search_in_chunks, _search_in_db
+
+
+def _conn(rows):
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.fetchall.return_value = rows
+    return conn, cursor
+
+
+def _rag_db(conn):
+    db = MagicMock()
+    db.db.connect.return_value.__enter__.return_value = conn
+    return db
+
+
+def test_search_excluding_anti_joins_visible_documents():
+    conn, cursor = _conn([(None, 7, {'original_filename': 'a.txt', 'user_path': 'п/a.txt'})])
+
+    rows = SearchIndexRepository(conn).search_excluding(1, ['поставка', 'картр*'], limit=10, after_document_id=3)
+
+    sql, params = cursor.execute.call_args[0]
+    assert 'NOT ILIKE' not in sql
+    assert 'NOT EXISTS (SELECT 1 FROM matched WHERE matched.document_id = ud.document_id)' in sql
+    assert 'm.search_vector @@' in sql and 'm.content ILIKE' in sql  # fts и подстрока
+    assert 'FROM user_documents ud' in sql and 'ud.is_soft_deleted = FALSE' in sql
+    assert sql.count('%s') == len(params)
+    assert '%картр%' in params  # префикс ищется как подстрока без *
+    assert params[-2:] == [3, 10]
+    assert rows == [{'id': None, 'document_id': 7, 'metadata': {'original_filename': 'a.txt', 'user_path': 'п/a.txt'}}]
+
+
+def test_search_excluding_substring_mode_skips_tsvector():
+    conn, cursor = _conn([])
+    SearchIndexRepository(conn).search_excluding(1, ['100%'], mode='substring')
+
+    sql, params = cursor.execute.call_args[0]
+    assert 'search_vector' not in sql
+    assert params[1] == '%100\\%%'
+    assert sql.count('%s') == len(params)
+
+
+def test_search_in_db_exclude_uses_index_not_chunks(app):
+    repo = MagicMock()
+    repo.search_excluding.return_value = [
+        {'id': 1, 'document_id': 5, 'metadata': {'original_filename': 'b.pdf', 'user_path': 'папка\\b.pdf'}},
+    ]
+    db = _rag_db(MagicMock())
+    with app.test_request_context(), \
+         patch('webapp.db.repositories.search_index_repository.SearchIndexRepository', return_value=repo), \
+         patch('webapp.routes.search._search_in_chunks') as search_in_chunks:
+        results = _search_in_db(db, 1, ['договор'], exclude_mode=True, mode='fts')
+
+    search_in_chunks.assert_not_called()
+    assert repo.search_excluding.call_args[1]['mode'] == 'fts'
+    assert results[0]['doc_id'] == 5 and results[0]['status'] == 'no_match'
+    assert results[0]['filename'] == 'b.pdf' and results[0]['source'] == results[0]['path']
+    assert results[0]['per_term'] == [] and results[0]['match_count'] == 0
+
+
+def test_chunks_fallback_excludes_by_whole_document(app):
+    conn, cursor = _conn([(9, 'c.docx', 'c.docx')])
+    with app.test_request_context():
+        results = _search_in_chunks(_rag_db(conn), 1, ['договор', 'счёт'], exclude_mode=True)
+
+    sql, params = cursor.execute.call_args[0]
+    assert 'NOT ILIKE' not in sql
+    assert 'NOT EXISTS (SELECT 1 FROM chunks c WHERE c.document_id = d.id AND (c.text ILIKE %s OR c.text ILIKE %s))' in sql
+    assert params == [1, '%договор%', '%счёт%']
+    assert [r['doc_id'] for r in results] == [9]
+    assert results[0]['source'] == 'c.docx'
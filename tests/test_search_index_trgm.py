@@ -0,0 +1,231 @@
+"""
+Регрессионные тесты плана запросов SearchIndexRepository (pg_trgm, tsvector).
+
+Поиск подстрок (ILIKE '%kw%') должен обслуживаться trigram GIN индексом по
+search_index.content, а морфологический поиск — GIN индексом по search_vector,
+а не последовательным сканированием всех документов.
+Проверяем через EXPLAIN реальных запросов репозитория на засеянных временных
+копиях таблиц (временные таблицы перекрывают постоянные в search_path,
+транзакция откатывается).
+
+Требуется PostgreSQL с применённой миграцией d7f3a1c8e502 — иначе тесты пропускаются.
+"""
+import pytest
+
+from webapp.db.repositories.search_index_repository import (
+    SearchIndexRepository, SEARCH_MODE_SUBSTRING
+)
+
+
+RARE_TERM = 'аэростат'
+SEED_ROWS = 5000
+
+
+class _ExplainCursor:
+    """Курсор, который вместо выполнения запроса сохраняет его план."""
+
+    def __init__(self, owner):
+        self.owner = owner
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        with self.owner.conn.cursor() as cur:
+            cur.execute('EXPLAIN ' + query, params)
+            self.owner.plans.append('\n'.join(row[0] for row in cur.fetchall()))
+
+    def fetchall(self):
+        return []
+
+    def fetchone(self):
+        return None
+
+
+class _ExplainConnection:
+    """Обёртка psycopg2 connection для SearchIndexRepository, собирающая планы."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.plans = []
+
+    def cursor(self):
+        return _ExplainCursor(self)
+
+
+@pytest.fixture()
+def seeded_conn():
+    """psycopg2 соединение с засеянными временными search_index/user_documents."""
+    try:
+        from webapp.db import engine
+        conn = engine.raw_connection()
+    except Exception as e:
+        pytest.skip(f'PostgreSQL недоступен: {e}')
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT 1 FROM pg_indexes
+                WHERE tablename = 'search_index' AND indexname = 'idx_search_index_content_trgm';
+            """)
+            if not cur.fetchone():
+                pytest.skip('Нет индекса idx_search_index_content_trgm (alembic upgrade head)')
+
+            cur.execute("CREATE TEMP TABLE search_index (LIKE public.search_index INCLUDING DEFAULTS INCLUDING INDEXES) ON COMMIT DROP;")
+            cur.execute("CREATE TEMP TABLE user_documents (LIKE public.user_documents INCLUDING DEFAULTS INCLUDING INDEXES) ON COMMIT DROP;")
+            cur.execute(f"""
+                INSERT INTO search_index (id, document_id, user_id, content, created_at)
+                SELECT g, g, 1,
+                       repeat('поставка товара по договору ' || md5(g::text) || ' ', 20)
+                           || CASE WHEN g % 1000 = 0 THEN ' {RARE_TERM}' ELSE '' END,
+                       NOW()
+                FROM generate_series(1, {SEED_ROWS}) g;
+            """)
+            # Триггер на временную таблицу не копируется
+            cur.execute("UPDATE search_index SET search_vector = to_tsvector('russian', content);")
+            cur.execute("""
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'search_index' AND column_name = 'content_squashed';
+            """)
+            if cur.fetchone():
+                cur.execute("UPDATE search_index SET content_squashed = squash_search_text(content);")
+            cur.execute(f"""
+                INSERT INTO user_documents (id, user_id, document_id, original_filename, user_path,
+                                            is_soft_deleted, created_at, access_level)
+                SELECT g, 1, g, 'doc_' || g || '.txt', 'doc_' || g || '.txt', FALSE, NOW(), 'read'
+                FROM generate_series(1, {SEED_ROWS}) g;
+            """)
+            cur.execute("ANALYZE search_index;")
+            cur.execute("ANALYZE user_documents;")
+            cur.execute("""
+                SELECT indexname FROM pg_indexes
+                WHERE tablename = 'search_index' AND schemaname LIKE 'pg_temp%%'
+                  AND indexdef LIKE '%%(content gin_trgm_ops)%%';
+            """)
+            trgm_index = cur.fetchone()[0]
+            cur.execute("""
+                SELECT indexname FROM pg_indexes
+                WHERE tablename = 'search_index' AND schemaname LIKE 'pg_temp%%'
+                  AND indexdef LIKE '%%search_vector%%';
+            """)
+            fts_index = cur.fetchone()[0]
+        yield conn, trgm_index, fts_index
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def test_build_substring_condition_escapes_like_wildcards():
+    """% и _ в пользовательском вводе ищутся буквально."""
+    condition, params = SearchIndexRepository.build_substring_condition(['50%', 'a_b', ''], alias='x')
+    assert condition == '(x.content ILIKE %s OR x.content ILIKE %s)'
+    assert params == ['%50\\%%', '%a\\_b%']
+
+
+def test_substring_search_uses_trgm_index(seeded_conn):
+    """search() не должен сканировать search_index последовательно."""
+    conn, trgm_index, _ = seeded_conn
+    explain_conn = _ExplainConnection(conn)
+
+    SearchIndexRepository(explain_conn).search(1, [RARE_TERM], limit=50, mode=SEARCH_MODE_SUBSTRING)
+
+    # Один план: основной запрос не упал в fallback simple_search
+    assert len(explain_conn.plans) == 1
+    plan = explain_conn.plans[0]
+    assert 'Seq Scan on search_index' not in plan, plan
+    assert trgm_index in plan, plan
+
+
+def test_exclude_search_uses_trgm_index_for_match_set(seeded_conn):
+    """search_excluding() находит документы с терминами по trigram индексу (anti-join)."""
+    conn, trgm_index, _ = seeded_conn
+    explain_conn = _ExplainConnection(conn)
+
+    SearchIndexRepository(explain_conn).search_excluding(1, [RARE_TERM], limit=50)
+
+    plan = explain_conn.plans[0]
+    assert 'Anti Join' in plan, plan
+    assert trgm_index in plan, plan
+
+
+def test_build_tsquery_escapes_user_input():
+    """Операторы tsquery/websearch в вводе не интерпретируются."""
+    assert SearchIndexRepository.build_tsquery('поставки') == (
+        "websearch_to_tsquery('russian', %s)", ['"поставки"'])
+    # Фраза в кавычках: - и or не становятся операторами, кавычки ввода убираются
+    assert SearchIndexRepository.build_tsquery('срок "поставки" -or') == (
+        "websearch_to_tsquery('russian', %s)", ['"срок поставки -or"'])
+    # Префикс: только слова, &|!():' из ввода отбрасываются
+    assert SearchIndexRepository.build_tsquery("картр&|!(':*") == (
+        "to_tsquery('russian', %s)", ['картр:*'])
+    assert SearchIndexRepository.build_tsquery('44 фз*') == (
+        "to_tsquery('russian', %s)", ['44 <-> фз:*'])
+    assert SearchIndexRepository.build_tsquery('№ %') == ('', [])
+
+
+def test_build_fts_condition_falls_back_to_substring_for_non_words():
+    condition, params, query, query_params = SearchIndexRepository.build_fts_condition(
+        ['поставки', '№', 'постав*'], alias='x')
+    assert condition.count('x.search_vector @@') == 2
+    assert 'x.content ILIKE %s' in condition
+    assert condition.count('%s') == len(params)
+    assert params == ['"поставки"', '"поставки"', '%поставки%', '%№%',
+                      'постав:*', 'постав:*', '%постав%']
+    assert query == "(websearch_to_tsquery('russian', %s) || to_tsquery('russian', %s))"
+    assert query_params == ['"поставки"', 'постав:*']
+
+
+def test_search_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        SearchIndexRepository(object()).search(1, ['поставка'], mode='regex')
+
+
+def test_fts_search_uses_search_vector_index(seeded_conn):
+    """Морфологический search() фильтрует через GIN индекс по search_vector."""
+    conn, _, fts_index = seeded_conn
+    explain_conn = _ExplainConnection(conn)
+
+    # Словоформа редкого термина: «аэростаты» → лексема «аэростат»
+    SearchIndexRepository(explain_conn).search(1, ['аэростаты'], limit=50)
+
+    assert len(explain_conn.plans) == 1
+    plan = explain_conn.plans[0]
+    assert 'Seq Scan on search_index' not in plan, plan
+    assert fts_index in plan, plan
+
+
+def test_fts_search_finds_word_forms(seeded_conn):
+    """«аэростаты» находит документы с «аэростат», префикс — тоже."""
+    conn, _, _ = seeded_conn
+    repo = SearchIndexRepository(conn)
+
+    expected = SEED_ROWS // 1000
+    for terms in (['аэростаты'], ['аэрос*']):
+        results = repo.search(1, terms, limit=50)
+        assert len(results) == expected
+        assert all(r['term_hits'][terms[0]] > 0 for r in results)
+    assert repo.search(1, ['аэростаты'], limit=50, mode=SEARCH_MODE_SUBSTRING) == []
+
+
+def test_tolerant_search_uses_squashed_trgm_index(seeded_conn):
+    """Поиск с разрывами (content_squashed) тоже идёт по trigram индексу."""
+    conn, _, _ = seeded_conn
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT indexname FROM pg_indexes
+            WHERE tablename = 'search_index' AND schemaname LIKE 'pg_temp%%'
+              AND indexdef LIKE '%%content_squashed gin_trgm_ops%%';
+        """)
+        row = cur.fetchone()
+    if not row:
+        pytest.skip('Нет индекса по content_squashed (alembic upgrade head)')
+    explain_conn = _ExplainConnection(conn)
+
+    SearchIndexRepository(explain_conn, tolerant=True).search(1, [RARE_TERM], limit=50, mode=SEARCH_MODE_SUBSTRING)
+
+    plan = explain_conn.plans[0]
+    assert 'Seq Scan on search_index' not in plan, plan
+    assert row[0] in plan, plan
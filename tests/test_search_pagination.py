@@ -0,0 +1,109 @@
+"""
+Тесты постраничного поиска: keyset-курсоры, /search/page и NDJSON /search/stream.
+
+БД не требуется: курсор psycopg2 и _search_page подменяются моками.
+"""
+import json
+from unittest.mock import MagicMock, patch
+
+from webapp.db.repositories.search_index_repository import SearchIndexRepository
+from webapp.routes.search import _decode_cursor, _encode_cursor, _search_page
+
+
+def _conn(rows):
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.fetchall.return_value = rows
+    return conn, cursor
+
+
+def test_cursor_roundtrip_keeps_exact_rank():
+    rank = 0.06079271063208580  # значение real из ts_rank
+    cursor = _encode_cursor(rank, 42, 'fts')
+    assert _decode_cursor(cursor) == (rank, 42, 'fts')
+
+
+def test_search_page_uses_keyset_after_cursor():
+    conn, cursor = _conn([(5, {'user_path': 'a/b.txt'}, 0.5, [2])])
+    repo = SearchIndexRepository(conn)
+
+    rows = repo.search_page(1, ['поставка'], page_size=10, after=(0.75, 3))
+
+    sql, params = cursor.execute.call_args[0]
+    assert 'si.rank < %s::real OR (si.rank = %s::real AND si.document_id > %s)' in sql
+    assert 'ORDER BY si.rank DESC, si.document_id' in sql
+    assert 'content' not in sql.split('FROM (')[0]  # тексты документов не читаются
+    assert sql.count('%s') == len(params)
+    assert params[-4:] == [0.75, 0.75, 3, 10]
+    assert rows == [{'document_id': 5, 'metadata': {'user_path': 'a/b.txt'}, 'rank': 0.5,
+                     'term_hits': {'поставка': 2}}]
+
+
+def test_page_returns_next_cursor_and_compact_rows():
+    repo = MagicMock()
+    repo.search_page.return_value = [
+        {'document_id': i, 'metadata': {'user_path': f'папка/{i}.txt'}, 'rank': 1.0 / i,
+         'term_hits': {'договор': 1}}
+        for i in range(1, 4)
+    ]
+    db = MagicMock()
+    with patch('webapp.db.repositories.search_index_repository.SearchIndexRepository', return_value=repo), \
+         patch('webapp.routes.search._count_terms_in_chunks', return_value={(1, 'договор'): (4, '')}):
+        results, next_cursor, mode = _search_page(db, 1, ['договор'], mode='fts', page_size=2)
+
+    assert repo.search_page.call_args[0][2] == 3  # page_size + 1: признак следующей страницы
+    assert [r['doc_id'] for r in results] == [1, 2]
+    assert results[0] == {'doc_id': 1, 'path': 'папка/1.txt', 'rank': 1.0,
+                          'match_count': 4, 'terms': {'договор': 4}}
+    assert results[1]['terms'] == {'договор': 1}  # только словоформа — счётчик по лексемам
+    assert _decode_cursor(next_cursor) == (0.5, 2, 'fts')
+
+    repo.search_page.reset_mock()
+    repo.search_page.return_value = []
+    with patch('webapp.db.repositories.search_index_repository.SearchIndexRepository', return_value=repo):
+        results, next_cursor, _ = _search_page(db, 1, ['договор'], cursor=next_cursor, page_size=2)
+    assert repo.search_page.call_args[1]['after'] == (0.5, 2)
+    assert results == [] and next_cursor is None
+
+
+def test_exclude_pages_keep_request_search_mode():
+    repo = MagicMock()
+    repo.search_excluding.return_value = [{'document_id': i, 'metadata': {}} for i in range(1, 4)]
+    db = MagicMock()
+    with patch('webapp.db.repositories.search_index_repository.SearchIndexRepository', return_value=repo):
+        _, next_cursor, mode = _search_page(db, 1, ['договор'], exclude_mode=True, mode='substring', page_size=2)
+        assert repo.search_excluding.call_args[1]['mode'] == 'substring'
+        assert mode == 'exclude:substring'
+        assert _decode_cursor(next_cursor)[1:] == (2, 'exclude:substring')
+
+        # Следующие страницы — тем же режимом, что и первая
+        repo.search_excluding.return_value = []
+        _search_page(db, 1, ['договор'], cursor=next_cursor, page_size=2)
+        assert repo.search_excluding.call_args[1]['mode'] == 'substring'
+        assert repo.search_excluding.call_args[1]['after_document_id'] == 2
+
+
+def test_page_endpoint_rejects_bad_cursor(app, auth_client):
+    response = auth_client.post('/search/page', json={'search_terms': 'договор', 'cursor': '%%%'})
+    assert response.status_code == 400
+
+
+def test_stream_emits_pages_as_ndjson(app, auth_client):
+    pages = [
+        ([{'doc_id': 1}], 'c1', 'fts'),
+        ([{'doc_id': 2}], None, 'fts'),
+    ]
+    with patch('webapp.routes.search._get_rag_db'), \
+         patch('webapp.routes.search._search_page', side_effect=pages) as search_page, \
+         patch('webapp.routes.search._update_document_access_metrics'), \
+         patch('webapp.routes.search._remember_search_terms'):
+        response = auth_client.post('/search/stream', json={'search_terms': 'договор', 'page_size': 1})
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert response.mimetype == 'application/x-ndjson'
+    assert lines == [
+        {'results': [{'doc_id': 1}], 'next_cursor': 'c1'},
+        {'results': [{'doc_id': 2}], 'next_cursor': None},
+        {'done': True, 'total': 2, 'next_cursor': None},
+    ]
+    assert search_page.call_args_list[1][1]['cursor'] == 'c1'
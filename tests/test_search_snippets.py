@@ -0,0 +1,69 @@
+"""
+Тесты ленивых сниппетов SearchIndexRepository (ts_headline только для первых строк).
+
+БД не требуется: курсор подменяется моком, проверяются выполненные запросы.
+"""
+from unittest.mock import MagicMock, patch
+
+from webapp.db.repositories.search_index_repository import SearchIndexRepository
+
+
+def _conn(fetchall_results):
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.fetchall.side_effect = list(fetchall_results)
+    return conn, cursor
+
+
+def test_snippet_window_is_bounded_around_first_match():
+    content = 'вступление ' * 1000 + 'срок поставки товара ' + 'хвост ' * 1000
+    window = SearchIndexRepository.snippet_window(content, ['поставка'], radius=200)
+    assert len(window) == 400
+    # Словоформа найдена по основе слова
+    assert 'поставки' in window
+
+    short = 'короткий текст'
+    assert SearchIndexRepository.snippet_window(short, ['нет'], radius=200) == short
+    assert SearchIndexRepository.snippet_window(content, ['аэростат'], radius=50) == content[:100]
+
+
+def test_search_builds_headlines_only_for_top_rows():
+    """Основной запрос без ts_headline; сниппеты — одним запросом для первых snippet_limit строк."""
+    rows = [(i, i, f'текст {i} поставка', None, 1.0 / i, [1]) for i in range(1, 6)]
+    conn, cursor = _conn([rows, [('<b>поставка</b> 1',), ('<b>поставка</b> 2',)]])
+
+    results = SearchIndexRepository(conn).search(1, ['поставка'], limit=5, snippet_limit=2)
+
+    assert cursor.execute.call_count == 2
+    main_sql, headline_sql = (c[0][0] for c in cursor.execute.call_args_list)
+    assert 'ts_headline' not in main_sql
+    assert 'ts_headline' in headline_sql
+    windows = cursor.execute.call_args_list[1][0][1][-1]
+    assert windows == ['текст 1 поставка', 'текст 2 поставка']
+
+    assert [r['snippet'] for r in results] == ['<b>поставка</b> 1', '<b>поставка</b> 2', None, None, None]
+    assert results[0]['term_hits'] == {'поставка': 1}
+
+
+def test_get_snippets_returns_only_visible_documents():
+    conn, cursor = _conn([[(7, 'договор поставки')], [('договор <b>поставки</b>',)]])
+
+    snippets = SearchIndexRepository(conn).get_snippets(1, [7, 8], ['поставка'])
+
+    assert snippets == {7: 'договор <b>поставки</b>'}
+    assert cursor.execute.call_args_list[0][0][1] == (1, [7, 8])
+
+
+def test_snippets_endpoint_validates_and_uses_repository(app, auth_client):
+    response = auth_client.post('/search/snippets', json={'search_terms': 'поставка'})
+    assert response.status_code == 400
+
+    with patch('webapp.routes.search._get_rag_db'), \
+         patch('webapp.db.repositories.search_index_repository.SearchIndexRepository.get_snippets',
+               return_value={3: '<b>поставка</b>'}) as get_snippets:
+        response = auth_client.post('/search/snippets',
+                                    json={'search_terms': 'поставка', 'doc_ids': [3, '4']})
+
+    assert response.status_code == 200
+    assert response.get_json() == {'snippets': {'3': '<b>поставка</b>'}}
+    assert get_snippets.call_args[0][:3] == (1, [3, 4], ['поставка'])
@@ -0,0 +1,44 @@
+"""
+Тесты агрегированного подсчёта терминов по chunks (_count_terms_in_chunks).
+
+БД не требуется: проверяем, что на весь набор документов и терминов
+выполняется ровно один запрос и результат раскладывается по парам (документ, термин).
+"""
+from unittest.mock import MagicMock
+
+from webapp.routes.search import _count_terms_in_chunks
+
+
+def _conn_with_rows(rows):
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.fetchall.return_value = rows
+    return conn, cursor
+
+
+def test_single_query_for_all_documents_and_terms():
+    """Один execute на весь результат, ord из unnest сопоставляется с исходным термином."""
+    conn, cursor = _conn_with_rows([
+        (1, 1, 3, 'первый чанк с договор'),
+        (1, 2, 1, 'чанк со словом поставка'),
+        (2, 2, 4, 'поставка поставка'),
+    ])
+
+    counts = _count_terms_in_chunks(conn, [1, 2, 3], ['Договор', 'поставка'])
+
+    assert cursor.execute.call_count == 1
+    params = cursor.execute.call_args[0][1]
+    assert params == (['Договор', 'поставка'], [1, 2, 3])
+    assert counts == {
+        (1, 'Договор'): (3, 'первый чанк с договор'),
+        (1, 'поставка'): (1, 'чанк со словом поставка'),
+        (2, 'поставка'): (4, 'поставка поставка'),
+    }
+
+
+def test_empty_input_skips_query():
+    """Без документов или терминов запрос к БД не выполняется."""
+    conn, cursor = _conn_with_rows([])
+    assert _count_terms_in_chunks(conn, [], ['a']) == {}
+    assert _count_terms_in_chunks(conn, [1], ['']) == {}
+    cursor.execute.assert_not_called()
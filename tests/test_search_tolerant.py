@@ -0,0 +1,105 @@
+"""
+Тесты толерантного поиска: термины, разорванные пробелом, дефисом или переносом
+строки («по-ставка», «пос тавка»), находятся по search_index.content_squashed.
+
+Юнит-тесты не требуют БД. Сверка squash_search_text с Python требует PostgreSQL с применённой
+миграцией b7e2d94c1f38 — иначе пропускается.
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from webapp.db.repositories.search_index_repository import SearchIndexRepository
+from webapp.routes.search import _count_terms_in_chunks, _make_snippet
+
+
+def test_squash_removes_gaps_and_soft_breaks():
+    assert SearchIndexRepository.squash('по-\nстав\u00adка  то\u00a0вара') == 'поставкатовара'
+    assert SearchIndexRepository.tolerant_term('постав*') == 'постав'
+    assert SearchIndexRepository.tolerant_term('44 фз') == '44фз'
+    assert SearchIndexRepository.tolerant_term('фз') is None  # слишком короткий
+
+
+def test_locate_tolerant_maps_back_to_original_text():
+    text = 'Итог: по-\nСТАВКА товара'
+    start, end = SearchIndexRepository.locate_tolerant(text, 'поставка')
+    assert text[start:end] == 'по-\nСТАВКА'
+    assert SearchIndexRepository.locate_tolerant(text, 'отгрузка') is None
+
+
+def test_conditions_add_squashed_match_only_when_enabled():
+    condition, params = SearchIndexRepository.build_substring_condition(['по-ставка', 'фз'], alias='x')
+    assert 'content_squashed' not in condition
+
+    condition, params = SearchIndexRepository.build_substring_condition(
+        ['по-ставка', 'фз'], alias='x', tolerant=True)
+    assert condition == '(x.content ILIKE %s OR x.content_squashed ILIKE %s OR x.content ILIKE %s)'
+    assert params == ['%по-ставка%', '%поставка%', '%фз%']
+
+    condition, params, _, _ = SearchIndexRepository.build_fts_condition(['поставка', '№'], alias='x', tolerant=True)
+    assert condition.count('x.content_squashed ILIKE %s') == 1
+    assert condition.count('%s') == len(params)
+
+
+def test_repository_search_uses_squashed_column():
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.fetchall.return_value = []
+
+    SearchIndexRepository(conn, tolerant=True).search(1, ['поставка'], mode='substring')
+
+    sql, params = cursor.execute.call_args[0]
+    assert 'si.content_squashed ILIKE %s' in sql
+    assert sql.count('%s') == len(params)
+
+
+def test_snippet_and_counts_see_gapped_terms():
+    snippet = _make_snippet('Начало. Предмет: по- ставка картриджей. Конец.', ['поставка'], context_chars=5)
+    assert 'по- ставка' in snippet
+
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.fetchall.return_value = [(3, 1, 2, 'по-ставка')]
+    counts = _count_terms_in_chunks(conn, [3], ['поставка', 'фз'], tolerant=True)
+    sql, params = cursor.execute.call_args[0]
+    # Склеенный текст chunk вычисляется один раз (LATERAL), а не в условии и в подсчёте
+    assert sql.count('squash_search_text(') == 1
+    assert params == (['поставка', 'фз'], ['поставка', None], [3])
+    assert counts == {(3, 'поставка'): (2, 'по-ставка')}
+
+
+def test_counts_without_tolerant_terms_skip_squash():
+    """Без склеенных терминов squash_search_text не вызывается (работает и без миграции)."""
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.fetchall.return_value = []
+    for tolerant in (False, True):
+        _count_terms_in_chunks(conn, [3], ['фз'], tolerant=tolerant)
+        sql, params = cursor.execute.call_args[0]
+        assert 'squash_search_text' not in sql
+        assert params == (['фз'], [3])
+
+
+@pytest.fixture()
+def pg_conn():
+    try:
+        from webapp.db import engine
+        conn = engine.raw_connection()
+    except Exception as e:
+        pytest.skip(f'PostgreSQL недоступен: {e}')
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regproc('public.squash_search_text');")
+            if cur.fetchone()[0] is None:
+                pytest.skip('Нет функции squash_search_text (alembic upgrade head)')
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def test_squash_function_matches_python(pg_conn):
+    text = 'по-\nстав\u00adка\tто\u200bвара \ufeffитог'
+    with pg_conn.cursor() as cur:
+        cur.execute("SELECT squash_search_text(%s);", (text,))
+        assert cur.fetchone()[0] == SearchIndexRepository.squash(text)
@@ -0,0 +1,168 @@
+"""
+Тесты отложенной записи побочных эффектов поиска (SearchWriteBuffer).
+
+БД не требуется: сессия подменяется моком, который запоминает выполненные запросы.
+"""
+import time
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.exc import IntegrityError
+
+from webapp.services.search_write_buffer import HISTORY_MAX_ATTEMPTS, SearchWriteBuffer
+
+
+class _RecordingSessionFactory:
+    """Фабрика сессий, запоминающая (SQL или таблица, параметры) каждого execute."""
+
+    def __init__(self, fail: bool = False, history_error=None):
+        self.statements = []
+        self.commits = 0
+        self.fail = fail
+        self.history_error = history_error  # history_error(rows) -> исключение INSERT истории или None
+
+    def __call__(self):
+        session = MagicMock()
+        staged = []
+
+        def _execute(stmt, params):
+            if self.fail:
+                raise RuntimeError('БД недоступна')
+            table = getattr(stmt, 'table', None)
+            if table is not None and self.history_error:
+                error = self.history_error(params)
+                if error is not None:
+                    raise error
+            staged.append((table.name if table is not None else str(stmt), params))
+
+        def _commit():
+            self.statements.extend(staged)
+            self.commits += 1
+
+        session.execute.side_effect = _execute
+        session.commit.side_effect = _commit
+        return session
+
+
+def test_access_is_coalesced_per_document():
+    """Повторные обращения схлопываются: один UPDATE с числом обращений на документ."""
+    factory = _RecordingSessionFactory()
+    buffer = SearchWriteBuffer(session_factory=factory, flush_interval=60)
+    buffer.record_access([3, 1])
+    buffer.record_access([3])
+    buffer.record_access([3, None])
+
+    assert factory.statements == []  # ничего не записано в потоке запроса
+    assert buffer.flush()
+
+    assert len(factory.statements) == 1 and factory.commits == 1
+    sql, params = factory.statements[0]
+    assert 'UPDATE documents' in sql
+    assert params['ids'] == [1, 3]
+    assert params['hits'] == [1, 3]
+    assert buffer.stats()['pending_documents'] == 0
+    buffer.shutdown()
+
+
+def test_terms_and_history_flush_in_separate_transactions():
+    factory = _RecordingSessionFactory()
+    buffer = SearchWriteBuffer(session_factory=factory, flush_interval=60)
+    buffer.record_last_search_terms(5, 'старые')
+    buffer.record_last_search_terms(5, 'поставка,картридж')
+    buffer.record_history(5, 'поставка', 3)
+    assert buffer.pending_last_search_terms(5) == 'поставка,картридж'
+
+    buffer.flush()
+
+    assert factory.commits == 2
+    (terms_sql, terms_params), (table, rows) = factory.statements
+    assert 'UPDATE file_search_state' in terms_sql
+    assert terms_params == {'users': [5], 'terms': ['поставка,картридж']}
+    assert table == 'search_history' and rows[0]['query_text'] == 'поставка'
+    assert buffer.pending_last_search_terms(5) is None
+    buffer.shutdown()
+
+
+def test_failed_flush_keeps_data_for_next_attempt():
+    factory = _RecordingSessionFactory(fail=True)
+    buffer = SearchWriteBuffer(session_factory=factory, flush_interval=60)
+    buffer.record_access([7])
+    assert not buffer.flush()
+    buffer.record_access([7])
+
+    factory.fail = False
+    assert buffer.flush()
+    assert factory.statements[0][1]['hits'] == [2]
+    assert buffer.stats()['failed_flushes'] == 1
+    buffer.shutdown()
+
+
+def test_history_error_does_not_roll_back_access():
+    factory = _RecordingSessionFactory(
+        history_error=lambda rows: IntegrityError('INSERT', {}, Exception('fk_violation'))
+    )
+    buffer = SearchWriteBuffer(session_factory=factory, flush_interval=60)
+    buffer.record_access([4])
+    buffer.record_history(5, 'поставка', 1)
+
+    assert not buffer.flush()
+    assert [sql for sql, _ in factory.statements if 'UPDATE documents' in sql]
+    stats = buffer.stats()
+    assert stats['pending_documents'] == 0 and stats['pending_history'] == 1
+    buffer.shutdown()
+
+
+def test_bad_history_row_is_isolated_and_dropped_after_retries():
+    """Строка, отвергнутая БД, не блокирует остальные и отбрасывается после HISTORY_MAX_ATTEMPTS."""
+    def history_error(rows):
+        if any(r['query_text'] == 'bad' for r in rows):
+            return IntegrityError('INSERT', {}, Exception('fk_violation'))
+
+    factory = _RecordingSessionFactory(history_error=history_error)
+    buffer = SearchWriteBuffer(session_factory=factory, flush_interval=60)
+    for query in ['a', 'b', 'bad', 'c']:
+        buffer.record_history(5, query, 1)
+
+    assert not buffer.flush()
+    written = [row['query_text'] for table, rows in factory.statements for row in rows]
+    assert sorted(written) == ['a', 'b', 'c']
+    assert buffer.stats()['history_rows'] == 3
+
+    for _ in range(HISTORY_MAX_ATTEMPTS - 1):
+        buffer.flush()
+    stats = buffer.stats()
+    assert stats['pending_history'] == 0 and stats['dropped'] == 1
+    assert buffer.flush()
+    buffer.shutdown()
+
+
+def test_background_thread_flushes_periodically():
+    factory = _RecordingSessionFactory()
+    buffer = SearchWriteBuffer(session_factory=factory, flush_interval=0.05)
+    buffer.record_access([1])
+    deadline = time.monotonic() + 2
+    while not factory.statements and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert factory.statements
+    buffer.shutdown()
+
+
+def test_disabled_buffer_writes_synchronously():
+    factory = _RecordingSessionFactory()
+    buffer = SearchWriteBuffer(session_factory=factory, background=False)
+    buffer.record_access([1])
+    assert len(factory.statements) == 1
+
+
+def test_search_route_defers_access_metrics(app):
+    """/search учитывает обращения через буфер, а не UPDATE в потоке запроса."""
+    buffer = MagicMock()
+    results = [{'doc_id': 1, 'source': 'a.txt'}, {'doc_id': 2, 'source': 'b.txt'}]
+    with patch('webapp.routes.search.get_search_write_buffer', return_value=buffer), \
+         patch('webapp.routes.search._get_rag_db'), \
+         patch('webapp.routes.search._search_in_db', return_value=results), \
+         patch('webapp.routes.search._get_files_state'):
+        response = app.test_client().post('/search', json={'search_terms': 'поставка'},
+                                          headers={'X-User-ID': '1'})
+
+    assert response.status_code == 200
+    buffer.record_access.assert_called_once_with([1, 2])
@@ -0,0 +1,82 @@
+"""
+Тесты многошаблонного поиска терминов (document_processor/search/matcher.py)
+и его использования в сниппетах и legacy Searcher.
+"""
+import pytest
+
+from document_processor.search import matcher as matcher_module
+from document_processor.search.matcher import TermMatcher, normalize
+from document_processor.search.searcher import Searcher
+
+
+def test_normalize_keeps_positions():
+    assert normalize('Ёлка ПОСТАВКА') == 'елка поставка'
+    text = 'Straße İstanbul'  # casefold удлиняет ß и İ — длина должна сохраниться
+    assert len(normalize(text)) == len(text)
+
+
+def test_counts_all_terms_in_one_pass():
+    matcher = TermMatcher(['договор', 'Договора', 'ёмкость', ''])
+    text = 'ДОГОВОР поставки; договора нет. Емкость и ёмкость. договордоговор'
+    assert matcher.counts(text) == {'договор': 4, 'Договора': 1, 'ёмкость': 2}
+    assert matcher.positions(text)['ёмкость'] == [32, 42]
+
+
+def test_count_matches_str_count_semantics():
+    # Вхождения одного термина не перекрываются, как у str.count
+    assert TermMatcher(['аа']).counts('ааааа') == {'аа': 2}
+
+
+def test_first_returns_earliest_start():
+    matcher = TermMatcher(['поставка товара', 'товар'])
+    assert matcher.first('Срок: поставка товара') == (6, 21, 'поставка товара')
+    assert matcher.first('нет совпадений') is None
+    assert matcher.contains('ТОВАР') and not TermMatcher([]).contains('товар')
+
+
+def test_for_terms_reuses_matcher():
+    assert TermMatcher.for_terms(['а', 'б']) is TermMatcher.for_terms(('а', 'б'))
+
+
+def test_searcher_finds_terms_case_and_yo_insensitive(tmp_path):
+    index = tmp_path / '_search_index.txt'
+    index.write_text(
+        '=====\nЗАГОЛОВОК: a.txt\nФормат: TXT\nИсточник: a.txt\n=====\n'
+        'Поставка ёлок. Срок по-ставки и ПОСТАВКА.\n'
+        '=====\nЗАГОЛОВОК: b.txt\nФормат: TXT\nИсточник: b.txt\n=====\n'
+        'Прочие документы\n',
+        encoding='utf-8'
+    )
+
+    results = Searcher().search(str(index), ['поставка', 'елок', 'поставка'], context=5)
+    assert [(r['keyword'], r['position']) for r in results] == [
+        ('елок', 9), ('поставка', 0), ('поставка', 32)
+    ]
+    tolerant = Searcher().search(str(index), ['поставк'], context=5)
+    assert [r['position'] for r in tolerant] == [0, 20, 32]  # «по-ставк» — толерантное совпадение
+
+    excluded = Searcher().search(str(index), ['ЁЛОК'], exclude_mode=True)
+    assert [r['source'] for r in excluded] == ['b.txt']
+
+
+def test_overlapping_terms_and_longest_first():
+    terms = ['договор', 'договора', 'ор', 'аа', 'поставка', 'ёмкость']
+    text = 'Договора и ДОГОВОР: ааааа, поставка емкости; договордоговор. ' * 3
+    matcher = TermMatcher(terms)
+    assert matcher.counts(text) == {term: normalize(text).count(normalize(term)) for term in terms}
+    assert matcher.positions(text)['ор'][:3] == [5, 16, 50]
+    # При одинаковом начале — самое длинное вхождение
+    assert matcher.first(text) == (0, 8, 'договора')
+    assert matcher.contains('ЁМКОСТЬ') and not matcher.contains('нет совпадений')
+
+
+def test_automaton_for_large_term_sets(monkeypatch):
+    pytest.importorskip('ahocorasick')
+    monkeypatch.setattr(matcher_module, 'SMALL_TERM_SET', 2)
+    terms = ['договор', 'договора', 'ор', 'аа', 'поставка']
+    text = 'Договора и ДОГОВОР: ааааа, поставка; договордоговор.'
+    large = TermMatcher(terms)
+    assert large._automaton is not None
+    monkeypatch.setattr(matcher_module, 'SMALL_TERM_SET', 100)
+    assert list(large.finditer(text)) == list(TermMatcher(terms).finditer(text))
+    assert large.counts(text) == TermMatcher(terms).counts(text)
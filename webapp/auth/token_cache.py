@@ -0,0 +1,278 @@
+"""
+Кэш проверенных токенов для auth middleware.
+
+Без кэша каждый аутентифицированный запрос (включая частые опросы /index_status,
+/files_json) проверяет подпись JWT и делает два запроса к БД: сессия по хешу
+токена и пользователь. Кэш хранит результат проверки (хеш токена → снимок
+пользователя, payload) не дольше AUTH_CACHE_TTL_SECONDS и не дольше срока
+действия самого JWT.
+
+Инвалидация:
+- явная — invalidate_token() при logout и invalidate_user() при смене пароля,
+  роли или профиля (вызывается из AuthService);
+- между процессами — опционально через PostgreSQL LISTEN/NOTIFY
+  (AUTH_CACHE_NOTIFY=true). Без неё выход в одном воркере виден остальным
+  не позже чем через TTL.
+"""
+import logging
+import os
+import select
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'auth_cache_invalidate'
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Снимок пользователя для g.user (атрибуты, которые читают роуты)."""
+
+    id: int
+    email: str
+    role: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user: Any) -> 'CachedUser':
+        """Снять значения с ORM-объекта User (до закрытия сессии)."""
+        return cls(
+            id=user.id,
+            email=user.email,
+            role=user.role,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            created_at=user.created_at,
+        )
+
+
+@dataclass(frozen=True)
+class CachedToken:
+    """Результат успешной проверки токена."""
+
+    user: CachedUser
+    payload: Dict[str, Any]
+    expires_at: float  # time.monotonic()
+
+
+class TokenCache:
+    """Потокобезопасный LRU-кэш с TTL: хеш токена → CachedToken."""
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 10000):
+        """
+        Args:
+            ttl_seconds: Время жизни записи
+            max_entries: Максимум записей (старые вытесняются)
+        """
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, CachedToken]' = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, token_hash: str) -> Optional[CachedToken]:
+        """Запись для токена или None (нет, истекла или инвалидирована)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(token_hash)
+                self._stats['hits'] += 1
+                return entry
+            if entry is not None:
+                self._remove(token_hash)
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, token_hash: str, user: CachedUser, payload: Dict[str, Any]) -> None:
+        """Запомнить результат проверки (срок — min(TTL, exp токена))."""
+        ttl = self.ttl_seconds
+        exp = payload.get('exp')
+        if isinstance(exp, (int, float)):
+            ttl = min(ttl, exp - time.time())
+        if ttl <= 0:
+            return
+        entry = CachedToken(user=user, payload=payload, expires_at=time.monotonic() + ttl)
+        with self._lock:
+            self._remove(token_hash)
+            self._entries[token_hash] = entry
+            self._by_user.setdefault(user.id, set()).add(token_hash)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_token(self, token_hash: str) -> None:
+        with self._lock:
+            if self._remove(token_hash):
+                self._stats['invalidations'] += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for token_hash in list(self._by_user.get(user_id, ())):
+                if self._remove(token_hash):
+                    self._stats['invalidations'] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики hits/misses/invalidations, размер и hit_rate."""
+        with self._lock:
+            data = dict(self._stats)
+            data['size'] = len(self._entries)
+        lookups = data['hits'] + data['misses']
+        data['hit_rate'] = round(data['hits'] / lookups, 4) if lookups else 0.0
+        return data
+
+    def apply_notification(self, payload: str) -> None:
+        """Применить уведомление из канала NOTIFY: 'token:<hash>', 'user:<id>' или 'all'."""
+        kind, _, value = (payload or '').partition(':')
+        if kind == 'token' and value:
+            self.invalidate_token(value)
+        elif kind == 'user' and value.isdigit():
+            self.invalidate_user(int(value))
+        elif kind == 'all':
+            self.clear()
+
+    def _remove(self, token_hash: str) -> bool:
+        entry = self._entries.pop(token_hash, None)
+        if entry is None:
+            return False
+        hashes = self._by_user.get(entry.user.id)
+        if hashes is not None:
+            hashes.discard(token_hash)
+            if not hashes:
+                del self._by_user[entry.user.id]
+        return True
+
+
+class InvalidationListener(threading.Thread):
+    """Поток LISTEN на отдельном psycopg2-соединении; применяет NOTIFY к локальному кэшу."""
+
+    def __init__(self, cache: TokenCache, dsn: str, poll_seconds: float = 5.0, reconnect_seconds: float = 5.0):
+        super().__init__(name='auth-cache-listener', daemon=True)
+        self.cache = cache
+        self.dsn = dsn
+        self.poll_seconds = poll_seconds
+        self.reconnect_seconds = reconnect_seconds
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        import psycopg2
+        import psycopg2.extensions
+
+        while not self._stop_event.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN {NOTIFY_CHANNEL};')
+                # Пока не слушали, уведомления могли потеряться
+                self.cache.clear()
+                while not self._stop_event.is_set():
+                    if select.select([conn], [], [], self.poll_seconds) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self.cache.apply_notification(conn.notifies.pop(0).payload)
+            except Exception as e:
+                logger.warning('LISTEN %s прерван: %s, переподключение через %ss',
+                               NOTIFY_CHANNEL, e, self.reconnect_seconds)
+                # Без подписки не знаем об инвалидациях в других процессах
+                self.cache.clear()
+                self._stop_event.wait(self.reconnect_seconds)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+_cache: Optional[TokenCache] = None
+_listener: Optional[InvalidationListener] = None
+_listener_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def get_token_cache() -> Optional[TokenCache]:
+    """Кэш процесса (None, если AUTH_CACHE_TTL_SECONDS=0); запускает LISTEN при AUTH_CACHE_NOTIFY."""
+    global _cache
+    from webapp.config.config_service import get_config
+    config = get_config()
+    if config.auth_cache_ttl_seconds <= 0:
+        return None
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = TokenCache(config.auth_cache_ttl_seconds, config.auth_cache_max_entries)
+    if config.auth_cache_notify:
+        _ensure_listener(_cache, config.database_url)
+    return _cache
+
+
+def _ensure_listener(cache: TokenCache, database_url: str) -> None:
+    """Запустить поток LISTEN (один на процесс; после fork — заново)."""
+    global _listener, _listener_pid
+    pid = os.getpid()
+    if _listener_pid == pid and _listener is not None and _listener.is_alive():
+        return
+    with _lock:
+        if _listener_pid == pid and _listener is not None and _listener.is_alive():
+            return
+        if _listener_pid != pid:
+            # Записи родителя могли устареть, пока уведомления не слушались
+            cache.clear()
+        dsn = database_url.replace('postgresql+psycopg2://', 'postgresql://', 1)
+        _listener = InvalidationListener(cache, dsn)
+        _listener_pid = pid
+        _listener.start()
+
+
+def _publish(payload: str) -> None:
+    """Разослать инвалидацию другим процессам (NOTIFY); ошибки не прерывают операцию."""
+    from webapp.config.config_service import get_config
+    if not get_config().auth_cache_notify:
+        return
+    try:
+        from sqlalchemy import text
+        from webapp.db.base import engine
+        with engine.connect() as conn:
+            conn.execute(text('SELECT pg_notify(:channel, :payload)'),
+                         {'channel': NOTIFY_CHANNEL, 'payload': payload})
+            conn.commit()
+    except Exception as e:
+        logger.warning('Не удалось отправить NOTIFY %s: %s', NOTIFY_CHANNEL, e)
+
+
+def invalidate_token(token_hash: str) -> None:
+    """Убрать токен из кэша этого и (при AUTH_CACHE_NOTIFY) остальных процессов."""
+    if _cache is not None:
+        _cache.invalidate_token(token_hash)
+    _publish(f'token:{token_hash}')
+
+
+def invalidate_user(user_id: int) -> None:
+    """Убрать все токены пользователя из кэша (смена пароля, роли, профиля)."""
+    if _cache is not None:
+        _cache.invalidate_user(user_id)
+    _publish(f'user:{user_id}')
+
+
+__all__ = [
+    'CachedUser', 'CachedToken', 'TokenCache', 'InvalidationListener', 'NOTIFY_CHANNEL',
+    'get_token_cache', 'invalidate_token', 'invalidate_user',
+]
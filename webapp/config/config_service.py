@@ -78,6 +78,31 @@ class ConfigService:
         """Логировать SQL-запросы (только для разработки)."""
         return os.getenv('SQL_ECHO', 'false').lower() == 'true'
     
+    @property
+    def db_pool_enabled(self) -> bool:
+        """Использовать пул соединений (false — NullPool, новое соединение на каждую сессию)."""
+        return os.getenv('DB_POOL_ENABLED', 'true').lower() == 'true'
+    
+    @property
+    def db_pool_size(self) -> int:
+        """Число постоянно удерживаемых соединений пула на процесс."""
+        return max(1, int(os.getenv('DB_POOL_SIZE', '5')))
+    
+    @property
+    def db_max_overflow(self) -> int:
+        """Сколько соединений сверх DB_POOL_SIZE можно открыть при пиковой нагрузке."""
+        return max(0, int(os.getenv('DB_MAX_OVERFLOW', '10')))
+    
+    @property
+    def db_pool_timeout_seconds(self) -> float:
+        """Сколько ждать свободное соединение, прежде чем вернуть ошибку."""
+        return float(os.getenv('DB_POOL_TIMEOUT', '30'))
+    
+    @property
+    def db_pool_recycle_seconds(self) -> int:
+        """Пересоздавать соединения старше N секунд (-1 — не пересоздавать)."""
+        return int(os.getenv('DB_POOL_RECYCLE_SECONDS', '1800'))
+    
     # ------------------------------------------------------------------------------
     # Шифрование и безопасность
     # ------------------------------------------------------------------------------
@@ -103,6 +128,21 @@ class ConfigService:
         """Время жизни JWT токена в часах."""
         return int(os.getenv('JWT_EXPIRATION_HOURS', '24'))
     
+    @property
+    def auth_cache_ttl_seconds(self) -> float:
+        """Сколько секунд доверять проверенному токену без обращения к БД (0 — без кэша)."""
+        return float(os.getenv('AUTH_CACHE_TTL_SECONDS', '60'))
+    
+    @property
+    def auth_cache_max_entries(self) -> int:
+        """Максимум токенов в кэше процесса."""
+        return int(os.getenv('AUTH_CACHE_MAX_ENTRIES', '10000'))
+    
+    @property
+    def auth_cache_notify(self) -> bool:
+        """Рассылать инвалидации кэша токенов между процессами через LISTEN/NOTIFY."""
+        return os.getenv('AUTH_CACHE_NOTIFY', 'false').lower() == 'true'
+    
     # ------------------------------------------------------------------------------
     # Flask настройки
     # ------------------------------------------------------------------------------
@@ -261,6 +301,36 @@ class ConfigService:
         default = 'true' if self.flask_env == 'development' else 'false'
         return os.getenv('LOG_TO_CONSOLE', default).lower() == 'true'
     
+    @property
+    def log_db_batch_size(self) -> int:
+        """Сколько записей лога писать в БД одним INSERT."""
+        return max(1, int(os.getenv('LOG_DB_BATCH_SIZE', '200')))
+    
+    @property
+    def log_db_flush_interval_seconds(self) -> float:
+        """Максимальная задержка записи лога в БД (неполный пакет сбрасывается по таймеру)."""
+        return float(os.getenv('LOG_DB_FLUSH_INTERVAL_SECONDS', '1.0'))
+    
+    @property
+    def log_db_queue_size(self) -> int:
+        """Ёмкость очереди записей лога; при переполнении новые записи отбрасываются со счётчиком."""
+        return max(1, int(os.getenv('LOG_DB_QUEUE_SIZE', '10000')))
+    
+    @property
+    def search_write_buffer_enabled(self) -> bool:
+        """Отложенная запись побочных эффектов поиска (метрики обращений, термины, история)."""
+        return os.getenv('SEARCH_WRITE_BUFFER_ENABLED', 'true').lower() == 'true'
+    
+    @property
+    def search_write_flush_interval_seconds(self) -> float:
+        """Период сброса буфера поиска в БД — и максимальное окно потери при сбое процесса."""
+        return float(os.getenv('SEARCH_WRITE_FLUSH_INTERVAL_SECONDS', '2.0'))
+    
+    @property
+    def search_write_max_pending(self) -> int:
+        """Досрочный сброс буфера поиска при стольких накопленных документах/пользователях/строках."""
+        return max(1, int(os.getenv('SEARCH_WRITE_MAX_PENDING', '10000')))
+    
     # ------------------------------------------------------------------------------
     # Лимиты и ограничения
     # ------------------------------------------------------------------------------
@@ -372,6 +442,62 @@ class ConfigService:
         """Автоматически индексировать файлы при загрузке."""
         return os.getenv('AUTO_INDEX_ON_UPLOAD', 'false').lower() == 'true'
     
+    @property
+    def background_indexing(self) -> bool:
+        """Индексировать через очередь job_queue фоновыми воркерами (иначе — внутри HTTP-запроса)."""
+        return os.getenv('BACKGROUND_INDEXING', 'false').lower() == 'true'
+    
+    @property
+    def job_lease_seconds(self) -> int:
+        """Длительность аренды задачи воркером; по истечении задачу может забрать другой воркер."""
+        return int(os.getenv('JOB_LEASE_SECONDS', '600'))
+    
+    @property
+    def job_max_attempts(self) -> int:
+        """Максимум попыток выполнения задачи до статуса error."""
+        return max(1, int(os.getenv('JOB_MAX_ATTEMPTS', '3')))
+    
+    @property
+    def worker_poll_interval_seconds(self) -> float:
+        """Пауза воркера между опросами пустой очереди."""
+        return float(os.getenv('WORKER_POLL_INTERVAL_SECONDS', '2'))
+    
+    @property
+    def search_mode(self) -> str:
+        """Режим поиска по search_index: fts (морфологический, GIN по tsvector) или substring (ILIKE)."""
+        mode = os.getenv('SEARCH_MODE', 'fts').strip().lower()
+        return mode if mode in ('fts', 'substring') else 'fts'
+    
+    @property
+    def search_tolerant_match(self) -> bool:
+        """Находить термины, разорванные пробелом, дефисом или переносом (search_index.content_squashed)."""
+        return os.getenv('SEARCH_TOLERANT_MATCH', 'true').lower() == 'true'
+    
+    @property
+    def search_snippet_top_n(self) -> int:
+        """Для скольких первых результатов /search строить сниппет ts_headline (остальные — /search/snippets)."""
+        return max(0, int(os.getenv('SEARCH_SNIPPET_TOP_N', '20')))
+    
+    @property
+    def search_snippet_window_chars(self) -> int:
+        """Полуширина окна текста вокруг первого совпадения, по которому строится ts_headline."""
+        return max(100, int(os.getenv('SEARCH_SNIPPET_WINDOW_CHARS', '1500')))
+    
+    @property
+    def search_cache_max_entries(self) -> int:
+        """Максимум запросов в кэше результатов /search (0 = кэш отключён)."""
+        return max(0, int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '256')))
+    
+    @property
+    def search_cache_max_results(self) -> int:
+        """Максимум результатов во всех записях кэша /search вместе."""
+        return max(1, int(os.getenv('SEARCH_CACHE_MAX_RESULTS', '20000')))
+    
+    @property
+    def embedding_cache_enabled(self) -> bool:
+        """Кэшировать эмбеддинги в PostgreSQL (embedding_cache) по хэшу нормализованного текста."""
+        return os.getenv('EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true'
+    
     @property
     def user_quota_bytes(self) -> int:
         """Квота на одного пользователя в байтах (default: 10 GB)."""
@@ -6,24 +6,18 @@
 from typing import Generator
 from contextlib import contextmanager
 
-from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
-from sqlalchemy.pool import NullPool
 
 from webapp.config import get_config
+from webapp.db.pool import build_engine
 
 
 # Получаем конфигурацию
 config = get_config()
 
-# Создаём engine
+# Создаём engine с общим пулом соединений процесса (настройки DB_POOL_*, см. webapp/db/pool.py)
 # echo=True включает логирование SQL-запросов (для отладки)
-engine = create_engine(
-    config.database_url,
-    echo=config.sql_echo,
-    poolclass=NullPool,  # Для Alembic и простоты (в продакшене можно использовать QueuePool)
-    pool_pre_ping=True,  # Проверка соединения перед использованием
-)
+engine = build_engine(config.database_url, echo=config.sql_echo, config=config)
 
 # Создаём фабрику сессий
 SessionLocal = sessionmaker(
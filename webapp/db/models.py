@@ -8,9 +8,9 @@ import enum
 
 from sqlalchemy import (
     Column, Integer, String, Text, Boolean, DateTime, 
-    ForeignKey, LargeBinary, Enum as SQLEnum, JSON, Index, UniqueConstraint, Float
+    ForeignKey, LargeBinary, Enum as SQLEnum, JSON, Index, UniqueConstraint, Float, BigInteger
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred, column_property
 from pgvector.sqlalchemy import Vector
 
 from webapp.db.base import Base
@@ -131,6 +131,7 @@ class Document(Base):
     Связь с пользователями через таблицу user_documents.
     
     С инкремента 020: добавлено поле blob для хранения файлов в БД.
+    Поле blob загружается отложенно (группа 'blob'), для проверки наличия — has_blob.
     """
     __tablename__ = 'documents'
     
@@ -139,7 +140,11 @@ class Document(Base):
     size_bytes = Column(Integer, nullable=False)
     mime = Column(String(127))  # тип файла
     parse_status = Column(Text)  # статус обработки: 'indexed', 'error', etc.
-    blob = Column(LargeBinary, nullable=True)  # Бинарное содержимое файла (DB MODE)
+    # Бинарное содержимое файла (DB MODE). Отложенная загрузка: обычные запросы к Document
+    # (списки файлов, удаление, GC) не тянут байты из БД. Явный доступ — через BlobStorageService.
+    blob = deferred(Column(LargeBinary, nullable=True), group='blob')
+    # Признак наличия содержимого без загрузки байтов (blob IS NOT NULL)
+    has_blob = column_property(blob.columns[0].isnot(None))
     
     # Поля для расчёта ценности документа при GC
     access_count = Column(Integer, default=0, nullable=False)  # счётчик обращений
@@ -216,6 +221,24 @@ class Chunk(Base):
     def __repr__(self):
         return f"<Chunk(id={self.id}, document_id={self.document_id}, chunk_idx={self.chunk_idx})>"
 
+class EmbeddingCache(Base):
+    """
+    Кэш эмбеддингов, адресуемый по содержимому.
+    Ключ: (модель, размерность, sha256 нормализованного текста) — одинаковые
+    фрагменты (типовые пункты договоров) векторизуются у провайдера один раз.
+    """
+    __tablename__ = 'embedding_cache'
+    
+    model = Column(String(100), primary_key=True)
+    dimension = Column(Integer, primary_key=True)
+    text_sha256 = Column(String(64), primary_key=True)
+    embedding = Column(Vector(), nullable=False)  # размерность зависит от модели
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<EmbeddingCache(model='{self.model}', dim={self.dimension}, sha256='{self.text_sha256[:8]}...')>"
+
+
 # ==============================================================================
 # AI ДИАЛОГИ И СООБЩЕНИЯ
 # ==============================================================================
@@ -403,13 +426,19 @@ class JobQueue(Base):
                    default='queued', nullable=False)
     priority = Column(Integer, default=0)
     locked_by = Column(String(63))  # ID воркера
-    locked_at = Column(DateTime)
+    locked_at = Column(DateTime)  # начало/продление аренды (lease) задачи воркером
+    attempts = Column(Integer, default=0, nullable=False)  # сколько раз задача была захвачена
+    max_attempts = Column(Integer, default=3, nullable=False)  # предел повторов до статуса error
+    run_after = Column(DateTime)  # не брать в работу раньше этого времени (backoff)
+    last_error = Column(Text)  # текст последней ошибки
+    result_json = Column(JSON)  # результат выполнения (doc_id, время и т.д.)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     __table_args__ = (
         Index('idx_job_queue_status_priority', 'status', 'priority', 'created_at'),
         Index('idx_job_queue_user', 'user_id'),
+        Index('idx_job_queue_status_run_after', 'status', 'run_after'),
     )
     
     def __repr__(self):
@@ -532,6 +561,23 @@ class AIModelConfig(Base):
         return f"<AIModelConfig(id={self.id}, model_id='{self.model_id}', provider='{self.provider}')>"
 
 
+class CorpusGeneration(Base):
+    """
+    Счётчик версий корпуса пользователя для кэша результатов поиска.
+    Увеличивается триггерами на user_documents и search_index (индексация,
+    мягкое удаление, восстановление) — закэшированная выдача со старой
+    версией больше не используется.
+    """
+    __tablename__ = 'corpus_generations'
+    
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    generation = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<CorpusGeneration(user_id={self.user_id}, generation={self.generation})>"
+
+
 class FileSearchState(Base):
     """Состояния файлов при поиске (замена search_results.json)."""
     __tablename__ = 'file_search_state'
@@ -568,6 +614,7 @@ class SearchIndex(Base):
     content = Column(Text, nullable=False)  # Текстовое содержимое документа
     metadata_json = Column('metadata', JSON, nullable=True)  # Метаданные (имя файла, путь, размер и т.д.)
     search_vector = Column(Text, nullable=True)  # tsvector для полнотекстового поиска (управляется триггером)
+    content_squashed = Column(Text, nullable=True)  # content без пробелов/дефисов/переносов для толерантного поиска (управляется триггером)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -631,6 +678,7 @@ __all__ = [
     'Session',
     'Document',
     'Chunk',
+    'EmbeddingCache',
     'AIConversation',
     'UserDocument',
     'AIMessage',
@@ -645,6 +693,7 @@ __all__ = [
     'TokenUsage',
     'AIModelConfig',
     'FileSearchState',
+    'CorpusGeneration',
     'SearchIndex',
     'FolderIndexStatus',
     'AppSettings',
@@ -0,0 +1,225 @@
+"""
+Общий пул соединений PostgreSQL для SQLAlchemy и «сырого» psycopg2 (RAGDatabase).
+
+Раньше engine создавался с NullPool (каждый SessionLocal() — новое TCP-соединение
+и аутентификация), а DatabaseConnection держал по одному psycopg2-соединению
+на экземпляр RAGDatabase. Теперь оба стека берут соединения из одного QueuePool
+на процесс (на каждый DSN):
+
+- размер/переполнение/recycle/тайм-аут ожидания настраиваются через DB_POOL_*;
+- pool_pre_ping проверяет соединение при выдаче и прозрачно переподключается;
+- после fork() дочерний процесс сбрасывает унаследованные пулы, не закрывая
+  сокеты родителя (engine.dispose(close=False));
+- время ожидания выдачи соединения и счётчики подключений доступны через pool_stats().
+"""
+import os
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool, измеряющий время ожидания выдачи соединения."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.metrics.record_wait(time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        # Метрики переживают dispose() — это статистика процесса, а не пула
+        pool.metrics = self.metrics
+        return pool
+
+
+class PoolMetrics:
+    """Счётчики пула соединений (потокобезопасные)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Обнулить счётчики."""
+        with self._lock:
+            self.checkouts = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+
+    def incr(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            checkouts = self.checkouts
+            return {
+                'checkouts': checkouts,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'wait_ms_total': round(self.wait_seconds_total * 1000, 3),
+                'wait_ms_max': round(self.wait_seconds_max * 1000, 3),
+                'wait_ms_avg': round(self.wait_seconds_total * 1000 / checkouts, 3) if checkouts else 0.0,
+            }
+
+
+# Все engine процесса (для сброса после fork и общей статистики)
+_engines: 'weakref.WeakSet[Engine]' = weakref.WeakSet()
+# Engine для psycopg2-DSN, используемые RAGDatabase
+_engines_by_dsn: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def _attach_metrics(engine: Engine) -> None:
+    """Подписать счётчики подключений/выдач на события пула."""
+
+    def _metrics() -> Optional[PoolMetrics]:
+        return getattr(engine.pool, 'metrics', None)
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        m = _metrics()
+        if m is not None:
+            m.incr('connects')
+
+    @event.listens_for(engine, 'checkout')
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        m = _metrics()
+        if m is not None:
+            m.incr('checkouts')
+
+    @event.listens_for(engine, 'invalidate')
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        m = _metrics()
+        if m is not None:
+            m.incr('invalidations')
+
+
+def build_engine(database_url: str, echo: bool = False, config: Any = None) -> Engine:
+    """
+    Создать engine с настройками пула из конфигурации.
+
+    Args:
+        database_url: URL SQLAlchemy (postgresql+psycopg2://...)
+        echo: Логировать SQL
+        config: ConfigService (по умолчанию get_config())
+
+    Returns:
+        Engine с MeteredQueuePool (или NullPool при DB_POOL_ENABLED=false)
+    """
+    if config is None:
+        from webapp.config import get_config
+        config = get_config()
+
+    if config.db_pool_enabled:
+        engine = create_engine(
+            database_url,
+            echo=echo,
+            poolclass=MeteredQueuePool,
+            pool_size=config.db_pool_size,
+            max_overflow=config.db_max_overflow,
+            pool_timeout=config.db_pool_timeout_seconds,
+            pool_recycle=config.db_pool_recycle_seconds,
+            pool_pre_ping=True,  # Проверка соединения перед использованием
+            pool_use_lifo=True,  # Лишние простаивающие соединения успевают закрыться по recycle
+        )
+        _attach_metrics(engine)
+    else:
+        engine = create_engine(
+            database_url,
+            echo=echo,
+            poolclass=NullPool,
+            pool_pre_ping=True,
+        )
+
+    with _engines_lock:
+        _engines.add(engine)
+    return engine
+
+
+def get_engine_for_dsn(dsn: str) -> Engine:
+    """
+    Общий engine для psycopg2-DSN (postgresql://...), используемый RAGDatabase.
+
+    Если DSN совпадает с DATABASE_URL, возвращается основной engine SQLAlchemy,
+    т.е. ORM и «сырые» запросы делят один пул.
+    """
+    with _engines_lock:
+        engine = _engines_by_dsn.get(dsn)
+    if engine is not None:
+        return engine
+
+    from webapp.db.base import engine as main_engine
+    if _psycopg2_dsn(main_engine.url.render_as_string(hide_password=False)) == dsn:
+        engine = main_engine
+    else:
+        from webapp.config import get_config
+        engine = build_engine(dsn.replace('postgresql://', 'postgresql+psycopg2://', 1), echo=get_config().sql_echo)
+
+    with _engines_lock:
+        return _engines_by_dsn.setdefault(dsn, engine)
+
+
+def _psycopg2_dsn(url: str) -> str:
+    if url.startswith('postgresql+psycopg2://'):
+        return url.replace('postgresql+psycopg2://', 'postgresql://', 1)
+    return url
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Состояние и метрики всех пулов процесса (для /health/db_pool и мониторинга)."""
+    pools = []
+    for engine in list(_engines):
+        pool = engine.pool
+        item: Dict[str, Any] = {
+            'url': engine.url.render_as_string(hide_password=True),
+            'pool': type(pool).__name__,
+        }
+        if isinstance(pool, QueuePool):
+            item.update({
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+            })
+        metrics = getattr(pool, 'metrics', None)
+        if metrics is not None:
+            item.update(metrics.as_dict())
+        pools.append(item)
+    return {'pid': os.getpid(), 'pools': pools}
+
+
+def _dispose_after_fork() -> None:
+    """В дочернем процессе забыть соединения родителя, не закрывая их сокеты."""
+    for engine in list(_engines):
+        engine.dispose(close=False)
+        metrics = getattr(engine.pool, 'metrics', None)
+        if metrics is not None:
+            metrics.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
+__all__ = ['MeteredQueuePool', 'PoolMetrics', 'build_engine', 'get_engine_for_dsn', 'pool_stats']
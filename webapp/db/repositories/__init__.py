@@ -9,6 +9,8 @@ from .session_repository import SessionRepository
 from .api_key_repository import ApiKeyRepository
 from .search_history_repository import SearchHistoryRepository
 from .app_log_repository import AppLogRepository
+from .job_queue_repository import JobQueueRepository
+from .embedding_cache_repository import EmbeddingCacheRepository
 
 __all__ = [
     "BaseRepository",
@@ -19,4 +21,6 @@ __all__ = [
     "ApiKeyRepository",
     "SearchHistoryRepository",
     "AppLogRepository",
+    "JobQueueRepository",
+    "EmbeddingCacheRepository",
 ]
@@ -0,0 +1,67 @@
+"""
+Репозиторий кэша эмбеддингов (таблица embedding_cache).
+"""
+from typing import Dict, Iterable, List
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from webapp.db.models import EmbeddingCache
+from webapp.db.repositories.base_repository import BaseRepository
+
+
+class EmbeddingCacheRepository(BaseRepository[EmbeddingCache]):
+    """Репозиторий для чтения и пакетного пополнения кэша эмбеддингов."""
+
+    # Ограничение размера одного IN (...) / INSERT ... VALUES
+    BATCH_SIZE = 500
+
+    def __init__(self, session: Session):
+        super().__init__(EmbeddingCache, session)
+
+    def get_many(self, model: str, dimension: int, text_hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        Найти эмбеддинги по хэшам нормализованного текста.
+
+        Args:
+            model: Модель эмбеддингов
+            dimension: Размерность векторов
+            text_hashes: sha256 нормализованных текстов
+
+        Returns:
+            {text_sha256: embedding} для найденных записей
+        """
+        hashes = list(dict.fromkeys(text_hashes))
+        found: Dict[str, List[float]] = {}
+        for start in range(0, len(hashes), self.BATCH_SIZE):
+            stmt = select(EmbeddingCache.text_sha256, EmbeddingCache.embedding).where(
+                EmbeddingCache.model == model,
+                EmbeddingCache.dimension == dimension,
+                EmbeddingCache.text_sha256.in_(hashes[start:start + self.BATCH_SIZE])
+            )
+            for text_sha256, embedding in self.session.execute(stmt):
+                found[text_sha256] = [float(x) for x in embedding]
+        return found
+
+    def put_many(self, model: str, dimension: int, embeddings: Dict[str, List[float]]) -> int:
+        """
+        Сохранить эмбеддинги одной вставкой на батч (существующие ключи пропускаются).
+
+        Args:
+            model: Модель эмбеддингов
+            dimension: Размерность векторов
+            embeddings: {text_sha256: embedding}
+
+        Returns:
+            Количество переданных на вставку записей
+        """
+        rows = [
+            {'model': model, 'dimension': dimension, 'text_sha256': h, 'embedding': emb}
+            for h, emb in embeddings.items() if emb is not None
+        ]
+        for start in range(0, len(rows), self.BATCH_SIZE):
+            stmt = insert(EmbeddingCache).values(rows[start:start + self.BATCH_SIZE])
+            self.session.execute(stmt.on_conflict_do_nothing(
+                index_elements=['model', 'dimension', 'text_sha256']
+            ))
+        self.session.commit()
+        return len(rows)
@@ -0,0 +1,237 @@
+"""
+Репозиторий очереди фоновых задач (таблица job_queue).
+
+Протокол захвата задач воркерами:
+- задача берётся одним UPDATE ... WHERE id = (SELECT ... FOR UPDATE SKIP LOCKED),
+  поэтому несколько воркеров не блокируют друг друга и не берут одну задачу дважды;
+- захват выдаёт аренду (lease): locked_by/locked_at. Воркер продлевает её heartbeat'ом;
+- задача в статусе running с истёкшей арендой (воркер упал) снова доступна для захвата,
+  если у неё остались попытки; иначе (задача каждый раз роняет воркер) — статус error;
+- при ошибке задача возвращается в очередь с экспоненциальным backoff (run_after),
+  пока не исчерпан max_attempts, после чего получает статус error.
+"""
+import json
+from typing import Optional, List, Dict, Any, Sequence
+from sqlalchemy import text, select
+from sqlalchemy.orm import Session
+from webapp.db.models import JobQueue
+from webapp.db.repositories.base_repository import BaseRepository
+
+
+class JobQueueRepository(BaseRepository[JobQueue]):
+    """Репозиторий для работы с очередью задач."""
+
+    # Базовая задержка перед повтором (секунды), удваивается на каждой попытке
+    RETRY_BASE_DELAY_SECONDS = 30
+    RETRY_MAX_DELAY_SECONDS = 3600
+
+    def __init__(self, session: Session):
+        super().__init__(JobQueue, session)
+
+    def enqueue(
+        self,
+        job_type: str,
+        payload: Dict[str, Any],
+        user_id: Optional[int] = None,
+        priority: int = 0,
+        max_attempts: int = 3
+    ) -> JobQueue:
+        """
+        Поставить задачу в очередь.
+
+        Args:
+            job_type: Тип задачи (index, ocr, embed, cleanup)
+            payload: Параметры задачи (JSON)
+            user_id: ID пользователя-инициатора
+            priority: Приоритет (больше — раньше)
+            max_attempts: Сколько раз можно захватить задачу до статуса error
+
+        Returns:
+            Созданная задача
+        """
+        return self.create(
+            type=job_type,
+            payload=payload,
+            user_id=user_id,
+            priority=priority,
+            max_attempts=max_attempts,
+            status='queued',
+            attempts=0
+        )
+
+    def claim_next(
+        self,
+        worker_id: str,
+        job_types: Sequence[str],
+        lease_seconds: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Атомарно захватить следующую готовую задачу.
+
+        Готовая задача: queued с наступившим run_after, либо running с истёкшей арендой
+        и неисчерпанными попытками. Задачи с истёкшей арендой и исчерпанными попытками
+        (воркер падал на каждой) переводятся в error.
+
+        Args:
+            worker_id: Идентификатор воркера (host:pid)
+            job_types: Типы задач, которые умеет выполнять воркер
+            lease_seconds: Длительность аренды в секундах
+
+        Returns:
+            Словарь с полями задачи или None, если очередь пуста
+        """
+        params = {
+            'worker_id': worker_id,
+            'job_types': list(job_types),
+            'lease_seconds': int(lease_seconds),
+        }
+        self.session.execute(
+            text("""
+                UPDATE job_queue
+                SET status = 'error',
+                    last_error = 'Аренда истекла, попытки исчерпаны (воркер аварийно завершался)',
+                    locked_by = NULL,
+                    locked_at = NULL,
+                    updated_at = NOW()
+                WHERE type::text = ANY(:job_types)
+                  AND status = 'running'
+                  AND locked_at < NOW() - make_interval(secs => :lease_seconds)
+                  AND attempts >= max_attempts;
+            """),
+            params
+        )
+        row = self.session.execute(
+            text("""
+                UPDATE job_queue
+                SET status = 'running',
+                    locked_by = :worker_id,
+                    locked_at = NOW(),
+                    attempts = attempts + 1,
+                    updated_at = NOW()
+                WHERE id = (
+                    SELECT id FROM job_queue
+                    WHERE type::text = ANY(:job_types)
+                      AND (
+                            (status = 'queued' AND (run_after IS NULL OR run_after <= NOW()))
+                         OR (status = 'running' AND locked_at < NOW() - make_interval(secs => :lease_seconds)
+                             AND attempts < max_attempts)
+                      )
+                    ORDER BY priority DESC, created_at, id
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, type, user_id, payload, attempts, max_attempts;
+            """),
+            params
+        ).fetchone()
+        self.session.commit()
+
+        if not row:
+            return None
+        return {
+            'id': row[0],
+            'type': row[1],
+            'user_id': row[2],
+            'payload': row[3] or {},
+            'attempts': row[4],
+            'max_attempts': row[5],
+        }
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """
+        Продлить аренду задачи.
+
+        Returns:
+            False, если задачу уже перехватил другой воркер (аренда истекла)
+        """
+        result = self.session.execute(
+            text("""
+                UPDATE job_queue
+                SET locked_at = NOW(), updated_at = NOW()
+                WHERE id = :job_id AND locked_by = :worker_id AND status = 'running';
+            """),
+            {'job_id': job_id, 'worker_id': worker_id}
+        )
+        self.session.commit()
+        return result.rowcount > 0
+
+    def complete(self, job_id: int, worker_id: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        """Пометить задачу выполненной (только если аренда всё ещё у этого воркера)."""
+        res = self.session.execute(
+            text("""
+                UPDATE job_queue
+                SET status = 'done',
+                    result_json = CAST(:result AS JSONB),
+                    last_error = NULL,
+                    locked_by = NULL,
+                    locked_at = NULL,
+                    updated_at = NOW()
+                WHERE id = :job_id AND locked_by = :worker_id AND status = 'running';
+            """),
+            {'job_id': job_id, 'worker_id': worker_id, 'result': json.dumps(result or {})}
+        )
+        self.session.commit()
+        return res.rowcount > 0
+
+    def fail(self, job_id: int, worker_id: str, error: str, attempts: int, max_attempts: int) -> str:
+        """
+        Зафиксировать ошибку задачи.
+
+        Если попытки не исчерпаны — задача возвращается в очередь с backoff,
+        иначе получает статус error.
+
+        Returns:
+            Новый статус задачи ('queued' или 'error')
+        """
+        if attempts < max_attempts:
+            new_status = 'queued'
+            delay_seconds = self.retry_delay(attempts)
+        else:
+            new_status = 'error'
+            delay_seconds = None
+
+        self.session.execute(
+            text("""
+                UPDATE job_queue
+                SET status = :status,
+                    run_after = CASE WHEN CAST(:delay_seconds AS INTEGER) IS NULL THEN NULL
+                                     ELSE NOW() + make_interval(secs => CAST(:delay_seconds AS INTEGER)) END,
+                    last_error = :error,
+                    locked_by = NULL,
+                    locked_at = NULL,
+                    updated_at = NOW()
+                WHERE id = :job_id AND locked_by = :worker_id;
+            """),
+            {
+                'job_id': job_id,
+                'worker_id': worker_id,
+                'status': new_status,
+                'delay_seconds': delay_seconds,
+                'error': (error or '')[:4000],
+            }
+        )
+        self.session.commit()
+        return new_status
+
+    @classmethod
+    def retry_delay(cls, attempts: int) -> int:
+        """Задержка перед повтором: 30s, 60s, 120s ... но не более часа."""
+        delay = cls.RETRY_BASE_DELAY_SECONDS * (2 ** max(0, attempts - 1))
+        return min(delay, cls.RETRY_MAX_DELAY_SECONDS)
+
+    def get_user_jobs(self, user_id: int, job_ids: List[int]) -> List[JobQueue]:
+        """Получить задачи пользователя по списку ID (для опроса статуса из UI)."""
+        if not job_ids:
+            return []
+        stmt = select(JobQueue).where(
+            JobQueue.user_id == user_id,
+            JobQueue.id.in_(job_ids)
+        ).order_by(JobQueue.id)
+        return list(self.session.execute(stmt).scalars().all())
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Количество задач по статусам (для мониторинга очереди)."""
+        rows = self.session.execute(
+            text("SELECT status::text, COUNT(*) FROM job_queue GROUP BY status;")
+        ).fetchall()
+        return {row[0]: int(row[1]) for row in rows}
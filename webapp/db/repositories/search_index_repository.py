@@ -5,23 +5,53 @@
 Использует PostgreSQL full-text search с tsvector.
 """
 import logging
-from typing import List, Dict, Any, Optional
+import re
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import psycopg2
 from psycopg2 import sql
 
 logger = logging.getLogger(__name__)
 
+# Режимы поиска: морфологический по tsvector (GIN idx_search_index_search_vector)
+# и поиск подстрок по trigram индексу — явный fallback
+SEARCH_MODE_FTS = 'fts'
+SEARCH_MODE_SUBSTRING = 'substring'
+SEARCH_MODES = (SEARCH_MODE_FTS, SEARCH_MODE_SUBSTRING)
+
+# Конфигурация text search — та же, что в триггере search_index_search_vector_update
+TS_CONFIG = 'russian'
+
+_WORD_RE = re.compile(r'\w+')
+
+# ts_headline разбирает весь переданный текст заново, поэтому сниппеты строятся
+# только для первых строк выдачи и только по окну вокруг первого совпадения
+HEADLINE_OPTIONS = 'MaxWords=50, MinWords=30, ShortWord=3'
+DEFAULT_SNIPPET_LIMIT = 20
+DEFAULT_SNIPPET_WINDOW_CHARS = 1500
+
+# Толерантный поиск: OCR и перенос строк разрывают слова («по-ставка», «пос тавка»,
+# мягкий перенос). Столбец content_squashed — content без этих символов, его заполняет
+# триггер search_index (функция squash_search_text, миграция b7e2d94c1f38) и
+# обслуживает trigram индекс. Набор символов совпадает с функцией в БД.
+TOLERANT_GAP_CHARS = ' \t\n\r\f\v\u00a0\u00ad\u200b\ufeff-'
+_GAP_RE = re.compile('[' + re.escape(TOLERANT_GAP_CHARS) + ']+')
+# Более короткие термины без пробелов слишком часто склеиваются из соседних слов
+TOLERANT_MIN_CHARS = 4
+
 
 class SearchIndexRepository:
     """Репозиторий для работы с таблицей search_index."""
     
-    def __init__(self, db_connection):
+    def __init__(self, db_connection, tolerant: bool = False):
         """
         Args:
             db_connection: Подключение к БД (psycopg2 connection)
+            tolerant: Находить термины, разорванные пробелом, дефисом или переносом
+                (по content_squashed, см. build_substring_condition)
         """
         self.db = db_connection
+        self.tolerant = tolerant
     
     def create_or_update_index(
         self,
@@ -84,56 +114,292 @@ class SearchIndexRepository:
                 logger.info(f"Создан поисковый индекс для документа {document_id}, id={new_id}")
                 return new_id
     
+    @staticmethod
+    def escape_like(term: str) -> str:
+        """Экранирует спецсимволы LIKE (\\, %, _), чтобы термин искался как подстрока."""
+        return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    @staticmethod
+    def squash(text: str) -> str:
+        """Текст без пробелов, дефисов и мягких переносов (как squash_search_text в БД)."""
+        return _GAP_RE.sub('', text or '')
+
+    @classmethod
+    def tolerant_term(cls, keyword: str) -> Optional[str]:
+        """
+        Термин для поиска по content_squashed или None, если он для этого слишком короткий.
+
+        У префиксного термина отбрасывается завершающая *.
+        """
+        squashed = cls.squash((keyword or '').rstrip().rstrip('*'))
+        return squashed if len(squashed) >= TOLERANT_MIN_CHARS else None
+
+    @classmethod
+    def locate_tolerant(cls, text: str, keyword: str) -> Optional[Tuple[int, int]]:
+        """
+        Позиция первого вхождения термина с разрывами (без учёта регистра).
+
+        Один проход по тексту: строится «склеенная» копия с картой позиций, в ней
+        ищется склеенный термин, границы переводятся обратно в исходный текст.
+
+        Returns:
+            (start, end) в text или None
+        """
+        needle = cls.tolerant_term(keyword)
+        if not needle or not text:
+            return None
+        positions: List[int] = []
+        chars: List[str] = []
+        for i, ch in enumerate(text):
+            if ch not in TOLERANT_GAP_CHARS:
+                positions.append(i)
+                chars.append(ch)
+        pos = ''.join(chars).lower().find(needle.lower())
+        if pos == -1:
+            return None
+        return positions[pos], positions[pos + len(needle) - 1] + 1
+
+    @classmethod
+    def _tolerant_clause(cls, keyword: str, alias: str, tolerant: bool) -> Tuple[str, List[str]]:
+        """' OR alias.content_squashed ILIKE %s' для термина или ('', [])."""
+        squashed = cls.tolerant_term(keyword) if tolerant else None
+        if not squashed:
+            return '', []
+        return f" OR {alias}.content_squashed ILIKE %s", [f'%{cls.escape_like(squashed)}%']
+
+    @classmethod
+    def build_substring_condition(
+        cls,
+        keywords: List[str],
+        alias: str = 'si',
+        tolerant: bool = False
+    ) -> Tuple[str, List[str]]:
+        """
+        Строит условие поиска подстрок, которое обслуживается trigram GIN индексом
+        idx_search_index_content_trgm (pg_trgm, gin_trgm_ops).
+
+        Условие имеет вид (si.content ILIKE %s OR ...): каждый ILIKE с ведущим и
+        замыкающим % превращается планировщиком в Bitmap Index Scan по триграммам,
+        а OR — в BitmapOr. Нельзя оборачивать content в LOWER()/функции — индекс
+        построен по самому столбцу. Термины короче 3 символов триграмм не дают,
+        для них PostgreSQL сам выберет полное сканирование.
+
+        Исключение (документы БЕЗ терминов) выражается не через NOT ILIKE, который
+        индексом не обслуживается, а через anti-join к множеству документов,
+        найденных этим же условием (см. search_excluding).
+
+        С tolerant=True для терминов от TOLERANT_MIN_CHARS символов добавляется
+        content_squashed ILIKE '%склеенный термин%' (свой trigram индекс): так
+        «поставка» находит «по-ставка», «пос тавка» и перенос с мягким дефисом.
+
+        Args:
+            keywords: Список терминов
+            alias: Алиас таблицы search_index в запросе
+            tolerant: Добавить поиск по content_squashed
+
+        Returns:
+            (SQL-условие в скобках, параметры)
+        """
+        terms = [kw for kw in keywords if kw]
+        if not terms:
+            return 'FALSE', []
+        conditions: List[str] = []
+        params: List[str] = []
+        for kw in terms:
+            tolerant_clause, tolerant_params = cls._tolerant_clause(kw, alias, tolerant)
+            conditions.append(f"{alias}.content ILIKE %s{tolerant_clause}")
+            params.extend([f'%{cls.escape_like(kw)}%'] + tolerant_params)
+        return f"({' OR '.join(conditions)})", params
+
+    @staticmethod
+    def build_tsquery(keyword: str) -> Tuple[str, List[str]]:
+        """
+        Строит tsquery для одного пользовательского термина.
+
+        - ``термин*`` — поиск по префиксу: to_tsquery('russian', 'слово <-> префикс:*');
+        - остальное — websearch_to_tsquery('russian', '"термин"'): кавычки делают из
+          многословного термина фразу и отключают операторы websearch (-, or).
+
+        Ввод не попадает в синтаксис tsquery: для префиксного режима берутся только
+        буквенно-цифровые слова, в websearch_to_tsquery передаётся параметр без кавычек
+        (эта функция не падает на синтаксических ошибках).
+
+        Returns:
+            (SQL-выражение tsquery, параметры); ('', []) — если в термине нет слов
+        """
+        words = _WORD_RE.findall(keyword or '')
+        if not words:
+            return '', []
+        if keyword.rstrip().endswith('*'):
+            return f"to_tsquery('{TS_CONFIG}', %s)", [' <-> '.join(words) + ':*']
+        phrase = ' '.join((keyword or '').replace('"', ' ').split())
+        return f"websearch_to_tsquery('{TS_CONFIG}', %s)", [f'"{phrase}"']
+
+    @classmethod
+    def build_fts_condition(
+        cls,
+        keywords: List[str],
+        alias: str = 'si',
+        tolerant: bool = False
+    ) -> Tuple[str, List[str], str, List[str]]:
+        """
+        Строит морфологическое условие поиска, которое обслуживается GIN индексом
+        idx_search_index_search_vector: (si.search_vector @@ q1 OR ...).
+
+        Термин, из которого не получается лексем (знаки без слов, стоп-слова вроде
+        «по»), ищется как подстрока: (numnode(q) = 0 AND si.content ILIKE %s).
+        Аргументы numnode — константы, поэтому планировщик сворачивает проверку
+        ещё при планировании, и для обычных терминов остаётся только @@.
+        С tolerant=True к каждому термину добавляется поиск по content_squashed
+        (см. build_substring_condition).
+
+        Args:
+            keywords: Список терминов
+            alias: Алиас таблицы search_index в запросе
+            tolerant: Добавить поиск по content_squashed
+
+        Returns:
+            (SQL-условие в скобках, его параметры,
+             объединённый tsquery для ранжирования/сниппета, его параметры)
+        """
+        conditions: List[str] = []
+        params: List[str] = []
+        queries: List[str] = []
+        query_params: List[str] = []
+        for kw in keywords:
+            if not kw:
+                continue
+            # Для префиксного термина подстрока — без завершающей *
+            like = f"%{cls.escape_like(kw.rstrip().rstrip('*') or kw)}%"
+            tolerant_clause, tolerant_params = cls._tolerant_clause(kw, alias, tolerant)
+            tsquery, ts_params = cls.build_tsquery(kw)
+            if not tsquery:
+                conditions.append(f"{alias}.content ILIKE %s{tolerant_clause}")
+                params.extend([like] + tolerant_params)
+                continue
+            conditions.append(
+                f"({alias}.search_vector @@ {tsquery}"
+                f" OR (numnode({tsquery}) = 0 AND {alias}.content ILIKE %s){tolerant_clause})"
+            )
+            params.extend(ts_params + ts_params + [like] + tolerant_params)
+            queries.append(tsquery)
+            query_params.extend(ts_params)
+        if not conditions:
+            return 'FALSE', [], '', []
+        query = f"({' || '.join(queries)})" if queries else ''
+        return f"({' OR '.join(conditions)})", params, query, query_params
+
+    @classmethod
+    def build_term_hits(cls, keywords: List[str], alias: str = 'si') -> Tuple[str, List[str]]:
+        """
+        Выражение ARRAY[...] с числом вхождений словоформ каждого термина в документ
+        (по позициям лексем в search_vector, без чтения content).
+
+        Нужно, когда документ найден морфологически («поставки» по «поставка»),
+        а подсчёт подстрок по chunks даёт ноль. Для многословных терминов
+        считаются вхождения всех их слов.
+
+        Returns:
+            (SQL-выражение int[], параметры)
+        """
+        parts: List[str] = []
+        params: List[str] = []
+        for kw in keywords:
+            words = _WORD_RE.findall(kw or '')
+            if not words:
+                parts.append('0')
+                continue
+            if kw.rstrip().endswith('*'):
+                match = (f"EXISTS (SELECT 1 FROM unnest(tsvector_to_array(to_tsvector('{TS_CONFIG}', %s))) l"
+                         f" WHERE starts_with(v.lexeme, l))")
+            else:
+                match = f"v.lexeme = ANY(tsvector_to_array(to_tsvector('{TS_CONFIG}', %s)))"
+            parts.append(
+                f"(SELECT COALESCE(SUM(COALESCE(array_length(v.positions, 1), 1)), 0)::int"
+                f" FROM unnest({alias}.search_vector) v WHERE {match})"
+            )
+            params.append(' '.join(words))
+        return f"ARRAY[{', '.join(parts)}]::int[]", params
+
+    @classmethod
+    def _match_parts(
+        cls,
+        keywords: List[str],
+        mode: str,
+        tolerant: bool = False
+    ) -> Tuple[str, List[str], str, List[str], str, List[str]]:
+        """
+        Части запроса поиска для режима: условие отбора, выражение ранга, term_hits.
+
+        Returns:
+            (where, where_params, rank, rank_params, term_hits, term_hits_params)
+        """
+        where_clause, where_params, tsquery, tsquery_params = cls.build_fts_condition(
+            keywords, alias='si', tolerant=tolerant
+        )
+        if mode == SEARCH_MODE_SUBSTRING:
+            where_clause, where_params = cls.build_substring_condition(keywords, alias='si', tolerant=tolerant)
+            term_hits, term_hits_params = 'NULL::int[]', []
+        else:
+            term_hits, term_hits_params = cls.build_term_hits(keywords, alias='si')
+        if tsquery:
+            rank, rank_params = f"ts_rank(si.search_vector, {tsquery})", list(tsquery_params)
+        else:
+            rank, rank_params = '0.0', []
+        return where_clause, where_params, rank, rank_params, term_hits, term_hits_params
+
     def search(
         self,
         user_id: int,
         keywords: List[str],
-        limit: int = 100
+        limit: int = 100,
+        mode: str = SEARCH_MODE_FTS,
+        snippet_limit: int = DEFAULT_SNIPPET_LIMIT,
+        snippet_window_chars: int = DEFAULT_SNIPPET_WINDOW_CHARS
     ) -> List[Dict[str, Any]]:
         """
-        Поиск по ключевым словам с использованием full-text search.
+        Поиск документов пользователя по ключевым словам.
         
-        ИЗМЕНЕНИЕ: Используем ILIKE для гарантии полноты результатов,
-        а ts_rank как опциональный бонус для ранжирования.
+        Режимы:
+        - ``fts`` (по умолчанию) — морфологический: фильтр search_vector @@ tsquery
+          обслуживается GIN индексом, «поставки» находит «поставка», ``постав*`` —
+          поиск по префиксу (см. build_fts_condition). В результатах есть term_hits —
+          число словоформ каждого термина в документе;
+        - ``substring`` — прежний поиск подстрок (ILIKE по trigram индексу,
+          см. build_substring_condition), явный fallback для частей слов.
+        
+        В обоих режимах ранжирование и сниппет строятся по tsquery терминов.
+        С self.tolerant находятся и термины, разорванные пробелом, дефисом или
+        переносом строки (content_squashed, см. build_substring_condition).
+        Сначала отбираются и ранжируются строки, затем ts_headline строится только
+        для первых snippet_limit из них по окну вокруг первого совпадения
+        (см. build_headlines); у остальных snippet=None — их сниппеты получают
+        через get_snippets.
         
         Args:
             user_id: ID пользователя
             keywords: Список ключевых слов для поиска
             limit: Максимальное количество результатов
+            mode: 'fts' или 'substring'
+            snippet_limit: Для скольких первых результатов строить сниппет
+            snippet_window_chars: Полуширина окна текста для ts_headline, символов
             
         Returns:
             Список словарей с результатами поиска
         """
+        keywords = [kw for kw in keywords if kw]
         if not keywords:
             return []
+        if mode not in SEARCH_MODES:
+            raise ValueError(f'Неизвестный режим поиска: {mode}')
         
         results = []
         
         with self.db.cursor() as cur:
             try:
-                # Формируем условие: (content ILIKE %kw1% OR content ILIKE %kw2% ...)
-                like_conditions = []
-                params = []
-                for kw in keywords:
-                    like_conditions.append("si.content ILIKE %s")
-                    params.append(f'%{kw}%')
-                
-                where_clause = " OR ".join(like_conditions)
-                
-                # Добавляем user_id и limit в параметры
-                params.insert(0, user_id)
-                params.append(limit)
-                
-                # Формируем поисковый запрос для tsquery (для ranking)
-                safe_keywords = []
-                for kw in keywords:
-                    safe_kw = ''.join(c for c in kw if c.isalnum() or c.isspace())
-                    if safe_kw.strip():
-                        safe_keywords.append(safe_kw.strip())
-                
-                search_query = ' | '.join(safe_keywords) if safe_keywords else ''
+                (where_clause, where_params, rank, rank_params,
+                 term_hits, term_hits_params) = self._match_parts(keywords, mode, self.tolerant)
                 
-                # Запрос с ranking, но фильтрация через ILIKE для полноты
                 # ВАЖНО: фильтруем удалённые документы через JOIN с user_documents
                 cur.execute(
                     f"""
@@ -142,43 +408,341 @@ class SearchIndexRepository:
                         si.document_id,
                         si.content,
                         si.metadata,
-                        CASE 
-                            WHEN si.search_vector IS NOT NULL AND %s != '' 
-                            THEN ts_rank(si.search_vector, to_tsquery('russian', %s))
-                            ELSE 0.0
-                        END as rank,
-                        CASE 
-                            WHEN si.search_vector IS NOT NULL AND %s != ''
-                            THEN ts_headline('russian', si.content, to_tsquery('russian', %s), 
-                                           'MaxWords=50, MinWords=30, ShortWord=3')
-                            ELSE LEFT(si.content, 200)
-                        END as snippet
+                        COALESCE({rank}, 0.0) as rank,
+                        {term_hits} as term_hits
                     FROM search_index si
                     JOIN user_documents ud ON ud.document_id = si.document_id AND ud.user_id = si.user_id
                     WHERE si.user_id = %s
                       AND ud.is_soft_deleted = FALSE
-                      AND ({where_clause})
+                      AND {where_clause}
                     ORDER BY rank DESC, si.id
                     LIMIT %s;
                     """,
-                    [search_query, search_query, search_query, search_query, user_id] + params[1:]
+                    rank_params + term_hits_params + [user_id] + where_params + [limit]
                 )
                 
                 for row in cur.fetchall():
-                    results.append({
+                    result = {
                         'id': row[0],
                         'document_id': row[1],
                         'content': row[2],
                         'metadata': row[3] if row[3] else {},
                         'rank': float(row[4]) if row[4] else 0.0,
-                        'snippet': row[5]
-                    })
+                        'snippet': None
+                    }
+                    if row[5] is not None:
+                        result['term_hits'] = dict(zip(keywords, row[5]))
+                    results.append(result)
             except Exception as e:
-                logger.error(f"Ошибка выполнения поискового запроса: {e}")
+                logger.error(f"Ошибка выполнения поискового запроса ({mode}): {e}")
                 # Fallback: простой LIKE поиск
                 return self.simple_search(user_id, keywords, limit)
         
-        logger.info(f"Поиск по {len(keywords)} ключевым словам: найдено {len(results)} результатов")
+        # Сниппеты — только для первых строк выдачи, остальные запрашиваются отдельно (get_snippets)
+        top = results[:max(0, snippet_limit)]
+        if top:
+            headlines = self.build_headlines([r['content'] or '' for r in top], keywords, snippet_window_chars)
+            for result, headline in zip(top, headlines):
+                result['snippet'] = headline
+        
+        logger.info(f"Поиск ({mode}) по {len(keywords)} ключевым словам: найдено {len(results)} результатов")
+        return results
+    
+    def search_page(
+        self,
+        user_id: int,
+        keywords: List[str],
+        page_size: int = 50,
+        after: Optional[Tuple[float, int]] = None,
+        mode: str = SEARCH_MODE_FTS
+    ) -> List[Dict[str, Any]]:
+        """
+        Страница результатов поиска с keyset-пагинацией по (rank DESC, document_id).
+
+        В отличие от search() не читает content и не строит сниппеты: возвращает
+        только page_size строк, поэтому время до первой страницы не зависит от
+        общего числа совпадений (кроме сортировки по рангу, которая идёт по
+        top-N без материализации текстов). Порядок стабилен: document_id
+        уникален для пользователя, rank сравнивается как real — ровно то
+        значение, которое вернул предыдущий запрос.
+
+        Args:
+            user_id: ID пользователя
+            keywords: Список ключевых слов
+            page_size: Размер страницы
+            after: (rank, document_id) последней строки предыдущей страницы
+            mode: 'fts' или 'substring'
+
+        Returns:
+            Список словарей {document_id, metadata, rank, term_hits?}
+        """
+        keywords = [kw for kw in keywords if kw]
+        if not keywords:
+            return []
+        if mode not in SEARCH_MODES:
+            raise ValueError(f'Неизвестный режим поиска: {mode}')
+
+        (where_clause, where_params, rank, rank_params,
+         term_hits, term_hits_params) = self._match_parts(keywords, mode, self.tolerant)
+        keyset, keyset_params = '', []
+        if after is not None:
+            keyset = "WHERE si.rank < %s::real OR (si.rank = %s::real AND si.document_id > %s)"
+            keyset_params = [after[0], after[0], int(after[1])]
+
+        with self.db.cursor() as cur:
+            # term_hits считается во внешнем запросе — только для строк страницы
+            cur.execute(
+                f"""
+                SELECT si.document_id, si.metadata, si.rank, {term_hits} AS term_hits
+                FROM (
+                    SELECT si.document_id, si.metadata, si.search_vector,
+                           COALESCE({rank}, 0)::real AS rank
+                    FROM search_index si
+                    JOIN user_documents ud ON ud.document_id = si.document_id AND ud.user_id = si.user_id
+                    WHERE si.user_id = %s
+                      AND ud.is_soft_deleted = FALSE
+                      AND {where_clause}
+                ) si
+                {keyset}
+                ORDER BY si.rank DESC, si.document_id
+                LIMIT %s;
+                """,
+                term_hits_params + rank_params + [user_id] + where_params + keyset_params + [int(page_size)]
+            )
+            rows = cur.fetchall()
+
+        results = []
+        for row in rows:
+            result = {
+                'document_id': row[0],
+                'metadata': row[1] if row[1] else {},
+                'rank': float(row[2]) if row[2] else 0.0,
+            }
+            if row[3] is not None:
+                result['term_hits'] = dict(zip(keywords, row[3]))
+            results.append(result)
+        return results
+
+    @staticmethod
+    def snippet_window(content: str, keywords: List[str], radius: int = DEFAULT_SNIPPET_WINDOW_CHARS) -> str:
+        """
+        Фрагмент content вокруг первого совпадения — вход для ts_headline.
+
+        Словоформы ищутся по начальной части слова («поставки» → «постав»), так что
+        окно находится и для документов, найденных морфологически. Если ничего не
+        найдено, берётся начало текста.
+
+        Args:
+            content: Полный текст документа
+            keywords: Термины поиска
+            radius: Полуширина окна, символов
+
+        Returns:
+            Подстрока content длиной не больше 2 * radius
+        """
+        if len(content) <= 2 * radius:
+            return content
+        text_lower = content.lower()
+        first = -1
+        for kw in keywords:
+            probes = [w if len(w) <= 4 else w[:max(4, len(w) - 2)] for w in _WORD_RE.findall(kw.lower())]
+            for probe in probes or [kw.lower()]:
+                pos = text_lower.find(probe)
+                if pos != -1 and (first == -1 or pos < first):
+                    first = pos
+        if first == -1:
+            return content[:2 * radius]
+        start = max(0, first - radius)
+        return content[start:start + 2 * radius]
+
+    def build_headlines(
+        self,
+        contents: List[str],
+        keywords: List[str],
+        window: int = DEFAULT_SNIPPET_WINDOW_CHARS
+    ) -> List[str]:
+        """
+        ts_headline для набора текстов одним запросом, каждый — по ограниченному окну.
+
+        Args:
+            contents: Тексты документов
+            keywords: Термины поиска
+            window: Полуширина окна вокруг первого совпадения, символов
+
+        Returns:
+            Сниппеты в порядке contents (с разметкой <b>…</b>)
+        """
+        windows = [self.snippet_window(c or '', keywords, window) for c in contents]
+        _, _, tsquery, tsquery_params = self.build_fts_condition(keywords)
+        if not windows or not tsquery:
+            return [w[:200] for w in windows]
+        try:
+            with self.db.cursor() as cur:
+                cur.execute(
+                    f"""
+                    SELECT ts_headline('{TS_CONFIG}', w.txt, {tsquery}, %s)
+                    FROM unnest(%s::text[]) WITH ORDINALITY AS w(txt, ord)
+                    ORDER BY w.ord;
+                    """,
+                    tsquery_params + [HEADLINE_OPTIONS, windows]
+                )
+                return [row[0] or w[:200] for row, w in zip(cur.fetchall(), windows)]
+        except Exception as e:
+            logger.warning(f"Не удалось построить сниппеты ts_headline: {e}")
+            return [w[:200] for w in windows]
+
+    def get_snippets(
+        self,
+        user_id: int,
+        document_ids: List[int],
+        keywords: List[str],
+        window: int = DEFAULT_SNIPPET_WINDOW_CHARS
+    ) -> Dict[int, str]:
+        """
+        Сниппеты по запросу для документов ниже первых результатов выдачи.
+
+        Args:
+            user_id: ID пользователя
+            document_ids: ID документов (только видимые пользователю)
+            keywords: Термины поиска
+            window: Полуширина окна вокруг первого совпадения, символов
+
+        Returns:
+            {document_id: snippet}
+        """
+        keywords = [kw for kw in keywords if kw]
+        if not document_ids or not keywords:
+            return {}
+        with self.db.cursor() as cur:
+            cur.execute(
+                """
+                SELECT si.document_id, si.content
+                FROM search_index si
+                JOIN user_documents ud ON ud.document_id = si.document_id AND ud.user_id = si.user_id
+                WHERE si.user_id = %s
+                  AND ud.is_soft_deleted = FALSE
+                  AND si.document_id = ANY(%s);
+                """,
+                (user_id, list(document_ids))
+            )
+            rows = cur.fetchall()
+        headlines = self.build_headlines([row[1] or '' for row in rows], keywords, window)
+        return {row[0]: headline for row, headline in zip(rows, headlines)}
+    
+    @classmethod
+    def build_exclusion_match(
+        cls,
+        keywords: List[str],
+        mode: str = SEARCH_MODE_FTS,
+        tolerant: bool = False
+    ) -> Tuple[str, List[str]]:
+        """
+        Условие «документ упоминает хотя бы один термин» для множества исключения.
+
+        В режиме fts документ считается упоминающим термин, если его находит любой из
+        поисков /search: морфологический (GIN по search_vector) или по подстроке
+        (trigram GIN) — иначе исключение показывало бы документы, которые обычный
+        поиск выдаёт. Оба условия обслуживаются индексами (BitmapOr).
+
+        Returns:
+            (SQL-условие по алиасу m, параметры)
+        """
+        substring_clause, substring_params = cls.build_substring_condition(
+            [kw.rstrip().rstrip('*') or kw for kw in keywords if kw], alias='m', tolerant=tolerant
+        )
+        if mode == SEARCH_MODE_SUBSTRING:
+            return substring_clause, substring_params
+        fts_clause, fts_params, _, _ = cls.build_fts_condition(keywords, alias='m')
+        return f'({fts_clause} OR {substring_clause})', fts_params + substring_params
+
+    def search_excluding(
+        self,
+        user_id: int,
+        keywords: List[str],
+        limit: int = 500,
+        after_document_id: Optional[int] = None,
+        mode: str = SEARCH_MODE_FTS
+    ) -> List[Dict[str, Any]]:
+        """
+        Видимые документы пользователя, в которых НЕ встречается ни один из терминов.
+        
+        Исключение считается на уровне документа: множество документов, содержащих
+        хотя бы один термин, находится по индексам search_index (см.
+        build_exclusion_match), затем вычитается (anti-join) из видимых документов
+        пользователя. Документы без записи в search_index проверяются по chunks
+        целиком (NOT EXISTS по всем чанкам), ещё не разобранные документы без
+        чанков в выдачу не попадают — про их текст ничего не известно.
+        
+        Args:
+            user_id: ID пользователя
+            keywords: Список ключевых слов
+            limit: Максимальное количество результатов
+            after_document_id: Keyset-курсор: только документы с большим ID
+            mode: Режим поиска 'fts' или 'substring'
+            
+        Returns:
+            Список словарей {id, document_id, metadata}; id — None для документа без search_index
+            
+        Raises:
+            ValueError: неизвестный режим поиска
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Неизвестный режим поиска: {mode}")
+        terms = [kw for kw in keywords if kw]
+        if not terms:
+            return []
+        
+        match_clause, match_params = self.build_exclusion_match(terms, mode, self.tolerant)
+        chunk_conditions: List[str] = []
+        chunk_params: List[str] = []
+        for kw in terms:
+            chunk_conditions.append('c.text ILIKE %s')
+            chunk_params.append(f"%{self.escape_like(kw.rstrip().rstrip('*') or kw)}%")
+            squashed = self.tolerant_term(kw) if self.tolerant else None
+            if squashed:
+                chunk_conditions.append('squash_search_text(c.text) ILIKE %s')
+                chunk_params.append(f'%{self.escape_like(squashed)}%')
+        chunk_clause = ' OR '.join(chunk_conditions)
+        
+        results = []
+        with self.db.cursor() as cur:
+            cur.execute(
+                f"""
+                WITH matched AS MATERIALIZED (
+                    -- Документы, где есть хотя бы один термин: один проход по индексам search_index
+                    SELECT m.document_id
+                    FROM search_index m
+                    WHERE m.user_id = %s
+                      AND {match_clause}
+                )
+                SELECT si.id, ud.document_id,
+                       COALESCE(si.metadata, jsonb_build_object(
+                           'original_filename', ud.original_filename, 'user_path', ud.user_path))
+                FROM user_documents ud
+                LEFT JOIN search_index si ON si.document_id = ud.document_id AND si.user_id = ud.user_id
+                WHERE ud.user_id = %s
+                  AND ud.is_soft_deleted = FALSE
+                  AND NOT EXISTS (SELECT 1 FROM matched WHERE matched.document_id = ud.document_id)
+                  AND (
+                      si.id IS NOT NULL
+                      OR (EXISTS (SELECT 1 FROM chunks c WHERE c.document_id = ud.document_id)
+                          AND NOT EXISTS (SELECT 1 FROM chunks c
+                                          WHERE c.document_id = ud.document_id AND ({chunk_clause})))
+                  )
+                  AND ud.document_id > %s
+                ORDER BY ud.document_id
+                LIMIT %s;
+                """,
+                [user_id] + match_params + [user_id] + chunk_params + [after_document_id or 0, limit]
+            )
+            for row in cur.fetchall():
+                results.append({
+                    'id': row[0],
+                    'document_id': row[1],
+                    'metadata': row[2] if row[2] else {},
+                })
+        
+        logger.info(f"Поиск с исключением {len(terms)} терминов: найдено {len(results)} документов")
         return results
     
     def simple_search(
@@ -203,9 +767,8 @@ class SearchIndexRepository:
         
         results = []
         
-        # Формируем условие LIKE для каждого ключевого слова
-        like_conditions = ' OR '.join(['LOWER(si.content) LIKE %s'] * len(keywords))
-        like_params = [f'%{kw.lower()}%' for kw in keywords]
+        # Формируем условие ILIKE для каждого ключевого слова (trigram индекс)
+        like_conditions, like_params = self.build_substring_condition(keywords, alias='si')
         
         with self.db.cursor() as cur:
             query = f"""
@@ -216,7 +779,7 @@ class SearchIndexRepository:
                     si.metadata
                 FROM search_index si
                 WHERE si.user_id = %s
-                  AND ({like_conditions})
+                  AND {like_conditions}
                 LIMIT %s;
             """
             
@@ -73,6 +73,19 @@ class UserRepository(BaseRepository[User]):
         """
         return self.update(user_id, password_hash=new_password_hash)
     
+    def update_role(self, user_id: int, role: UserRole) -> Optional[User]:
+        """
+        Изменить роль пользователя.
+        
+        Args:
+            user_id: ID пользователя
+            role: Новая роль
+            
+        Returns:
+            Обновлённый User или None
+        """
+        return self.update(user_id, role=role.value)
+    
     def get_all_users(self, limit: Optional[int] = None, offset: int = 0):
         """
         Получить список всех пользователей.
@@ -8,7 +8,8 @@ Auth Middleware для извлечения и валидации JWT токен
 from functools import wraps
 from flask import request, g, jsonify, current_app
 
-from webapp.auth.jwt_manager import extract_token_from_header
+from webapp.auth.jwt_manager import extract_token_from_header, hash_token
+from webapp.auth.token_cache import CachedUser, get_token_cache
 from webapp.services.auth_service import AuthService
 from webapp.db.base import SessionLocal
 
@@ -29,6 +30,7 @@ def setup_auth_middleware(app):
         """
         Выполняется перед каждым запросом.
         Извлекает JWT токен и устанавливает g.user если токен валидный.
+        Повторные запросы с тем же токеном обслуживаются из кэша (без БД).
         """
         # Сбрасываем g.user
         g.user = None
@@ -46,6 +48,16 @@ def setup_auth_middleware(app):
             # Токен отсутствует - это нормально для публичных эндпоинтов
             return None
         
+        # Токен уже проверен недавно — обходимся без JWT и БД
+        token_cache = get_token_cache()
+        token_hash = hash_token(token) if token_cache is not None else None
+        if token_cache is not None:
+            cached = token_cache.get(token_hash)
+            if cached is not None:
+                g.user = cached.user
+                g.token_payload = cached.payload
+                return None
+        
         # Валидируем токен через AuthService
         db_session = SessionLocal()
         try:
@@ -64,8 +76,11 @@ def setup_auth_middleware(app):
                 return None
             
             # Успешная валидация - устанавливаем пользователя
-            g.user = user
+            # (снимок атрибутов: ORM-объект отсоединяется при закрытии сессии)
+            g.user = CachedUser.from_user(user)
             g.token_payload = payload
+            if token_cache is not None:
+                token_cache.put(token_hash, g.user, payload)
             
         except Exception as e:
             g.auth_error = f'Ошибка при валидации токена: {str(e)}'
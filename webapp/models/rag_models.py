@@ -6,10 +6,32 @@ import psycopg2
 from psycopg2.extras import execute_values
 from typing import List, Dict, Any, Optional
 import json
+import threading
+
+
+class _PooledConnection:
+    """
+    Аренда соединения из общего пула (см. webapp/db/pool.py).
+
+    Повторяет семантику ``with psycopg2_connection:`` — commit/rollback на каждом
+    выходе из блока, — но на выходе из внешнего блока возвращает соединение в пул.
+    Вложенные ``with db.connect()`` в том же потоке получают то же соединение,
+    поэтому незакоммиченные изменения внешнего блока видны внутреннему.
+    """
+
+    def __init__(self, owner: 'DatabaseConnection'):
+        self.owner = owner
+
+    def __enter__(self) -> psycopg2.extensions.connection:
+        return self.owner._acquire()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.owner._release(exc_type is None)
+        return False
 
 
 class DatabaseConnection:
-    """Управление подключением к PostgreSQL."""
+    """Управление подключением к PostgreSQL (соединения берутся из общего пула процесса)."""
     
     def __init__(self, database_url: str):
         """
@@ -19,29 +41,58 @@ class DatabaseConnection:
             database_url: URL подключения к PostgreSQL
         """
         self.database_url = database_url
-        self._connection = None
+        self._local = threading.local()
+    
+    def connect(self) -> _PooledConnection:
+        """Арендовать подключение к БД: ``with db.connect() as conn: ...``."""
+        return _PooledConnection(self)
+    
+    def _acquire(self) -> psycopg2.extensions.connection:
+        """Выдать соединение текущему потоку (вложенные вызовы — то же соединение)."""
+        local = self._local
+        if getattr(local, 'depth', 0) == 0:
+            from webapp.db.pool import get_engine_for_dsn
+            local.fairy = get_engine_for_dsn(self.database_url).raw_connection()
+        local.depth = getattr(local, 'depth', 0) + 1
+        return local.fairy.dbapi_connection
     
-    def connect(self) -> psycopg2.extensions.connection:
-        """Создать подключение к БД."""
-        if self._connection is None or self._connection.closed:
-            self._connection = psycopg2.connect(self.database_url)
-        return self._connection
+    def _release(self, success: bool) -> None:
+        """Завершить транзакцию блока; на внешнем уровне вернуть соединение в пул."""
+        local = self._local
+        fairy = getattr(local, 'fairy', None)
+        if fairy is None:
+            return
+        local.depth -= 1
+        try:
+            if success:
+                fairy.commit()
+            else:
+                fairy.rollback()
+        except Exception:
+            # Соединение сломано — не возвращаем его в пул
+            fairy.invalidate()
+            local.depth = 0
+            raise
+        finally:
+            if local.depth <= 0:
+                local.depth = 0
+                local.fairy = None
+                fairy.close()
     
     def close(self):
-        """Закрыть подключение."""
-        if self._connection and not self._connection.closed:
-            self._connection.close()
+        """Вернуть соединение текущего потока в пул (если оно арендовано)."""
+        local = self._local
+        fairy = getattr(local, 'fairy', None)
+        if fairy is not None:
+            local.fairy = None
+            local.depth = 0
+            fairy.close()
     
     def __enter__(self):
-        return self.connect()
+        return self._acquire()
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self._connection:
-            if exc_type is None:
-                self._connection.commit()
-            else:
-                self._connection.rollback()
-            self.close()
+        self._release(exc_type is None)
 
 
 class RAGDatabase:
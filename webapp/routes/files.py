@@ -137,10 +137,25 @@ def upload_files():
                     mime_type=file.content_type
                 )
                 
+                job_id = None
+                config = get_config()
+
+                # Фоновая индексация: ставим задачу в job_queue, индексирует воркер
+                if is_new and config.background_indexing:
+                    from webapp.services.indexing_worker import enqueue_index_job
+                    job_id = enqueue_index_job(
+                        db,
+                        user_id=user_id,
+                        document_id=document.id,
+                        original_filename=safe_parts[-1],
+                        user_path=user_path
+                    )
+                    current_app.logger.info(
+                        f"✅ Файл загружен, индексация поставлена в очередь: {user_path} → doc#{document.id}, job#{job_id}"
+                    )
                 # Автоматическая индексация из blob (если документ новый)
-                if is_new:
+                elif is_new:
                     from webapp.services.db_indexing import index_document_to_db
-                    config = get_config()
                     rag_db = _get_rag_db()  # RAGDatabase для index_document_to_db
                     
                     try:
@@ -177,7 +192,8 @@ def upload_files():
                     'user_path': user_path,
                     'document_id': document.id,
                     'is_new': is_new,
-                    'size_bytes': document.size_bytes
+                    'size_bytes': document.size_bytes,
+                    'job_id': job_id
                 })
                 
             except RuntimeError as e:
@@ -303,6 +319,7 @@ def download_file(filepath: str):
     try:
         from io import BytesIO
         from webapp.db.models import Document, UserDocument
+        from webapp.services.blob_storage_service import BlobStorageService
         from sqlalchemy import and_
         
         decoded_filepath = unquote(filepath)
@@ -326,7 +343,9 @@ def download_file(filepath: str):
         
         document, user_doc = result
         
-        if not document.blob:
+        # blob загружается отложенно — читаем байты явно, только для скачивания
+        blob_bytes = BlobStorageService(get_config()).get_file_bytes(db, document.id)
+        if not blob_bytes:
             return jsonify({'error': 'Файл не найден в БД'}), 404
         
         # Извлекаем имя файла и расширение
@@ -340,8 +359,6 @@ def download_file(filepath: str):
         # Определяем, можно ли отображать inline
         inline = ext in current_app.config.get('PREVIEW_INLINE_EXTENSIONS', set())
         
-        # Преобразуем memoryview в bytes
-        blob_bytes = bytes(document.blob) if not isinstance(document.blob, bytes) else document.blob
         file_size = len(blob_bytes)
         
         # Range support для больших файлов
@@ -8,3 +8,20 @@ health_bp = Blueprint('health', __name__)
 def health_check():
     """Проверка работоспособности приложения."""
     return jsonify({'status': 'ok'}), 200
+
+
+@health_bp.get('/health/db_pool')
+def db_pool_stats():
+    """Состояние пулов соединений PostgreSQL и время ожидания выдачи соединения."""
+    from webapp.db.pool import pool_stats
+    return jsonify(pool_stats()), 200
+
+
+@health_bp.get('/health/search_cache')
+def search_cache_stats():
+    """Счётчики кэша результатов поиска (hits, misses, hit_rate, размер)."""
+    from webapp.services.search_cache import get_search_cache
+    cache = get_search_cache()
+    if cache is None:
+        return jsonify({'enabled': False}), 200
+    return jsonify(dict(cache.stats(), enabled=True)), 200
@@ -2,11 +2,15 @@
 import os
 import re
 import json
+import base64
 import html as htmllib
 from datetime import datetime, timedelta
-from flask import Blueprint, request, jsonify, current_app, Response, g
+from flask import Blueprint, request, jsonify, current_app, Response, g, stream_with_context
 from webapp.services.files import allowed_file
 from webapp.services.file_search_state_service import FileSearchStateService
+from webapp.services.search_write_buffer import get_search_write_buffer
+from webapp.services.search_cache import get_search_cache, get_corpus_generation
+from document_processor.search.matcher import TermMatcher
 # Legacy imports removed: build_db_index, rebuild_all_documents (Блок 10)
 # get_folder_index_status оставлен для статусов
 from webapp.services.db_indexing import get_folder_index_status
@@ -60,45 +64,12 @@ def required_user_id() -> int:
     return 1
 
 
-def _fetch_snippet_from_chunk(conn, document_id: int, term: str, context_chars: int = 100) -> tuple[str, int]:
-    """Фолбэк: найти первый chunk с термином и вернуть (сниппет, count_in_chunk).
-
-    Args:
-        conn: psycopg2 connection
-        document_id: ID документа
-        term: искомый термин
-        context_chars: ширина контекста для _make_snippet
-
-    Returns:
-        (snippet, count) или ("", 0), если не найдено
-    """
-    try:
-        with conn.cursor() as cur2:
-            cur2.execute(
-                """
-                SELECT text
-                FROM chunks
-                WHERE document_id = %s AND text ILIKE %s
-                ORDER BY chunk_idx
-                LIMIT 1;
-                """,
-                (document_id, f"%{term}%"),
-            )
-            row = cur2.fetchone()
-            if not row:
-                return "", 0
-            chunk_text = row[0] or ""
-            # Простой подсчёт вхождений подстроки в чанке
-            cnt = chunk_text.lower().count(term.lower())
-            return _make_snippet(chunk_text, [term], context_chars=context_chars), cnt
-    except Exception:
-        return "", 0
-
-
 def _make_snippet(text: str, keywords: list, context_chars: int = 100) -> str:
     """
     Создаёт сниппет с контекстом вокруг первого найденного ключевого слова.
     
+    Все термины ищутся за один проход (TermMatcher: без учёта регистра и ё/е).
+    
     Args:
         text: Исходный текст
         keywords: Список ключевых слов для поиска
@@ -107,17 +78,23 @@ def _make_snippet(text: str, keywords: list, context_chars: int = 100) -> str:
     Returns:
         Сниппет с контекстом и многоточиями
     """
-    text_lower = text.lower()
-    
     # Ищем первое вхождение любого ключевого слова
     min_pos = len(text)
     found_keyword = None
+    match_len = 0
     
-    for keyword in keywords:
-        pos = text_lower.find(keyword.lower())
-        if pos != -1 and pos < min_pos:
-            min_pos = pos
-            found_keyword = keyword
+    first = TermMatcher.for_terms(keywords).first(text)
+    if first is not None:
+        min_pos, end, found_keyword = first
+        match_len = end - min_pos
+    else:
+        # Термин, разорванный пробелом/дефисом/переносом (толерантный поиск)
+        from webapp.db.repositories.search_index_repository import SearchIndexRepository
+        for keyword in keywords:
+            span = SearchIndexRepository.locate_tolerant(text, keyword)
+            if span and span[0] < min_pos:
+                min_pos, match_len = span[0], span[1] - span[0]
+                found_keyword = keyword
     
     # Если ни одно ключевое слово не найдено, возвращаем начало
     if found_keyword is None:
@@ -125,7 +102,7 @@ def _make_snippet(text: str, keywords: list, context_chars: int = 100) -> str:
     
     # Вычисляем границы сниппета
     start = max(0, min_pos - context_chars)
-    end = min(len(text), min_pos + len(found_keyword) + context_chars)
+    end = min(len(text), min_pos + match_len + context_chars)
     
     snippet = text[start:end]
     
@@ -138,70 +115,178 @@ def _make_snippet(text: str, keywords: list, context_chars: int = 100) -> str:
     return snippet
 
 
-def _count_term_in_chunks(conn, document_id: int, term: str) -> int:
+def _count_terms_in_chunks(conn, document_ids: list, terms: list, tolerant: bool = False) -> dict:
     """
-    Подсчитывает количество вхождений термина во всех chunks документа.
+    Подсчитывает вхождения всех терминов во всех chunks сразу для набора документов.
+    
+    Один агрегирующий запрос вместо запроса на каждую пару (документ, термин):
+    количество вхождений считается на стороне БД (без учёта регистра, без перекрытий —
+    как str.count), а для каждой пары возвращается только первый chunk с термином
+    (для фолбэк-сниппета), а не весь текст документа.
+    
+    С tolerant=True в chunk без точного вхождения считаются вхождения с разрывами
+    («по-ставка»): склеенный термин в squash_search_text(текст chunk). Если ни один
+    термин для этого не подходит (или tolerant=False), squash_search_text не
+    вызывается — запрос работает и без миграции b7e2d94c1f38.
     
     Args:
         conn: Подключение к БД
-        document_id: ID документа
-        term: Термин для поиска
+        document_ids: ID документов из результатов поиска
+        terms: Термины для подсчёта
+        tolerant: Считать и вхождения с разрывами
         
     Returns:
-        Количество вхождений термина
+        {(document_id, term): (count, first_chunk_text)} — только пары с count > 0
     """
+    terms = [t for t in terms if t]
+    if not document_ids or not terms:
+        return {}
+    
+    from webapp.db.repositories.search_index_repository import SearchIndexRepository
+    squashed = [SearchIndexRepository.tolerant_term(t) if tolerant else None for t in terms]
+    
     with conn.cursor() as cur:
-        cur.execute("""
-            SELECT text FROM chunks
-            WHERE document_id = %s
-            ORDER BY chunk_idx
-        """, (document_id,))
+        if not any(squashed):
+            cur.execute("""
+                WITH terms AS (
+                    SELECT t.ord, lower(t.term) AS term
+                    FROM unnest(%s::text[]) WITH ORDINALITY AS t(term, ord)
+                ),
+                hits AS (
+                    SELECT c.document_id, terms.ord, c.chunk_idx, c.text,
+                           (length(lower(c.text)) - length(replace(lower(c.text), terms.term, '')))
+                               / length(terms.term) AS cnt
+                    FROM chunks c
+                    JOIN terms ON strpos(lower(c.text), terms.term) > 0
+                    WHERE c.document_id = ANY(%s)
+                )
+                SELECT DISTINCT ON (document_id, ord)
+                       document_id,
+                       ord,
+                       SUM(cnt) OVER (PARTITION BY document_id, ord) AS total,
+                       text
+                FROM hits
+                ORDER BY document_id, ord, chunk_idx;
+            """, (terms, list(document_ids)))
+        else:
+            # Склеенный текст chunk считается один раз (LATERAL) и только для chunks,
+            # где какой-то склеенный термин не найден точным вхождением
+            cur.execute("""
+                WITH terms AS (
+                    SELECT t.ord, lower(t.term) AS term, lower(s.squashed) AS squashed
+                    FROM unnest(%s::text[]) WITH ORDINALITY AS t(term, ord)
+                    JOIN unnest(%s::text[]) WITH ORDINALITY AS s(squashed, ord) USING (ord)
+                ),
+                tolerant_terms AS (
+                    SELECT * FROM terms WHERE squashed IS NOT NULL
+                ),
+                chunk_texts AS (
+                    SELECT c.document_id, c.chunk_idx, c.text, lower(c.text) AS lowered
+                    FROM chunks c
+                    WHERE c.document_id = ANY(%s)
+                ),
+                squashed_texts AS (
+                    SELECT ct.*, sq.lowered AS squashed
+                    FROM chunk_texts ct
+                    CROSS JOIN LATERAL (
+                        SELECT lower(squash_search_text(ct.text)) AS lowered
+                    ) sq
+                    WHERE EXISTS (
+                        SELECT 1 FROM tolerant_terms tt WHERE strpos(ct.lowered, tt.term) = 0
+                    )
+                ),
+                hits AS (
+                    SELECT ct.document_id, terms.ord, ct.chunk_idx, ct.text,
+                           (length(ct.lowered) - length(replace(ct.lowered, terms.term, '')))
+                               / length(terms.term) AS cnt
+                    FROM chunk_texts ct
+                    JOIN terms ON strpos(ct.lowered, terms.term) > 0
+                    UNION ALL
+                    SELECT st.document_id, tt.ord, st.chunk_idx, st.text,
+                           (length(st.squashed) - length(replace(st.squashed, tt.squashed, '')))
+                               / length(tt.squashed) AS cnt
+                    FROM squashed_texts st
+                    JOIN tolerant_terms tt ON strpos(st.lowered, tt.term) = 0
+                        AND strpos(st.squashed, tt.squashed) > 0
+                )
+                SELECT DISTINCT ON (document_id, ord)
+                       document_id,
+                       ord,
+                       SUM(cnt) OVER (PARTITION BY document_id, ord) AS total,
+                       text
+                FROM hits
+                ORDER BY document_id, ord, chunk_idx;
+            """, (terms, squashed, list(document_ids)))
         rows = cur.fetchall()
-        
-        # Считаем во всех чанках
-        total_count = 0
-        term_lower = term.lower()
-        for row in rows:
-            chunk_text = row[0] or ''
-            total_count += chunk_text.lower().count(term_lower)
-        
-        return total_count
+    
+    counts = {}
+    for document_id, ord_, total, first_text in rows:
+        counts[(document_id, terms[ord_ - 1])] = (int(total or 0), first_text or '')
+    return counts
 
 
-def _search_in_db(db: RAGDatabase, owner_id: int, keywords: list, exclude_mode: bool = False) -> list:
+def _search_in_db(db: RAGDatabase, owner_id: int, keywords: list, exclude_mode: bool = False,
+                  mode: str = None, fallback_on_error: bool = True) -> list:
     """
     Поиск по search_index с fallback на chunks.
     
     Сначала пытаемся использовать search_index (быстрый полнотекстовый поиск через tsvector).
-    Если search_index пуст или произошла ошибка, используем fallback на chunks.
+    Если морфологический поиск ничего не нашёл, повторяем его поиском подстрок
+    (части слов, которых нет среди словоформ). В exclude_mode выдаются документы,
+    которых нет во множестве найденных по индексу (anti-join, см.
+    SearchIndexRepository.search_excluding). Если search_index пуст или произошла
+    ошибка, используем fallback на chunks.
     
     Args:
         db: Подключение к БД
         owner_id: ID владельца
         keywords: Список ключевых слов
         exclude_mode: Если True, ищет файлы БЕЗ ключевых слов
+        mode: Режим поиска 'fts' или 'substring' (по умолчанию — SEARCH_MODE)
+        fallback_on_error: При ошибке search_index искать по chunks; False — пробросить
+            исключение (кэш не должен сохранять деградированную выдачу)
         
     Returns:
         Список результатов поиска
     """
     # Пробуем поиск через search_index (приоритетный метод)
     try:
-        from webapp.db.repositories.search_index_repository import SearchIndexRepository
+        from webapp.db.repositories.search_index_repository import (
+            SearchIndexRepository, SEARCH_MODE_FTS, SEARCH_MODE_SUBSTRING
+        )
+        config = get_config()
+        mode = mode or config.search_mode
+        snippet_options = {
+            'snippet_limit': config.search_snippet_top_n,
+            'snippet_window_chars': config.search_snippet_window_chars,
+        }
         
         with db.db.connect() as conn:
-            search_repo = SearchIndexRepository(conn)
+            search_repo = SearchIndexRepository(conn, tolerant=config.search_tolerant_match)
             
             if exclude_mode:
-                # Для exclude_mode используем chunks (search_index не поддерживает NOT)
-                current_app.logger.info("Exclude mode: используем поиск по chunks")
-                return _search_in_chunks(db, owner_id, keywords, exclude_mode=True)
+                # Документы без терминов: anti-join к множеству найденных по индексу
+                excluded = search_repo.search_excluding(owner_id, keywords, limit=500, mode=mode)
+                current_app.logger.info(f"Exclude mode: {len(excluded)} документов без терминов")
+                return [_excluded_result(row['document_id'], row.get('metadata')) for row in excluded]
             
             # Полнотекстовый поиск через search_index
-            search_results = search_repo.search(owner_id, keywords, limit=500)
+            search_results = search_repo.search(owner_id, keywords, limit=500, mode=mode, **snippet_options)
+            if not search_results and mode == SEARCH_MODE_FTS:
+                current_app.logger.info("Морфологический поиск ничего не нашёл, повтор поиском подстрок")
+                search_results = search_repo.search(owner_id, keywords, limit=500,
+                                                    mode=SEARCH_MODE_SUBSTRING, **snippet_options)
             
             if search_results:
                 current_app.logger.info(f"Найдено {len(search_results)} результатов через search_index")
                 
+                # Пер-термин счётчики и первые chunks с терминами — одним запросом на весь результат
+                # ВАЖНО: считаем из chunks (полные данные), а не из search_index.content (может быть обрезан)
+                term_counts = _count_terms_in_chunks(
+                    conn, [sr['document_id'] for sr in search_results], keywords,
+                    tolerant=config.search_tolerant_match
+                )
+                
                 # Форматируем результаты для фронтенда
                 results = []
                 for sr in search_results:
@@ -214,26 +299,34 @@ def _search_in_db(db: RAGDatabase, owner_id: int, keywords: list, exclude_mode:
                     per_term = []
                     content = sr.get('content', '') or ''
                     content_lower = content.lower()
+                    term_hits = sr.get('term_hits') or {}
                     for term in keywords:
-                        # ВАЖНО: считаем из chunks (полные данные), а не из search_index.content (может быть обрезан)
-                        count = _count_term_in_chunks(conn, sr['document_id'], term)
+                        count, first_chunk = term_counts.get((sr['document_id'], term), (0, ''))
                         
-                        if count > 0:
-                            # Сниппет формируем из content, если там есть термин
-                            if content_lower.count(term.lower()) > 0:
-                                per_term.append({
-                                    'term': term,
-                                    'count': count,
-                                    'snippets': [_make_snippet(content, [term], 100)]
-                                })
+                        if count == 0 and term_hits.get(term):
+                            # Найдено только в другой словоформе: счётчик — по лексемам,
+                            # сниппет — ts_headline без разметки или окно вокруг основы слова
+                            if sr.get('snippet'):
+                                snippet = re.sub(r'</?b>', '', sr['snippet'])
                             else:
-                                # Фолбэк: ищем чанк с термином и формируем сниппет оттуда
-                                fb_snip, _ = _fetch_snippet_from_chunk(conn, sr['document_id'], term, context_chars=100)
-                                per_term.append({
-                                    'term': term,
-                                    'count': count,
-                                    'snippets': [fb_snip if fb_snip else '...']
-                                })
+                                snippet = SearchIndexRepository.snippet_window(content, [term], 100)
+                            per_term.append({
+                                'term': term,
+                                'count': term_hits[term],
+                                'snippets': [snippet or '...']
+                            })
+                        elif count > 0:
+                            # Сниппет формируем из content, если там есть термин,
+                            # иначе (фолбэк) — из первого чанка с термином
+                            if term.lower() in content_lower:
+                                snippet = _make_snippet(content, [term], 100)
+                            else:
+                                snippet = _make_snippet(first_chunk, [term], 100) if first_chunk else '...'
+                            per_term.append({
+                                'term': term,
+                                'count': count,
+                                'snippets': [snippet]
+                            })
                     
                     per_term.sort(key=lambda x: x['count'], reverse=True)
                     
@@ -245,8 +338,9 @@ def _search_in_db(db: RAGDatabase, owner_id: int, keywords: list, exclude_mode:
                         'path': normalized_path,
                         'matches': [{
                             'chunk_idx': 0,
-                            # Для совместимости оставляем общий сниппет, но он не влияет на per_term
-                            'snippet': sr.get('snippet', _make_snippet(content, keywords, 100)),
+                            # Для совместимости оставляем общий сниппет, но он не влияет на per_term.
+                            # None — результат ниже первых SEARCH_SNIPPET_TOP_N, см. /search/snippets
+                            'snippet': sr.get('snippet'),
                             'text': content[:200]
                         }],
                         'match_count': sum(pt['count'] for pt in per_term),
@@ -261,10 +355,66 @@ def _search_in_db(db: RAGDatabase, owner_id: int, keywords: list, exclude_mode:
                 return _search_in_chunks(db, owner_id, keywords, exclude_mode)
                 
     except Exception as e:
+        if not fallback_on_error:
+            raise
         current_app.logger.warning(f"Ошибка поиска через search_index: {e}, fallback на chunks")
         return _search_in_chunks(db, owner_id, keywords, exclude_mode)
 
 
+def _cached_search_in_db(db: RAGDatabase, owner_id: int, keywords: list, exclude_mode: bool = False,
+                         mode: str = None) -> list:
+    """
+    _search_in_db через кэш выдачи (см. webapp/services/search_cache.py).
+    
+    Ключ включает версию корпуса пользователя из corpus_generations; если её не
+    удалось прочитать (нет миграции, ошибка БД), поиск идёт мимо кэша. Выдача
+    fallback на chunks после ошибки search_index (например, тайм-аут блокировки)
+    не кэшируется: без морфологии и с лимитом строк она жила бы до смены корпуса.
+    """
+    mode = mode or get_config().search_mode
+    cache = get_search_cache()
+    if cache is None:
+        return _search_in_db(db, owner_id, keywords, exclude_mode, mode=mode)
+    try:
+        with db.db.connect() as conn:
+            generation = get_corpus_generation(conn, owner_id)
+    except Exception as e:
+        current_app.logger.debug(f"Кэш поиска пропущен: нет версии корпуса ({e})")
+        return _search_in_db(db, owner_id, keywords, exclude_mode, mode=mode)
+    
+    key = cache.make_key(owner_id, keywords, exclude_mode, mode, generation)
+    results = cache.get(key)
+    if results is None:
+        try:
+            results = _search_in_db(db, owner_id, keywords, exclude_mode, mode=mode, fallback_on_error=False)
+        except Exception as e:
+            current_app.logger.warning(f"Ошибка поиска через search_index: {e}, fallback на chunks (без кэша)")
+            return _search_in_chunks(db, owner_id, keywords, exclude_mode)
+        cache.put(key, results)
+    else:
+        current_app.logger.info(f"Поиск: результат из кэша ({len(results)} результатов)")
+    return results
+
+
+def _excluded_result(document_id: int, metadata: dict = None) -> dict:
+    """Результат exclude_mode (документ без терминов) в формате выдачи /search."""
+    metadata = metadata or {}
+    filename = metadata.get('original_filename') or f"doc_{document_id}"
+    normalized_path = normalize_path(metadata.get('user_path') or filename)
+    return {
+        'file': filename,
+        'storage_url': normalized_path,
+        'filename': filename,
+        'source': normalized_path,
+        'path': normalized_path,
+        'matches': [],
+        'match_count': 0,
+        'doc_id': document_id,
+        'per_term': [],
+        'status': 'no_match'
+    }
+
+
 def _search_in_chunks(db: RAGDatabase, owner_id: int, keywords: list, exclude_mode: bool = False) -> list:
     """
     FALLBACK: Поиск по чанкам в БД через глобальные documents с видимостью через user_documents.
@@ -286,29 +436,25 @@ def _search_in_chunks(db: RAGDatabase, owner_id: int, keywords: list, exclude_mo
         with db.db.connect() as conn:
             with conn.cursor() as cur:
                 if exclude_mode:
-                    # Ищем документы, где ни один термин не встречается
-                    conditions = []
-                    params = [owner_id]
-                    for kw in keywords:
-                        conditions.append("c.text NOT ILIKE %s")
-                        params.append(f'%{kw}%')
-                    where_clause = " AND ".join(conditions)
+                    # Документы, где ни один термин не встречается ни в одном чанке
+                    # (проверка на уровне документа, а не отдельного чанка)
+                    from webapp.db.repositories.search_index_repository import SearchIndexRepository
+                    conditions = " OR ".join(["c.text ILIKE %s"] * len(keywords))
+                    params = [owner_id] + [f'%{SearchIndexRepository.escape_like(kw)}%' for kw in keywords]
                     cur.execute(f"""
-SELECT DISTINCT d.id, COALESCE(ud.original_filename, d.sha256) AS filename
+SELECT d.id, ud.original_filename, ud.user_path
 FROM user_documents ud
 JOIN documents d ON d.id = ud.document_id
-JOIN chunks c ON c.document_id = d.id
 WHERE ud.user_id = %s AND ud.is_soft_deleted = FALSE
-  AND {where_clause};
+  AND EXISTS (SELECT 1 FROM chunks c WHERE c.document_id = d.id)
+  AND NOT EXISTS (SELECT 1 FROM chunks c WHERE c.document_id = d.id AND ({conditions}))
+ORDER BY d.id
+LIMIT 500;
 """, params)
-                    rows = cur.fetchall()
-                    for row in rows:
-                        results.append({
-                            'file': row[1],
-                            'matches': [],
-                            'match_count': 0,
-                            'status': 'no_match'
-                        })
+                    for doc_id, filename, user_path in cur.fetchall():
+                        results.append(_excluded_result(
+                            doc_id, {'original_filename': filename, 'user_path': user_path}
+                        ))
                 else:
                     # Обычный поиск по совпадениям
                     conditions = []
@@ -336,6 +482,7 @@ LIMIT 500;
                     
                     # Группируем по файлам и одновременно собираем per_term
                     file_matches = {}
+                    matcher = TermMatcher.for_terms(keywords)
                     for row in rows:
                         doc_id, filename, storage_url, chunk_idx, text = row
                         
@@ -367,11 +514,8 @@ LIMIT 500;
 
                         # Пер-термин статистика для UI (по каждому ключу считаем вхождения и берём до 2 сниппетов)
                         try:
-                            lower_text = text.lower()
-                            for term in keywords:
-                                term_lower = term.lower()
-                                # Простой подсчёт подстроки
-                                cnt = lower_text.count(term_lower)
+                            # Все термины за один проход по тексту chunk
+                            for term, cnt in matcher.counts(text).items():
                                 if cnt > 0:
                                     entry = file_matches[filename]['_per_term'][term]
                                     entry['count'] += cnt
@@ -409,12 +553,14 @@ LIMIT 500;
     return results
 
 
-def _update_document_access_metrics(db: RAGDatabase, results: list) -> None:
+def _update_document_access_metrics(results: list) -> None:
     """
-    Обновляет метрики использования документов (access_count, last_accessed_at).
+    Учитывает обращение к найденным документам (access_count, last_accessed_at).
+    
+    Запись отложенная: обращения схлопываются по документу в SearchWriteBuffer
+    и пишутся фоновым потоком одним UPDATE (см. webapp/services/search_write_buffer.py).
     
     Args:
-        db: Подключение к БД
         results: Список результатов поиска
     """
     if not results:
@@ -424,22 +570,9 @@ def _update_document_access_metrics(db: RAGDatabase, results: list) -> None:
         doc_ids = [r.get('doc_id') for r in results if r.get('doc_id')]
         if not doc_ids:
             return
-        
-        with db.db.connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    UPDATE documents
-                    SET access_count = access_count + 1,
-                        last_accessed_at = CURRENT_TIMESTAMP
-                    WHERE id = ANY(%s);
-                """, (doc_ids,))
-            conn.commit()
-            
-        current_app.logger.debug(f"Обновлены метрики для {len(doc_ids)} документов")
-        
+        get_search_write_buffer().record_access(doc_ids)
     except Exception as e:
-        current_app.logger.warning(f"Не удалось обновить метрики использования: {e}")
-
+        current_app.logger.warning(f"Не удалось учесть метрики использования: {e}")
 
 
 def _get_files_state():
@@ -448,28 +581,36 @@ def _get_files_state():
     return FileSearchStateService()
 
 
-@search_bp.route('/search', methods=['POST'])
-def search():
-    """Поиск по ключевым словам (спецификация 015).
-    
-    Поиск всегда происходит в БД с фильтрацией по user_documents (user_id, is_soft_deleted=FALSE).
-    Legacy файловый индекс больше не поддерживается.
+def _remember_search_terms(terms: list) -> None:
+    """Сохранить последние поисковые термины для UI (/ и /view_index)."""
+    try:
+        files_state = _get_files_state()
+        files_state.set_last_search_terms(','.join(terms))
+    except Exception:
+        current_app.logger.debug('Не удалось сохранить последние поисковые термины', exc_info=True)
+
+
+def _parse_search_terms(search_terms):
     """
-    search_terms = request.json.get('search_terms', '')
-    exclude_mode = request.json.get('exclude_mode', False)
+    Разбор и валидация search_terms (строка через запятую или массив).
+    
+    Не более 10 терминов длиной 2..64 символа, без дубликатов (без учёта регистра).
     
+    Returns:
+        (список терминов, None) или (None, текст ошибки)
+    """
     # Поддержка и списка и строки
     if isinstance(search_terms, list):
         raw_terms = [str(t).strip() for t in search_terms if str(t).strip()]
     elif isinstance(search_terms, str):
         if not search_terms.strip():
-            return jsonify({'error': 'Введите ключевые слова для поиска'}), 400
+            return None, 'Введите ключевые слова для поиска'
         raw_terms = [t.strip() for t in search_terms.split(',') if t.strip()]
     else:
-        return jsonify({'error': 'Неверный формат search_terms (ожидается строка или массив)'}), 400
+        return None, 'Неверный формат search_terms (ожидается строка или массив)'
     
     if not raw_terms:
-        return jsonify({'error': 'Введите ключевые слова для поиска'}), 400
+        return None, 'Введите ключевые слова для поиска'
     
     # Валидация: не более 10 терминов, длина 2..64, удаление дубликатов
     if len(raw_terms) > 50:  # жёсткий предел на вход
@@ -481,7 +622,26 @@ def search():
             seen.add(t.lower())
             filtered.append(t)
     if not filtered:
-        return jsonify({'error': 'Слишком короткие/длинные или пустые ключевые слова'}), 400
+        return None, 'Слишком короткие/длинные или пустые ключевые слова'
+    return filtered, None
+
+
+@search_bp.route('/search', methods=['POST'])
+def search():
+    """Поиск по ключевым словам (спецификация 015).
+    
+    Поиск всегда происходит в БД с фильтрацией по user_documents (user_id, is_soft_deleted=FALSE).
+    Legacy файловый индекс больше не поддерживается.
+    """
+    search_terms = request.json.get('search_terms', '')
+    exclude_mode = request.json.get('exclude_mode', False)
+    search_mode = request.json.get('search_mode') or None
+    if search_mode not in (None, 'fts', 'substring'):
+        return jsonify({'error': 'Неверный search_mode (ожидается fts или substring)'}), 400
+    
+    filtered, error = _parse_search_terms(search_terms)
+    if error:
+        return jsonify({'error': error}), 400
 
     current_app.logger.info(f"Поиск в БД: terms='{','.join(filtered)}', exclude_mode={exclude_mode}")
     
@@ -493,7 +653,7 @@ def search():
     
     try:
         # Поиск с фильтрацией по owner_id и is_visible=TRUE
-        results = _search_in_db(rag_db, owner_id, filtered, exclude_mode)
+        results = _cached_search_in_db(rag_db, owner_id, filtered, exclude_mode, mode=search_mode)
         
         # Логируем пути для отладки
         if results:
@@ -501,14 +661,10 @@ def search():
             current_app.logger.debug(f"Примеры путей в результатах поиска: {sample_paths}")
         
         # Обновляем метрики использования (access_count, last_accessed_at)
-        _update_document_access_metrics(rag_db, results)
+        _update_document_access_metrics(results)
         
         # Сохраняем последние поисковые термины для UI (/ и /view_index)
-        try:
-            files_state = _get_files_state()
-            files_state.set_last_search_terms(','.join(filtered))
-        except Exception:
-            current_app.logger.debug('Не удалось сохранить последние поисковые термины', exc_info=True)
+        _remember_search_terms(filtered)
         
         current_app.logger.info(f"Поиск в БД завершён: найдено {len(results)} результатов")
         return jsonify({'results': results})
@@ -518,6 +674,267 @@ def search():
         return jsonify({'error': f'Ошибка поиска: {str(e)}'}), 500
 
 
+# Префикс режима курсора для поиска «без терминов» (ранга нет, ключ — только document_id):
+# 'exclude:fts' / 'exclude:substring' — вместе с режимом, которым строится множество найденных
+_EXCLUDE_CURSOR_MODE = 'exclude'
+SEARCH_PAGE_SIZE_DEFAULT = 50
+SEARCH_PAGE_SIZE_MAX = 200
+SEARCH_STREAM_MAX_RESULTS = 500
+
+
+def _encode_cursor(rank: float, document_id: int, mode: str) -> str:
+    """Непрозрачный keyset-курсор: позиция последней строки страницы и режим поиска."""
+    raw = json.dumps([rank, document_id, mode], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor: str):
+    """
+    Разбор курсора _encode_cursor.
+    
+    Returns:
+        (rank, document_id, mode)
+    
+    Raises:
+        ValueError: курсор повреждён
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        rank, document_id, mode = json.loads(raw.decode('utf-8'))
+        return float(rank), int(document_id), str(mode)
+    except Exception:
+        raise ValueError('Неверный cursor')
+
+
+def _search_page(db: RAGDatabase, owner_id: int, keywords: list, exclude_mode: bool = False,
+                 mode: str = None, cursor: str = None, page_size: int = SEARCH_PAGE_SIZE_DEFAULT):
+    """
+    Одна страница поиска в компактном формате (без сниппетов и дублирующихся путей).
+    
+    Страницы идут по keyset (rank DESC, document_id); курсор хранит и режим поиска,
+    чтобы продолжение шло тем же режимом, что и первая страница (в том числе после
+    fallback с fts на substring). Сниппеты — через /search/snippets.
+    
+    Args:
+        db: Подключение к БД
+        owner_id: ID владельца
+        keywords: Список ключевых слов
+        exclude_mode: Если True, ищет файлы БЕЗ ключевых слов
+        mode: Режим поиска 'fts' или 'substring' (по умолчанию — SEARCH_MODE)
+        cursor: next_cursor предыдущей страницы
+        page_size: Размер страницы
+        
+    Returns:
+        (результаты, next_cursor или None, режим)
+        
+    Raises:
+        ValueError: курсор повреждён
+    """
+    from webapp.db.repositories.search_index_repository import (
+        SearchIndexRepository, SEARCH_MODE_FTS, SEARCH_MODE_SUBSTRING
+    )
+    config = get_config()
+    after = None
+    if cursor:
+        rank, document_id, mode = _decode_cursor(cursor)
+        after = (rank, document_id)
+        prefix, _, exclude_search_mode = mode.partition(':')
+        exclude_mode = prefix == _EXCLUDE_CURSOR_MODE
+        if exclude_mode:
+            # Курсоры без режима (старый формат 'exclude') — режим по умолчанию
+            exclude_search_mode = exclude_search_mode or config.search_mode
+    elif exclude_mode:
+        exclude_search_mode = mode or config.search_mode
+    else:
+        mode = mode or config.search_mode
+    if exclude_mode:
+        mode = f'{_EXCLUDE_CURSOR_MODE}:{exclude_search_mode}'
+    
+    with db.db.connect() as conn:
+        repo = SearchIndexRepository(conn, tolerant=config.search_tolerant_match)
+        if exclude_mode:
+            rows = repo.search_excluding(owner_id, keywords, limit=page_size + 1,
+                                         after_document_id=after[1] if after else None,
+                                         mode=exclude_search_mode)
+        else:
+            rows = repo.search_page(owner_id, keywords, page_size + 1, after=after, mode=mode)
+            if not rows and after is None and mode == SEARCH_MODE_FTS:
+                mode = SEARCH_MODE_SUBSTRING
+                rows = repo.search_page(owner_id, keywords, page_size + 1, mode=mode)
+        
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        term_counts = {} if exclude_mode else _count_terms_in_chunks(
+            conn, [r['document_id'] for r in rows], keywords, tolerant=config.search_tolerant_match
+        )
+    
+    results = []
+    for row in rows:
+        metadata = row.get('metadata') or {}
+        path = normalize_path(metadata.get('user_path') or metadata.get('original_filename')
+                              or f"doc_{row['document_id']}")
+        terms = {}
+        term_hits = row.get('term_hits') or {}
+        for term in ([] if exclude_mode else keywords):
+            count = term_counts.get((row['document_id'], term), (0, ''))[0] or term_hits.get(term, 0)
+            if count:
+                terms[term] = count
+        results.append({
+            'doc_id': row['document_id'],
+            'path': path,
+            'rank': row.get('rank', 0.0),
+            'match_count': sum(terms.values()),
+            'terms': terms,
+        })
+    
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = _encode_cursor(last.get('rank', 0.0), last['document_id'], mode)
+    return results, next_cursor, mode
+
+
+def _parse_page_request(payload: dict):
+    """
+    Общий разбор тела /search/page и /search/stream.
+    
+    Returns:
+        (параметры для _search_page, None) или (None, текст ошибки)
+    """
+    filtered, error = _parse_search_terms(payload.get('search_terms', ''))
+    if error:
+        return None, error
+    search_mode = payload.get('search_mode') or None
+    if search_mode not in (None, 'fts', 'substring'):
+        return None, 'Неверный search_mode (ожидается fts или substring)'
+    try:
+        page_size = int(payload.get('page_size') or SEARCH_PAGE_SIZE_DEFAULT)
+    except (TypeError, ValueError):
+        return None, 'page_size должен быть целым числом'
+    cursor = payload.get('cursor') or None
+    if cursor is not None:
+        try:
+            _decode_cursor(str(cursor))
+        except ValueError as e:
+            return None, str(e)
+    return {
+        'keywords': filtered,
+        'exclude_mode': bool(payload.get('exclude_mode', False)),
+        'mode': search_mode,
+        'cursor': cursor,
+        'page_size': max(1, min(page_size, SEARCH_PAGE_SIZE_MAX)),
+    }, None
+
+
+@search_bp.route('/search/page', methods=['POST'])
+def search_page():
+    """Страница поиска с keyset-курсором и компактными результатами.
+    
+    Тело: {"search_terms", "exclude_mode"?, "search_mode"?, "page_size"? (≤200), "cursor"?}.
+    Ответ: {"results": [{"doc_id", "path", "rank", "match_count", "terms": {термин: число}}],
+            "next_cursor": str|null, "search_mode": str}.
+    """
+    params, error = _parse_page_request(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({'error': error}), 400
+    try:
+        owner_id = required_user_id()
+    except ValueError:
+        return jsonify({'error': 'Не указан идентификатор пользователя (X-User-ID)'}), 400
+    
+    try:
+        results, next_cursor, mode = _search_page(_get_rag_db(), owner_id, **params)
+    except Exception as e:
+        current_app.logger.exception("Ошибка постраничного поиска")
+        return jsonify({'error': f'Ошибка поиска: {str(e)}'}), 500
+    
+    _update_document_access_metrics(results)
+    if params['cursor'] is None:
+        _remember_search_terms(params['keywords'])
+    return jsonify({'results': results, 'next_cursor': next_cursor, 'search_mode': mode})
+
+
+@search_bp.route('/search/stream', methods=['POST'])
+def search_stream():
+    """Поиск в формате NDJSON: каждая страница уходит клиенту сразу после ранжирования.
+    
+    Тело — как у /search/page. Строки ответа:
+    {"results": [...], "next_cursor": ...} — по одной на страницу (не больше 500 результатов),
+    затем {"done": true, "total": N, "next_cursor": ...}; при ошибке — {"error": "..."}.
+    """
+    params, error = _parse_page_request(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({'error': error}), 400
+    try:
+        owner_id = required_user_id()
+    except ValueError:
+        return jsonify({'error': 'Не указан идентификатор пользователя (X-User-ID)'}), 400
+    rag_db = _get_rag_db()
+    
+    def _generate():
+        total = 0
+        cursor = params['cursor']
+        page_params = dict(params)
+        while True:
+            page_params['cursor'] = cursor
+            page_params['page_size'] = min(params['page_size'], SEARCH_STREAM_MAX_RESULTS - total)
+            try:
+                results, cursor, _ = _search_page(rag_db, owner_id, **page_params)
+            except Exception as e:
+                current_app.logger.exception("Ошибка потокового поиска")
+                yield json.dumps({'error': f'Ошибка поиска: {str(e)}'}, ensure_ascii=False) + '\n'
+                return
+            total += len(results)
+            _update_document_access_metrics(results)
+            yield json.dumps({'results': results, 'next_cursor': cursor}, ensure_ascii=False) + '\n'
+            if not cursor or total >= SEARCH_STREAM_MAX_RESULTS:
+                break
+        if params['cursor'] is None:
+            _remember_search_terms(params['keywords'])
+        yield json.dumps({'done': True, 'total': total, 'next_cursor': cursor}, ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(_generate()), mimetype='application/x-ndjson',
+                    headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'})
+
+
+@search_bp.route('/search/snippets', methods=['POST'])
+def search_snippets():
+    """Сниппеты по запросу для результатов ниже первых SEARCH_SNIPPET_TOP_N.
+    
+    Тело: {"search_terms": ..., "doc_ids": [int, ...]} (не более 100 документов).
+    Ответ: {"snippets": {"<doc_id>": "...<b>термин</b>..."}} — только для видимых документов.
+    """
+    payload = request.get_json(silent=True) or {}
+    filtered, error = _parse_search_terms(payload.get('search_terms', ''))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    doc_ids = payload.get('doc_ids')
+    if not isinstance(doc_ids, list) or not doc_ids:
+        return jsonify({'error': 'Укажите doc_ids (массив ID документов)'}), 400
+    try:
+        doc_ids = [int(d) for d in doc_ids[:100]]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'doc_ids должны быть целыми числами'}), 400
+    
+    try:
+        owner_id = required_user_id()
+    except ValueError:
+        return jsonify({'error': 'Не указан идентификатор пользователя (X-User-ID)'}), 400
+    
+    try:
+        from webapp.db.repositories.search_index_repository import SearchIndexRepository
+        config = get_config()
+        with _get_rag_db().db.connect() as conn:
+            snippets = SearchIndexRepository(conn).get_snippets(
+                owner_id, doc_ids, filtered, window=config.search_snippet_window_chars
+            )
+        return jsonify({'snippets': {str(doc_id): snippet for doc_id, snippet in snippets.items()}})
+    except Exception as e:
+        current_app.logger.exception("Ошибка построения сниппетов")
+        return jsonify({'error': f'Ошибка построения сниппетов: {str(e)}'}), 500
+
+
 # Удалено: парсинг файлового индекса (_search_index.txt) — legacy
 
 
@@ -545,6 +962,7 @@ def build_index_route():
         
         from webapp.db.models import Document, UserDocument, Chunk
         from webapp.services.db_indexing import index_document_to_db
+        from webapp.services.indexing_worker import enqueue_index_job
         from sqlalchemy import and_
         
         # Получаем все не удалённые документы пользователя (через SQLAlchemy)
@@ -561,18 +979,33 @@ def build_index_route():
             'total_docs': len(results),
             'reindexed': 0,
             'skipped_empty': 0,
+            'queued': 0,
             'errors': 0
         }
+        job_ids = []
         
         current_app.logger.info(f"Найдено {len(results)} документов для переиндексации user_id={owner_id}")
         
         for user_doc, document in results:
-            if not document.blob:
+            if not document.has_blob:
                 current_app.logger.warning(f"Документ {document.id} без blob, пропускаем")
                 stats['skipped_empty'] += 1
                 continue
             
             try:
+                # Фоновый режим: только ставим задачу, chunks пересоздаст воркер
+                if config.background_indexing:
+                    job_ids.append(enqueue_index_job(
+                        db,
+                        user_id=owner_id,
+                        document_id=document.id,
+                        original_filename=user_doc.original_filename or 'document',
+                        user_path=user_doc.user_path or user_doc.original_filename,
+                        force_rebuild=force_rebuild
+                    ))
+                    stats['queued'] += 1
+                    continue
+                
                 # Если force_rebuild=True, удаляем существующие chunks и search_index
                 if force_rebuild:
                     from webapp.db.models import SearchIndex
@@ -605,7 +1038,10 @@ def build_index_route():
                 current_app.logger.exception(f"Ошибка переиндексации документа {document.id}: {e}")
                 stats['errors'] += 1
         
-        message = f"Переиндексировано {stats['reindexed']}/{stats['total_docs']} документов"
+        if config.background_indexing:
+            message = f"Поставлено в очередь {stats['queued']}/{stats['total_docs']} документов"
+        else:
+            message = f"Переиндексировано {stats['reindexed']}/{stats['total_docs']} документов"
         if stats['errors'] > 0:
             message += f", ошибок: {stats['errors']}"
         
@@ -613,7 +1049,8 @@ def build_index_route():
         return jsonify({
             'success': True,
             'message': message,
-            'stats': stats
+            'stats': stats,
+            'job_ids': job_ids
         })
         
     except Exception as e:
@@ -641,6 +1078,7 @@ def rebuild_index_route():
         
         from webapp.db.models import Document, UserDocument, Chunk
         from webapp.services.db_indexing import index_document_to_db
+        from webapp.services.indexing_worker import enqueue_index_job
         from sqlalchemy import and_
         
         # Получаем все не удалённые документы пользователя (через SQLAlchemy)
@@ -657,18 +1095,33 @@ def rebuild_index_route():
             'total_docs': len(results),
             'reindexed': 0,
             'skipped_empty': 0,
+            'queued': 0,
             'errors': 0
         }
+        job_ids = []
         
         current_app.logger.info(f"Найдено {len(results)} документов для пересборки user_id={owner_id}")
         
         for user_doc, document in results:
-            if not document.blob:
+            if not document.has_blob:
                 current_app.logger.warning(f"Документ {document.id} без blob, пропускаем")
                 stats['skipped_empty'] += 1
                 continue
             
             try:
+                # Фоновый режим: только ставим задачу, chunks пересоздаст воркер
+                if config.background_indexing:
+                    job_ids.append(enqueue_index_job(
+                        db,
+                        user_id=owner_id,
+                        document_id=document.id,
+                        original_filename=user_doc.original_filename or 'document',
+                        user_path=user_doc.user_path or user_doc.original_filename,
+                        force_rebuild=True
+                    ))
+                    stats['queued'] += 1
+                    continue
+                
                 # Удаляем существующие chunks (принудительная пересборка)
                 db.query(Chunk).filter(Chunk.document_id == document.id).delete()
                 db.commit()
@@ -697,7 +1150,10 @@ def rebuild_index_route():
                 current_app.logger.exception(f"Ошибка пересборки документа {document.id}: {e}")
                 stats['errors'] += 1
         
-        message = f"Пересобрано {stats['reindexed']}/{stats['total_docs']} документов"
+        if config.background_indexing:
+            message = f"Поставлено в очередь {stats['queued']}/{stats['total_docs']} документов"
+        else:
+            message = f"Пересобрано {stats['reindexed']}/{stats['total_docs']} документов"
         if stats['errors'] > 0:
             message += f", ошибок: {stats['errors']}"
         
@@ -705,7 +1161,8 @@ def rebuild_index_route():
         return jsonify({
             'success': True,
             'message': message,
-            'stats': stats
+            'stats': stats,
+            'job_ids': job_ids
         })
         
     except Exception as e:
@@ -713,6 +1170,51 @@ def rebuild_index_route():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+@search_bp.get('/index_jobs')
+def index_jobs_route():
+    """Статус фоновых задач индексации пользователя (BACKGROUND_INDEXING=true).
+    
+    Query params:
+        ids: ID задач через запятую (из ответа /upload, /build_index, /rebuild_index)
+    
+    Returns:
+        JSON: {jobs: [{id, status, attempts, max_attempts, last_error, result, updated_at}], summary: {status: count}}
+    """
+    try:
+        owner_id = required_user_id()
+    except ValueError:
+        return jsonify({'error': 'Не указан идентификатор пользователя (X-User-ID)'}), 400
+    
+    try:
+        job_ids = [int(x) for x in (request.args.get('ids') or '').split(',') if x.strip()]
+    except ValueError:
+        return jsonify({'error': 'Некорректный список ids'}), 400
+    
+    try:
+        from webapp.db.repositories.job_queue_repository import JobQueueRepository
+        db = _get_db()
+        jobs = JobQueueRepository(db).get_user_jobs(owner_id, job_ids[:500])
+        
+        items = []
+        summary = {}
+        for job in jobs:
+            status = str(job.status)
+            summary[status] = summary.get(status, 0) + 1
+            items.append({
+                'id': job.id,
+                'status': status,
+                'attempts': job.attempts,
+                'max_attempts': job.max_attempts,
+                'last_error': job.last_error,
+                'result': job.result_json,
+                'updated_at': job.updated_at.isoformat() if job.updated_at else None
+            })
+        return jsonify({'jobs': items, 'summary': summary})
+    except Exception as e:
+        current_app.logger.exception("Ошибка получения статуса задач индексации")
+        return jsonify({'error': str(e)}), 500
+
+
 @search_bp.get('/index_status')
 def index_status():
     """Возвращает статус индексации и информацию о группах.
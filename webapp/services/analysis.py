@@ -5,6 +5,7 @@ from datetime import datetime
 from flask import current_app
 from typing import Dict, Any, Optional, Tuple
 from document_processor.analysis import Extractor
+from document_processor.search.segments import index_exists
 
 
 def run_analysis(index_path: str) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
@@ -12,13 +13,14 @@ def run_analysis(index_path: str) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
     Запускает анализ сводного индекса.
     
     Args:
-        index_path: Путь к файлу _search_index.txt
+        index_path: Путь индекса _search_index.txt (при групповой индексации
+            самого файла нет — читаются сегменты по манифесту)
         
     Returns:
         tuple: (success, message, result_dict)
     """
     try:
-        if not os.path.exists(index_path):
+        if not index_exists(index_path):
             return False, f'Индекс не найден: {index_path}', None
         
         current_app.logger.info(f'Запуск анализа индекса: {index_path}')
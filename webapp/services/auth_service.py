@@ -11,6 +11,7 @@ from typing import Optional, Tuple
 from sqlalchemy.orm import Session
 
 from webapp.auth.jwt_manager import generate_token, verify_token, hash_token
+from webapp.auth import token_cache
 from webapp.db.repositories import UserRepository, SessionRepository
 from webapp.db.models import User, UserRole
 
@@ -228,6 +229,7 @@ class AuthService:
         """
         token_hash_value = hash_token(token)
         success = self.session_repo.invalidate_session(token_hash_value)
+        token_cache.invalidate_token(token_hash_value)
         
         if success:
             return True, None
@@ -308,6 +310,7 @@ class AuthService:
         if success:
             # Инвалидация всех сессий пользователя (требуется повторный вход)
             self.session_repo.invalidate_all_user_sessions(user_id)
+            token_cache.invalidate_user(user_id)
             return True, None
         else:
             return False, 'Ошибка при обновлении пароля'
@@ -329,7 +332,10 @@ class AuthService:
         Returns:
             True если успешно, False иначе
         """
-        return self.user_repo.update_user_name(user_id, first_name, last_name)
+        success = self.user_repo.update_user_name(user_id, first_name, last_name)
+        if success:
+            token_cache.invalidate_user(user_id)
+        return success
     
     def update_user_email(
         self,
@@ -353,6 +359,33 @@ class AuthService:
         
         success = self.user_repo.update_user_email(user_id, new_email)
         if success:
+            token_cache.invalidate_user(user_id)
             return True, None
         else:
             return False, 'Ошибка при обновлении email'
+    
+    def change_role(self, user_id: int, role: str) -> Tuple[bool, Optional[str]]:
+        """
+        Изменяет роль пользователя.
+        
+        Args:
+            user_id: ID пользователя
+            role: Новая роль ('user' или 'admin')
+            
+        Returns:
+            Кортеж (успех, ошибка)
+            
+        Note:
+            Кэш токенов пользователя сбрасывается: новая роль действует
+            со следующего запроса, без повторного входа.
+        """
+        try:
+            user_role = UserRole(role.lower())
+        except ValueError:
+            return False, f'Неверная роль: {role}. Допустимые: user, admin'
+        
+        if not self.user_repo.update_role(user_id, user_role):
+            return False, 'Пользователь не найден'
+        
+        token_cache.invalidate_user(user_id)
+        return True, None
@@ -133,10 +133,20 @@ class BlobStorageService:
         
         return new_doc, True  # Новый документ
     
+    @staticmethod
+    def _to_bytes(blob) -> Optional[bytes]:
+        """Привести значение bytea (memoryview/bytes) к bytes."""
+        if blob is None:
+            return None
+        return blob if isinstance(blob, bytes) else bytes(blob)
+    
     def get_file_bytes(self, db: Session, document_id: int) -> Optional[bytes]:
         """
         Получить байты файла из БД.
         
+        Document.blob загружается отложенно, поэтому содержимое читается
+        отдельным запросом только по колонке blob.
+        
         Args:
             db: Сессия БД
             document_id: ID документа
@@ -144,8 +154,22 @@ class BlobStorageService:
         Returns:
             Байты файла или None если не найдено
         """
-        doc = db.query(Document).filter(Document.id == document_id).first()
-        return doc.blob if doc else None
+        blob = db.query(Document.blob).filter(Document.id == document_id).scalar()
+        return self._to_bytes(blob)
+    
+    def get_file_bytes_by_sha256(self, db: Session, sha256: str) -> Optional[bytes]:
+        """
+        Получить байты файла по SHA256 (ключ дедупликации).
+        
+        Args:
+            db: Сессия БД
+            sha256: SHA256 содержимого
+            
+        Returns:
+            Байты файла или None если не найдено
+        """
+        blob = db.query(Document.blob).filter(Document.sha256 == sha256).scalar()
+        return self._to_bytes(blob)
     
     def get_file_stream(self, db: Session, document_id: int) -> Optional[io.BytesIO]:
         """
@@ -161,6 +185,19 @@ class BlobStorageService:
         file_bytes = self.get_file_bytes(db, document_id)
         return io.BytesIO(file_bytes) if file_bytes else None
     
+    def has_file(self, db: Session, document_id: int) -> bool:
+        """
+        Проверить наличие содержимого файла без чтения байтов.
+        
+        Args:
+            db: Сессия БД
+            document_id: ID документа
+            
+        Returns:
+            True если blob сохранён
+        """
+        return bool(db.query(Document.has_blob).filter(Document.id == document_id).scalar())
+    
     def check_size_limit_and_prune(self, db: Session, new_file_size: int) -> bool:
         """
         Проверить лимит БД и при необходимости удалить 30% файлов с минимальным retention score.
@@ -15,7 +15,7 @@ from typing import List, Dict, Any, Optional, Tuple
 from flask import current_app
 from webapp.models.rag_models import RAGDatabase
 from webapp.services.chunking import chunk_document
-from document_processor.extractors.text_extractor import extract_text_from_bytes
+from document_processor.extractors.sandbox import STATUS_OK, extract_text_sandboxed
 from webapp.utils.path_utils import normalize_path, get_relative_path
 
 
@@ -140,8 +140,17 @@ def index_document_to_db(
             blob_bytes = bytes(document_blob) if not isinstance(document_blob, bytes) else document_blob
             current_app.logger.info(f'[EXTRACT] Извлечение текста из blob, размер: {len(blob_bytes)} байт')
             ext = os.path.splitext(original_filename)[1].lower().lstrip('.')
-            content = extract_text_from_bytes(blob_bytes, ext) or ""
-            current_app.logger.info(f'[EXTRACT] extract_text_from_bytes вернул {len(content)} символов')
+            # Извлечение в отдельном процессе с лимитами времени и памяти:
+            # зависший или «раздутый» документ не затрагивает веб-процесс
+            extracted = extract_text_sandboxed(blob_bytes, ext)
+            content = extracted['text'] or ""
+            if extracted['status'] != STATUS_OK:
+                current_app.logger.warning(
+                    f'[EXTRACT] Извлечение {original_filename} прервано: {extracted["status"]} ({extracted["error"]})'
+                )
+            current_app.logger.info(
+                f'[EXTRACT] Извлечено {len(content)} символов за {extracted["elapsed_ms"]} мс'
+            )
         except Exception as e:
             current_app.logger.exception(f'Ошибка извлечения текста из blob {original_filename}: {e}')
             raise
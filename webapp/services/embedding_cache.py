@@ -0,0 +1,125 @@
+"""Кэш эмбеддингов в PostgreSQL, адресуемый по содержимому текста.
+
+Ключ: (модель, размерность, sha256 нормализованного текста). Нормализация
+(NFKC + схлопывание пробелов) делает ключ устойчивым к переносам строк и
+лишним пробелам, которые различаются между повторной нарезкой документа и
+почти-дубликатами в корпусе закупок.
+
+Ошибки кэша никогда не ломают получение эмбеддингов: при недоступности БД
+сервис работает как без кэша и увеличивает счётчик errors.
+"""
+import hashlib
+import re
+import threading
+import unicodedata
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Нормализовать текст для ключа кэша (NFKC, схлопывание пробелов, trim)."""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFKC', text or '')).strip()
+
+
+def text_hash(text: str) -> str:
+    """sha256 нормализованного текста (ключ кэша)."""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+class EmbeddingCacheService:
+    """Чтение/запись кэша эмбеддингов и счётчики попаданий (общие для процесса)."""
+
+    _stats_lock = threading.Lock()
+    _stats = {'hits': 0, 'misses': 0, 'writes': 0, 'errors': 0}
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None):
+        """
+        Args:
+            session_factory: Фабрика SQLAlchemy сессий (по умолчанию SessionLocal)
+        """
+        if session_factory is None:
+            from webapp.db.base import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+
+    @classmethod
+    def _count(cls, **deltas: int) -> None:
+        with cls._stats_lock:
+            for key, delta in deltas.items():
+                cls._stats[key] += delta
+
+    @classmethod
+    def stats(cls) -> Dict[str, float]:
+        """Счётчики кэша: hits, misses, writes, errors и hit_rate."""
+        with cls._stats_lock:
+            data = dict(cls._stats)
+        lookups = data['hits'] + data['misses']
+        data['hit_rate'] = round(data['hits'] / lookups, 4) if lookups else 0.0
+        return data
+
+    @classmethod
+    def reset_stats(cls) -> None:
+        """Сбросить счётчики (для тестов и мониторинга по интервалам)."""
+        with cls._stats_lock:
+            for key in cls._stats:
+                cls._stats[key] = 0
+
+    def get_many(self, model: str, dimension: int, text_hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        Найти эмбеддинги в кэше.
+
+        Args:
+            model: Модель эмбеддингов
+            dimension: Размерность
+            text_hashes: Хэши нормализованных текстов (text_hash)
+
+        Returns:
+            {text_sha256: embedding} — только попадания
+        """
+        from webapp.db.repositories.embedding_cache_repository import EmbeddingCacheRepository
+
+        hashes = set(text_hashes)
+        if not hashes:
+            return {}
+        session = self.session_factory()
+        try:
+            found = EmbeddingCacheRepository(session).get_many(model, dimension, hashes)
+        except Exception:
+            session.rollback()
+            self._count(errors=1, misses=len(hashes))
+            return {}
+        finally:
+            session.close()
+
+        self._count(hits=len(found), misses=len(hashes) - len(found))
+        return found
+
+    def put_many(self, model: str, dimension: int, embeddings: Dict[str, List[float]]) -> None:
+        """
+        Сохранить новые эмбеддинги пакетно.
+
+        Args:
+            model: Модель эмбеддингов
+            dimension: Размерность
+            embeddings: {text_sha256: embedding}
+        """
+        from webapp.db.repositories.embedding_cache_repository import EmbeddingCacheRepository
+
+        if not embeddings:
+            return
+        session = self.session_factory()
+        try:
+            written = EmbeddingCacheRepository(session).put_many(model, dimension, embeddings)
+            self._count(writes=written)
+        except Exception:
+            session.rollback()
+            self._count(errors=1)
+        finally:
+            session.close()
+
+
+__all__ = ['EmbeddingCacheService', 'normalize_text', 'text_hash']
@@ -1,9 +1,11 @@
 """Сервис для работы с эмбеддингами OpenAI."""
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional
 import openai
 from flask import current_app
 
+from webapp.services.embedding_cache import EmbeddingCacheService, text_hash
+
 
 class EmbeddingsService:
     """Сервис для генерации векторных представлений текста."""
@@ -11,7 +13,8 @@ class EmbeddingsService:
     def __init__(
         self,
         api_key: Optional[str] = None,
-        model: str = "text-embedding-3-small"
+        model: str = "text-embedding-3-small",
+        cache: Optional[EmbeddingCacheService] = None
     ):
         """
         Инициализация сервиса.
@@ -19,9 +22,11 @@ class EmbeddingsService:
         Args:
             api_key: API ключ OpenAI (если None, берётся из конфига/env)
             model: Модель эмбеддингов
+            cache: Кэш эмбеддингов (если None — каждый текст отправляется провайдеру)
         """
         self.api_key = api_key or self._get_api_key()
         self.model = model
+        self.cache = cache
         
         # Настраиваем клиент OpenAI
         if self.api_key:
@@ -56,6 +61,12 @@ class EmbeddingsService:
         if not text or not text.strip():
             return None
         
+        key = text_hash(text)
+        if self.cache is not None:
+            cached = self.cache.get_many(self.model, self.get_dimension(), [key])
+            if key in cached:
+                return cached[key]
+        
         try:
             # Используем новый API клиент OpenAI
             client = openai.OpenAI(api_key=self.api_key)
@@ -66,7 +77,10 @@ class EmbeddingsService:
             )
             
             if response and response.data:
-                return response.data[0].embedding
+                embedding = response.data[0].embedding
+                if self.cache is not None:
+                    self.cache.put_many(self.model, self.get_dimension(), {key: embedding})
+                return embedding
             
             return None
             
@@ -107,13 +121,36 @@ class EmbeddingsService:
         # Результирующий массив
         results = [None] * len(texts)
         
+        # Группируем одинаковые (после нормализации) тексты: каждый уникальный текст
+        # запрашивается не более одного раза — из кэша или у провайдера
+        indices_by_hash: Dict[str, List[int]] = {}
+        text_by_hash: Dict[str, str] = {}
+        for i, t in filtered_texts:
+            key = text_hash(t)
+            indices_by_hash.setdefault(key, []).append(i)
+            text_by_hash.setdefault(key, t)
+        
+        if self.cache is not None:
+            cached = self.cache.get_many(self.model, self.get_dimension(), indices_by_hash.keys())
+            for key, embedding in cached.items():
+                for i in indices_by_hash[key]:
+                    results[i] = embedding
+            pending = [(key, text_by_hash[key]) for key in indices_by_hash if key not in cached]
+        else:
+            pending = list(text_by_hash.items())
+        
+        if not pending:
+            return results
+        
+        new_embeddings: Dict[str, List[float]] = {}
+        
         try:
             client = openai.OpenAI(api_key=self.api_key)
             
             # Обрабатываем батчами
-            for batch_start in range(0, len(filtered_texts), batch_size):
-                batch_end = min(batch_start + batch_size, len(filtered_texts))
-                batch = filtered_texts[batch_start:batch_end]
+            for batch_start in range(0, len(pending), batch_size):
+                batch_end = min(batch_start + batch_size, len(pending))
+                batch = pending[batch_start:batch_end]
                 
                 # Извлекаем только тексты для API
                 batch_texts = [t[1] for t in batch]
@@ -127,8 +164,10 @@ class EmbeddingsService:
                     if response and response.data:
                         # Распределяем результаты по исходным индексам
                         for j, embedding_obj in enumerate(response.data):
-                            original_index = batch[j][0]
-                            results[original_index] = embedding_obj.embedding
+                            key = batch[j][0]
+                            new_embeddings[key] = embedding_obj.embedding
+                            for i in indices_by_hash[key]:
+                                results[i] = embedding_obj.embedding
                 
                 except Exception as e:
                     try:
@@ -137,6 +176,9 @@ class EmbeddingsService:
                         pass
                     # Пропускаем этот батч, оставляя None
             
+            if self.cache is not None:
+                self.cache.put_many(self.model, self.get_dimension(), new_embeddings)
+            
             return results
             
         except Exception as e:
@@ -144,7 +186,8 @@ class EmbeddingsService:
                 current_app.logger.error(f'Ошибка батч-обработки эмбеддингов: {e}')
             except Exception:
                 pass
-            return [None] * len(texts)
+            # Попадания из кэша сохраняем, остальные — None
+            return results
     
     def get_dimension(self) -> int:
         """Получить размерность векторов для модели."""
@@ -177,4 +220,12 @@ def get_embeddings_service(
         except Exception:
             model = 'text-embedding-3-small'
     
-    return EmbeddingsService(api_key=api_key, model=model)
+    cache = None
+    try:
+        from webapp.config.config_service import get_config
+        if get_config().embedding_cache_enabled:
+            cache = EmbeddingCacheService()
+    except Exception:
+        cache = None
+    
+    return EmbeddingsService(api_key=api_key, model=model, cache=cache)
@@ -243,6 +243,12 @@ class FileSearchStateService:
             if not user_id:
                 return ''
             
+            # Термины последнего поиска могут ещё ждать записи в буфере
+            from webapp.services.search_write_buffer import get_search_write_buffer
+            pending = get_search_write_buffer().pending_last_search_terms(user_id)
+            if pending is not None:
+                return pending
+            
             from webapp.db import get_db
             from webapp.db.repositories.file_search_state_repository import FileSearchStateRepository
             
@@ -268,15 +274,9 @@ class FileSearchStateService:
             if not user_id:
                 return
             
-            from webapp.db import get_db
-            from webapp.db.repositories.file_search_state_repository import FileSearchStateRepository
-            
-            db = next(get_db())
-            try:
-                repo = FileSearchStateRepository(db)
-                repo.set_last_search_terms(user_id, terms)
-            finally:
-                db.close()
+            # Отложенная запись: UPDATE file_search_state выполнит фоновый поток буфера
+            from webapp.services.search_write_buffer import get_search_write_buffer
+            get_search_write_buffer().record_last_search_terms(user_id, terms)
         else:
             data = self._read_state_file()
             data['last_search_terms'] = terms
@@ -299,6 +299,11 @@ class FileSearchStateService:
                     'last_search_terms': ''
                 }
             
-            return self._read_state_db(user_id)
+            data = self._read_state_db(user_id)
+            from webapp.services.search_write_buffer import get_search_write_buffer
+            pending = get_search_write_buffer().pending_last_search_terms(user_id)
+            if pending is not None:
+                data['last_search_terms'] = pending
+            return data
         else:
             return self._read_state_file()
@@ -0,0 +1,298 @@
+"""
+Фоновые воркеры индексации поверх таблицы job_queue.
+
+Вместо вызова index_document_to_db внутри HTTP-запроса роуты (/upload, /build_index,
+/rebuild_index) ставят задачи типа 'index' в очередь и сразу возвращают job_id.
+Воркеры — отдельные процессы (python worker.py), число которых масштабируется
+независимо от веб-потоков.
+
+Протокол захвата, аренды и повторов описан в JobQueueRepository.
+"""
+import os
+import socket
+import signal
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from flask import Flask
+from sqlalchemy.orm import Session
+
+from webapp.db.base import SessionLocal
+from webapp.db.repositories.job_queue_repository import JobQueueRepository
+from webapp.models.rag_models import RAGDatabase
+
+
+INDEX_JOB_TYPE = 'index'
+
+
+def enqueue_index_job(
+    db: Session,
+    user_id: int,
+    document_id: int,
+    original_filename: str,
+    user_path: str,
+    force_rebuild: bool = False,
+    priority: int = 0
+) -> int:
+    """
+    Поставить документ пользователя в очередь на индексацию.
+
+    Args:
+        db: SQLAlchemy сессия
+        user_id: ID пользователя
+        document_id: ID документа (documents.id, blob уже сохранён)
+        original_filename: Имя файла у пользователя
+        user_path: Путь файла у пользователя
+        force_rebuild: Удалить старые chunks/search_index перед индексацией
+        priority: Приоритет задачи (больше — раньше)
+
+    Returns:
+        ID задачи в job_queue
+    """
+    from webapp.config.config_service import get_config
+    job = JobQueueRepository(db).enqueue(
+        job_type=INDEX_JOB_TYPE,
+        payload={
+            'document_id': document_id,
+            'original_filename': original_filename,
+            'user_path': user_path,
+            'force_rebuild': bool(force_rebuild),
+        },
+        user_id=user_id,
+        priority=priority,
+        max_attempts=get_config().job_max_attempts
+    )
+    return job.id
+
+
+def run_index_job(rag_db: RAGDatabase, user_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Выполнить задачу индексации одного документа (вызывается воркером в app context).
+
+    Raises:
+        ValueError: документ не найден
+        RuntimeError: index_document_to_db не смог проиндексировать документ
+    """
+    from webapp.config.config_service import get_config
+    from webapp.services.db_indexing import index_document_to_db
+
+    config = get_config()
+    document_id = int(payload['document_id'])
+
+    with rag_db.db.connect() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT sha256, size_bytes, mime FROM documents WHERE id = %s;",
+                (document_id,)
+            )
+            row = cur.fetchone()
+            if not row:
+                raise ValueError(f'Документ {document_id} не найден')
+
+            if payload.get('force_rebuild'):
+                cur.execute("DELETE FROM chunks WHERE document_id = %s;", (document_id,))
+                cur.execute("DELETE FROM search_index WHERE document_id = %s;", (document_id,))
+        conn.commit()
+
+    file_info = {
+        'sha256': row[0],
+        'size': row[1],
+        'content_type': row[2] or 'application/octet-stream'
+    }
+    original_filename = payload.get('original_filename') or 'document'
+
+    doc_id, indexing_cost = index_document_to_db(
+        db=rag_db,
+        file_path="",  # Пустой путь - индексация из blob
+        file_info=file_info,
+        user_id=user_id,
+        original_filename=original_filename,
+        user_path=payload.get('user_path') or original_filename,
+        chunk_size_tokens=config.chunk_size_tokens,
+        chunk_overlap_tokens=config.chunk_overlap_tokens
+    )
+    # index_document_to_db не пробрасывает исключения, а возвращает doc_id=0
+    if not doc_id:
+        raise RuntimeError(f'Не удалось проиндексировать документ {document_id}')
+
+    return {'document_id': doc_id, 'indexing_cost_seconds': round(indexing_cost, 3)}
+
+
+class IndexingWorker:
+    """
+    Воркер очереди задач: захватывает задачу, продлевает аренду heartbeat'ом
+    во время выполнения, фиксирует результат или ошибку (с повтором).
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        worker_id: Optional[str] = None,
+        job_types: Sequence[str] = (INDEX_JOB_TYPE,),
+        poll_interval: Optional[float] = None,
+        lease_seconds: Optional[int] = None,
+        session_factory: Callable[[], Session] = SessionLocal
+    ):
+        """
+        Args:
+            app: Flask приложение (задачи выполняются в его app context)
+            worker_id: Идентификатор воркера (по умолчанию host:pid)
+            job_types: Типы задач, которые обрабатывает воркер
+            poll_interval: Пауза между опросами пустой очереди (секунды)
+            lease_seconds: Длительность аренды задачи (секунды)
+            session_factory: Фабрика SQLAlchemy сессий
+        """
+        from webapp.config.config_service import get_config
+        config = get_config()
+
+        self.app = app
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        self.job_types = list(job_types)
+        self.poll_interval = poll_interval if poll_interval is not None else config.worker_poll_interval_seconds
+        self.lease_seconds = lease_seconds if lease_seconds is not None else config.job_lease_seconds
+        self.session_factory = session_factory
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            INDEX_JOB_TYPE: self._handle_index
+        }
+        self._rag_db: Optional[RAGDatabase] = None
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Остановить воркер после завершения текущей задачи."""
+        self._stop.set()
+
+    def run_forever(self, max_jobs: Optional[int] = None) -> int:
+        """
+        Обрабатывать задачи до stop() (или до max_jobs задач).
+
+        Returns:
+            Количество обработанных задач
+        """
+        processed = 0
+        self.app.logger.info(f'[WORKER {self.worker_id}] Запуск, типы задач: {self.job_types}')
+        while not self._stop.is_set():
+            try:
+                had_job = self.run_once()
+            except Exception:
+                # Ошибка БД при захвате — не роняем воркер, ждём и пробуем снова
+                self.app.logger.exception(f'[WORKER {self.worker_id}] Ошибка цикла обработки')
+                had_job = False
+
+            if had_job:
+                processed += 1
+                if max_jobs is not None and processed >= max_jobs:
+                    break
+            else:
+                self._stop.wait(self.poll_interval)
+        self.app.logger.info(f'[WORKER {self.worker_id}] Остановлен, обработано задач: {processed}')
+        return processed
+
+    def run_once(self) -> bool:
+        """
+        Захватить и выполнить одну задачу.
+
+        Returns:
+            True, если задача была захвачена (независимо от результата)
+        """
+        session = self.session_factory()
+        try:
+            repo = JobQueueRepository(session)
+            job = repo.claim_next(self.worker_id, self.job_types, self.lease_seconds)
+            if not job:
+                return False
+
+            self.app.logger.info(
+                f"[WORKER {self.worker_id}] Задача #{job['id']} ({job['type']}), попытка {job['attempts']}/{job['max_attempts']}"
+            )
+            started = time.time()
+            heartbeat_stop = threading.Event()
+            heartbeat = threading.Thread(
+                target=self._heartbeat_loop,
+                args=(job['id'], heartbeat_stop),
+                name=f'job-heartbeat-{job["id"]}',
+                daemon=True
+            )
+            heartbeat.start()
+            try:
+                handler = self.handlers.get(job['type'])
+                if handler is None:
+                    raise ValueError(f"Неизвестный тип задачи: {job['type']}")
+                result = handler(job)
+            except Exception as e:
+                heartbeat_stop.set()
+                heartbeat.join()
+                new_status = repo.fail(job['id'], self.worker_id, f'{type(e).__name__}: {e}',
+                                       job['attempts'], job['max_attempts'])
+                self.app.logger.exception(
+                    f"[WORKER {self.worker_id}] Задача #{job['id']} завершилась ошибкой, новый статус: {new_status}"
+                )
+                return True
+
+            heartbeat_stop.set()
+            heartbeat.join()
+            if not repo.complete(job['id'], self.worker_id, result):
+                # Аренда истекла и задачу перехватил другой воркер — результат не фиксируем
+                self.app.logger.warning(f"[WORKER {self.worker_id}] Аренда задачи #{job['id']} потеряна")
+            else:
+                self.app.logger.info(
+                    f"[WORKER {self.worker_id}] Задача #{job['id']} выполнена за {time.time() - started:.2f}s"
+                )
+            return True
+        finally:
+            session.close()
+
+    def _handle_index(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Обработчик задач типа 'index'."""
+        if self._rag_db is None:
+            self._rag_db = RAGDatabase()
+        return run_index_job(self._rag_db, job['user_id'], job['payload'])
+
+    def _heartbeat_loop(self, job_id: int, stop_event: threading.Event) -> None:
+        """Продлевать аренду задачи, пока она выполняется (в отдельной сессии)."""
+        interval = max(1.0, self.lease_seconds / 3.0)
+        while not stop_event.wait(interval):
+            session = self.session_factory()
+            try:
+                if not JobQueueRepository(session).heartbeat(job_id, self.worker_id):
+                    return
+            except Exception:
+                self.app.logger.debug(f'Не удалось продлить аренду задачи #{job_id}', exc_info=True)
+            finally:
+                session.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Точка входа процесса-воркера (см. worker.py)."""
+    import argparse
+    from webapp import create_app
+
+    parser = argparse.ArgumentParser(description='Воркер фоновой индексации (job_queue)')
+    parser.add_argument('--worker-id', default=None, help='Идентификатор воркера (по умолчанию host:pid)')
+    parser.add_argument('--max-jobs', type=int, default=None, help='Завершиться после N задач')
+    parser.add_argument('--once', action='store_true', help='Обработать не более одной задачи и выйти')
+    args = parser.parse_args(argv)
+
+    app = create_app(os.environ.get('FLASK_ENV', 'prod'))
+    worker = IndexingWorker(app, worker_id=args.worker_id)
+
+    def _graceful_stop(signum, frame):
+        app.logger.info(f'[WORKER {worker.worker_id}] Получен сигнал {signum}, завершаем после текущей задачи')
+        worker.stop()
+
+    try:
+        signal.signal(signal.SIGINT, _graceful_stop)
+        signal.signal(signal.SIGTERM, _graceful_stop)
+    except Exception:
+        # Не во всех окружениях доступна регистрация сигналов
+        pass
+
+    with app.app_context():
+        if args.once:
+            worker.run_once()
+        else:
+            worker.run_forever(max_jobs=args.max_jobs)
+    return 0
+
+
+__all__ = ['INDEX_JOB_TYPE', 'enqueue_index_job', 'run_index_job', 'IndexingWorker', 'main']
@@ -0,0 +1,128 @@
+"""
+Кэш результатов /search в памяти процесса.
+
+Пользователи многократно повторяют одни и те же запросы (фрагменты ИКЗ,
+названия поставщиков), а корпус меняется только при загрузке и удалении.
+Ключ кэша — (user_id, нормализованные термины, exclude_mode, режим поиска,
+версия корпуса пользователя). Версию (corpus_generations.generation) увеличивают
+триггеры БД при индексации, мягком удалении и восстановлении документов, поэтому
+устаревшая выдача не возвращается ни в одном процессе: после изменения корпуса
+ключ просто перестаёт совпадать, а старые записи вытесняются по LRU.
+
+Размер ограничен числом записей (SEARCH_CACHE_MAX_ENTRIES) и суммарным числом
+закэшированных результатов (SEARCH_CACHE_MAX_RESULTS).
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[int, Tuple[str, ...], bool, str, int]
+
+
+def normalize_terms(terms: List[str]) -> Tuple[str, ...]:
+    """Термины без учёта регистра и лишних пробелов, в исходном порядке."""
+    return tuple(' '.join(str(t).split()).casefold() for t in terms if str(t).strip())
+
+
+class SearchResultCache:
+    """Потокобезопасный LRU-кэш выдачи поиска с ограничением по записям и результатам."""
+
+    def __init__(self, max_entries: int = 256, max_results: int = 20000):
+        """
+        Args:
+            max_entries: Максимум закэшированных запросов
+            max_results: Максимум результатов во всех записях вместе
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.max_results = max(1, int(max_results))
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[CacheKey, List[Dict[str, Any]]]' = OrderedDict()
+        self._results = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'skipped': 0}
+
+    @staticmethod
+    def make_key(user_id: int, terms: List[str], exclude_mode: bool, mode: str, generation: int) -> CacheKey:
+        return (int(user_id), normalize_terms(terms), bool(exclude_mode), mode, int(generation))
+
+    def get(self, key: CacheKey) -> Optional[List[Dict[str, Any]]]:
+        """Закэшированная выдача (копия списка) или None."""
+        with self._lock:
+            results = self._entries.get(key)
+            if results is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return list(results)
+
+    def put(self, key: CacheKey, results: List[Dict[str, Any]]) -> None:
+        """Запомнить выдачу; слишком большая для кэша выдача не сохраняется."""
+        if len(results) > self.max_results:
+            with self._lock:
+                self._stats['skipped'] += 1
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = list(results)
+            self._results += len(results)
+            while len(self._entries) > self.max_entries or self._results > self.max_results:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._results = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики hits/misses/evictions/skipped, размер и hit_rate."""
+        with self._lock:
+            data = dict(self._stats)
+            data['entries'] = len(self._entries)
+            data['results'] = self._results
+        lookups = data['hits'] + data['misses']
+        data['hit_rate'] = round(data['hits'] / lookups, 4) if lookups else 0.0
+        return data
+
+    def _remove(self, key: CacheKey) -> None:
+        results = self._entries.pop(key, None)
+        if results is not None:
+            self._results -= len(results)
+
+
+def get_corpus_generation(conn, user_id: int) -> int:
+    """
+    Текущая версия корпуса пользователя (0, если корпус ещё не менялся).
+
+    Args:
+        conn: psycopg2 connection
+        user_id: ID пользователя
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT generation FROM corpus_generations WHERE user_id = %s;", (user_id,))
+        row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+_cache: Optional[SearchResultCache] = None
+_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SearchResultCache]:
+    """Кэш процесса (None, если SEARCH_CACHE_MAX_ENTRIES=0)."""
+    global _cache
+    from webapp.config.config_service import get_config
+    config = get_config()
+    if config.search_cache_max_entries <= 0:
+        return None
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = SearchResultCache(config.search_cache_max_entries, config.search_cache_max_results)
+    return _cache
+
+
+__all__ = ['SearchResultCache', 'normalize_terms', 'get_corpus_generation', 'get_search_cache']
@@ -6,6 +6,7 @@ import openai
 
 from webapp.db.repositories import ChunkRepository, SearchHistoryRepository
 from webapp.db.models import Chunk
+from document_processor.search.matcher import TermMatcher
 
 
 class SearchResult:
@@ -90,16 +91,15 @@ class SearchService:
         if not query or not text:
             return text[:length] + ('...' if len(text) > length else '')
         
-        # Ищем первое вхождение (регистронезависимо)
-        query_lower = query.lower()
-        text_lower = text.lower()
-        pos = text_lower.find(query_lower)
+        # Ищем первое вхождение (без учёта регистра и ё/е)
+        first = TermMatcher.for_terms([query]).first(text)
         
-        if pos == -1:
+        if first is None:
             # Запрос не найден - возвращаем начало
             return text[:length] + ('...' if len(text) > length else '')
         
         # Вычисляем границы сниппета
+        pos = first[0]
         start = max(0, pos - length // 2)
         end = min(len(text), start + length)
         
@@ -297,15 +297,19 @@ class SearchService:
         """
         Сохранить запрос в историю поиска.
         
+        Запись отложенная: строка попадает в SearchWriteBuffer и вставляется
+        пакетом фоновым потоком.
+        
         Args:
             user_id: ID пользователя
             query: Текст запроса
             results_count: Количество результатов
             filters: Дополнительные фильтры (опционально)
         """
-        self.history_repo.create_search_record(
+        from webapp.services.search_write_buffer import get_search_write_buffer
+        get_search_write_buffer().record_history(
             user_id=user_id,
-            query_text=query,
+            query=query,
             results_count=results_count,
             filters=filters
         )
@@ -0,0 +1,344 @@
+"""
+Отложенная запись побочных эффектов поиска (write-behind).
+
+/search после выдачи результатов обновлял access_count/last_accessed_at у
+каждого найденного документа, последние поисковые термины пользователя и
+историю поиска — синхронно, в потоке запроса. UPDATE documents блокирует те же
+строки, что и параллельная индексация, и поиск ждал эти блокировки.
+
+SearchWriteBuffer накапливает эти записи в памяти процесса и схлопывает их:
+- обращения к документу — в счётчик и время последнего обращения на документ;
+- последние термины — последнее значение на пользователя;
+- история — строки для пакетного INSERT.
+Фоновый поток сбрасывает накопленное раз в SEARCH_WRITE_FLUSH_INTERVAL_SECONDS
+одним UPDATE/INSERT на таблицу; каждая таблица — в своей транзакции, чтобы ошибка
+истории не откатывала счётчики обращений. Пакет истории, отвергнутый из-за данных,
+делится пополам до отдельных строк; строка, не записанная за HISTORY_MAX_ATTEMPTS
+сбросов, отбрасывается (счётчик dropped). При аварийном завершении процесса
+теряется не больше одного интервала; при штатном выходе остаток записывается (atexit).
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, text
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from webapp.db.base import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Сколько сбросов подряд строка истории может не записаться, прежде чем её отбросить
+HISTORY_MAX_ATTEMPTS = 3
+
+
+def _is_connection_error(error: Exception) -> bool:
+    """Ошибка соединения с БД (а не данных): дробить пакет бессмысленно."""
+    return isinstance(error, (OperationalError, InterfaceError))
+
+
+class SearchWriteBuffer:
+    """Буфер побочных записей поиска с периодическим сбросом (один на процесс, см. get_search_write_buffer)."""
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        flush_interval: float = 2.0,
+        max_pending: int = 10000,
+        background: bool = True
+    ):
+        """
+        Args:
+            session_factory: Фабрика SQLAlchemy сессий
+            flush_interval: Период сброса (и максимальное окно потери при сбое процесса)
+            max_pending: Сбросить досрочно при стольких накопленных ключах; строки истории
+                сверх 2 * max_pending отбрасываются со счётчиком
+            background: False — записывать сразу в вызывающем потоке (без буферизации)
+        """
+        self.session_factory = session_factory
+        self.flush_interval = max(0.05, float(flush_interval))
+        self.max_pending = max(1, int(max_pending))
+        self.background = background
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._access: Dict[int, List[float]] = {}  # document_id -> [обращений, time.time() последнего]
+        self._last_terms: Dict[int, str] = {}
+        self._history: List[Tuple[int, Dict[str, Any]]] = []  # (неудачных попыток, строка)
+        self._stats = {'flushes': 0, 'failed_flushes': 0, 'access_updates': 0,
+                       'history_rows': 0, 'dropped': 0}
+        self._pid: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    # --- API потока запроса ---
+
+    def record_access(self, document_ids: Iterable[int]) -> None:
+        """Учесть обращение к документам (access_count += 1, last_accessed_at = сейчас)."""
+        now = time.time()
+        ids = [int(d) for d in document_ids if d]
+        if not ids:
+            return
+        with self._lock:
+            self._reset_after_fork()
+            for doc_id in ids:
+                entry = self._access.get(doc_id)
+                if entry is None:
+                    self._access[doc_id] = [1, now]
+                else:
+                    entry[0] += 1
+                    entry[1] = now
+        self._after_record()
+
+    def record_last_search_terms(self, user_id: int, terms: str) -> None:
+        """Запомнить последние поисковые термины пользователя (последнее значение побеждает)."""
+        with self._lock:
+            self._reset_after_fork()
+            self._last_terms[int(user_id)] = terms
+        self._after_record()
+
+    def pending_last_search_terms(self, user_id: int) -> Optional[str]:
+        """Ещё не записанные термины пользователя (чтобы чтение сразу после поиска видело их)."""
+        with self._lock:
+            if self._pid != os.getpid():
+                return None
+            return self._last_terms.get(int(user_id))
+
+    def record_history(self, user_id: int, query: str, results_count: int,
+                       filters: Optional[dict] = None) -> None:
+        """Добавить строку search_history."""
+        row = {'user_id': user_id, 'query_text': query, 'results_count': results_count,
+               'filters': filters, 'created_at': datetime.utcnow()}
+        with self._lock:
+            self._reset_after_fork()
+            if len(self._history) >= 2 * self.max_pending:
+                self._stats['dropped'] += 1
+                return
+            self._history.append((0, row))
+        self._after_record()
+
+    def flush(self) -> bool:
+        """
+        Записать всё накопленное сейчас (из любого потока).
+
+        Обращения, последние термины и история пишутся в отдельных транзакциях:
+        неудача одной части не откатывает и не задерживает остальные.
+
+        Returns:
+            False, если какая-то часть не записалась (она возвращена в буфер до
+            следующей попытки; строки истории — не больше HISTORY_MAX_ATTEMPTS раз)
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._reset_after_fork()
+                access, self._access = self._access, {}
+                last_terms, self._last_terms = self._last_terms, {}
+                history, self._history = self._history, []
+            if not (access or last_terms or history):
+                return True
+
+            errors = []
+            if access:
+                try:
+                    self._in_transaction(self._write_access, access)
+                except Exception as e:
+                    errors.append(e)
+                    self._restore(access=access)
+                    access = {}
+            if last_terms:
+                try:
+                    self._in_transaction(self._write_last_terms, last_terms)
+                except Exception as e:
+                    errors.append(e)
+                    self._restore(last_terms=last_terms)
+            written = 0
+            if history:
+                written, failed, error = self._write_history_isolated(history)
+                if failed:
+                    errors.append(error)
+                    self._restore(history=failed)
+
+            with self._lock:
+                self._stats['access_updates'] += len(access)
+                self._stats['history_rows'] += written
+                self._stats['failed_flushes' if errors else 'flushes'] += 1
+            if errors:
+                logger.warning(f"Не удалось записать побочные данные поиска: {errors[0]}")
+                return False
+            return True
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Остановить поток и записать остаток (вызывается при выходе процесса)."""
+        self._closed = True
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+        if self._pid == os.getpid():
+            self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики сбросов и объём накопленного."""
+        with self._lock:
+            data = dict(self._stats)
+            data['pending_documents'] = len(self._access)
+            data['pending_users'] = len(self._last_terms)
+            data['pending_history'] = len(self._history)
+        return data
+
+    # --- Внутреннее ---
+
+    def _reset_after_fork(self) -> None:
+        """Вызывается под self._lock: накопленное родителем запишет сам родитель."""
+        pid = os.getpid()
+        if self._pid is not None and self._pid != pid:
+            self._access, self._last_terms, self._history = {}, {}, []
+            self._thread = None
+        self._pid = pid
+
+    def _after_record(self) -> None:
+        if not self.background or self._closed:
+            self.flush()
+            return
+        self._ensure_started()
+        if len(self._access) + len(self._last_terms) + len(self._history) >= self.max_pending:
+            self._wakeup.set()
+
+    def _ensure_started(self) -> None:
+        """Запустить поток сброса (лениво и заново после fork — потоки не наследуются)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='search-write-buffer', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._closed:
+                return
+            self.flush()
+
+    def _restore(self, access=None, last_terms=None, history=None) -> None:
+        """Вернуть несохранённое в буфер, не затирая более новые значения."""
+        with self._lock:
+            for doc_id, (count, accessed) in (access or {}).items():
+                entry = self._access.get(doc_id)
+                if entry is None:
+                    self._access[doc_id] = [count, accessed]
+                else:
+                    entry[0] += count
+                    entry[1] = max(entry[1], accessed)
+            for user_id, terms in (last_terms or {}).items():
+                self._last_terms.setdefault(user_id, terms)
+            if history:
+                retry = [(attempts, row) for attempts, row in history if attempts < HISTORY_MAX_ATTEMPTS]
+                room = max(0, 2 * self.max_pending - len(self._history))
+                self._stats['dropped'] += len(history) - len(retry[:room])
+                self._history[:0] = retry[:room]
+
+    def _in_transaction(self, write, data) -> None:
+        """Выполнить write(session, data) в отдельной транзакции."""
+        session = self.session_factory()
+        try:
+            write(session, data)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _write_history_isolated(self, history) -> Tuple[int, list, Optional[Exception]]:
+        """
+        Записать историю, деля отвергнутый пакет пополам до отдельных строк.
+
+        Returns:
+            (записано строк, [(попыток, строка)] незаписанных с увеличенным счётчиком, ошибка)
+        """
+        try:
+            self._in_transaction(self._write_history, [row for _, row in history])
+            return len(history), [], None
+        except Exception as e:
+            if len(history) == 1 or _is_connection_error(e):
+                return 0, [(attempts + 1, row) for attempts, row in history], e
+        middle = len(history) // 2
+        left_written, left_failed, left_error = self._write_history_isolated(history[:middle])
+        right_written, right_failed, right_error = self._write_history_isolated(history[middle:])
+        return left_written + right_written, left_failed + right_failed, left_error or right_error
+
+    @staticmethod
+    def _write_access(session, access) -> None:
+        """Один UPDATE documents на все накопленные обращения."""
+        now = time.time()
+        # Сортировка по id — одинаковый порядок блокировок у разных процессов
+        ids = sorted(access)
+        session.execute(
+            text("""
+                UPDATE documents AS d
+                SET access_count = COALESCE(d.access_count, 0) + v.hits,
+                    last_accessed_at = GREATEST(
+                        COALESCE(d.last_accessed_at, '-infinity'::timestamp),
+                        CURRENT_TIMESTAMP - make_interval(secs => v.age)
+                    )
+                FROM unnest(CAST(:ids AS integer[]), CAST(:hits AS integer[]),
+                            CAST(:ages AS double precision[])) AS v(id, hits, age)
+                WHERE d.id = v.id
+            """),
+            {
+                'ids': ids,
+                'hits': [int(access[i][0]) for i in ids],
+                'ages': [max(0.0, now - access[i][1]) for i in ids],
+            }
+        )
+
+    @staticmethod
+    def _write_last_terms(session, last_terms) -> None:
+        """Один UPDATE file_search_state на всех пользователей."""
+        users = sorted(last_terms)
+        session.execute(
+            text("""
+                UPDATE file_search_state AS f
+                SET search_terms = v.terms
+                FROM unnest(CAST(:users AS integer[]), CAST(:terms AS text[])) AS v(user_id, terms)
+                WHERE f.user_id = v.user_id
+            """),
+            {'users': users, 'terms': [last_terms[u] for u in users]}
+        )
+
+    @staticmethod
+    def _write_history(session, rows) -> None:
+        """Пакетный INSERT search_history."""
+        from webapp.db.models import SearchHistory
+        session.execute(insert(SearchHistory), rows)
+
+
+_buffer: Optional[SearchWriteBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def get_search_write_buffer() -> SearchWriteBuffer:
+    """Общий для процесса буфер (настройки SEARCH_WRITE_*)."""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                from webapp.config.config_service import get_config
+                config = get_config()
+                _buffer = SearchWriteBuffer(
+                    flush_interval=config.search_write_flush_interval_seconds,
+                    max_pending=config.search_write_max_pending,
+                    background=config.search_write_buffer_enabled
+                )
+                atexit.register(_buffer.shutdown)
+    return _buffer
+
+
+__all__ = ['SearchWriteBuffer', 'get_search_write_buffer']
@@ -1,28 +1,316 @@
 """
 Обработчик логов для записи в PostgreSQL.
+
+Записи app_logs и http_request_logs не пишутся в БД в потоке запроса: данные
+записи собираются синхронно (user_id, путь, тело запроса), а вставку выполняет
+фоновый поток LogBatchWriter — пакетами (один INSERT на пакет) по размеру или
+по таймеру. Если PostgreSQL не успевает и очередь заполнена, новые записи
+отбрасываются, а их число попадает в счётчик dropped и в служебную запись лога.
+Строки обрезаются по длине колонок; если пакет всё же отвергнут из-за данных
+(например, user_id удалённого пользователя), он делится пополам до отдельных
+записей — теряются (счётчик failed) только сами ошибочные записи.
 """
+import atexit
 import logging
+import os
+import queue
+import sys
+import threading
+import time
 import traceback
 from datetime import datetime
+from typing import Any, Dict, List, Optional
+
 from flask import has_request_context, request, g
+from sqlalchemy import String, insert
+from sqlalchemy.exc import InterfaceError, OperationalError
 from webapp.db.base import SessionLocal
 
 
+_STOP = object()
+
+# Длины строковых колонок моделей логов: {model: {column: length}}
+_column_lengths: Dict[Any, Dict[str, int]] = {}
+
+
+def _fit_columns(model, row: Dict[str, Any]) -> Dict[str, Any]:
+    """Обрезать строковые значения по длине колонок (String(N)) модели."""
+    lengths = _column_lengths.get(model)
+    if lengths is None:
+        lengths = {
+            column.name: column.type.length
+            for column in model.__table__.columns
+            if isinstance(column.type, String) and column.type.length
+        }
+        _column_lengths[model] = lengths
+    for name, length in lengths.items():
+        value = row.get(name)
+        if isinstance(value, str) and len(value) > length:
+            row[name] = value[:length]
+    return row
+
+
+def _is_connection_error(error: Exception) -> bool:
+    """Ошибка соединения с БД (а не данных): дробить пакет бессмысленно."""
+    return isinstance(error, (OperationalError, InterfaceError))
+
+
+class LogBatchWriter:
+    """Фоновая пакетная запись логов в БД (одна на процесс, см. get_log_writer)."""
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        queue_size: int = 10000
+    ):
+        """
+        Args:
+            session_factory: Фабрика SQLAlchemy сессий
+            batch_size: Сбрасывать пакет при накоплении N записей
+            flush_interval: Сбрасывать неполный пакет не позже чем через N секунд
+            queue_size: Ёмкость очереди (back-pressure: при переполнении запись отбрасывается)
+        """
+        self.session_factory = session_factory
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.01, float(flush_interval))
+        self.queue_size = max(1, int(queue_size))
+        self._lock = threading.Lock()
+        self._stats = {'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+        self._unreported_drops = 0
+        self._pid = None
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._failing = False
+
+    # --- API потоков-производителей ---
+
+    def submit(self, model, row: Dict[str, Any]) -> bool:
+        """
+        Поставить запись в очередь (не блокирует).
+
+        Args:
+            model: ORM-модель таблицы (AppLog, HTTPRequestLog)
+            row: Значения колонок (строки длиннее колонки обрезаются)
+
+        Returns:
+            False, если запись отброшена (очередь переполнена или writer остановлен)
+        """
+        if self._closed or not self._ensure_started():
+            self._count('dropped')
+            return False
+        try:
+            self._queue.put_nowait((model, _fit_columns(model, row)))
+            return True
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+                self._unreported_drops += 1
+            return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Дождаться записи всего, что уже в очереди. Returns: True, если успели."""
+        if not self._ensure_started():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Записать остаток очереди и остановить поток (вызывается при выходе процесса)."""
+        self._closed = True
+        thread = self._thread
+        if thread is None or not thread.is_alive() or self._pid != os.getpid():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики: written, dropped, failed, batches и текущая длина очереди."""
+        with self._lock:
+            data = dict(self._stats)
+        data['queued'] = self._queue.qsize() if self._queue is not None else 0
+        return data
+
+    def is_writer_thread(self) -> bool:
+        """Вызов из потока writer'а (его собственные логи в БД не пишем — иначе петля)."""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    # --- Фоновый поток ---
+
+    def _count(self, key: str, delta: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += delta
+
+    def _ensure_started(self) -> bool:
+        """Запустить поток (лениво и заново после fork — потоки не наследуются)."""
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return True
+        with self._lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return True
+            if self._closed:
+                return False
+            self._pid = pid
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._thread = threading.Thread(target=self._run, name='db-log-writer', daemon=True)
+            self._thread.start()
+        return True
+
+    def _run(self) -> None:
+        pending: Dict[Any, List[Dict[str, Any]]] = {}
+        count = 0
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if count else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._write(pending)
+                return
+            if isinstance(item, threading.Event):
+                self._write(pending)
+                pending, count = {}, 0
+                item.set()
+                continue
+            if item is not None:
+                model, row = item
+                pending.setdefault(model, []).append(row)
+                count += 1
+                if count == 1:
+                    deadline = time.monotonic() + self.flush_interval
+                if count < self.batch_size:
+                    continue
+
+            self._write(pending)
+            pending, count = {}, 0
+
+    def _write(self, pending: Dict[Any, List[Dict[str, Any]]]) -> None:
+        """Вставить пакет: по одному executemany-INSERT на таблицу, один commit.
+
+        Если пакет отвергнут из-за данных, таблицы пишутся по отдельности, а
+        отвергнутая часть делится пополам до отдельных записей (_write_rows).
+        """
+        with self._lock:
+            drops, self._unreported_drops = self._unreported_drops, 0
+        if drops:
+            from webapp.db.models import AppLog
+            pending.setdefault(AppLog, []).append({
+                'level': 'WARNING',
+                'user_id': None,
+                'component': __name__,
+                'message': f'Очередь логов переполнена: отброшено записей: {drops}',
+                'context_json': {'dropped': drops},
+                'created_at': datetime.utcnow(),
+            })
+
+        total = sum(len(rows) for rows in pending.values())
+        if not total:
+            return
+        try:
+            self._insert(pending.items())
+            written, failed, error = total, 0, None
+        except Exception as e:
+            if _is_connection_error(e):
+                self._count('failed', total)
+                if not self._failing:
+                    # Не пишем через logging: ошибка снова попала бы в эту же очередь.
+                    # Сообщаем один раз на серию ошибок, пока БД недоступна.
+                    print(f'Ошибка записи {total} записей лога в БД: {e}', file=sys.stderr)
+                self._failing = True
+                return
+            written, failed, error = 0, 0, e
+            for model, rows in pending.items():
+                model_written, model_failed = self._write_rows(model, rows)
+                written += model_written
+                failed += model_failed
+
+        with self._lock:
+            self._stats['written'] += written
+            self._stats['failed'] += failed
+            self._stats['batches'] += 1
+        self._failing = False
+        if failed:
+            print(f'Отброшено {failed} из {total} записей лога (ошибка данных): {error}', file=sys.stderr)
+
+    def _write_rows(self, model, rows: List[Dict[str, Any]]) -> tuple:
+        """Вставить строки одной таблицы, деля пополам при ошибке. Returns: (written, failed)."""
+        try:
+            self._insert([(model, rows)])
+            return len(rows), 0
+        except Exception as e:
+            if len(rows) == 1 or _is_connection_error(e):
+                return 0, len(rows)
+        middle = len(rows) // 2
+        left = self._write_rows(model, rows[:middle])
+        right = self._write_rows(model, rows[middle:])
+        return left[0] + right[0], left[1] + right[1]
+
+    def _insert(self, batches) -> None:
+        """Одна транзакция: executemany-INSERT для каждой пары (model, rows)."""
+        session = self.session_factory()
+        try:
+            for model, rows in batches:
+                # psycopg2 + SQLAlchemy 2.0: executemany INSERT отправляется как multi-row VALUES
+                session.execute(insert(model), rows)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+
+_writer: Optional[LogBatchWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer() -> LogBatchWriter:
+    """Общий для процесса LogBatchWriter (настройки LOG_DB_*)."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                from webapp.config.config_service import get_config
+                config = get_config()
+                _writer = LogBatchWriter(
+                    batch_size=config.log_db_batch_size,
+                    flush_interval=config.log_db_flush_interval_seconds,
+                    queue_size=config.log_db_queue_size
+                )
+                atexit.register(_writer.shutdown)
+    return _writer
+
+
 class DatabaseLogHandler(logging.Handler):
-    """Handler для записи логов в таблицу app_logs."""
+    """Handler для записи логов в таблицу app_logs (асинхронно, пакетами)."""
     
-    def __init__(self, level=logging.INFO):
+    def __init__(self, level=logging.INFO, writer: Optional[LogBatchWriter] = None):
         super().__init__(level)
         self.session_factory = SessionLocal
+        self.writer = writer or get_log_writer()
     
     def emit(self, record):
-        """Записать лог в БД."""
+        """Поставить лог в очередь записи в БД."""
         try:
+            if self.writer.is_writer_thread():
+                return
+
             # Отложенный импорт моделей для избежания циклических зависимостей
             from webapp.db.models import AppLog
             
-            session = self.session_factory()
-            
             # Определяем user_id если есть контекст запроса
             user_id = None
             if has_request_context() and hasattr(g, 'user') and g.user:
@@ -39,19 +327,14 @@ class DatabaseLogHandler(logging.Handler):
             if hasattr(record, 'extra') and record.extra:
                 context_json.update(record.extra)
             
-            # Создаём запись лога
-            log_entry = AppLog(
-                level=record.levelname,
-                user_id=user_id,
-                component=record.name,
-                message=record.getMessage(),
-                context_json=context_json if context_json else None,
-                created_at=datetime.utcnow()
-            )
-            
-            session.add(log_entry)
-            session.commit()
-            session.close()
+            self.writer.submit(AppLog, {
+                'level': record.levelname,
+                'user_id': user_id,
+                'component': record.name,
+                'message': record.getMessage(),
+                'context_json': context_json if context_json else None,
+                'created_at': datetime.utcfromtimestamp(record.created),
+            })
             
         except Exception:
             # Не падаем если не удалось записать лог в БД
@@ -63,15 +346,12 @@ class HTTPRequestLogHandler:
     """Middleware для логирования HTTP запросов в БД."""
     
     @staticmethod
-    def log_request(app, request, response, start_time):
-        """Записать информацию о HTTP запросе."""
+    def log_request(app, request, response, start_time, writer: Optional[LogBatchWriter] = None):
+        """Поставить информацию о HTTP запросе в очередь записи в БД."""
         try:
-            import time
             # Отложенный импорт моделей для избежания циклических зависимостей
             from webapp.db.models import HTTPRequestLog
             
-            session = SessionLocal()
-            
             # Определяем user_id
             user_id = None
             if hasattr(g, 'user') and g.user:
@@ -92,23 +372,19 @@ class HTTPRequestLogHandler:
                 except Exception:
                     pass
             
-            # Создаём запись
-            log_entry = HTTPRequestLog(
-                user_id=user_id,
-                method=request.method,
-                path=request.path,
-                query_params=query_params,
-                request_body=request_body,
-                response_status=response.status_code,
-                response_time_ms=response_time_ms,
-                ip_address=request.remote_addr,
-                user_agent=request.user_agent.string if request.user_agent else None,
-                created_at=datetime.utcnow()
-            )
-            
-            session.add(log_entry)
-            session.commit()
-            session.close()
+            (writer or get_log_writer()).submit(HTTPRequestLog, {
+                'user_id': user_id,
+                'method': request.method,
+                'path': request.path,
+                'query_params': query_params,
+                'request_body': request_body,
+                'response_status': response.status_code,
+                'response_time_ms': response_time_ms,
+                'ip_address': request.remote_addr,
+                # bool(request.user_agent) ложно без парсера браузера — берём заголовок
+                'user_agent': request.headers.get('User-Agent'),
+                'created_at': datetime.utcnow(),
+            })
             
         except Exception as e:
             # Логируем ошибку но не падаем
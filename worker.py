@@ -0,0 +1,14 @@
+"""Точка входа процесса фоновой индексации (воркер job_queue).
+
+Запуск (процессов можно поднять несколько — задачи распределяются через SKIP LOCKED):
+    python worker.py
+    python worker.py --max-jobs 100
+    python worker.py --once
+
+Воркер нужен только при BACKGROUND_INDEXING=true (см. .env.sample).
+"""
+import sys
+from webapp.services.indexing_worker import main
+
+if __name__ == '__main__':
+    sys.exit(main())